@@ -0,0 +1,96 @@
+"""
+Benchmark de mensajes/segundo del worker por tamaño de micro-lote
+
+Publica `--messages` transacciones en una cola temporal de RabbitMQ y las
+consume con MicroBatchConsumer (lotes de 1, 16, 64 y 256 por defecto),
+midiendo desde el primer mensaje hasta el último ack. Cada lote lee las
+ubicaciones en un pipeline de Redis, escribe sus evaluaciones con un
+insert_many y se confirma con un solo ack múltiple.
+
+Requiere MongoDB, Redis y RabbitMQ (los de docker-compose) y aio-pika;
+usa usuarios `bench:user_*` y borra la cola al terminar.
+
+Uso:
+    python scripts/benchmark_batch_consumer.py [--messages 5000] [--sizes 1,16,64,256]
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import aio_pika
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.config import settings  # noqa: E402
+from src.infrastructure.evaluation_consumer import MicroBatchConsumer  # noqa: E402
+from src.infrastructure.evaluation_engine import EvaluationEngine  # noqa: E402
+
+
+def make_message(i: int) -> bytes:
+    return json.dumps({
+        "id": f"bench_{uuid.uuid4().hex}",
+        "amount": 250.0,
+        "user_id": f"bench:user_{i % 200}",
+        "location": {"latitude": 4.6097, "longitude": -74.0817},
+        "timestamp": datetime.now().isoformat(),
+        "device_id": f"device_{i % 5}",
+    }).encode()
+
+
+async def run(messages: int, batch_size: int) -> float:
+    settings.worker_batch_size = batch_size
+    engine = EvaluationEngine.from_settings()
+    consumer = MicroBatchConsumer(engine, batch_size=batch_size, max_wait_seconds=0.02)
+    timer = asyncio.create_task(consumer.flush_periodically())
+
+    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=max(2 * batch_size, 100))
+    queue = await channel.declare_queue(f"bench.batch.{uuid.uuid4().hex[:8]}", auto_delete=True)
+    for i in range(messages):
+        await channel.default_exchange.publish(aio_pika.Message(make_message(i)), routing_key=queue.name)
+
+    received = 0
+    done = asyncio.Event()
+
+    async def on_message(message) -> None:
+        nonlocal received
+        await consumer.dispatch(message)
+        received += 1
+        if received == messages:
+            done.set()
+
+    start = time.perf_counter()
+    tag = await queue.consume(on_message)
+    await done.wait()
+    await consumer.drain()
+    elapsed = time.perf_counter() - start
+
+    await queue.cancel(tag)
+    timer.cancel()
+    await queue.delete(if_unused=False, if_empty=False)
+    await connection.close()
+    await engine.aclose()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--sizes", default="1,16,64,256")
+    args = parser.parse_args()
+
+    print(f"{args.messages:,} messages, single worker\n")
+    for size in (int(size) for size in args.sizes.split(",")):
+        elapsed = asyncio.run(run(args.messages, size))
+        print(f"batch {size:<6}{args.messages / elapsed:>10,.0f} msg/s{elapsed * 1000 / args.messages:>10.2f} ms/msg")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,109 @@
+"""
+Benchmark de la exportación masiva (/api/v1/admin/export)
+
+Mide filas por segundo de cada formato y, con --memory, la memoria máxima
+(tracemalloc ralentiza la medición, por eso va aparte). Por defecto usa
+documentos sintéticos en memoria (mide solo serialización + compresión);
+con --mongodb-url lee la colección `evaluations` real.
+
+Uso:
+    python scripts/benchmark_export.py [--rows 200000] [--batch-size 2000]
+    python scripts/benchmark_export.py --mongodb-url mongodb://localhost:27017 --database fraud_detection
+"""
+import argparse
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure import evaluation_export  # noqa: E402
+from src.infrastructure.evaluation_export import EvaluationExporter  # noqa: E402
+
+
+class SyntheticCollection:
+    """Colección mínima que genera documentos bajo demanda (sin acumularlos)"""
+
+    def __init__(self, rows: int) -> None:
+        self.rows = rows
+
+    def find(self, query, projection):
+        return self
+
+    def sort(self, *args):
+        return self
+
+    def batch_size(self, size):
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        base = datetime(2026, 1, 1)
+        for i in range(self.rows):
+            yield {
+                "transaction_id": f"txn_{i:08d}",
+                "user_id": f"user_{i % 5000:05d}",
+                "timestamp": base + timedelta(seconds=i),
+                "risk_level": "MEDIUM_RISK" if i % 10 == 0 else "LOW_RISK",
+                "status": "PENDING_REVIEW" if i % 10 == 0 else "APPROVED",
+                "reasons": ["Amount exceeds threshold"] if i % 10 == 0 else [],
+                "amount": float(i % 3000),
+                "location": {"latitude": 4.6097, "longitude": -74.0817},
+                "transaction_type": "transfer",
+                "reviewed_at": None,
+            }
+
+
+def run(exporter: EvaluationExporter, export_format: str, compress: bool, rows: int, memory: bool) -> None:
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    size = 0
+    for chunk in exporter.stream(export_format, {}, compress=compress):
+        size += len(chunk)
+    elapsed = time.perf_counter() - start
+    label = f"{export_format}{'+gzip' if compress and export_format != 'parquet' else ''}"
+    line = f"{label:<12}{rows / elapsed:>14,.0f} rows/s{size / 1e6:>10.1f} MB"
+    if memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        line += f"{peak / 1e6:>12.1f} MB peak"
+    print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=2000)
+    parser.add_argument("--mongodb-url")
+    parser.add_argument("--database", default="fraud_detection")
+    parser.add_argument("--memory", action="store_true", help="Track peak memory (slower)")
+    args = parser.parse_args()
+
+    if args.mongodb_url:
+        from pymongo import MongoClient
+
+        collection = MongoClient(args.mongodb_url)[args.database].evaluations
+        rows = collection.estimated_document_count()
+    else:
+        collection = SyntheticCollection(args.rows)
+        rows = args.rows
+
+    exporter = EvaluationExporter(collection, batch_size=args.batch_size)
+    print(f"{rows:,} rows, batch size {args.batch_size}\n")
+    run(exporter, "ndjson", False, rows, args.memory)
+    run(exporter, "ndjson", True, rows, args.memory)
+    run(exporter, "csv", True, rows, args.memory)
+    if evaluation_export.pyarrow is not None:
+        run(exporter, "parquet", False, rows, args.memory)
+    else:
+        print("parquet     skipped (pyarrow not installed)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,152 @@
+"""
+Benchmark de hedged reads: p99 de la lectura de ubicación con un primario lento
+
+Lee `--requests` veces la última ubicación de usuarios `bench:user_*`
+(UserLocationStore.get) con `--concurrency` lecturas en paralelo y muestra
+el histograma de latencias:
+
+- primary: solo el primario
+- hedged: HedgedRedis (primario + réplica, delay = p95 adaptativo)
+
+Al primario se le inyecta latencia del lado del cliente: una fracción
+`--slow-fraction` de las lecturas espera `--slow-ms` adicionales antes de
+enviarse, como los GETs lentos ocasionales que marcan el p99 en producción.
+
+Requiere un primario y una réplica que replique de él.
+
+Uso:
+    python scripts/benchmark_hedged_reads.py --primary-url redis://localhost:6379 \\
+        --replica-url redis://localhost:6380 [--requests 5000] [--slow-fraction 0.02]
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+import redis.asyncio as redis_async  # noqa: E402
+
+from src.infrastructure.hedged_reads import HedgedRedis, HedgePolicy  # noqa: E402
+from src.infrastructure.redis_keys import user_geo_key  # noqa: E402
+from src.infrastructure.user_location_store import UserLocationStore  # noqa: E402
+
+USERS = 500
+BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class SlowPipeline:
+    """Pipeline cuyo execute() se retrasa con probabilidad `fraction`"""
+
+    def __init__(self, pipeline, delay: float, fraction: float) -> None:
+        self._pipeline = pipeline
+        self._delay = delay
+        self._fraction = fraction
+
+    async def __aenter__(self):
+        await self._pipeline.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._pipeline.__aexit__(*exc)
+
+    def __getattr__(self, name):
+        return getattr(self._pipeline, name)
+
+    async def execute(self):
+        if random.random() < self._fraction:
+            await asyncio.sleep(self._delay)
+        return await self._pipeline.execute()
+
+
+class SlowPrimary:
+    """Cliente con latencia inyectada en los pipelines"""
+
+    def __init__(self, client, delay: float, fraction: float) -> None:
+        self.wrapped = client
+        self._delay = delay
+        self._fraction = fraction
+
+    def pipeline(self, *args, **kwargs):
+        return SlowPipeline(self.wrapped.pipeline(*args, **kwargs), self._delay, self._fraction)
+
+    def __getattr__(self, name):
+        return getattr(self.wrapped, name)
+
+
+async def run(label: str, store: UserLocationStore, requests: int, concurrency: int) -> None:
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await store.get(f"bench:user_{i % USERS}")
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(requests)))
+
+    latencies.sort()
+    p50 = latencies[len(latencies) // 2]
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{label}: p50 {p50:.2f} ms, p99 {p99:.2f} ms, max {latencies[-1]:.2f} ms")
+    lower = 0.0
+    for upper in BUCKETS_MS + (float("inf"),):
+        count = sum(1 for value in latencies if lower <= value < upper)
+        share = count / len(latencies)
+        print(f"  < {upper:>6} ms {count:>7,} {share:>7.2%} {'#' * int(share * 50)}")
+        lower = upper
+    print()
+
+
+async def main_async(args) -> None:
+    primary = redis_async.from_url(args.primary_url, decode_responses=True)
+    replica = redis_async.from_url(args.replica_url, decode_responses=True)
+
+    writer = UserLocationStore(primary, ttl=600, legacy_reads=False)
+    for i in range(USERS):
+        await writer.set(f"bench:user_{i}", 4.6097, -74.0817)
+    await primary.wait(1, 5000)
+
+    slow_primary = SlowPrimary(primary, args.slow_ms / 1000, args.slow_fraction)
+    policy = HedgePolicy("bench", percentile=args.percentile)
+
+    print(
+        f"{args.requests:,} reads, concurrency {args.concurrency}, "
+        f"{args.slow_fraction:.1%} of primary reads +{args.slow_ms} ms\n"
+    )
+    try:
+        await run("primary", UserLocationStore(slow_primary, ttl=600, legacy_reads=False),
+                  args.requests, args.concurrency)
+        await run("hedged", UserLocationStore(
+            slow_primary, ttl=600, legacy_reads=False,
+            reads=HedgedRedis(slow_primary, replica, policy),
+        ), args.requests, args.concurrency)
+        print(
+            f"hedged {policy.hedged_total:,} of {policy.reads_total:,} reads "
+            f"(replica won {policy.replica_wins_total:,}), final delay {policy.delay() * 1000:.2f} ms"
+        )
+    finally:
+        await primary.delete(*(user_geo_key(f"bench:user_{i}") for i in range(USERS)))
+        await primary.aclose()
+        await replica.aclose()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--primary-url", default="redis://localhost:6379")
+    parser.add_argument("--replica-url", default="redis://localhost:6380")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--slow-fraction", type=float, default=0.02)
+    parser.add_argument("--slow-ms", type=float, default=50.0)
+    parser.add_argument("--percentile", type=float, default=0.95)
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+"""
+Benchmark de punta a punta del worker sin RabbitMQ
+
+Publica `--messages` transacciones con InMemoryPublisher (mismo
+enrutamiento por shard y mismo codec que el publisher de RabbitMQ) y las
+consume con LocalWorker, midiendo desde la primera publicación hasta el
+último ack. Sin la red ni el broker de por medio, la diferencia entre
+tamaños de micro-lote y niveles de concurrencia es la del propio worker
+(evaluación, Redis y escrituras en MongoDB).
+
+Requiere MongoDB y Redis (los de docker-compose); usa usuarios
+`bench:user_*`.
+
+Uso:
+    python scripts/benchmark_local_pipeline.py [--messages 5000] [--sizes 0,16,64] [--prefetch 256]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.adapters import MongoDBAdapter, RedisAdapter  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer  # noqa: E402
+from src.infrastructure.evaluation_engine import EvaluationEngine  # noqa: E402
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter  # noqa: E402
+from src.infrastructure.memory_broker import InMemoryBroker, InMemoryPublisher, LocalWorker  # noqa: E402
+
+
+def make_transaction(i: int) -> dict:
+    return {
+        "id": f"bench_{uuid.uuid4().hex}",
+        "amount": 250.0,
+        "user_id": f"bench:user_{i % 200}",
+        "location": {"latitude": 4.6097, "longitude": -74.0817},
+        "timestamp": datetime.now().isoformat(),
+        "device_id": f"device_{i % 5}",
+    }
+
+
+async def run(messages: int, batch_size: int, prefetch: int, concurrency: int) -> float:
+    broker = InMemoryBroker()
+    mongo = MongoDBAdapter(settings.mongodb_url, settings.mongodb_database)
+    writer = EvaluationBatchWriter(
+        mongo,
+        max_batch_size=max(settings.worker_write_batch_size, batch_size),
+        max_delay_seconds=settings.worker_write_flush_ms / 1000,
+        offload=True,
+    )
+    cache = RedisAdapter(settings.redis_url, settings.redis_ttl)
+    engine = EvaluationEngine(mongo, InMemoryPublisher(broker), cache, writer)
+    if batch_size:
+        consumer = MicroBatchConsumer(engine, batch_size=batch_size, max_wait_seconds=0.02)
+    else:
+        consumer = EvaluationConsumer(engine, concurrency=concurrency)
+    worker = LocalWorker(broker, consumer, prefetch_count=max(prefetch, batch_size))
+    await worker.start()
+
+    publisher = InMemoryPublisher(broker)
+    start = time.perf_counter()
+    for i in range(messages):
+        await publisher.publish_transaction_for_processing(make_transaction(i))
+    await worker.wait_idle()
+    elapsed = time.perf_counter() - start
+
+    await worker.stop()
+    await engine.aclose()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--sizes", default="0,16,64", help="micro-lotes (0 = mensaje a mensaje)")
+    parser.add_argument("--prefetch", type=int, default=settings.worker_prefetch_count)
+    parser.add_argument("--concurrency", type=int, default=settings.worker_concurrency)
+    args = parser.parse_args()
+
+    print(f"{args.messages:,} messages, in-memory broker, prefetch {args.prefetch}\n")
+    for size in (int(size) for size in args.sizes.split(",")):
+        elapsed = asyncio.run(run(args.messages, size, args.prefetch, args.concurrency))
+        label = f"batch {size}" if size else f"single x{args.concurrency}"
+        print(f"{label:<14}{args.messages / elapsed:>10,.0f} msg/s{elapsed * 1000 / args.messages:>10.2f} ms/msg")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
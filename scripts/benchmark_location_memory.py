@@ -0,0 +1,94 @@
+"""
+Comparación de memoria en Redis: ubicaciones JSON vs sets GEO
+
+Carga `--users` ubicaciones (1M por defecto) en cada formato, con el
+mismo TTL que usa la aplicación, y reporta el delta de `used_memory` y
+`MEMORY USAGE` de una clave de muestra:
+
+- json: `user:{id}:location` -> '{"latitude": ..., "longitude": ...}'
+- geo:  `user:{id}:geo` (con hash tag) -> set GEO con el miembro `last`
+
+Las claves llevan el prefijo `bench_` en el id de usuario y se borran al
+terminar cada formato. Conviene correrlo contra un Redis sin otra carga.
+
+Uso:
+    python scripts/benchmark_location_memory.py --redis-url redis://localhost:6379 [--users 1000000]
+"""
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+import redis  # noqa: E402
+
+from src.infrastructure.redis_keys import legacy_location_key, user_geo_key  # noqa: E402
+from src.infrastructure.user_location_store import LOCATION_MEMBER  # noqa: E402
+
+BATCH = 10_000
+TTL = 86400
+
+
+def coordinates(count: int):
+    rng = random.Random(42)
+    for i in range(count):
+        yield f"bench_{i}", rng.uniform(-4.2, 12.5), rng.uniform(-79.0, -66.8)
+
+
+def load_json(pipe, user_id, latitude, longitude):
+    pipe.setex(legacy_location_key(user_id), TTL, json.dumps({"latitude": latitude, "longitude": longitude}))
+
+
+def load_geo(pipe, user_id, latitude, longitude):
+    pipe.geoadd(user_geo_key(user_id), (longitude, latitude, LOCATION_MEMBER))
+    pipe.expire(user_geo_key(user_id), TTL)
+
+
+def cleanup(client, pattern: str) -> None:
+    batch = []
+    for key in client.scan_iter(pattern, count=BATCH):
+        batch.append(key)
+        if len(batch) >= BATCH:
+            client.unlink(*batch)
+            batch = []
+    if batch:
+        client.unlink(*batch)
+
+
+def measure(client, label: str, load, key_for, users: int) -> int:
+    before = client.info("memory")["used_memory"]
+    pipe = client.pipeline(transaction=False)
+    for i, (user_id, latitude, longitude) in enumerate(coordinates(users), 1):
+        load(pipe, user_id, latitude, longitude)
+        if i % BATCH == 0:
+            pipe.execute()
+    pipe.execute()
+    delta = client.info("memory")["used_memory"] - before
+    sample = client.memory_usage(key_for("bench_0"))
+    print(f"{label:<6}{delta / 1e6:>12.1f} MB{delta / users:>10.1f} B/user{sample:>10} B sample key")
+    return delta
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--users", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    client = redis.from_url(args.redis_url, decode_responses=True)
+    print(f"{args.users:,} users\n")
+    try:
+        json_bytes = measure(client, "json", load_json, legacy_location_key, args.users)
+        cleanup(client, legacy_location_key("bench_*"))
+        geo_bytes = measure(client, "geo", load_geo, user_geo_key, args.users)
+    finally:
+        cleanup(client, legacy_location_key("bench_*"))
+        cleanup(client, user_geo_key("bench_*"))
+    print(f"\ngeo / json: {geo_bytes / json_bytes:.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
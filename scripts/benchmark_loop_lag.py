@@ -0,0 +1,138 @@
+"""
+Benchmark del lag del event loop al evaluar con las estrategias de Redis
+
+Lanza `--concurrency` evaluaciones concurrentes de DeviceValidation +
+RapidTransaction mientras una sonda duerme `--interval` ms en el mismo
+loop y registra cuánto se retrasa cada despertar. Compara:
+
+- blocking: los mismos comandos con el cliente síncrono `redis` (como
+  antes: cada llamada detiene el loop hasta que Redis responde)
+- async: las estrategias actuales sobre `redis.asyncio` (pool compartido)
+
+Requiere un Redis accesible (usa claves `bench:*` y las borra al final).
+
+Uso:
+    python scripts/benchmark_loop_lag.py --redis-url redis://localhost:6379 [--requests 5000] [--concurrency 100]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+import redis  # noqa: E402
+import redis.asyncio as redis_async  # noqa: E402
+
+from src.domain.models import Location, Transaction  # noqa: E402
+from src.domain.strategies.device_validation import DEVICE_MEMORY_SECONDS, DeviceValidationStrategy  # noqa: E402
+from src.domain.strategies.rapid_transaction import RapidTransactionStrategy  # noqa: E402
+
+
+def make_transaction(i: int) -> Transaction:
+    return Transaction(
+        id=f"bench_txn_{i}",
+        amount=Decimal("100.0"),
+        user_id=f"bench:user_{i % 500}",
+        location=Location(latitude=4.6097, longitude=-74.0817),
+        timestamp=datetime.now(),
+        device_id=f"device_{i % 7}",
+    )
+
+
+async def evaluate_blocking(client, transaction: Transaction) -> None:
+    """Secuencia de comandos anterior, con el cliente síncrono"""
+    devices_key = f"user_devices:{transaction.user_id}"
+    if not client.sismember(devices_key, transaction.device_id):
+        client.sadd(devices_key, transaction.device_id)
+        client.expire(devices_key, DEVICE_MEMORY_SECONDS)
+    rapid_key = f"rapid_tx:{transaction.user_id}"
+    now = transaction.timestamp.timestamp()
+    client.zadd(rapid_key, {transaction.id: now})
+    client.expire(rapid_key, 300)
+    client.zremrangebyscore(rapid_key, 0, now - 300)
+    client.zcount(rapid_key, now - 300, now)
+
+
+async def probe(interval: float, lags: list, stop: asyncio.Event) -> None:
+    """Duerme `interval` segundos en bucle y anota el retraso de cada despertar"""
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def run(label: str, evaluate, requests: int, concurrency: int, interval: float) -> None:
+    lags: list = []
+    stop = asyncio.Event()
+    probe_task = asyncio.create_task(probe(interval, lags, stop))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            await evaluate(make_transaction(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await probe_task
+
+    lags_ms = sorted(lag * 1000 for lag in lags) or [0.0]
+    p99 = lags_ms[min(len(lags_ms) - 1, int(len(lags_ms) * 0.99))]
+    print(
+        f"{label:<10}{requests / elapsed:>10,.0f} eval/s"
+        f"{statistics.median(lags_ms):>10.2f} ms p50 lag"
+        f"{p99:>10.2f} ms p99 lag{lags_ms[-1]:>10.2f} ms max"
+    )
+
+
+async def cleanup(client) -> None:
+    keys = [key async for key in client.scan_iter("*bench:user_*")]
+    if keys:
+        await client.delete(*keys)
+
+
+async def main_async(args) -> None:
+    sync_client = redis.from_url(args.redis_url, decode_responses=True)
+    async_client = redis_async.from_url(args.redis_url, decode_responses=True)
+    interval = args.interval / 1000
+
+    async def blocking(transaction):
+        await evaluate_blocking(sync_client, transaction)
+
+    device = DeviceValidationStrategy(redis_client=async_client)
+    rapid = RapidTransactionStrategy(redis_client=async_client)
+
+    async def non_blocking(transaction):
+        await device.evaluate(transaction)
+        await rapid.evaluate(transaction)
+
+    print(f"{args.requests:,} evaluations, concurrency {args.concurrency}, probe every {args.interval} ms\n")
+    try:
+        await run("blocking", blocking, args.requests, args.concurrency, interval)
+        await cleanup(async_client)
+        await run("async", non_blocking, args.requests, args.concurrency, interval)
+    finally:
+        await cleanup(async_client)
+        await async_client.aclose()
+        sync_client.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--interval", type=float, default=5.0, help="Probe interval in ms")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,79 @@
+"""
+Benchmark del formato de los mensajes: JSON sin esquema vs codecs tipados
+
+Codifica y decodifica `--messages` transacciones con:
+
+- json (anterior): `json.dumps` / `json.loads` a un dict sin validar
+- typed-json: JsonCodec (msgspec si está instalado) al esquema validado
+- msgpack: MsgpackCodec (requiere msgspec)
+
+Reporta mensajes por segundo de cada dirección y el tamaño medio del
+cuerpo. No necesita RabbitMQ.
+
+Uso:
+    python scripts/benchmark_message_codec.py [--messages 100000]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.message_codec import (  # noqa: E402
+    MSGPACK,
+    JsonCodec,
+    TransactionMessage,
+    convert,
+    get_codec,
+    msgspec,
+)
+
+
+def transaction(i: int) -> dict:
+    return {
+        "id": f"txn_{i}",
+        "amount": 1500.0 + i % 1000,
+        "user_id": f"user_{i % 1000}",
+        "location": {"latitude": 4.711, "longitude": -74.0721},
+        "timestamp": "2026-01-15T10:30:00Z",
+        "device_id": f"device_{i % 50}",
+        "transaction_type": "transfer",
+    }
+
+
+def measure(label: str, encode, decode, payloads: list) -> None:
+    start = time.perf_counter()
+    bodies = [encode(payload) for payload in payloads]
+    encode_rate = len(payloads) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for body in bodies:
+        decode(body)
+    decode_rate = len(payloads) / (time.perf_counter() - start)
+
+    size = sum(len(body) for body in bodies) / len(bodies)
+    print(f"{label:>11}: encode {encode_rate:>10,.0f} msg/s  decode {decode_rate:>10,.0f} msg/s  {size:6.1f} bytes")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100_000)
+    args = parser.parse_args()
+
+    raw = [transaction(i) for i in range(args.messages)]
+    typed = [convert(data, TransactionMessage) for data in raw]
+
+    measure("json", lambda data: json.dumps(data).encode(), json.loads, raw)
+    codec = JsonCodec()
+    measure("typed-json", codec.encode, lambda body: codec.decode(body, TransactionMessage), typed)
+    if msgspec is None:
+        print("    msgpack: msgspec not installed")
+        return
+    codec = get_codec(MSGPACK)
+    measure("msgpack", codec.encode, lambda body: codec.decode(body, TransactionMessage), typed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark del publisher: RabbitMQAdapter (pika bloqueante) vs AsyncRabbitMQPublisher
+
+Dos mediciones contra el RabbitMQ de docker-compose, publicando en una
+cola temporal:
+
+- throughput: `--messages` publicaciones con `--concurrency` en vuelo
+  (con pika salen de a una: bloquean el loop)
+- latencia de POST /transaction: `--requests` peticiones concurrentes que
+  crean su publisher como lo hace la API (pika: conexión nueva por
+  petición; async: publisher del proceso) y publican una revisión manual;
+  se reporta p50/p99 de cada petición
+
+Solo las publicaciones asíncronas esperan la confirmación del broker.
+
+Uso:
+    python scripts/benchmark_publisher.py [--messages 5000] [--concurrency 64] [--requests 500]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.adapters import RabbitMQAdapter  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.infrastructure.async_publisher import AsyncRabbitMQPublisher  # noqa: E402
+
+
+def payload(i: int) -> dict:
+    return {
+        "transaction_id": f"bench_{i}",
+        "risk_level": "MEDIUM_RISK",
+        "reasons": [],
+        "amount": 250.0,
+        "user_id": f"user_{i % 100}",
+    }
+
+
+async def throughput_pika(messages: int, concurrency: int) -> float:
+    publisher = RabbitMQAdapter(settings.rabbitmq_url)
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await publisher.publish_for_manual_review(payload(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - start
+    publisher.close()
+    return elapsed
+
+
+async def throughput_async(messages: int, concurrency: int) -> float:
+    publisher = AsyncRabbitMQPublisher(settings.rabbitmq_url)
+    await publisher.publish_for_manual_review(payload(-1))  # abre conexión y canales
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await publisher.publish_for_manual_review(payload(i))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    elapsed = time.perf_counter() - start
+    await publisher.aclose()
+    return elapsed
+
+
+async def latencies(requests: int, make_publisher) -> list:
+    samples = []
+
+    async def request(i: int) -> None:
+        start = time.perf_counter()
+        publisher = make_publisher()
+        await publisher.publish_for_manual_review(payload(i))
+        if isinstance(publisher, RabbitMQAdapter):
+            publisher.close()
+        samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(request(i) for i in range(requests)))
+    return sorted(samples)
+
+
+async def run(args) -> None:
+    # Cola temporal para no llenar la de revisión manual
+    settings.rabbitmq_manual_review_queue = f"bench.publisher.{uuid.uuid4().hex[:8]}"
+    print(f"Queue {settings.rabbitmq_manual_review_queue}\n")
+
+    print(f"throughput: {args.messages:,} messages, concurrency {args.concurrency}")
+    for label, bench in (("pika", throughput_pika), ("async+confirms", throughput_async)):
+        elapsed = await bench(args.messages, args.concurrency)
+        print(f"  {label:<16}{args.messages / elapsed:>10,.0f} msg/s")
+
+    print(f"\nPOST /transaction publish latency: {args.requests} concurrent requests")
+    shared = AsyncRabbitMQPublisher(settings.rabbitmq_url)
+    for label, factory in (
+        ("pika", lambda: RabbitMQAdapter(settings.rabbitmq_url)),
+        ("async+confirms", lambda: shared),
+    ):
+        samples = await latencies(args.requests, factory)
+        p50 = statistics.median(samples) * 1000
+        p99 = samples[int(len(samples) * 0.99) - 1] * 1000
+        print(f"  {label:<16}p50 {p50:>8.2f} ms   p99 {p99:>8.2f} ms")
+    await shared.aclose()
+
+    import pika
+
+    connection = pika.BlockingConnection(pika.URLParameters(settings.rabbitmq_url))
+    connection.channel().queue_delete(settings.rabbitmq_manual_review_queue)
+    connection.close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--requests", type=int, default=500)
+    asyncio.run(run(parser.parse_args()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,155 @@
+"""
+Benchmark del transporte: RabbitMQ (aio-pika) vs Redis Streams
+
+Publica `--messages` transacciones con `--concurrency` publicaciones en
+vuelo y las consume en el mismo proceso con un consumidor que solo
+decodifica y confirma (sin evaluación ni MongoDB): la diferencia es la
+del transporte. Por transporte reporta el throughput de punta a punta
+(primera publicación -> último ack) y la latencia publicación -> entrega
+(p50/p99).
+
+- rabbitmq: AsyncRabbitMQPublisher (publisher confirms) y un consumidor
+  aio-pika con `--prefetch`, sobre una cola temporal.
+- redis_streams: RedisStreamsPublisher (XADD) y
+  RedisStreamReader (XREADGROUP con COUNT, XACK), sobre un stream
+  temporal que se borra al terminar.
+
+Requiere RabbitMQ y Redis en el mismo host (los de docker-compose).
+
+Uso:
+    python scripts/benchmark_transports.py [--messages 20000] [--concurrency 64] [--prefetch 256]
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+import uuid
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.config import settings  # noqa: E402
+from src.infrastructure.async_publisher import AsyncRabbitMQPublisher  # noqa: E402
+from src.infrastructure.message_codec import TransactionMessage, convert, decode_transaction  # noqa: E402
+from src.infrastructure.redis_streams import (  # noqa: E402
+    RedisStreamReader,
+    RedisStreamsPublisher,
+    streams_client,
+)
+
+
+def make_transaction(i: int) -> TransactionMessage:
+    return convert(
+        {
+            "id": f"bench_{i}",
+            "amount": 250.0,
+            "user_id": f"bench:user_{i % 200}",
+            "location": {"latitude": 4.6097, "longitude": -74.0817},
+            "device_id": f"device_{i % 5}",
+        },
+        TransactionMessage,
+    )
+
+
+class Recorder:
+    """Momento de publicación por id y latencia hasta la entrega"""
+
+    def __init__(self, messages: int) -> None:
+        self.messages = messages
+        self.sent: Dict[str, float] = {}
+        self.latencies: List[float] = []
+        self.done = asyncio.Event()
+
+    async def on_message(self, message) -> None:
+        transaction = decode_transaction(message)
+        self.latencies.append(time.perf_counter() - self.sent.pop(transaction["id"]))
+        await message.ack()
+        if len(self.latencies) == self.messages:
+            self.done.set()
+
+
+async def publish_all(recorder: Recorder, publish: Callable[[TransactionMessage], Awaitable[None]],
+                      concurrency: int) -> None:
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            message = make_transaction(i)
+            recorder.sent[message.id] = time.perf_counter()
+            await publish(message)
+
+    await asyncio.gather(*(one(i) for i in range(recorder.messages)))
+
+
+async def run_rabbitmq(messages: int, concurrency: int, prefetch: int) -> Tuple[float, List[float]]:
+    import aio_pika
+
+    queue_name = f"bench.transport.{uuid.uuid4().hex[:8]}"
+    recorder = Recorder(messages)
+    connection = await aio_pika.connect_robust(settings.rabbitmq_url)
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=prefetch)
+    queue = await channel.declare_queue(queue_name, auto_delete=True)
+    await queue.consume(recorder.on_message)
+    publisher = AsyncRabbitMQPublisher(settings.rabbitmq_url)
+
+    start = time.perf_counter()
+    await publish_all(recorder, lambda message: publisher.publish(queue_name, message), concurrency)
+    await recorder.done.wait()
+    elapsed = time.perf_counter() - start
+
+    await publisher.aclose()
+    await connection.close()
+    return elapsed, recorder.latencies
+
+
+async def run_redis_streams(messages: int, concurrency: int, prefetch: int) -> Tuple[float, List[float]]:
+    stream = f"bench.transport.{uuid.uuid4().hex[:8]}"
+    recorder = Recorder(messages)
+    client = streams_client(settings.redis_streams_url or settings.redis_url)
+    reader = RedisStreamReader(
+        client, [stream], "bench", "bench-0", recorder.on_message,
+        parking=f"{stream}.parking", prefetch_count=prefetch, read_count=prefetch, block_ms=100,
+    )
+    await reader.declare()
+    consuming = asyncio.create_task(reader.run())
+    publisher = RedisStreamsPublisher("", client=client)
+
+    start = time.perf_counter()
+    await publish_all(recorder, lambda message: publisher.publish(stream, message), concurrency)
+    await recorder.done.wait()
+    elapsed = time.perf_counter() - start
+
+    consuming.cancel()
+    await asyncio.gather(consuming, return_exceptions=True)
+    await client.delete(stream, f"{stream}.parking")
+    await client.aclose()
+    return elapsed, recorder.latencies
+
+
+def percentile(values: List[float], q: float) -> float:
+    return statistics.quantiles(values, n=100)[int(q) - 1]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--prefetch", type=int, default=256)
+    args = parser.parse_args()
+
+    print(f"{args.messages:,} messages, {args.concurrency} in flight, prefetch {args.prefetch}\n")
+    print(f"{'transport':<16}{'msg/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, run in (("rabbitmq", run_rabbitmq), ("redis_streams", run_redis_streams)):
+        elapsed, latencies = asyncio.run(run(args.messages, args.concurrency, args.prefetch))
+        print(
+            f"{name:<16}{args.messages / elapsed:>10,.0f}"
+            f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 99) * 1000:>10.2f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+"""
+Benchmark del historial por usuario: colección `evaluations` vs buckets
+
+Siembra un usuario pesado (por defecto 12.000 transacciones en ~2 años)
+en una base temporal, construye los índices del catálogo y los buckets,
+y mide las dos lecturas que hacen la app de usuario (timeline completo) y
+UnusualTimeStrategy (últimos 90 días, límite 100).
+
+Reporta latencia (mediana de N repeticiones) y documentos / claves de
+índice examinados según `explain("executionStats")`.
+
+Uso:
+    MONGODB_TEST_URL=mongodb://localhost:27017 python scripts/benchmark_user_history.py [--transactions 12000]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from pymongo import MongoClient  # noqa: E402
+
+from src.infrastructure.index_catalog import catalog_collections, ensure_indexes  # noqa: E402
+from src.infrastructure.user_history_buckets import UserHistoryBucketStore  # noqa: E402
+
+DATABASE = "fraud_detection_history_benchmark"
+HEAVY_USER = "user_heavy"
+
+
+def seed(db, transactions: int, now: datetime) -> None:
+    """Siembra el usuario pesado y algo de ruido de otros usuarios"""
+    step = timedelta(days=730) / transactions
+    documents = []
+    for i in range(transactions):
+        documents.append({
+            "transaction_id": f"txn_heavy_{i:06d}",
+            "user_id": HEAVY_USER,
+            "risk_level": "LOW_RISK",
+            "reasons": [],
+            "status": "APPROVED",
+            "timestamp": now - step * i,
+            "amount": float(i % 2000),
+            "location": {"latitude": 4.6, "longitude": -74.1},
+            "transaction_type": "transfer",
+        })
+    for i in range(transactions):
+        documents.append({
+            "transaction_id": f"txn_other_{i:06d}",
+            "user_id": f"user_{i % 500:04d}",
+            "risk_level": "LOW_RISK",
+            "reasons": [],
+            "status": "APPROVED",
+            "timestamp": now - step * i,
+            "amount": 10.0,
+        })
+    for offset in range(0, len(documents), 5000):
+        db.evaluations.insert_many(documents[offset:offset + 5000], ordered=False)
+
+
+def timed(function, repeat: int) -> float:
+    """Mediana en milisegundos"""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def execution_stats(cursor) -> str:
+    stats = cursor.explain()["executionStats"]
+    return f"docs={stats['totalDocsExamined']} keys={stats['totalKeysExamined']}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--transactions", type=int, default=12000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--cap", type=int, default=1000)
+    args = parser.parse_args()
+
+    client = MongoClient(os.getenv("MONGODB_TEST_URL", "mongodb://localhost:27017"))
+    client.drop_database(DATABASE)
+    db = client[DATABASE]
+    now = datetime.now().replace(microsecond=0)
+
+    print(f"Seeding {args.transactions} evaluations for {HEAVY_USER}...")
+    seed(db, args.transactions, now)
+    ensure_indexes({name: db[name] for name in catalog_collections()})
+    store = UserHistoryBucketStore(db.user_evaluation_buckets, cap=args.cap)
+    buckets = store.rebuild(db.evaluations, until=now + timedelta(seconds=1))
+    print(f"Built {buckets} buckets (cap={args.cap})\n")
+
+    since = now - timedelta(days=90)
+    cases = [
+        (
+            "full timeline",
+            lambda: list(db.evaluations.find({"user_id": HEAVY_USER}).sort("timestamp", -1)),
+            lambda: store.get_history(HEAVY_USER),
+            lambda: db.evaluations.find({"user_id": HEAVY_USER}).sort("timestamp", -1),
+            lambda: db.user_evaluation_buckets.find({"user_id": HEAVY_USER}).sort("last_ts", -1),
+        ),
+        (
+            "90 days, limit 100",
+            lambda: list(
+                db.evaluations.find({"user_id": HEAVY_USER, "timestamp": {"$gte": since}})
+                .sort("timestamp", -1).limit(100)
+            ),
+            lambda: store.get_history(HEAVY_USER, since=since, limit=100),
+            lambda: db.evaluations.find(
+                {"user_id": HEAVY_USER, "timestamp": {"$gte": since}}
+            ).sort("timestamp", -1).limit(100),
+            lambda: db.user_evaluation_buckets.find(
+                {"user_id": HEAVY_USER, "last_ts": {"$gte": since}}
+            ).sort("last_ts", -1),
+        ),
+    ]
+
+    print(f"{'query':<22}{'layout':<14}{'median ms':>12}  examined")
+    for name, flat, bucketed, flat_cursor, bucket_cursor in cases:
+        print(f"{name:<22}{'evaluations':<14}{timed(flat, args.repeat):>12.2f}  {execution_stats(flat_cursor())}")
+        print(f"{'':<22}{'buckets':<14}{timed(bucketed, args.repeat):>12.2f}  {execution_stats(bucket_cursor())}")
+
+    client.drop_database(DATABASE)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,129 @@
+"""
+Benchmark de mensajes/segundo de un worker: caso de uso por mensaje vs engine
+
+Procesa `--messages` transacciones en un solo hilo, como el callback del
+worker, sin pasar por la cola (se mide el costo de evaluar y preparar el
+guardado, no el del broker):
+
+- per-message: lo que hacía `create_use_case()` en cada callback
+  (MongoDBAdapter + RabbitMQAdapter + RedisAdapter nuevos y `asyncio.run`);
+  aquí se cierran al terminar cada mensaje para no agotar conexiones
+- engine: EvaluationEngine construido una vez y reutilizado, en un solo loop
+- engine xN: el mismo engine con N evaluaciones en vuelo (worker_concurrency)
+
+En todos los casos las evaluaciones pasan por el writer por lotes, que se
+vacía al final. Requiere MongoDB, Redis y RabbitMQ (los de docker-compose);
+usa usuarios `bench:user_*`.
+
+Uso:
+    python scripts/benchmark_worker_throughput.py [--messages 2000] [--concurrency 16]
+"""
+import argparse
+import asyncio
+import sys
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.adapters import MongoDBAdapter, RabbitMQAdapter, RedisAdapter  # noqa: E402
+from src.application.use_cases import EvaluateTransactionUseCase  # noqa: E402
+from src.config import settings  # noqa: E402
+from src.infrastructure.evaluation_engine import EvaluationEngine, build_strategies  # noqa: E402
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter, WriteBehindRepository  # noqa: E402
+
+
+def make_message(i: int) -> dict:
+    return {
+        "id": f"bench_{uuid.uuid4().hex}",
+        "amount": 250.0,
+        "user_id": f"bench:user_{i % 200}",
+        "location": {"latitude": 4.6097, "longitude": -74.0817},
+        "timestamp": datetime.now().isoformat(),
+        "device_id": f"device_{i % 5}",
+    }
+
+
+def ignore(outcome) -> None:
+    pass
+
+
+def run_per_message(messages: int) -> float:
+    writer = EvaluationBatchWriter(MongoDBAdapter(settings.mongodb_url, settings.mongodb_database))
+    start = time.perf_counter()
+    for i in range(messages):
+        mongo = MongoDBAdapter(settings.mongodb_url, settings.mongodb_database)
+        repository = WriteBehindRepository(mongo, writer)
+        publisher = RabbitMQAdapter(settings.rabbitmq_url)
+        cache = RedisAdapter(settings.redis_url, settings.redis_ttl)
+        use_case = EvaluateTransactionUseCase(repository, publisher, cache, build_strategies(repository, cache))
+
+        async def evaluate():
+            try:
+                await use_case.execute(make_message(i))
+            finally:
+                await cache.redis.aclose()
+
+        asyncio.run(evaluate())
+        repository.commit(ignore)
+        if writer.should_flush():
+            writer.flush()
+        publisher.close()
+        mongo.client.close()
+    writer.flush()
+    return time.perf_counter() - start
+
+
+async def run_engine(messages: int) -> float:
+    engine = EvaluationEngine.from_settings()
+    start = time.perf_counter()
+    for i in range(messages):
+        await engine.evaluate(make_message(i), ignore)
+        if engine.writer.should_flush():
+            await engine.writer.flush_async()
+    await engine.writer.flush_async()
+    await engine.writer.join()
+    elapsed = time.perf_counter() - start
+    await engine.aclose()
+    return elapsed
+
+
+async def run_concurrent(messages: int, concurrency: int) -> float:
+    engine = EvaluationEngine.from_settings()
+    slots = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> None:
+        async with slots:
+            await engine.evaluate(make_message(i), ignore)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(messages)))
+    await engine.writer.flush_async()
+    await engine.writer.join()
+    elapsed = time.perf_counter() - start
+    await engine.aclose()
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    args = parser.parse_args()
+
+    print(f"{args.messages:,} messages, single worker\n")
+    runs = (
+        ("per-message", lambda: run_per_message(args.messages)),
+        ("engine", lambda: asyncio.run(run_engine(args.messages))),
+        (f"engine x{args.concurrency}", lambda: asyncio.run(run_concurrent(args.messages, args.concurrency))),
+    )
+    for label, run in runs:
+        elapsed = run()
+        print(f"{label:<14}{args.messages / elapsed:>10,.0f} msg/s{elapsed * 1000 / args.messages:>10.2f} ms/msg")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
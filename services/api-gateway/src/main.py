@@ -9,6 +9,7 @@ Por eso las puse en funciones separadas que se pueden inyectar - así los tests
 y el código real usa las conexiones reales. Es más trabajo inicial pero vale la pena.
 """
 from fastapi import FastAPI, Depends
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from decimal import Decimal
 from api_gateway.routes import router
@@ -24,6 +25,16 @@ from src.application.use_cases import (
     EvaluateTransactionUseCase,
     ReviewTransactionUseCase,
 )
+from src.infrastructure.admission_control import (
+    AdmissionConfigStore,
+    InflightSampler,
+    Watermarks,
+    all_admission_controllers,
+    get_admission_controller,
+)
+from src.infrastructure.async_publisher import get_async_publisher
+from src.infrastructure.metrics import CONTENT_TYPE, render_metrics
+from src.infrastructure.redis_streams import REDIS_STREAMS, get_streams_publisher
 from src.infrastructure.user_repository import UserRepository
 from src.infrastructure.auth_service import (
     PasswordService,
@@ -66,10 +77,56 @@ def get_cache():
 
 
 def get_publisher():
-    """Factory para MessagePublisher"""
+    """
+    Factory para MessagePublisher
+
+    El publisher asíncrono es uno por proceso (conexión y canales
+    compartidos entre peticiones); RabbitMQAdapter abre una conexión por
+    petición. Con `message_transport = "redis_streams"` se publica en
+    Redis Streams (un publisher por proceso).
+    """
+    if settings.message_transport == REDIS_STREAMS:
+        return get_streams_publisher("redis_streams", settings.redis_streams_url or settings.redis_url)
+    if settings.rabbitmq_async_publisher:
+        return get_async_publisher(
+            "rabbitmq",
+            settings.rabbitmq_url,
+            pool_size=settings.rabbitmq_publisher_channels,
+            max_batch=settings.rabbitmq_publish_batch_size,
+            confirm_timeout=settings.rabbitmq_confirm_timeout_seconds,
+        )
     return RabbitMQAdapter(settings.rabbitmq_url)
 
 
+def get_admission():
+    """
+    Factory del control de admisión de POST /transaction
+
+    Uno por proceso: mide las evaluaciones en línea de este proceso y la
+    muestra se comparte entre peticiones. None si
+    `admission_control_enabled` es False.
+    """
+    if not settings.admission_control_enabled:
+        return None
+    controller = all_admission_controllers().get("transactions")
+    if controller is not None:
+        return controller
+    return get_admission_controller(
+        "transactions",
+        sample=InflightSampler(window_seconds=settings.admission_window_seconds),
+        defaults=Watermarks(
+            soft_depth=settings.admission_soft_depth,
+            hard_depth=settings.admission_hard_depth,
+            soft_lag_seconds=settings.admission_soft_lag_seconds,
+            hard_lag_seconds=settings.admission_hard_lag_seconds,
+        ),
+        load_overrides=AdmissionConfigStore(get_cache().redis).load,
+        sample_ttl=settings.admission_sample_seconds,
+        overflow=settings.admission_overflow_enabled,
+        max_retry_after=settings.admission_max_retry_after_seconds,
+    )
+
+
 def get_strategies():
     """
     Factory para estrategias de fraude
@@ -178,7 +235,8 @@ configure_dependencies(
     cache_factory=get_cache,
     evaluate_use_case_factory=get_evaluate_use_case,
     review_use_case_factory=get_review_use_case,
-    publisher_factory=get_publisher
+    publisher_factory=get_publisher,
+    admission_factory=get_admission
 )
 
 configure_auth_dependencies(
@@ -203,6 +261,12 @@ async def health_check():
     return {"status": "healthy", "version": "0.1.0"}
 
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Métricas en formato Prometheus (circuit breakers, hedged reads, publisher y admisión)"""
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
 
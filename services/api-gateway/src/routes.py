@@ -13,6 +13,7 @@ from typing import List, Optional, Callable, Any, Dict
 from pydantic import BaseModel, Field
 from decimal import Decimal
 from datetime import datetime, timezone
+from contextlib import nullcontext
 
 
 def _iso_utc(dt: Optional[datetime]) -> Optional[str]:
@@ -80,6 +81,15 @@ class RuleReorderRequest(BaseModel):
     ruleIds: List[str] = Field(..., description="Ordered list of rule IDs")
 
 
+class AdmissionWatermarksRequest(BaseModel):
+    """DTO para ajustar los watermarks del control de admisión"""
+
+    soft_depth: Optional[int] = Field(None, gt=0, description="Backlog (messages) that defers low-priority traffic")
+    hard_depth: Optional[int] = Field(None, gt=0, description="Backlog (messages) that rejects all traffic")
+    soft_lag_seconds: Optional[float] = Field(None, gt=0, description="Consumer lag that defers low-priority traffic")
+    hard_lag_seconds: Optional[float] = Field(None, gt=0, description="Consumer lag that rejects all traffic")
+
+
 class UserAuthenticateRequest(BaseModel):
     """DTO para autenticación de transacción por parte del usuario"""
 
@@ -98,38 +108,51 @@ _cache_factory = None
 _publisher_factory = None
 _evaluate_use_case_factory = None
 _review_use_case_factory = None
+_admission_factory = None
 
 def configure_dependencies(
     repository_factory,
     cache_factory,
     evaluate_use_case_factory,
     review_use_case_factory,
-    publisher_factory=None
+    publisher_factory=None,
+    admission_factory=None
 ):
     """Configura las factories de dependencias desde main.py"""
     global _repository_factory, _cache_factory, _evaluate_use_case_factory, _review_use_case_factory, _publisher_factory
+    global _admission_factory
     _repository_factory = repository_factory
     _cache_factory = cache_factory
     _evaluate_use_case_factory = evaluate_use_case_factory
     _review_use_case_factory = review_use_case_factory
     _publisher_factory = publisher_factory
+    _admission_factory = admission_factory
+
+
+def _admission():
+    """Control de admisión del proceso (None si está deshabilitado)"""
+    return _admission_factory() if _admission_factory else None
 
 
 # ============================================================================
 # Helper Functions para reducir complejidad cognitiva
 # ============================================================================
 
-async def _get_disabled_rules(cache) -> set:
-    """Obtiene el conjunto de reglas deshabilitadas desde cache"""
+async def _load_rule_config(cache):
+    """
+    Snapshot del estado de reglas (umbrales, parámetros, deshabilitadas y
+    eliminadas) en un solo round trip a Redis
+    """
+    from src.infrastructure.rule_config_store import RuleConfigSnapshot
+
     try:
-        disabled_set = await cache.redis.smembers("disabled_default_rules")
-        return {r.decode('utf-8') if isinstance(r, bytes) else r for r in disabled_set}
+        return await cache.rule_config.load()
     except Exception as e:
-        print(f"Error loading disabled rules: {e}")
-        return set()
+        print(f"Error loading rule configuration: {e}")
+        return RuleConfigSnapshot()
 
 
-async def _build_strategies(disabled_rules: set, cache, repository):
+async def _build_strategies(rule_config, cache, repository):
     """Construye las estrategias de fraude basadas en reglas habilitadas"""
     from src.config import settings
     from src.domain.strategies.amount_threshold import AmountThresholdStrategy
@@ -139,7 +162,8 @@ async def _build_strategies(disabled_rules: set, cache, repository):
     from src.domain.strategies.unusual_time import UnusualTimeStrategy
     
     strategies = []
-    config = await cache.get_threshold_config()
+    disabled_rules = rule_config.disabled
+    config = rule_config.threshold_config()
     
     # 1. AmountThresholdStrategy
     if "rule_amount_threshold" not in disabled_rules:
@@ -153,15 +177,13 @@ async def _build_strategies(disabled_rules: set, cache, repository):
     
     # 3. DeviceValidationStrategy
     if "rule_device_validation" not in disabled_rules:
-        strategies.append(DeviceValidationStrategy(redis_client=cache.redis_sync))
+        strategies.append(DeviceValidationStrategy(redis_client=cache.redis, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state))
     
     # 4. RapidTransactionStrategy
     if "rule_rapid_transaction" not in disabled_rules:
-        max_transactions_str = await cache.redis.get("rule_config:rule_rapid_transaction:max_transactions")
-        time_window_minutes_str = await cache.redis.get("rule_config:rule_rapid_transaction:time_window_minutes")
-        max_transactions = int(max_transactions_str) if max_transactions_str else 3
-        time_window_minutes = int(time_window_minutes_str) if time_window_minutes_str else 5
-        strategies.append(RapidTransactionStrategy(redis_client=cache.redis_sync, max_transactions=max_transactions, window_minutes=time_window_minutes))
+        max_transactions = rule_config.parameter("rule_rapid_transaction", "max_transactions", int, 3)
+        time_window_minutes = rule_config.parameter("rule_rapid_transaction", "time_window_minutes", int, 5)
+        strategies.append(RapidTransactionStrategy(redis_client=cache.redis, max_transactions=max_transactions, window_minutes=time_window_minutes, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state))
     
     # 5. UnusualTimeStrategy
     if "rule_unusual_time" not in disabled_rules:
@@ -230,8 +252,7 @@ def _get_default_rule_ids() -> set:
 
 async def _delete_default_rule(rule_id: str, cache) -> None:
     """Marca una regla predeterminada como eliminada en Redis"""
-    await cache.redis.sadd("deleted_default_rules", rule_id)
-    await cache.redis.srem("disabled_default_rules", rule_id)
+    await cache.rule_config.mark_deleted(rule_id)
 
 
 def _delete_custom_rule(rule_id: str, repository) -> None:
@@ -244,10 +265,7 @@ def _delete_custom_rule(rule_id: str, repository) -> None:
 
 async def _handle_rule_enabled_state(rule_id: str, enabled: bool, cache, analyst_id: str) -> dict:
     """Maneja el cambio de estado enabled/disabled de una regla"""
-    if enabled == False:
-        await cache.redis.sadd("disabled_default_rules", rule_id)
-    else:
-        await cache.redis.srem("disabled_default_rules", rule_id)
+    await cache.rule_config.set_enabled(rule_id, enabled != False)
     
     return {
         "success": True,
@@ -261,16 +279,7 @@ async def _update_amount_threshold(rule_params: RuleParametersRequest, cache) ->
     if threshold is None or threshold <= 0:
         raise ValueError("Threshold must be positive")
     
-    config = await cache.get_threshold_config()
-    if config is None:
-        from src.config import settings
-        config = {
-            "amount_threshold": settings.amount_threshold,
-            "location_radius_km": settings.location_radius_km
-        }
-    
-    config["amount_threshold"] = threshold
-    await cache.set_threshold_config(**config)
+    await cache.rule_config.set_thresholds(amount_threshold=threshold)
 
 
 async def _update_location_check(rule_params: RuleParametersRequest, cache) -> None:
@@ -279,16 +288,7 @@ async def _update_location_check(rule_params: RuleParametersRequest, cache) -> N
     if radius_km is None or radius_km <= 0:
         raise ValueError("Radius must be positive")
     
-    config = await cache.get_threshold_config()
-    if config is None:
-        from src.config import settings
-        config = {
-            "amount_threshold": settings.amount_threshold,
-            "location_radius_km": settings.location_radius_km
-        }
-    
-    config["location_radius_km"] = radius_km
-    await cache.set_threshold_config(**config)
+    await cache.rule_config.set_thresholds(location_radius_km=radius_km)
 
 
 async def _update_device_validation(rule_id: str, rule_params: RuleParametersRequest, cache) -> dict:
@@ -297,7 +297,7 @@ async def _update_device_validation(rule_id: str, rule_params: RuleParametersReq
     if device_memory_days is not None:
         if device_memory_days <= 0:
             raise ValueError("device_memory_days must be positive")
-        await cache.redis.set(f"rule_config:{rule_id}:device_memory_days", str(device_memory_days))
+        await cache.rule_config.set_parameters(rule_id, device_memory_days=device_memory_days)
     
     return {"id": rule_id, "parameters": rule_params.parameters}
 
@@ -307,15 +307,20 @@ async def _update_rapid_transaction(rule_id: str, rule_params: RuleParametersReq
     max_transactions = rule_params.parameters.get("max_transactions")
     time_window_minutes = rule_params.parameters.get("time_window_minutes")
     
+    updates = {}
     if max_transactions is not None:
         if max_transactions <= 0:
             raise ValueError("max_transactions must be positive")
-        await cache.redis.set(f"rule_config:{rule_id}:max_transactions", str(max_transactions))
+        updates["max_transactions"] = max_transactions
     
     if time_window_minutes is not None:
         if time_window_minutes <= 0:
             raise ValueError("time_window_minutes must be positive")
-        await cache.redis.set(f"rule_config:{rule_id}:time_window_minutes", str(time_window_minutes))
+        updates["time_window_minutes"] = time_window_minutes
+    
+    # Ambos parámetros en la misma transacción: nadie ve uno sin el otro
+    if updates:
+        await cache.rule_config.set_parameters(rule_id, **updates)
     
     return {"id": rule_id, "parameters": rule_params.parameters}
 
@@ -326,7 +331,7 @@ async def _update_unusual_time(rule_id: str, rule_params: RuleParametersRequest,
     if deviation_threshold is not None:
         if deviation_threshold <= 0 or deviation_threshold > 1:
             raise ValueError("deviation_threshold must be between 0 and 1")
-        await cache.redis.set(f"rule_config:{rule_id}:deviation_threshold", str(deviation_threshold))
+        await cache.rule_config.set_parameters(rule_id, deviation_threshold=deviation_threshold)
     
     return {"id": rule_id, "parameters": rule_params.parameters}
 
@@ -353,12 +358,43 @@ def _update_custom_rule(rule_id: str, rule_params: RuleParametersRequest, reposi
         raise HTTPException(status_code=404, detail=RULE_NOT_FOUND_MESSAGE)
 
 
+async def _admit_transaction(transaction_data: dict, priority: Optional[str]) -> Optional[dict]:
+    """
+    Control de admisión según las evaluaciones en línea en curso
+
+    Returns:
+        Respuesta si la transacción se difirió al overflow (None = admitida)
+
+    Raises:
+        HTTPException: 429 con Retry-After si se rechaza
+    """
+    from src.infrastructure.admission_control import DEFER, REJECT
+
+    admission = _admission()
+    if admission is None:
+        return None
+    decision = await admission.admit(low_priority=(priority or "").lower() == "low")
+    if decision.action == REJECT:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Transaction backlog too large: {decision.reason}",
+            headers={"Retry-After": str(decision.retry_after)},
+        )
+    if decision.action == DEFER:
+        await _publisher_factory().publish_to_overflow(transaction_data)
+        return {"status": "deferred", "transaction_id": transaction_data["id"], "risk_level": None}
+    return None
+
+
 # ============================================================================
 # Endpoints
 # ============================================================================
 
 @router.post("/transaction", status_code=status.HTTP_202_ACCEPTED)
-async def submit_transaction(transaction: TransactionRequest):
+async def submit_transaction(
+    transaction: TransactionRequest,
+    priority: Optional[str] = Header(None, alias="X-Priority"),
+):
     """
     HU-001: Recibe transacción y responde 202 Accepted
     El procesamiento es asíncrono vía RabbitMQ
@@ -366,13 +402,12 @@ async def submit_transaction(transaction: TransactionRequest):
     Nota del desarrollador:
     La IA sugirió 200 OK. Lo cambié a 202 Accepted porque el procesamiento
     es asíncrono - esto comunica mejor la semántica al cliente.
+
+    Con demasiadas evaluaciones en curso responde 429 con Retry-After, o
+    difiere el tráfico `X-Priority: low` a la cola de overflow, que evalúa
+    el worker (ver infrastructure/admission_control.py).
     """
     try:
-        # Instanciar directamente con las factories
-        repository = _repository_factory()
-        cache = _cache_factory()
-        publisher = _publisher_factory()
-        
         # Ajustar el monto según el tipo de transacción
         transaction_data = transaction.model_dump()
         transaction_type = transaction_data.get('transaction_type', 'transfer')
@@ -384,6 +419,15 @@ async def submit_transaction(transaction: TransactionRequest):
             if transaction_data['amount'] > 0:
                 transaction_data['amount'] = -transaction_data['amount']
         # Para 'deposit' el monto ya es positivo, no se modifica
+
+        deferred = await _admit_transaction(transaction_data, priority)
+        if deferred is not None:
+            return deferred
+
+        # Instanciar directamente con las factories
+        repository = _repository_factory()
+        cache = _cache_factory()
+        publisher = _publisher_factory()
         
         # Crear estrategias
         from decimal import Decimal
@@ -397,8 +441,8 @@ async def submit_transaction(transaction: TransactionRequest):
         strategies = [
             AmountThresholdStrategy(Decimal(str(settings.amount_threshold))),
             LocationStrategy(settings.location_radius_km),
-            DeviceValidationStrategy(redis_client=cache.redis_sync),
-            RapidTransactionStrategy(redis_client=cache.redis_sync),
+            DeviceValidationStrategy(redis_client=cache.redis, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state),
+            RapidTransactionStrategy(redis_client=cache.redis, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state),
             UnusualTimeStrategy(audit_repository=repository),
         ]
         
@@ -406,7 +450,9 @@ async def submit_transaction(transaction: TransactionRequest):
         from src.application.use_cases import EvaluateTransactionUseCase
         evaluate_use_case = EvaluateTransactionUseCase(repository, publisher, cache, strategies)
         
-        result = await evaluate_use_case.execute(transaction_data)
+        admission = _admission()
+        with admission.track() if admission is not None else nullcontext():
+            result = await evaluate_use_case.execute(transaction_data)
         return {
             "status": "accepted",
             "transaction_id": transaction.id,
@@ -440,10 +486,12 @@ async def get_all_evaluations():
 @router.get("/audit/transaction/{transaction_id}")
 async def get_evaluation_by_id(transaction_id: str):
     """
-    Consulta una evaluación específica por ID
+    Consulta una evaluación específica por ID (incluye evaluaciones archivadas)
     """
+    from starlette.concurrency import run_in_threadpool
+
     repository = _repository_factory()
-    evaluation = await repository.get_evaluation_by_id(transaction_id)
+    evaluation = await run_in_threadpool(repository.get_evaluation_by_id, transaction_id)
     if evaluation is None:
         raise HTTPException(status_code=404, detail="Transaction not found")
 
@@ -589,9 +637,9 @@ async def validate_transaction_sync(transaction: TransactionValidateRequest):
         cache = _cache_factory()
         publisher = _publisher_factory()
         
-        # Obtener reglas deshabilitadas y crear estrategias
-        disabled_rules = await _get_disabled_rules(cache)
-        strategies = await _build_strategies(disabled_rules, cache, repository)
+        # Estado de reglas (un round trip) y estrategias habilitadas
+        rule_config = await _load_rule_config(cache)
+        strategies = await _build_strategies(rule_config, cache, repository)
         
         # Crear use case
         from src.application.use_cases import EvaluateTransactionUseCase
@@ -701,55 +749,13 @@ def _build_default_rules(amount_threshold, location_radius):
         }
     ]
 
-async def _update_rule_parameter(cache, rule_id: str, param_key: str, default_rules, param_type=int):
-    """Actualiza un parámetro específico de una regla desde Redis."""
-    value = await cache.redis.get(f"rule_config:{rule_id}:{param_key}")
-    if value:
-        for rule in default_rules:
-            if rule["id"] == rule_id:
-                rule["parameters"][param_key] = param_type(value)
-
-async def _load_device_validation_params(cache, default_rules):
-    """Carga parámetros de device_validation."""
-    await _update_rule_parameter(cache, "rule_device_validation", "device_memory_days", default_rules, int)
-
-async def _load_rapid_transaction_params(cache, default_rules):
-    """Carga parámetros de rapid_transaction."""
-    await _update_rule_parameter(cache, "rule_rapid_transaction", "max_transactions", default_rules, int)
-    await _update_rule_parameter(cache, "rule_rapid_transaction", "time_window_minutes", default_rules, int)
-
-async def _load_unusual_time_params(cache, default_rules):
-    """Carga parámetros de unusual_time."""
-    await _update_rule_parameter(cache, "rule_unusual_time", "deviation_threshold", default_rules, float)
-
-async def _load_custom_rule_parameters(cache, default_rules):
-    """Carga parámetros personalizados de Redis para las reglas."""
-    try:
-        await _load_device_validation_params(cache, default_rules)
-        await _load_rapid_transaction_params(cache, default_rules)
-        await _load_unusual_time_params(cache, default_rules)
-    except Exception as e:
-        print(f"Error loading custom rule parameters from Redis: {e}")
-
-async def _get_deleted_rules(cache):
-    """Obtiene las reglas eliminadas de Redis."""
-    deleted_rules = set()
-    try:
-        deleted_set = await cache.redis.smembers("deleted_default_rules")
-        deleted_rules = {r.decode('utf-8') if isinstance(r, bytes) else r for r in deleted_set}
-    except Exception as e:
-        print(f"Error loading deleted rules: {e}")
-    return deleted_rules
-
-async def _get_disabled_rules(cache):
-    """Obtiene las reglas deshabilitadas de Redis."""
-    disabled_rules = set()
-    try:
-        disabled_set = await cache.redis.smembers("disabled_default_rules")
-        disabled_rules = {r.decode('utf-8') if isinstance(r, bytes) else r for r in disabled_set}
-    except Exception as e:
-        print(f"Error loading disabled rules: {e}")
-    return disabled_rules
+def _apply_rule_parameters(rule_config, default_rules):
+    """Aplica los parámetros personalizados del snapshot a las reglas predeterminadas."""
+    for rule in default_rules:
+        for param_key, default_value in rule["parameters"].items():
+            rule["parameters"][param_key] = rule_config.parameter(
+                rule["id"], param_key, type(default_value), default_value
+            )
 
 def _get_custom_rules(repository):
     """Obtiene reglas personalizadas de MongoDB."""
@@ -781,30 +787,24 @@ async def get_rules():
     try:
         cache = _cache_factory()
         
-        # Obtener configuración actual de umbrales
-        config = await cache.get_threshold_config()
+        # Umbrales, parámetros, eliminadas y deshabilitadas: un solo HGETALL
+        rule_config = await _load_rule_config(cache)
         
         from src.config import settings
-        amount_threshold, location_radius = _get_threshold_config(config, settings)
+        amount_threshold, location_radius = _get_threshold_config(rule_config.threshold_config(), settings)
         
         # Definir reglas predeterminadas
         default_rules = _build_default_rules(amount_threshold, location_radius)
         
-        # Leer parámetros personalizados desde Redis si existen
-        await _load_custom_rule_parameters(cache, default_rules)
-        
-        # Obtener reglas ELIMINADAS de Redis (estas NO deben aparecer)
-        deleted_rules = await _get_deleted_rules(cache)
+        # Aplicar parámetros personalizados guardados en Redis
+        _apply_rule_parameters(rule_config, default_rules)
         
         # Filtrar reglas ELIMINADAS (no deben aparecer en la lista)
-        default_rules = [r for r in default_rules if r["id"] not in deleted_rules]
-        
-        # Obtener reglas DESHABILITADAS de Redis (estas sí deben aparecer pero con enabled=false)
-        disabled_rules = await _get_disabled_rules(cache)
+        default_rules = [r for r in default_rules if r["id"] not in rule_config.deleted]
         
         # Marcar reglas predeterminadas deshabilitadas (NO filtrarlas)
         for rule in default_rules:
-            if rule["id"] in disabled_rules:
+            if rule["id"] in rule_config.disabled:
                 rule["enabled"] = False
         
         # Obtener reglas personalizadas de MongoDB (TODAS, no solo enabled)
@@ -887,29 +887,24 @@ async def get_transactions_log(
     Utilizado por el Dashboard Admin para monitoreo.
     """
     try:
+        from starlette.concurrency import run_in_threadpool
+
         repository = _repository_factory()
         
-        # Obtener todas las evaluaciones
-        evaluations = await repository.get_all_evaluations()
-        
-        # Filtrar por user_id si se especifica
-        if user_id:
-            evaluations = [e for e in evaluations if e.user_id == user_id]
-        
-        # Filtrar por status si se especifica
+        # Mapear status del frontend a status del backend
+        backend_status = None
         if status:
-            # Mapear status del frontend a status del backend
             status_map = {
                 "APPROVED": "APPROVED",
                 "SUSPICIOUS": "PENDING_REVIEW",
                 "REJECTED": "REJECTED"
             }
             backend_status = status_map.get(status.upper(), status.upper())
-            evaluations = [e for e in evaluations if e.status == backend_status]
         
-        # Limitar resultados si se especificó un límite
-        if limit is not None:
-            evaluations = evaluations[:limit]
+        # Filtros, orden y límite se resuelven en MongoDB (índices del catálogo)
+        evaluations = await run_in_threadpool(
+            repository.find_evaluations, backend_status, user_id, limit
+        )
         
         # Helper para mapear status
         def map_status_to_frontend(status: str) -> str:
@@ -992,64 +987,198 @@ async def get_metrics():
         raise HTTPException(status_code=500, detail=f"Error fetching metrics: {str(e)}")
 
 
+@api_v1_router.get("/admin/admission")
+async def get_admission_control():
+    """Watermarks del control de admisión y última muestra de evaluaciones en curso"""
+    admission = _admission()
+    if admission is None:
+        return {"enabled": False}
+    await admission.refresh()
+    return {"enabled": True, **admission.snapshot()}
+
+
+@api_v1_router.put("/admin/admission")
+async def update_admission_control(
+    config: AdmissionWatermarksRequest,
+    analyst_id: str = Header(..., alias="X-Analyst-ID"),
+):
+    """
+    Ajusta los watermarks sin redespliegue
+
+    Se guardan en Redis: este proceso los aplica de inmediato y el resto
+    en su siguiente muestra (~1 s).
+    """
+    from dataclasses import asdict
+    from src.infrastructure.admission_control import AdmissionConfigStore, Watermarks
+
+    admission = _admission()
+    if admission is None:
+        raise HTTPException(status_code=409, detail="Admission control is disabled")
+    watermarks = {**asdict(admission.watermarks), **config.model_dump(exclude_none=True)}
+    try:
+        Watermarks(**watermarks)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    await AdmissionConfigStore(_cache_factory().redis).save(**watermarks)
+    admission.apply(watermarks)
+    return {
+        "status": "updated",
+        "updated_by": analyst_id,
+        "watermarks": asdict(admission.watermarks),
+    }
+
+
+def _review_item(doc: dict) -> dict:
+    """Ítem de la cola de revisión en el formato del Dashboard Admin"""
+    return {
+        "transactionId": doc["_id"],
+        "userId": doc.get("user_id"),
+        "riskLevel": doc.get("risk_level"),
+        "amount": doc.get("amount"),
+        "violations": doc.get("reasons", []),
+        "status": doc.get("status"),
+        "enqueuedAt": _iso_utc(doc.get("enqueued_at")),
+        "claimedBy": doc.get("claimed_by"),
+        "leaseUntil": _iso_utc(doc.get("lease_until")),
+    }
+
+
+@api_v1_router.get("/admin/review-queue")
+async def get_review_queue(
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of pending items to return"),
+):
+    """
+    Próximos ítems sin reclamar de la cola de revisión manual
+
+    Ordenados por riesgo, monto y antigüedad (índice de `review_queue`).
+    Para tomar trabajo se usa POST /admin/review-queue/next.
+    """
+    from starlette.concurrency import run_in_threadpool
+
+    try:
+        repository = _repository_factory()
+        items = await run_in_threadpool(repository.review_queue.pending, limit)
+        return [_review_item(doc) for doc in items]
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching review queue: {str(e)}")
+
+
+@api_v1_router.post("/admin/review-queue/next")
+async def claim_next_review(analyst_id: str = Header(..., alias="X-Analyst-ID")):
+    """
+    Reclama el ítem más prioritario para el analista
+
+    Un solo find_one_and_update: dos analistas nunca reciben el mismo
+    ítem. 204 si la cola está vacía.
+    """
+    from fastapi import Response
+    from starlette.concurrency import run_in_threadpool
+    from src.config import settings
+
+    repository = _repository_factory()
+    item = await run_in_threadpool(
+        repository.review_queue.claim_next, analyst_id, settings.review_queue_lease_seconds
+    )
+    if item is None:
+        return Response(status_code=status.HTTP_204_NO_CONTENT)
+    return _review_item(item)
+
+
+@api_v1_router.post("/admin/review-queue/{transaction_id}/claim")
+async def claim_review(transaction_id: str, analyst_id: str = Header(..., alias="X-Analyst-ID")):
+    """Reclama un ítem puntual (o renueva el reclamo propio)"""
+    from starlette.concurrency import run_in_threadpool
+    from src.config import settings
+
+    store = _repository_factory().review_queue
+    item = await run_in_threadpool(
+        store.claim, transaction_id, analyst_id, settings.review_queue_lease_seconds
+    )
+    if item is not None:
+        return _review_item(item)
+    current = await run_in_threadpool(store.get, transaction_id)
+    if current is None:
+        raise HTTPException(status_code=404, detail=f"Transaction {transaction_id} is not in the review queue")
+    raise HTTPException(status_code=409, detail=f"Transaction {transaction_id} is claimed by {current.get('claimed_by')}")
+
+
+@api_v1_router.delete("/admin/review-queue/{transaction_id}/claim")
+async def release_review(transaction_id: str, analyst_id: str = Header(..., alias="X-Analyst-ID")):
+    """Devuelve a la cola un ítem reclamado por el analista"""
+    from starlette.concurrency import run_in_threadpool
+
+    released = await run_in_threadpool(
+        _repository_factory().review_queue.release, transaction_id, analyst_id
+    )
+    if not released:
+        raise HTTPException(status_code=409, detail=f"Transaction {transaction_id} is not claimed by {analyst_id}")
+    return {"status": "released", "transaction_id": transaction_id}
+
+
 @api_v1_router.get("/admin/trends")
-async def get_trends():
+async def get_trends(
+    resolution: str = Query("hour", pattern="^(hour|day)$", description="Bucket size: hour or day"),
+    window: int = Query(24, ge=1, le=744, description="Number of buckets to return"),
+):
     """
-    Tendencias de transacciones de las últimas 24h agrupadas por hora
-    
+    Tendencias de transacciones agrupadas por hora (o por día)
+
     Retorna conteos de transacciones aprobadas, sospechosas y rechazadas
-    por cada hora, permitiendo visualizar patrones temporales.
+    por bucket, en orden cronológico. Lee los rollups materializados en
+    `evaluation_rollups`: `window` documentos pequeños por consulta, sin
+    importar cuántas evaluaciones existan (p. ej. 24 horas o 30 días).
     """
-    from datetime import timedelta
-    from collections import defaultdict
-    
+    from starlette.concurrency import run_in_threadpool
+
     try:
         repository = _repository_factory()
-        
-        # Obtener todas las evaluaciones
-        evaluations = await repository.get_all_evaluations()
-        
-        if not evaluations:
-            # Retornar 24 horas con valores en 0
-            return [
-                {"time": f"{h:02d}:00", "approved": 0, "suspicious": 0, "rejected": 0}
-                for h in range(24)
-            ]
-        
-        # Filtrar evaluaciones de las últimas 24h
-        now = datetime.now()
-        last_24h = now - timedelta(hours=24)
-        recent_evaluations = [e for e in evaluations if e.timestamp >= last_24h]
-        
-        # Agrupar por hora
-        hourly_data = defaultdict(lambda: {"approved": 0, "suspicious": 0, "rejected": 0})
-        
-        for e in recent_evaluations:
-            hour = e.timestamp.strftime("%H:00")
-            
-            if e.status == "APPROVED":
-                hourly_data[hour]["approved"] += 1
-            elif e.status in ["PENDING_REVIEW", "SUSPICIOUS"]:
-                hourly_data[hour]["suspicious"] += 1
-            elif e.status == "REJECTED":
-                hourly_data[hour]["rejected"] += 1
-        
-        # Generar resultado para todas las 24 horas
-        result = []
-        for h in range(24):
-            time_key = f"{h:02d}:00"
-            result.append({
-                "time": time_key,
-                "approved": hourly_data[time_key]["approved"],
-                "suspicious": hourly_data[time_key]["suspicious"],
-                "rejected": hourly_data[time_key]["rejected"]
-            })
-        
-        return result
+        return await run_in_threadpool(
+            repository.rollups.get_series, resolution, window
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching trends: {str(e)}")
 
 
+@api_v1_router.get("/admin/export")
+async def export_evaluations(
+    format: str = Query("ndjson", pattern="^(ndjson|csv|parquet)$", description="ndjson, csv or parquet"),
+    since: Optional[datetime] = Query(None, description="Start of the range (inclusive, ISO 8601)"),
+    until: Optional[datetime] = Query(None, description="End of the range (exclusive, ISO 8601)"),
+    status: Optional[str] = Query(None, description="Filter by status: APPROVED, SUSPICIOUS, REJECTED"),
+    compress: bool = Query(True, description="gzip the response body (ndjson/csv)"),
+):
+    """
+    Exportación masiva de evaluaciones para cumplimiento (dumps mensuales)
+
+    A diferencia de `/audit/all`, no arma la lista completa en memoria: el
+    cursor de MongoDB se recorre por lotes y cada lote se serializa (y se
+    comprime con gzip) a medida que se envía.
+    """
+    from fastapi.responses import StreamingResponse
+    from src.infrastructure.evaluation_export import MEDIA_TYPES, export_query
+
+    repository = _repository_factory()
+    backend_status = None
+    if status:
+        backend_status = "PENDING_REVIEW" if status.upper() == "SUSPICIOUS" else status.upper()
+
+    try:
+        body = repository.exporter.stream(
+            format, export_query(since, until, backend_status), compress=compress
+        )
+    except RuntimeError as e:
+        # Parquet sin pyarrow instalado
+        raise HTTPException(status_code=501, detail=str(e))
+
+    headers = {"Content-Disposition": f'attachment; filename="evaluations.{format}"'}
+    if compress and format != "parquet":
+        headers["Content-Encoding"] = "gzip"
+
+    # StreamingResponse recorre el generador síncrono en el threadpool
+    return StreamingResponse(body, media_type=MEDIA_TYPES[format], headers=headers)
+
+
 @api_v1_router.post("/admin/rules")
 async def create_rule(
     rule: dict,
@@ -1116,7 +1245,7 @@ async def delete_rule(
     """
     Elimina permanentemente una regla (predeterminada o personalizada)
     
-    Las reglas predeterminadas se marcan como ELIMINADAS en Redis (deleted_default_rules).
+    Las reglas predeterminadas se marcan como ELIMINADAS en Redis (hash rule_config).
     Las reglas personalizadas se eliminan de MongoDB.
     """
     try:
@@ -12,13 +12,13 @@ La IA sugirió un solo adaptador genérico "DataAdapter". Lo refactoricé en
 tres adaptadores específicos para cumplir con Interface Segregation y
 Single Responsibility.
 """
-from typing import List, Optional
+from typing import Dict, Iterable, List, Optional
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, ReturnDocument
+from pymongo.errors import BulkWriteError, ConnectionFailure, ExecutionTimeout, WTimeoutError
 import redis.asyncio as redis_async
-import redis
+from redis.exceptions import ConnectionError as RedisConnectionError, TimeoutError as RedisTimeoutError
 import pika
-import json
 from src.application.interfaces import (
     TransactionRepository,
     MessagePublisher,
@@ -26,6 +26,39 @@ from src.application.interfaces import (
 )
 from src.domain.models import FraudEvaluation, RiskLevel
 from src.config import settings
+from src.infrastructure.circuit_breaker import CircuitOpenError, GuardedRedis, get_breaker, guarded
+from src.infrastructure.evaluation_archive import EvaluationArchive
+from src.infrastructure.evaluation_export import EvaluationExporter
+from src.infrastructure.admission_control import overflow_queue
+from src.infrastructure.evaluation_rollups import EvaluationRollupStore
+from src.infrastructure.hedged_reads import HedgedRedis, get_hedge_policy
+from src.infrastructure.index_catalog import ensure_indexes_once
+from src.infrastructure.local_risk_state import shared_local_state
+from src.infrastructure.message_codec import (
+    ManualReviewMessage,
+    TransactionMessage,
+    convert,
+    encode,
+    publishing_codec,
+)
+from src.infrastructure.review_queue import (
+    ReviewQueueStore,
+    review_priority,
+    review_priority_queue,
+    review_queue_arguments,
+)
+from src.infrastructure.rule_config_store import RuleConfigStore
+from src.infrastructure.sharding import shard_queue, transactions_queue
+from src.infrastructure.user_history_buckets import UserHistoryBucketStore
+from src.infrastructure.user_location_store import UserLocationStore
+from src.infrastructure.evaluation_writer import WriteOutcome
+
+# Código de error de MongoDB para violación de índice único
+DUPLICATE_KEY_ERROR = 11000
+
+# Errores de disponibilidad que abren los circuit breakers
+MONGODB_FAILURES = (ConnectionFailure, ExecutionTimeout, WTimeoutError)
+REDIS_FAILURES = (RedisConnectionError, RedisTimeoutError, OSError)
 
 
 class MongoDBAdapter(TransactionRepository):
@@ -41,33 +74,143 @@ class MongoDBAdapter(TransactionRepository):
     a Motor después si es necesario (YAGNI principle).
     """
 
-    def __init__(self, connection_string: str, database_name: str) -> None:
+    def __init__(
+        self,
+        connection_string: str,
+        database_name: str,
+        create_indexes: Optional[bool] = None,
+        timeout_ms: Optional[int] = None,
+    ) -> None:
         """
         Inicializa el adaptador de MongoDB
         
         Args:
             connection_string: URL de conexión a MongoDB
             database_name: Nombre de la base de datos
-        """
-        self.client = MongoClient(connection_string)
+            create_indexes: Construir los índices del catálogo (una vez por
+                proceso). Por defecto usa `settings.mongodb_auto_create_indexes`
+                (apagado); los índices se construyen con
+                `python -m src.management bootstrap-indexes`.
+            timeout_ms: Límite por operación (timeoutMS de pymongo). Por
+                defecto `settings.mongodb_timeout_ms`, pensado para las
+                peticiones; 0 = sin límite (comandos de mantenimiento).
+        """
+        if timeout_ms is None:
+            timeout_ms = settings.mongodb_timeout_ms
+        self.client = MongoClient(connection_string, timeoutMS=timeout_ms)
         self.db = self.client[database_name]
+        # Breaker compartido por todos los adaptadores del proceso
+        self.breaker = get_breaker(
+            "mongodb",
+            failure_threshold=settings.mongodb_breaker_failure_threshold,
+            reset_timeout=settings.mongodb_breaker_reset_seconds,
+            failure_types=MONGODB_FAILURES,
+        )
         self.evaluations = self.db.evaluations
 
-        # Crear índices para mejorar performance
-        self.evaluations.create_index("transaction_id", unique=True)
-        self.evaluations.create_index([("timestamp", -1)])
-        self.evaluations.create_index("user_id")
+        if create_indexes is None:
+            create_indexes = settings.mongodb_auto_create_indexes
+        if create_indexes:
+            ensure_indexes_once({
+                "evaluations": self.evaluations,
+                "custom_rules": self.db.custom_rules,
+                "user_evaluation_buckets": self.db.user_evaluation_buckets,
+                "review_queue": self.db.review_queue,
+            })
+
+        # Rollups por hora/día para el endpoint de tendencias
+        self.rollups = EvaluationRollupStore(self.db.evaluation_rollups)
+
+        # Tier frío: evaluaciones movidas fuera de `evaluations` por el archivador
+        self.archive = EvaluationArchive(
+            settings.archive_path,
+            self.db.evaluation_archive_index,
+            settings.archive_compression,
+        )
+
+        # Exportación masiva en streaming (endpoint /admin/export)
+        self.exporter = EvaluationExporter(self.evaluations)
+
+        # Cola de trabajo de los analistas (materializada por el worker)
+        self.review_queue = ReviewQueueStore(self.db.review_queue, self.evaluations)
+
+        # Historial por usuario en buckets: se escribe en paralelo desde el
+        # despliegue y se lee de ahí cuando se habilita (después del backfill)
+        self.use_user_buckets = settings.user_history_buckets_enabled
+        self.write_user_buckets = settings.user_history_buckets_write or self.use_user_buckets
+        self.user_buckets = UserHistoryBucketStore(
+            self.db.user_evaluation_buckets,
+            granularity=settings.user_history_bucket_granularity,
+            cap=settings.user_history_bucket_cap,
+        )
 
+    @guarded
     async def save_evaluation(self, evaluation: FraudEvaluation) -> None:
         """
         Guarda una evaluación en MongoDB
-        
+        """
+        document = self._evaluation_to_document(evaluation)
+        self.evaluations.insert_one(document)
+        self._record_rollup(evaluation)
+        self._append_user_buckets([document])
+
+    @guarded
+    def save_evaluations(self, evaluations: List[FraudEvaluation]) -> List[WriteOutcome]:
+        """
+        Guarda un lote de evaluaciones con un único `insert_many` desordenado
+
+        Con `ordered=False` MongoDB intenta todos los documentos aunque alguno
+        falle, y reporta los errores por índice. Un `transaction_id`
+        duplicado (código 11000) significa que la evaluación ya estaba
+        persistida (p. ej. un mensaje reentregado) y se reporta como DUPLICATE.
+
+        Returns:
+            Un WriteOutcome por evaluación, en el mismo orden
+
+        Raises:
+            PyMongoError: Si el lote completo falla (conexión, timeout, etc.)
+        """
+        if not evaluations:
+            return []
+
+        documents = [self._evaluation_to_document(e) for e in evaluations]
+        outcomes = [WriteOutcome.WRITTEN] * len(documents)
+        try:
+            self.evaluations.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                outcomes[error["index"]] = (
+                    WriteOutcome.DUPLICATE
+                    if error.get("code") == DUPLICATE_KEY_ERROR
+                    else WriteOutcome.FAILED
+                )
+
+        written = [
+            (evaluation.timestamp, evaluation.status)
+            for evaluation, outcome in zip(evaluations, outcomes)
+            if outcome is WriteOutcome.WRITTEN
+        ]
+        try:
+            self.rollups.record_evaluations(written)
+        except Exception as e:
+            print(f"Error updating evaluation rollups: {e}")
+        self._append_user_buckets([
+            document
+            for document, outcome in zip(documents, outcomes)
+            if outcome is WriteOutcome.WRITTEN
+        ])
+        return outcomes
+
+    def _evaluation_to_document(self, evaluation: FraudEvaluation) -> dict:
+        """
+        Convierte una entidad FraudEvaluation al documento de MongoDB
+
         Nota del desarrollador:
         La IA sugirió guardar la entidad directamente. Agregué conversión
         explícita a dict para controlar la serialización y evitar problemas
         con tipos de Python no soportados por MongoDB.
         """
-        document = {
+        return {
             "transaction_id": evaluation.transaction_id,
             "user_id": evaluation.user_id,
             "risk_level": evaluation.risk_level.name,
@@ -86,7 +229,18 @@ class MongoDBAdapter(TransactionRepository):
             "transaction_type": evaluation.transaction_type,
             "description": evaluation.description,
         }
-        self.evaluations.insert_one(document)
+
+    def _record_rollup(self, evaluation: FraudEvaluation) -> None:
+        """
+        Actualiza los rollups de tendencias tras persistir una evaluación
+
+        Los rollups son datos derivados: si fallan no se pierde la evaluación
+        y se pueden reconstruir con `python -m src.management backfill-rollups`.
+        """
+        try:
+            self.rollups.record_evaluation(evaluation.timestamp, evaluation.status)
+        except Exception as e:
+            print(f"Error updating evaluation rollups: {e}")
 
     async def get_all_evaluations(self) -> List[FraudEvaluation]:
         """
@@ -100,30 +254,94 @@ class MongoDBAdapter(TransactionRepository):
         documents = self.evaluations.find().sort("timestamp", -1)
         return [self._document_to_evaluation(doc) for doc in documents]
 
+    def _append_user_buckets(self, documents: List[dict]) -> None:
+        """Agrega las evaluaciones al historial por usuario (si se mantiene)"""
+        if not self.write_user_buckets or not documents:
+            return
+        try:
+            self.user_buckets.append_many(documents)
+        except Exception as e:
+            print(f"Error updating user history buckets: {e}")
+
+    @guarded
     def get_evaluation_by_id(
         self, transaction_id: str
     ) -> Optional[FraudEvaluation]:
         """
         Obtiene una evaluación específica por ID
+
+        Si no está en el tier caliente, se busca en el archivo para que la
+        auditoría siga cubriendo las evaluaciones archivadas.
         """
         document = self.evaluations.find_one({"transaction_id": transaction_id})
+        if document is None:
+            document = self._find_archived(transaction_id)
         if document is None:
             return None
         return self._document_to_evaluation(document)
 
-    def get_evaluations_by_user(self, user_id: str) -> List[FraudEvaluation]:
+    def _find_archived(self, transaction_id: str) -> Optional[dict]:
+        """Busca en el archivo; un archivo ilegible se trata como no encontrado"""
+        try:
+            return self.archive.find(transaction_id)
+        except Exception as e:
+            print(f"Error reading evaluation archive for {transaction_id}: {e}")
+            return None
+
+    @guarded
+    def get_evaluations_by_user(
+        self,
+        user_id: str,
+        since: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> List[FraudEvaluation]:
         """
-        Obtiene todas las evaluaciones de un usuario específico
+        Obtiene las evaluaciones de un usuario específico
         
         Args:
             user_id: ID del usuario
+            since: Solo evaluaciones con timestamp >= since (opcional)
+            limit: Máximo de evaluaciones a retornar (opcional)
             
         Returns:
             Lista de evaluaciones ordenadas por timestamp descendente
         """
-        documents = self.evaluations.find({"user_id": user_id}).sort("timestamp", -1)
+        if self.use_user_buckets:
+            documents = self.user_buckets.get_history(user_id, since=since, limit=limit)
+            return [self._document_to_evaluation(doc) for doc in documents]
+
+        query = {"user_id": user_id}
+        if since is not None:
+            query["timestamp"] = {"$gte": since}
+
+        documents = self.evaluations.find(query).sort("timestamp", -1)
+        if limit:
+            documents = documents.limit(limit)
         return [self._document_to_evaluation(doc) for doc in documents]
 
+    def find_evaluations(
+        self,
+        status: Optional[str] = None,
+        user_id: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> List[FraudEvaluation]:
+        """
+        Consulta evaluaciones filtradas por estado y/o usuario, más recientes primero
+
+        Los filtros y el límite se resuelven en MongoDB con los índices
+        compuestos (status, timestamp) y (user_id, timestamp) del catálogo.
+        """
+        query = {}
+        if status:
+            query["status"] = status
+        if user_id:
+            query["user_id"] = user_id
+
+        cursor = self.evaluations.find(query).sort("timestamp", -1)
+        if limit:
+            cursor = cursor.limit(limit)
+        return [self._document_to_evaluation(doc) for doc in cursor]
+
     def update_evaluation(self, evaluation: FraudEvaluation) -> None:
         """
         Actualiza una evaluación existente
@@ -131,7 +349,9 @@ class MongoDBAdapter(TransactionRepository):
         Raises:
             ValueError: Si la evaluación no existe
         """
-        result = self.evaluations.update_one(
+        # Se recupera el estado previo en la misma operación para poder
+        # mover el contador del rollup sin una lectura adicional
+        previous = self.evaluations.find_one_and_update(
             {"transaction_id": evaluation.transaction_id},
             {
                 "$set": {
@@ -142,11 +362,39 @@ class MongoDBAdapter(TransactionRepository):
                     "user_auth_timestamp": evaluation.user_auth_timestamp
                 }
             },
+            projection={"status": 1, "timestamp": 1, "user_id": 1},
+            return_document=ReturnDocument.BEFORE,
         )
 
-        if result.matched_count == 0:
+        if previous is None:
             raise ValueError(f"Transaction {evaluation.transaction_id} not found")
 
+        if previous.get("status") != evaluation.status and previous.get("timestamp"):
+            try:
+                self.rollups.record_status_change(
+                    previous["timestamp"], previous.get("status"), evaluation.status
+                )
+            except Exception as e:
+                print(f"Error updating evaluation rollups: {e}")
+
+        if self.write_user_buckets and previous.get("user_id"):
+            try:
+                self.user_buckets.update_review(
+                    previous["user_id"],
+                    evaluation.transaction_id,
+                    evaluation.status,
+                    evaluation.reviewed_by,
+                    evaluation.reviewed_at,
+                )
+            except Exception as e:
+                print(f"Error updating user history buckets: {e}")
+
+        if evaluation.reviewed_by:
+            try:
+                self.review_queue.complete(evaluation.transaction_id)
+            except Exception as e:
+                print(f"Error removing review queue item: {e}")
+
     def _document_to_evaluation(self, document: dict) -> FraudEvaluation:
         """
         Convierte un documento de MongoDB a entidad FraudEvaluation
@@ -198,9 +446,50 @@ class RedisAdapter(CacheService):
             connection_string: URL de conexión a Redis
             ttl: Tiempo de vida por defecto en segundos
         """
-        self.redis = redis_async.from_url(connection_string, decode_responses=True)
-        # Cliente síncrono para estrategias que no pueden usar async/await
-        self.redis_sync = redis.from_url(connection_string, decode_responses=True)
+        # Único pool de conexiones: lo comparten el adaptador y las
+        # estrategias (DeviceValidation, RapidTransaction), todas async
+        if settings.redis_cluster_enabled:
+            client = redis_async.RedisCluster.from_url(connection_string, decode_responses=True)
+        else:
+            client = redis_async.from_url(connection_string, decode_responses=True)
+        # Cada comando y pipeline pasa por el breaker del proceso, con un
+        # timeout estricto: con Redis lento se falla rápido en vez de
+        # esperar el timeout del socket
+        self.breaker = get_breaker(
+            "redis",
+            failure_threshold=settings.redis_breaker_failure_threshold,
+            reset_timeout=settings.redis_breaker_reset_seconds,
+            call_timeout=settings.redis_call_timeout_ms / 1000,
+            failure_types=REDIS_FAILURES,
+        )
+        self.redis = GuardedRedis(client, self.breaker)
+        # Lecturas idempotentes con hedging contra la réplica (opcional)
+        self.reads = self.redis
+        if settings.redis_hedged_reads and settings.redis_replica_url:
+            replica = redis_async.from_url(settings.redis_replica_url, decode_responses=True)
+            replica_breaker = get_breaker(
+                "redis_replica",
+                failure_threshold=settings.redis_breaker_failure_threshold,
+                reset_timeout=settings.redis_breaker_reset_seconds,
+                call_timeout=settings.redis_call_timeout_ms / 1000,
+                failure_types=REDIS_FAILURES,
+            )
+            self.reads = HedgedRedis(
+                self.redis,
+                GuardedRedis(replica, replica_breaker),
+                get_hedge_policy(
+                    "redis",
+                    percentile=settings.redis_hedge_percentile,
+                    initial_delay=settings.redis_hedge_initial_delay_ms / 1000,
+                    max_delay=settings.redis_hedge_max_delay_ms / 1000,
+                ),
+            )
+        # Estado local aproximado para el modo degradado (None = deshabilitado)
+        self.local_state = shared_local_state() if settings.redis_degraded_mode else None
+        # Estado de reglas y umbrales (hash `rule_config`)
+        self.rule_config = RuleConfigStore(self.redis)
+        # Última ubicación de cada usuario (sets GEO, ver redis_keys.py)
+        self.locations = UserLocationStore(self.redis, ttl, settings.redis_legacy_key_reads, reads=self.reads)
         self.ttl = ttl
 
     async def get_user_location(self, user_id: str) -> Optional[dict]:
@@ -210,15 +499,40 @@ class RedisAdapter(CacheService):
         Nota del desarrollador:
         La IA sugirió almacenar como string separado por comas.
         Lo cambié a JSON para ser más robusto y extensible.
+        Ahora vive en un set GEO por usuario (ver UserLocationStore); el
+        JSON se sigue leyendo mientras dura la migración.
         """
-        data = await self.redis.get(f"user:{user_id}:location")
-        if data is None:
-            return None
+        try:
+            location = await self.locations.get(user_id)
+        except REDIS_FAILURES + (CircuitOpenError,) as e:
+            if self.local_state is None:
+                raise
+            print(f"Redis unavailable, using local location for {user_id}: {e}")
+            return self.local_state.last_location(user_id)
+        if location is not None and self.local_state is not None:
+            self.local_state.remember_location(user_id, location["latitude"], location["longitude"])
+        return location
 
+    async def get_user_locations(self, user_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """
+        Ubicación histórica de varios usuarios en un round trip
+
+        Usado por los micro-lotes del worker; mismo modo degradado que
+        `get_user_location`.
+        """
+        user_ids = list(user_ids)
         try:
-            return json.loads(data)
-        except json.JSONDecodeError:
-            return None
+            locations = await self.locations.get_many(user_ids)
+        except REDIS_FAILURES + (CircuitOpenError,) as e:
+            if self.local_state is None:
+                raise
+            print(f"Redis unavailable, using local locations for {len(user_ids)} users: {e}")
+            return {user_id: self.local_state.last_location(user_id) for user_id in user_ids}
+        if self.local_state is not None:
+            for user_id, location in locations.items():
+                if location is not None:
+                    self.local_state.remember_location(user_id, location["latitude"], location["longitude"])
+        return locations
 
     async def set_user_location(
         self, user_id: str, latitude: float, longitude: float, ttl: int = None
@@ -226,24 +540,28 @@ class RedisAdapter(CacheService):
         """
         Almacena la ubicación del usuario en caché
         """
-        if ttl is None:
-            ttl = self.ttl
-
-        location_data = json.dumps({"latitude": latitude, "longitude": longitude})
-        await self.redis.setex(f"user:{user_id}:location", ttl, location_data)
+        if self.local_state is not None:
+            self.local_state.remember_location(user_id, latitude, longitude)
+        try:
+            await self.locations.set(user_id, latitude, longitude, ttl)
+        except REDIS_FAILURES + (CircuitOpenError,) as e:
+            if self.local_state is None:
+                raise
+            print(f"Redis unavailable, location for {user_id} kept locally: {e}")
 
     async def get_threshold_config(self) -> Optional[dict]:
         """
         Obtiene la configuración de umbrales desde caché (HU-008/009)
-        """
-        data = await self.redis.get("config:thresholds")
-        if data is None:
-            return None
 
-        try:
-            return json.loads(data)
-        except json.JSONDecodeError:
-            return None
+        Los umbrales viven en el hash `rule_config` junto con el resto del
+        estado de reglas (ver RuleConfigStore); los que no se escribieron
+        toman el valor de settings.
+        """
+        snapshot = await self.rule_config.load()
+        return snapshot.threshold_config({
+            "amount_threshold": settings.amount_threshold,
+            "location_radius_km": settings.location_radius_km,
+        })
 
     async def set_threshold_config(
         self, amount_threshold: float, location_radius_km: float
@@ -255,15 +573,17 @@ class RedisAdapter(CacheService):
         La IA sugirió no usar TTL para configuración. Agregué TTL
         de 1 año para evitar que Redis lo elimine por falta de uso,
         pero permitir limpieza eventual si el sistema se reconfigura.
+        El hash `rule_config` ya no tiene TTL: comparte clave con los flags
+        de reglas, que nunca expiraron.
         """
-        config_data = json.dumps(
-            {
-                "amount_threshold": amount_threshold,
-                "location_radius_km": location_radius_km,
-            }
+        await self.rule_config.set_thresholds(
+            amount_threshold=amount_threshold,
+            location_radius_km=location_radius_km,
         )
-        # TTL de 1 año (31536000 segundos)
-        await self.redis.setex("config:thresholds", 31536000, config_data)
+
+
+# Colas por shard ya declaradas por este proceso
+_declared_shard_queues = set()
 
 
 class RabbitMQAdapter(MessagePublisher):
@@ -274,6 +594,8 @@ class RabbitMQAdapter(MessagePublisher):
     La IA sugirió usar pika asíncrono (aio-pika). Para el MVP usé
     pika bloqueante para simplicidad. Se puede migrar a aio-pika
     después si el rendimiento lo requiere (premature optimization is evil).
+    Ya lo requirió: ver infrastructure/async_publisher.py; este adaptador
+    queda para `rabbitmq_async_publisher=False`.
     """
 
     def __init__(self, connection_string: str) -> None:
@@ -284,6 +606,7 @@ class RabbitMQAdapter(MessagePublisher):
             connection_string: URL de conexión a RabbitMQ
         """
         self.connection_string = connection_string
+        self.codec = publishing_codec(settings.rabbitmq_message_codec)
         self._connection = None
         self._channel = None
         self._ensure_connection()
@@ -307,8 +630,28 @@ class RabbitMQAdapter(MessagePublisher):
                 queue=settings.rabbitmq_transactions_queue, durable=True
             )
             self._channel.queue_declare(
-                queue=settings.rabbitmq_manual_review_queue, durable=True
+                queue=review_priority_queue(settings.rabbitmq_manual_review_queue),
+                durable=True,
+                arguments=review_queue_arguments(),
             )
+            self._channel.queue_declare(
+                queue=overflow_queue(settings.rabbitmq_transactions_queue), durable=True
+            )
+            # Colas por shard: se declaran una vez por proceso (el adaptador
+            # se crea por petición en la API)
+            for shard in range(settings.rabbitmq_shard_count):
+                queue = shard_queue(settings.rabbitmq_transactions_queue, shard)
+                if queue not in _declared_shard_queues:
+                    self._channel.queue_declare(queue=queue, durable=True)
+                    _declared_shard_queues.add(queue)
+
+    def _transactions_routing_key(self, transaction_data: dict) -> str:
+        """Cola de la transacción: su shard por `user_id` (o la cola única)"""
+        return transactions_queue(
+            settings.rabbitmq_transactions_queue,
+            transaction_data.get("user_id", ""),
+            settings.rabbitmq_shard_count,
+        )
 
     async def publish_transaction_for_processing(
         self, transaction_data: dict
@@ -321,34 +664,61 @@ class RabbitMQAdapter(MessagePublisher):
         Lo cambié a delivery_mode=2 para que los mensajes sobrevivan
         reinicios de RabbitMQ (durability).
         """
-        self._ensure_connection()
+        self._publish(
+            self._transactions_routing_key(transaction_data),
+            convert(transaction_data, TransactionMessage),
+        )
 
-        self._channel.basic_publish(
-            exchange="",
-            routing_key=settings.rabbitmq_transactions_queue,
-            body=json.dumps(transaction_data),
-            properties=pika.BasicProperties(
-                delivery_mode=2,  # Mensaje persistente
-                content_type="application/json",
-            ),
+    async def publish_to_overflow(self, transaction_data: dict) -> None:
+        """Difiere una transacción a la cola de overflow (control de admisión)"""
+        self._publish(
+            overflow_queue(settings.rabbitmq_transactions_queue),
+            convert(transaction_data, TransactionMessage),
         )
 
     async def publish_for_manual_review(self, evaluation_data: dict) -> None:
         """
         Publica una evaluación en la cola de revisión manual (HU-010)
         """
+        message = convert(evaluation_data, ManualReviewMessage)
+        self._publish(
+            review_priority_queue(settings.rabbitmq_manual_review_queue),
+            message,
+            priority=review_priority(message.risk_level, message.amount),
+        )
+
+    def _publish(self, routing_key: str, message, priority: Optional[int] = None) -> None:
         self._ensure_connection()
 
+        body, content_type, headers = encode(message, self.codec)
         self._channel.basic_publish(
             exchange="",
-            routing_key=settings.rabbitmq_manual_review_queue,
-            body=json.dumps(evaluation_data),
+            routing_key=routing_key,
+            body=body,
             properties=pika.BasicProperties(
-                delivery_mode=2,
-                content_type="application/json",
+                delivery_mode=2,  # Mensaje persistente
+                content_type=content_type,
+                headers=headers,
+                priority=priority,
             ),
         )
 
+    def keepalive(self) -> None:
+        """
+        Atiende los heartbeats de la conexión y reconecta si se cayó
+
+        Una BlockingConnection solo procesa heartbeats cuando se usa; en un
+        proceso de larga vida (worker) se llama periódicamente para que el
+        broker no la cierre por inactividad entre publicaciones.
+        """
+        try:
+            self._ensure_connection()
+            self._connection.process_data_events(time_limit=0)
+        except pika.exceptions.AMQPError as e:
+            print(f"RabbitMQ publisher connection lost, reconnecting: {e}")
+            self._connection = None
+            self._ensure_connection()
+
     def close(self) -> None:
         """
         Cierra la conexión a RabbitMQ
@@ -12,6 +12,7 @@ La IA sugirió un método genérico "process_transaction" que hacía todo.
 Lo refactoricé en dos casos de uso separados (EvaluateTransaction y ReviewTransaction)
 para cumplir con Single Responsibility y Command Query Separation (CQS).
 """
+import inspect
 from datetime import datetime
 from decimal import Decimal
 from typing import List, Dict, Any, Optional
@@ -91,6 +92,8 @@ class EvaluateTransactionUseCase:
 
         for strategy in self.strategies:
             result = strategy.evaluate(transaction, historical_location)
+            if inspect.isawaitable(result):
+                result = await result
             
             # Si la estrategia detectó violaciones, contar como regla incumplida
             if result["reasons"]:
@@ -42,6 +42,10 @@ class FraudStrategy(ABC):
                 - reasons: List[str] con razones de la evaluación
                 - details: str con información adicional
         
+        Las estrategias que consultan Redis implementan `evaluate` como
+        corrutina (`async def`) para no bloquear el event loop; el caso de
+        uso espera el resultado cuando es awaitable.
+        
         Nota del desarrollador:
         El parámetro historical_location es opcional porque solo LocationStrategy lo usa.
         La IA propuso dos métodos separados, pero lo unifiqué para cumplir con
@@ -6,6 +6,10 @@ previamente para detectar actividad sospechosa.
 from typing import Dict, Any, Optional
 from .base import FraudStrategy
 from src.domain.models import Transaction, RiskLevel, Location
+from src.infrastructure.redis_keys import legacy_devices_key, pipeline, user_devices_key
+
+
+DEVICE_MEMORY_SECONDS = 90 * 24 * 60 * 60
 
 
 class DeviceValidationStrategy(FraudStrategy):
@@ -16,20 +20,31 @@ class DeviceValidationStrategy(FraudStrategy):
     de dispositivos nuevos o no reconocidos que puedan indicar fraude.
     """
     
-    def __init__(self, redis_client):
+    def __init__(self, redis_client, legacy_reads: bool = True, local_state=None):
         """
         Inicializa la estrategia con el cliente Redis.
         
         Args:
-            redis_client: Cliente Redis para almacenar y recuperar información de dispositivos
+            redis_client: Cliente `redis.asyncio` (el pool compartido de RedisAdapter)
+            legacy_reads: Consultar también el set `user_devices:{id}` anterior
+            local_state: LocalRiskState para el modo degradado (None = deshabilitado)
         """
         self.redis_client = redis_client
+        self.legacy_reads = legacy_reads
+        self.local_state = local_state
     
-    def evaluate(
+    async def evaluate(
         self, transaction: Transaction, historical_location: Optional[Location] = None
     ) -> Dict[str, Any]:
         """
         Evalúa si el dispositivo usado en la transacción ha sido usado antes.
+
+        Un solo round trip: SADD devuelve 1 si el dispositivo no estaba en el
+        set (nuevo) y 0 si ya era conocido, así que no hace falta un
+        SISMEMBER previo. El EXPIRE va en el mismo pipeline y renueva la
+        memoria de 90 días con cada uso. Durante la migración de claves
+        (ver redis_keys.py) un dispositivo del set anterior cuenta como
+        conocido.
         
         Args:
             transaction: La transacción a evaluar
@@ -53,12 +68,20 @@ class DeviceValidationStrategy(FraudStrategy):
                 }
             
             # Clave de Redis para dispositivos del usuario
-            redis_key = f"user_devices:{user_id}"
+            redis_key = user_devices_key(user_id)
             
-            # Verificar si el dispositivo ya fue registrado
-            is_known_device = self.redis_client.sismember(redis_key, device_id)
+            # Registrar el dispositivo y renovar la expiración de 90 días
+            async with pipeline(self.redis_client, transaction=False) as pipe:
+                pipe.sadd(redis_key, device_id)
+                pipe.expire(redis_key, DEVICE_MEMORY_SECONDS)
+                if self.legacy_reads:
+                    pipe.sismember(legacy_devices_key(user_id), device_id)
+                results = await pipe.execute()
+            added = results[0] and not (len(results) > 2 and results[2])
+            if self.local_state is not None:
+                self.local_state.remember_device(user_id, device_id)
             
-            if is_known_device:
+            if not added:
                 # Dispositivo conocido - no agregar a violaciones
                 return {
                     "risk_level": RiskLevel.LOW_RISK,
@@ -66,11 +89,6 @@ class DeviceValidationStrategy(FraudStrategy):
                     "details": f"Dispositivo {device_id} registrado previamente para usuario {user_id}"
                 }
             else:
-                # Registrar el nuevo dispositivo
-                self.redis_client.sadd(redis_key, device_id)
-                # Establecer expiración de 90 días
-                self.redis_client.expire(redis_key, 90 * 24 * 60 * 60)
-                
                 return {
                     "risk_level": RiskLevel.HIGH_RISK,
                     "reasons": ["Dispositivo nuevo o no reconocido"],
@@ -80,6 +98,15 @@ class DeviceValidationStrategy(FraudStrategy):
         except Exception as e:
             # En caso de error con Redis, retornar riesgo bajo para no bloquear
             print(f"Error en DeviceValidationStrategy: {e}")
+            # Modo degradado: un dispositivo visto por este proceso es conocido
+            if self.local_state is not None and self.local_state.knows_device(
+                transaction.user_id, transaction.device_id
+            ):
+                return {
+                    "risk_level": RiskLevel.LOW_RISK,
+                    "reasons": [],
+                    "details": f"Dispositivo {transaction.device_id} conocido en estado local (Redis no disponible)"
+                }
             return {
                 "risk_level": RiskLevel.LOW_RISK,
                 "reasons": ["Error en validación de dispositivo"],
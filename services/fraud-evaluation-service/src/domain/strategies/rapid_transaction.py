@@ -8,6 +8,18 @@ from typing import Dict, Any
 
 from .base import FraudStrategy
 from src.domain.models import Transaction, RiskLevel
+from src.infrastructure.redis_keys import legacy_rapid_tx_key, pipeline, rapid_tx_key
+
+
+# Ventana deslizante atómica sobre la clave del usuario (una sola clave con
+# hash tag: EVAL funciona igual en Redis Cluster, donde no hay MULTI).
+# ARGV: transacción, timestamp, inicio de la ventana, TTL en segundos
+RAPID_TX_SCRIPT = """
+redis.call('ZADD', KEYS[1], ARGV[2], ARGV[1])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[3])
+return redis.call('ZCOUNT', KEYS[1], ARGV[3], ARGV[2])
+"""
 
 
 class RapidTransactionStrategy(FraudStrategy):
@@ -18,16 +30,27 @@ class RapidTransactionStrategy(FraudStrategy):
     patrones de transacciones rápidas que puedan indicar fraude.
     """
     
-    def __init__(self, redis_client, max_transactions: int = 3, window_minutes: int = 5):
+    def __init__(
+        self,
+        redis_client,
+        max_transactions: int = 3,
+        window_minutes: int = 5,
+        legacy_reads: bool = True,
+        local_state=None,
+    ):
         """
         Inicializa la estrategia con el cliente Redis y parámetros de detección.
         
         Args:
-            redis_client: Cliente Redis para almacenar transacciones recientes
+            redis_client: Cliente `redis.asyncio` (el pool compartido de RedisAdapter)
             max_transactions: Número máximo de transacciones permitidas en la ventana
             window_minutes: Tamaño de la ventana de tiempo en minutos
+            legacy_reads: Contar también la ventana de la clave `rapid_tx:{id}` anterior
+            local_state: LocalRiskState para el modo degradado (None = deshabilitado)
         """
         self.redis_client = redis_client
+        self.legacy_reads = legacy_reads
+        self.local_state = local_state
         self.max_transactions = max_transactions
         self.window_minutes = window_minutes
         self.window_seconds = window_minutes * 60
@@ -36,7 +59,7 @@ class RapidTransactionStrategy(FraudStrategy):
         """Retorna el nombre de la estrategia."""
         return "rapid_transaction"
     
-    def evaluate(self, transaction: Transaction, historical_location=None) -> Dict[str, Any]:
+    async def evaluate(self, transaction: Transaction, historical_location=None) -> Dict[str, Any]:
         """
         Evalúa si la transacción es parte de un patrón de transacciones rápidas.
         
@@ -47,61 +70,63 @@ class RapidTransactionStrategy(FraudStrategy):
         Returns:
             Dict con risk_level, reasons y details
         """
+        user_id = transaction.user_id
+        now = transaction.timestamp.timestamp()
+        window_start = now - self.window_seconds
+        
+        # La ventana local se alimenta siempre para que esté caliente
+        # cuando haga falta el modo degradado
+        local_count = None
+        if self.local_state is not None:
+            local_count = self.local_state.record_transaction(user_id, now, self.window_seconds)
+        
         try:
-            user_id = transaction.user_id
-            current_time = transaction.timestamp
-            
             # Clave de Redis para este usuario
-            redis_key = f"rapid_tx:{user_id}"
-            
-            # Añadir la transacción actual PRIMERO
-            self.redis_client.zadd(
-                redis_key,
-                {transaction.id: current_time.timestamp()}
-            )
+            redis_key = rapid_tx_key(user_id)
             
-            # Establecer expiración de la clave
-            self.redis_client.expire(redis_key, self.window_seconds)
-            
-            # Limpiar transacciones antiguas
-            self.redis_client.zremrangebyscore(
-                redis_key,
-                0,
-                current_time.timestamp() - self.window_seconds
-            )
-            
-            # Contar transacciones en la ventana (incluyendo la actual que acabamos de añadir)
-            transaction_count = self.redis_client.zcount(
-                redis_key,
-                current_time.timestamp() - self.window_seconds,
-                current_time.timestamp()
-            )
-            
-            # Evaluar riesgo según el número de transacciones
-            # Solo mostrar violación cuando se SUPERA el límite
-            if transaction_count > self.max_transactions:
-                return {
-                    "risk_level": RiskLevel.HIGH_RISK,
-                    "reasons": ["rapid_transactions_detected"],
-                    "details": f"{transaction_count} transactions in {self.window_minutes} minutes (limit: {self.max_transactions})"
-                }
-            else:
-                # 3 o menos transacciones = OK (sin violación)
-                return {
-                    "risk_level": RiskLevel.LOW_RISK,
-                    "reasons": [],
-                    "details": f"{transaction_count} transactions in {self.window_minutes} minutes"
-                }
+            # Un solo round trip: el script añade la transacción actual
+            # PRIMERO, renueva la expiración, limpia las antiguas y cuenta la
+            # ventana (incluyendo la actual) de forma atómica. Durante la
+            # migración de claves se suma la ventana de la clave anterior,
+            # que está en otro slot y se lee aparte en el mismo pipeline.
+            async with pipeline(self.redis_client, transaction=False) as pipe:
+                pipe.eval(RAPID_TX_SCRIPT, 1, redis_key, transaction.id, now, window_start, self.window_seconds)
+                if self.legacy_reads:
+                    pipe.zcount(legacy_rapid_tx_key(user_id), window_start, now)
+                results = await pipe.execute()
+            transaction_count = sum(int(count) for count in results)
+            return self._result(transaction_count)
                 
         except Exception as e:
             # En caso de error con Redis, retornar riesgo bajo para no bloquear
             print(f"Error en RapidTransactionStrategy: {e}")
+            if local_count is not None:
+                # Modo degradado: conteo aproximado de este proceso
+                result = self._result(local_count)
+                result["details"] += " (local estimate, Redis unavailable)"
+                return result
             return {
                 "risk_level": RiskLevel.LOW_RISK,
                 "reasons": ["rapid_transaction_check_failed"],
                 "details": "Could not check rapid transactions"
             }
     
+    def _result(self, transaction_count: int) -> Dict[str, Any]:
+        # Evaluar riesgo según el número de transacciones
+        # Solo mostrar violación cuando se SUPERA el límite
+        if transaction_count > self.max_transactions:
+            return {
+                "risk_level": RiskLevel.HIGH_RISK,
+                "reasons": ["rapid_transactions_detected"],
+                "details": f"{transaction_count} transactions in {self.window_minutes} minutes (limit: {self.max_transactions})"
+            }
+        # 3 o menos transacciones = OK (sin violación)
+        return {
+            "risk_level": RiskLevel.LOW_RISK,
+            "reasons": [],
+            "details": f"{transaction_count} transactions in {self.window_minutes} minutes"
+        }
+    
     def get_reason(self, risk_level: RiskLevel) -> str:
         """
         Retorna la razón del nivel de riesgo asignado.
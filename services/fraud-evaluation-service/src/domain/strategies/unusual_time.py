@@ -144,11 +144,14 @@ class UnusualTimeStrategy(FraudStrategy):
             list: Lista de transacciones históricas
         """
         try:
-            # Obtener todas las evaluaciones del usuario
-            historical_data = self.audit_repository.get_evaluations_by_user(user_id)
-            
-            # Filtrar por fecha (últimos 90 días) y limitar a 100
+            # Últimos 90 días, máximo 100: el filtro y el límite se resuelven
+            # en el repositorio con el índice (user_id, timestamp)
             cutoff_date = datetime.now() - timedelta(days=90)
+            historical_data = self.audit_repository.get_evaluations_by_user(
+                user_id, since=cutoff_date, limit=100
+            )
+            
+            # Se mantiene el filtro local por si el repositorio no lo aplica
             filtered_data = [
                 eval for eval in historical_data 
                 if eval.timestamp >= cutoff_date
@@ -0,0 +1,267 @@
+"""
+Async Publisher - Publicación no bloqueante en RabbitMQ con confirmaciones
+
+RabbitMQAdapter expone métodos `async`, pero `basic_publish` de pika
+bloqueante corre en el event loop: cada publicación detiene todas las
+peticiones del proceso mientras espera el socket, y la API además abría
+una conexión nueva por petición. Sin publisher confirms tampoco se sabe si
+el broker guardó el mensaje.
+
+AsyncRabbitMQPublisher (aio-pika) vive una vez por proceso
+(`get_async_publisher`, contadores en /metrics):
+
+- Una conexión robusta: aio-pika reconecta en segundo plano y restablece
+  los canales; mientras tanto las publicaciones fallan rápido en lugar de
+  bloquear el loop.
+- Un pool de `pool_size` canales en modo confirm, usados en round robin.
+- Las publicaciones concurrentes se juntan en lotes de hasta `max_batch`:
+  todos los `basic.publish` de un lote salen seguidos por el mismo canal
+  (pipelining) y sus confirmaciones se esperan juntas. Cada llamador
+  recibe el resultado de su mensaje: retorna cuando el broker confirmó
+  (mensaje persistido) o lanza la excepción si lo rechazó o venció
+  `confirm_timeout`.
+
+Los mensajes se codifican con el codec configurado (ver message_codec.py).
+Las revisiones manuales van a la cola con prioridad (ver review_queue.py).
+"""
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.application.interfaces import MessagePublisher
+from src.config import settings
+from src.infrastructure.admission_control import overflow_queue
+from src.infrastructure.message_codec import (
+    JSON,
+    ManualReviewMessage,
+    TransactionMessage,
+    convert,
+    encode,
+    publishing_codec,
+)
+from src.infrastructure.review_queue import (
+    review_priority,
+    review_priority_queue,
+    review_queue_arguments,
+)
+from src.infrastructure.sharding import shard_queue, transactions_queue
+
+
+# (routing key, body, headers, content_type, prioridad, resultado)
+_Pending = Tuple[str, bytes, dict, str, Optional[int], asyncio.Future]
+
+
+async def _connect_robust(url: str):
+    import aio_pika
+
+    return await aio_pika.connect_robust(url)
+
+
+def persistent_message(
+    body: bytes,
+    headers: Optional[dict] = None,
+    content_type: Optional[str] = None,
+    priority: Optional[int] = None,
+):
+    """Mensaje persistente de aio-pika (importado al usarse)"""
+    import aio_pika
+
+    return aio_pika.Message(
+        body,
+        headers=headers,
+        delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        content_type=content_type or JSON,
+        priority=priority,
+    )
+
+
+class AsyncRabbitMQPublisher(MessagePublisher):
+    """
+    Publisher de aio-pika con pool de canales y publisher confirms
+
+    Args:
+        connection_string: URL de conexión a RabbitMQ
+        pool_size: Canales en modo confirm
+        max_batch: Publicaciones por lote como máximo
+        confirm_timeout: Espera máxima (s) de la confirmación del broker
+        connect: Fábrica de la conexión (inyectable en tests)
+        message_factory: Construye el mensaje persistente (body, headers, content_type, priority)
+        codec: Codec de los mensajes (por defecto `rabbitmq_message_codec`)
+    """
+
+    def __init__(
+        self,
+        connection_string: str,
+        pool_size: int = 4,
+        max_batch: int = 128,
+        confirm_timeout: float = 5.0,
+        connect: Callable = _connect_robust,
+        message_factory: Callable = persistent_message,
+        codec=None,
+    ) -> None:
+        if pool_size < 1 or max_batch < 1:
+            raise ValueError("pool_size and max_batch must be positive")
+        self.connection_string = connection_string
+        self.pool_size = pool_size
+        self.max_batch = max_batch
+        self.confirm_timeout = confirm_timeout
+        self._connect = connect
+        self._message = message_factory
+        self.codec = codec or publishing_codec(settings.rabbitmq_message_codec)
+        self._connection = None
+        self._channels: List = []
+        self._next_channel = 0
+        self._connecting: Optional[asyncio.Lock] = None
+        self._pending: List[_Pending] = []
+        self._flusher: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+        # Contadores para /metrics
+        self.published_total = 0
+        self.confirmed_total = 0
+        self.failed_total = 0
+        self.batches_total = 0
+
+    async def publish_transaction_for_processing(self, transaction_data: dict) -> None:
+        """Publica la transacción en la cola de su shard y espera la confirmación"""
+        routing_key = transactions_queue(
+            settings.rabbitmq_transactions_queue,
+            transaction_data.get("user_id", ""),
+            settings.rabbitmq_shard_count,
+        )
+        await self.publish(routing_key, convert(transaction_data, TransactionMessage))
+
+    async def publish_to_overflow(self, transaction_data: dict) -> None:
+        """Difiere una transacción a la cola de overflow (control de admisión)"""
+        await self.publish(
+            overflow_queue(settings.rabbitmq_transactions_queue), convert(transaction_data, TransactionMessage)
+        )
+
+    async def publish_for_manual_review(self, evaluation_data: dict) -> None:
+        """Publica en la cola de revisión manual (HU-010) y espera la confirmación"""
+        message = convert(evaluation_data, ManualReviewMessage)
+        await self.publish(
+            review_priority_queue(settings.rabbitmq_manual_review_queue),
+            message,
+            priority=review_priority(message.risk_level, message.amount),
+        )
+
+    async def publish(self, routing_key: str, message, priority: Optional[int] = None) -> None:
+        """Encola la publicación en el lote actual y espera su confirmación"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        body, content_type, headers = encode(message, self.codec)
+        self._pending.append((routing_key, body, headers, content_type, priority, future))
+        self.published_total += 1
+        if self._flusher is None or self._flusher.done():
+            self._flusher = loop.create_task(self._flush_pending())
+        await future
+
+    async def _flush_pending(self) -> None:
+        # Un ciclo del loop para que las publicaciones concurrentes se sumen al lote
+        await asyncio.sleep(0)
+        while self._pending:
+            batch = self._pending[:self.max_batch]
+            del self._pending[:self.max_batch]
+            try:
+                channel = await self._channel()
+            except Exception as e:
+                print(f"RabbitMQ unavailable, {len(batch)} publishes failed: {e}")
+                self._fail(batch, e)
+                continue
+            task = asyncio.get_running_loop().create_task(self._confirm_batch(channel, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _confirm_batch(self, channel, batch: List[_Pending]) -> None:
+        """Envía el lote seguido por el canal y espera sus confirmaciones"""
+        self.batches_total += 1
+        results = await asyncio.gather(
+            *(
+                channel.default_exchange.publish(
+                    self._message(body, headers, content_type, priority),
+                    routing_key=routing_key,
+                    timeout=self.confirm_timeout,
+                )
+                for routing_key, body, headers, content_type, priority, _ in batch
+            ),
+            return_exceptions=True,
+        )
+        for (*_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                self.failed_total += 1
+                future.set_exception(result)
+            else:
+                self.confirmed_total += 1
+                future.set_result(None)
+
+    def _fail(self, batch: List[_Pending], error: Exception) -> None:
+        for *_, future in batch:
+            if not future.done():
+                self.failed_total += 1
+                future.set_exception(error)
+
+    async def _channel(self):
+        """Siguiente canal del pool (abre la conexión la primera vez)"""
+        if not self._channels:
+            if self._connecting is None:
+                self._connecting = asyncio.Lock()
+            async with self._connecting:
+                if not self._channels:
+                    await self._open()
+        channel = self._channels[self._next_channel % len(self._channels)]
+        self._next_channel += 1
+        return channel
+
+    async def _open(self) -> None:
+        connection = await self._connect(self.connection_string)
+        try:
+            channels = [
+                await connection.channel(publisher_confirms=True) for _ in range(self.pool_size)
+            ]
+            # Declarar colas (idempotente)
+            queues = [
+                settings.rabbitmq_transactions_queue,
+                overflow_queue(settings.rabbitmq_transactions_queue),
+            ]
+            queues += [
+                shard_queue(settings.rabbitmq_transactions_queue, shard)
+                for shard in range(settings.rabbitmq_shard_count)
+            ]
+            for queue in queues:
+                await channels[0].declare_queue(queue, durable=True)
+            await channels[0].declare_queue(
+                review_priority_queue(settings.rabbitmq_manual_review_queue),
+                durable=True,
+                arguments=review_queue_arguments(),
+            )
+        except Exception:
+            await connection.close()
+            raise
+        self._connection, self._channels = connection, channels
+
+    async def aclose(self) -> None:
+        """Espera las confirmaciones pendientes y cierra la conexión"""
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        connection, self._connection, self._channels = self._connection, None, []
+        if connection is not None:
+            await connection.close()
+
+
+# Un publisher por nombre y proceso (la API crea los adaptadores por petición)
+_PUBLISHERS: Dict[str, AsyncRabbitMQPublisher] = {}
+
+
+def get_async_publisher(name: str, connection_string: str, **config) -> AsyncRabbitMQPublisher:
+    """Publisher compartido del proceso (`config` solo aplica al crearlo)"""
+    publisher = _PUBLISHERS.get(name)
+    if publisher is None:
+        publisher = _PUBLISHERS[name] = AsyncRabbitMQPublisher(connection_string, **config)
+    return publisher
+
+
+def all_publishers() -> Dict[str, AsyncRabbitMQPublisher]:
+    return dict(_PUBLISHERS)
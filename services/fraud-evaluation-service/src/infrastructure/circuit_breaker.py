@@ -0,0 +1,269 @@
+"""
+Circuit Breaker - Timeouts acotados y fallo rápido para Redis y MongoDB
+
+Sin breaker, cuando Redis se degrada cada petición espera el timeout
+completo del socket antes de que la estrategia capture la excepción. Con
+breaker cada llamada tiene un timeout estricto y, tras
+`failure_threshold` fallos seguidos, el circuito se abre: las llamadas
+fallan de inmediato con CircuitOpenError (las estrategias pasan a su modo
+degradado) hasta que pasa `reset_timeout` y se deja pasar una llamada de
+prueba (half-open). Si la prueba responde, el circuito se cierra.
+
+    CLOSED --N fallos--> OPEN --reset_timeout--> HALF_OPEN --éxito--> CLOSED
+                          ^-------------------------fallo----'
+
+Solo cuentan como fallo los errores de disponibilidad (`failure_types`):
+un WRONGTYPE de Redis o un duplicado de MongoDB significan que el servicio
+respondió.
+
+Los adaptadores se crean por petición, así que los breakers viven en un
+registro por proceso (`get_breaker`) y su estado se publica en /metrics.
+"""
+import asyncio
+import functools
+import inspect
+import time
+from enum import Enum
+from typing import Callable, Dict, Optional, Tuple, Type
+
+
+class CircuitState(str, Enum):
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+
+# Valor numérico del gauge de estado
+STATE_VALUES = {CircuitState.CLOSED: 0, CircuitState.HALF_OPEN: 1, CircuitState.OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    """El circuito está abierto: la llamada se rechazó sin intentarla"""
+
+    def __init__(self, name: str, retry_after: float) -> None:
+        super().__init__(f"Circuit '{name}' is open (retry in {retry_after:.1f}s)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Breaker con estados closed / open / half-open
+
+    Args:
+        name: Nombre del servicio protegido (etiqueta de métricas)
+        failure_threshold: Fallos consecutivos que abren el circuito
+        reset_timeout: Segundos en OPEN antes de la llamada de prueba
+        call_timeout: Timeout (s) de cada llamada async; None = sin timeout
+        failure_types: Excepciones que cuentan como fallo del servicio
+        half_open_max_calls: Llamadas de prueba simultáneas en HALF_OPEN
+        clock: Reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        call_timeout: Optional[float] = None,
+        failure_types: Tuple[Type[BaseException], ...] = (Exception,),
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.call_timeout = call_timeout
+        self.failure_types = tuple(failure_types) + (asyncio.TimeoutError,)
+        self.half_open_max_calls = half_open_max_calls
+        self.clock = clock
+
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._half_open_in_flight = 0
+
+        # Contadores para /metrics
+        self.calls_total = 0
+        self.failures_total = 0
+        self.rejected_total = 0
+        self.opened_total = 0
+
+    @property
+    def state(self) -> CircuitState:
+        """Estado actual (OPEN pasa a HALF_OPEN al vencer reset_timeout)"""
+        if self._state is CircuitState.OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = CircuitState.HALF_OPEN
+            self._half_open_in_flight = 0
+        return self._state
+
+    def before_call(self) -> None:
+        """
+        Reserva una llamada o falla de inmediato
+
+        Raises:
+            CircuitOpenError: Si el circuito está abierto o ya hay una prueba en curso
+        """
+        state = self.state
+        if state is CircuitState.OPEN or (
+            state is CircuitState.HALF_OPEN and self._half_open_in_flight >= self.half_open_max_calls
+        ):
+            self.rejected_total += 1
+            retry_after = max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+            raise CircuitOpenError(self.name, retry_after)
+        if state is CircuitState.HALF_OPEN:
+            self._half_open_in_flight += 1
+        self.calls_total += 1
+
+    def on_success(self) -> None:
+        if self._state is CircuitState.HALF_OPEN:
+            self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+        self._state = CircuitState.CLOSED
+        self._consecutive_failures = 0
+
+    def on_error(self, exc: BaseException) -> None:
+        """Registra el resultado de una llamada que lanzó `exc`"""
+        if isinstance(exc, asyncio.CancelledError):
+            # La llamada no terminó: libera la prueba sin veredicto
+            if self._state is CircuitState.HALF_OPEN:
+                self._half_open_in_flight = max(0, self._half_open_in_flight - 1)
+            return
+        if not isinstance(exc, self.failure_types):
+            self.on_success()
+            return
+
+        self.failures_total += 1
+        self._consecutive_failures += 1
+        if self._state is CircuitState.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        if self._state is not CircuitState.OPEN:
+            self.opened_total += 1
+        self._state = CircuitState.OPEN
+        self._opened_at = self.clock()
+        self._half_open_in_flight = 0
+
+    async def call(self, fn: Callable, *args, **kwargs):
+        """Ejecuta `fn(*args, **kwargs)` (awaitable) con timeout y breaker"""
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+            if self.call_timeout is not None:
+                result = await asyncio.wait_for(result, self.call_timeout)
+            else:
+                result = await result
+        except BaseException as exc:
+            self.on_error(exc)
+            raise
+        self.on_success()
+        return result
+
+    def call_sync(self, fn: Callable, *args, **kwargs):
+        """Ejecuta una llamada bloqueante (el timeout lo pone el driver)"""
+        self.before_call()
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as exc:
+            self.on_error(exc)
+            raise
+        self.on_success()
+        return result
+
+
+def guarded(method: Callable) -> Callable:
+    """
+    Decorador para métodos de adaptador que usan `self.breaker`
+
+    En métodos async que hacen I/O bloqueante (pymongo) no se aplica
+    `call_timeout`: el timeout lo impone el driver (`timeoutMS`).
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, *args, **kwargs):
+            self.breaker.before_call()
+            try:
+                result = await method(self, *args, **kwargs)
+            except BaseException as exc:
+                self.breaker.on_error(exc)
+                raise
+            self.breaker.on_success()
+            return result
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        return self.breaker.call_sync(method, self, *args, **kwargs)
+    return wrapper
+
+
+class _GuardedPipeline:
+    """Pipeline cuyo `execute()` pasa por el breaker (un round trip = una llamada)"""
+
+    def __init__(self, pipeline, breaker: CircuitBreaker) -> None:
+        self._pipeline = pipeline
+        self._breaker = breaker
+
+    async def __aenter__(self):
+        await self._pipeline.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc):
+        return await self._pipeline.__aexit__(*exc)
+
+    def __getattr__(self, name):
+        attr = getattr(self._pipeline, name)
+        if not callable(attr):
+            return attr
+
+        def queue(*args, **kwargs):
+            attr(*args, **kwargs)
+            return self
+        return queue
+
+    async def execute(self, *args, **kwargs):
+        return await self._breaker.call(self._pipeline.execute, *args, **kwargs)
+
+
+# Métodos del cliente que no son comandos (no pasan por el breaker)
+_UNGUARDED = frozenset({"close", "aclose", "initialize", "get_node_from_key", "get_primaries"})
+
+
+class GuardedRedis:
+    """
+    Cliente `redis.asyncio` con breaker y timeout por comando
+
+    Expone la misma interfaz para los comandos que retornan awaitables y
+    para `pipeline()`; `wrapped` es el cliente original.
+    """
+
+    def __init__(self, redis, breaker: CircuitBreaker) -> None:
+        self.wrapped = redis
+        self.breaker = breaker
+
+    def pipeline(self, *args, **kwargs) -> _GuardedPipeline:
+        return _GuardedPipeline(self.wrapped.pipeline(*args, **kwargs), self.breaker)
+
+    def __getattr__(self, name):
+        attr = getattr(self.wrapped, name)
+        if not callable(attr) or name in _UNGUARDED:
+            return attr
+
+        async def command(*args, **kwargs):
+            return await self.breaker.call(attr, *args, **kwargs)
+        return command
+
+
+_BREAKERS: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(name: str, **config) -> CircuitBreaker:
+    """Breaker compartido del proceso (`config` solo aplica al crearlo)"""
+    breaker = _BREAKERS.get(name)
+    if breaker is None:
+        breaker = _BREAKERS[name] = CircuitBreaker(name, **config)
+    return breaker
+
+
+def all_breakers() -> Dict[str, CircuitBreaker]:
+    return dict(_BREAKERS)
@@ -0,0 +1,224 @@
+"""
+Evaluation Archive - Tier frío de evaluaciones antiguas
+
+La colección `evaluations` (tier caliente) solo conserva las evaluaciones
+de los últimos `archive_after_days` días. El archivador mueve las más
+antiguas a archivos NDJSON comprimidos, particionados por día:
+
+    <archive_path>/evaluations/date=2026-01-12/part-<uuid>.ndjson.zst
+
+Cada ejecución escribe archivos nuevos (nunca modifica uno existente), así
+que los archivos son inmutables y pueden copiarse a almacenamiento de
+objetos sin coordinación. La compresión es zstd si `zstandard` está
+instalado y gzip (stdlib) en caso contrario; la lectura detecta el formato
+por la extensión.
+
+Para mantener el acceso de auditoría, cada evaluación archivada deja una
+entrada en `evaluation_archive_index` (`_id` = transaction_id -> archivo),
+de modo que `get_evaluation_by_id` resuelve un ID archivado con una lectura
+por `_id` y la descompresión de un solo archivo.
+
+Orden de operaciones por lote (seguro ante caídas):
+1. Escribir el archivo temporal, fsync y renombrar (atómico)
+2. Registrar las entradas del índice
+3. Borrar del tier caliente
+Si el proceso muere entre pasos, la siguiente ejecución vuelve a archivar
+las mismas evaluaciones en un archivo nuevo y el índice apunta al último;
+nunca se borra una evaluación que no esté escrita.
+"""
+import gzip
+import json
+import os
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from pymongo import UpdateOne
+
+try:  # pragma: no cover - depende del entorno
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+PARTITION_PREFIX = "date="
+
+
+def _json_default(value):
+    """Serializa los tipos de MongoDB que json no conoce"""
+    if isinstance(value, datetime):
+        return {"$date": value.isoformat()}
+    return str(value)
+
+
+def _json_object_hook(value: dict):
+    """Revierte la serialización de fechas de `_json_default`"""
+    if set(value) == {"$date"}:
+        return datetime.fromisoformat(value["$date"])
+    return value
+
+
+def encode_document(document: dict) -> bytes:
+    """Serializa un documento de evaluación como una línea NDJSON"""
+    payload = {key: value for key, value in document.items() if key != "_id"}
+    return json.dumps(payload, default=_json_default, separators=(",", ":")).encode("utf-8") + b"\n"
+
+
+def decode_line(line: bytes) -> dict:
+    """Lee una línea NDJSON generada por `encode_document`"""
+    return json.loads(line, object_hook=_json_object_hook)
+
+
+class EvaluationArchive:
+    """
+    Lectura y escritura de los archivos del tier frío
+
+    Args:
+        root: Directorio base del archivo (volumen local o montado)
+        index_collection: Colección `evaluation_archive_index`
+        compression: 'zstd', 'gzip' o None para elegir automáticamente
+    """
+
+    def __init__(self, root: str, index_collection, compression: Optional[str] = None) -> None:
+        self.root = Path(root) / "evaluations"
+        self.index = index_collection
+        if compression is None:
+            compression = "zstd" if zstandard is not None else "gzip"
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the 'zstandard' package")
+        if compression not in ("zstd", "gzip"):
+            raise ValueError(f"Unsupported compression: {compression}")
+        self.compression = compression
+
+    @property
+    def extension(self) -> str:
+        return ".ndjson.zst" if self.compression == "zstd" else ".ndjson.gz"
+
+    def partition_dir(self, day: datetime) -> Path:
+        return self.root / f"{PARTITION_PREFIX}{day.strftime('%Y-%m-%d')}"
+
+    def write_partition(self, day: datetime, documents: List[dict]) -> str:
+        """
+        Escribe un archivo nuevo en la partición del día
+
+        Returns:
+            Ruta relativa al directorio base (lo que se guarda en el índice)
+        """
+        directory = self.partition_dir(day)
+        directory.mkdir(parents=True, exist_ok=True)
+        final_path = directory / f"part-{uuid.uuid4().hex}{self.extension}"
+        tmp_path = final_path.with_name(final_path.name + ".tmp")
+
+        raw = b"".join(encode_document(document) for document in documents)
+        with open(tmp_path, "wb") as handle:
+            handle.write(self._compress(raw))
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, final_path)
+        return str(final_path.relative_to(self.root))
+
+    def read_file(self, relative_path: str) -> Iterator[dict]:
+        """Itera los documentos de un archivo del archivo"""
+        path = self.root / relative_path
+        with open(path, "rb") as handle:
+            raw = handle.read()
+        if path.name.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"Cannot read {path}: 'zstandard' is not installed")
+            raw = zstandard.ZstdDecompressor().decompress(raw)
+        else:
+            raw = gzip.decompress(raw)
+        for line in raw.splitlines():
+            if line:
+                yield decode_line(line)
+
+    def find(self, transaction_id: str) -> Optional[dict]:
+        """Busca una evaluación archivada por transaction_id"""
+        entry = self.index.find_one({"_id": transaction_id})
+        if entry is None:
+            return None
+        for document in self.read_file(entry["file"]):
+            if document.get("transaction_id") == transaction_id:
+                return document
+        return None
+
+    def partitions(self) -> List[str]:
+        """Días archivados (YYYY-MM-DD) en orden cronológico"""
+        if not self.root.exists():
+            return []
+        return sorted(
+            entry.name[len(PARTITION_PREFIX):]
+            for entry in self.root.iterdir()
+            if entry.is_dir() and entry.name.startswith(PARTITION_PREFIX)
+        )
+
+    def register(self, file_path: str, documents: Iterable[dict], day: datetime) -> None:
+        """Apunta cada transaction_id del lote a su archivo"""
+        operations = [
+            UpdateOne(
+                {"_id": document["transaction_id"]},
+                {"$set": {"file": file_path, "day": day}},
+                upsert=True,
+            )
+            for document in documents
+        ]
+        if operations:
+            self.index.bulk_write(operations, ordered=False)
+
+    def _compress(self, raw: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=10).compress(raw)
+        return gzip.compress(raw, compresslevel=9)
+
+
+class EvaluationArchiver:
+    """
+    Mueve evaluaciones antiguas del tier caliente al archivo
+
+    Args:
+        evaluations: Colección `evaluations`
+        archive: EvaluationArchive de destino
+        batch_size: Evaluaciones leídas por iteración
+    """
+
+    def __init__(self, evaluations, archive: EvaluationArchive, batch_size: int = 5000) -> None:
+        self.evaluations = evaluations
+        self.archive = archive
+        self.batch_size = batch_size
+
+    def run(self, older_than_days: int, now: Optional[datetime] = None) -> int:
+        """
+        Archiva todas las evaluaciones anteriores al corte
+
+        El corte se trunca al inicio del día para que cada partición se
+        archive completa y no quede repartida entre ambos tiers.
+
+        Returns:
+            Número de evaluaciones movidas al archivo
+        """
+        cutoff = (now or datetime.now()) - timedelta(days=older_than_days)
+        cutoff = cutoff.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        moved = 0
+        while True:
+            batch = list(
+                self.evaluations.find({"timestamp": {"$lt": cutoff}})
+                .sort("timestamp", 1)
+                .limit(self.batch_size)
+            )
+            if not batch:
+                return moved
+            for day, documents in self._group_by_day(batch).items():
+                file_path = self.archive.write_partition(day, documents)
+                self.archive.register(file_path, documents, day)
+            self.evaluations.delete_many({"_id": {"$in": [document["_id"] for document in batch]}})
+            moved += len(batch)
+
+    @staticmethod
+    def _group_by_day(documents: Iterable[dict]) -> Dict[datetime, List[dict]]:
+        groups: Dict[datetime, List[dict]] = {}
+        for document in documents:
+            day = document["timestamp"].replace(hour=0, minute=0, second=0, microsecond=0)
+            groups.setdefault(day, []).append(document)
+        return groups
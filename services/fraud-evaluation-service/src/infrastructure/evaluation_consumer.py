@@ -0,0 +1,399 @@
+"""
+Evaluation Consumer - Procesamiento concurrente de mensajes en un solo loop
+
+El worker (aio-pika) entrega cada mensaje a `dispatch()`, que lo encola
+por su `user_id` en un KeyedExecutor (ver keyed_executor.py): hasta
+`concurrency` evaluaciones en vuelo, de usuarios distintos. Las de un
+mismo usuario se evalúan de a una y en orden de entrega, así el estado
+por usuario en Redis (ventana de transacciones rápidas, última ubicación,
+dispositivos) no se pisa. Los mensajes sin usuario (ilegibles) no se
+ordenan. Las evaluaciones terminan en cualquier orden, así que cada
+mensaje se confirma con su propio objeto (`message.ack()` usa su delivery
+tag, sin `multiple`): nunca se confirma un mensaje ajeno.
+
+El ack sigue difiriéndose hasta que el lote con la evaluación se escribe
+(ver evaluation_writer.py). El `insert_many` corre en un hilo
+(`flush_async`), pero el writer notifica en el loop y de forma síncrona,
+por eso el ack/nack se programa como tarea en el loop.
+
+Modo micro-lote (MicroBatchConsumer): junta hasta `batch_size` mensajes o
+espera `max_wait_seconds`, los evalúa juntos (ver
+`EvaluationEngine.evaluate_batch`), escribe sus evaluaciones en un solo
+lote y confirma todo con un único `ack(multiple=True)`. Los mensajes que
+fallan se rechazan uno por uno antes del ack múltiple.
+
+Con un RetryRouter (ver retry_topology.py) los errores temporales no se
+reencolan en la cabeza de la cola: el mensaje se republica en una cola de
+espera con backoff y se confirma; los inválidos y los que agotaron sus
+intentos van a la cola de parking. Sin router se usa nack como antes.
+
+Los mensajes se decodifican según su `content_type` y se validan contra
+su esquema (ver message_codec.py); uno inválido no se reintenta.
+
+Con un WorkerStats (ver worker_metrics.py) se registra la entrega de cada
+mensaje, la duración de su evaluación y el resultado con el que se decide
+su ack/nack.
+
+Interfaz de mensaje usada (la de `aio_pika.IncomingMessage`): `body`,
+`content_type`, `delivery_tag`, `headers`, `routing_key`,
+`await ack(multiple=...)` y `await nack(requeue=...)`.
+"""
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.infrastructure.evaluation_engine import EvaluationEngine
+from src.infrastructure.evaluation_writer import WriteOutcome
+from src.infrastructure.keyed_executor import KeyedExecutor
+from src.infrastructure.message_codec import MessageDecodeError, decode_transaction
+from src.infrastructure.retry_topology import RetryRouter
+from src.infrastructure.worker_metrics import WorkerStats
+
+
+class EvaluationConsumer:
+    """
+    Despacha mensajes al engine con concurrencia acotada y orden por usuario
+
+    Args:
+        engine: EvaluationEngine compartido
+        concurrency: Evaluaciones en vuelo como máximo
+        retries: Reintentos diferidos y parking (None = nack)
+        decode: Mensaje -> dict de la transacción validada
+        stats: Métricas del proceso (None = sin métricas)
+        max_pending_per_user: Mensajes en espera por usuario; con la cola
+            del usuario llena `dispatch()` espera
+    """
+
+    def __init__(
+        self,
+        engine: EvaluationEngine,
+        concurrency: int = 16,
+        retries: Optional[RetryRouter] = None,
+        decode: Callable[[object], dict] = decode_transaction,
+        stats: Optional[WorkerStats] = None,
+        max_pending_per_user: int = 16,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        self.engine = engine
+        self.concurrency = concurrency
+        self.retries = retries
+        self.decode = decode
+        self.stats = stats
+        self._executor = KeyedExecutor(concurrency, max_pending_per_user)
+        self._in_flight = 0
+        # Evaluaciones y acks pendientes (referencias fuertes hasta que terminan)
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        """Evaluaciones en curso"""
+        return self._in_flight
+
+    async def dispatch(self, message) -> None:
+        """Encola el mensaje detrás de los anteriores de su usuario"""
+        self._received(message)
+        try:
+            transaction_data = self.decode(message)
+        except Exception:
+            # `handle` lo rechaza; sin usuario no hay orden que respetar
+            transaction_data = None
+        user_id = transaction_data.get("user_id") if isinstance(transaction_data, dict) else None
+        key = user_id if user_id else (None, id(message))
+        await self._executor.submit(key, self._run, message, transaction_data)
+
+    async def _run(self, message, transaction_data: Optional[dict]) -> None:
+        self._in_flight += 1
+        try:
+            await self.handle(message, transaction_data)
+        finally:
+            self._in_flight -= 1
+
+    def _received(self, message) -> None:
+        if self.stats is not None:
+            self.stats.received(message)
+
+    def _observe(self, message, outcome: str) -> None:
+        if self.stats is not None:
+            self.stats.observe(message, outcome)
+
+    def _evaluated(self, started: float, count: int = 1) -> None:
+        if self.stats is not None:
+            self.stats.evaluated(time.monotonic() - started, count)
+
+    def _track(self, coroutine) -> None:
+        task = asyncio.get_running_loop().create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def handle(self, message, transaction_data: Optional[dict] = None) -> None:
+        """
+        Evalúa un mensaje y decide su ack/nack
+
+        `transaction_data` es el mensaje ya decodificado por `dispatch()`
+        (None = decodificarlo aquí).
+
+        - Mensaje ilegible o datos inválidos: parking (o nack sin reencolar)
+        - Error temporal: reintento diferido (o nack y reencolar)
+        - Evaluación preparada: ack/reintento cuando se escriba su lote
+        """
+        try:
+            if transaction_data is None:
+                transaction_data = self.decode(message)
+            print(f"Processing transaction: {transaction_data['id']}")
+
+            started = time.monotonic()
+            try:
+                result, deferred = await self.engine.evaluate(
+                    transaction_data, lambda outcome: self._settle(message, outcome)
+                )
+            finally:
+                self._evaluated(started)
+            print(f"Transaction {transaction_data['id']} evaluated as {result['risk_level']}")
+
+            if not deferred:
+                self._observe(message, "unsaved")
+                await self._send(message, ack=True)
+
+        except MessageDecodeError as e:
+            print(f"Error: Invalid message: {e}")
+            self._observe(message, "invalid")
+            await self._fail(message, f"invalid message: {e}", retryable=False)
+
+        except ValueError as e:
+            print(f"Error: Invalid transaction data: {e}")
+            self._observe(message, "invalid")
+            await self._fail(message, f"invalid transaction data: {e}", retryable=False)
+
+        except Exception as e:
+            print(f"Error processing transaction: {e}")
+            self._observe(message, "error")
+            await self._fail(message, f"{type(e).__name__}: {e}", retryable=True)
+
+    def _settle(self, message, outcome: WriteOutcome) -> None:
+        """Callback del writer: programa el ack o el reintento del mensaje"""
+        self._observe(message, outcome.value)
+        if outcome.is_durable:
+            self._track(self._send(message, ack=True))
+        else:
+            self._track(self._fail(
+                message, f"evaluation write {outcome.value}", retryable=outcome is WriteOutcome.RETRY
+            ))
+
+    async def _reroute(self, message, reason: str, retryable: bool) -> bool:
+        """Republica en la cola de espera o en el parking; False si no se pudo"""
+        if self.retries is None:
+            return False
+        try:
+            if retryable:
+                await self.retries.retry(message, reason)
+            else:
+                await self.retries.park(message, reason)
+            return True
+        except Exception as e:
+            print(f"Could not reroute delivery {message.delivery_tag}: {e}")
+            return False
+
+    async def _fail(self, message, reason: str, retryable: bool) -> None:
+        """Mensaje fallido: se confirma si quedó republicado; si no, nack"""
+        if await self._reroute(message, reason, retryable):
+            await self._send(message, ack=True)
+        elif self.retries is not None:
+            # El broker no confirmó la copia: que vuelva a entregarse
+            await self._send(message, ack=False, requeue=True)
+        else:
+            await self._send(message, ack=False, requeue=retryable)
+
+    async def _send(self, message, ack: bool, requeue: bool = False, multiple: bool = False) -> None:
+        """
+        Envía el ack/nack del mensaje
+
+        Si el canal se reconectó, el delivery tag ya no es válido: RabbitMQ
+        reentregará el mensaje y el índice único lo marcará DUPLICATE.
+        """
+        try:
+            if ack and multiple:
+                await message.ack(multiple=True)
+            elif ack:
+                await message.ack()
+            else:
+                await message.nack(requeue=requeue)
+        except Exception as e:
+            print(f"Could not settle delivery {message.delivery_tag}: {e}")
+
+    async def flush_periodically(self) -> None:
+        """Escribe el lote pendiente cuando vence su espera máxima"""
+        writer = self.engine.writer
+        while True:
+            delay = writer.seconds_until_due()
+            await asyncio.sleep(writer.max_delay_seconds if delay is None else delay)
+            if writer.should_flush():
+                await writer.flush_async()
+
+    async def maintain_periodically(self, interval: float) -> None:
+        """Mantenimiento del engine fuera del procesamiento de mensajes"""
+        while True:
+            await asyncio.sleep(interval)
+            self.engine.maintain()
+
+    async def drain(self) -> None:
+        """Espera las evaluaciones en vuelo, escribe el lote y envía sus acks"""
+        await self._executor.join()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        await self.engine.writer.flush_async()
+        await self.engine.writer.join()
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
+
+
+class MicroBatchConsumer(EvaluationConsumer):
+    """
+    Evalúa y confirma los mensajes por micro-lotes
+
+    El ack múltiple confirma todos los delivery tags del canal hasta el
+    indicado, así que los lotes se procesan de a uno (en orden de llegada)
+    y cada lote termina de confirmarse antes de empezar el siguiente: los
+    tags menores al último del lote ya están confirmados o rechazados.
+
+    Args:
+        engine: EvaluationEngine compartido
+        batch_size: Mensajes por lote como máximo
+        max_wait_seconds: Espera máxima del mensaje más antiguo del lote
+        clock: Reloj monotónico (inyectable en tests)
+        retries: Reintentos diferidos y parking (None = nack)
+        decode: Mensaje -> dict de la transacción validada
+        stats: Métricas del proceso (None = sin métricas)
+    """
+
+    def __init__(
+        self,
+        engine: EvaluationEngine,
+        batch_size: int = 64,
+        max_wait_seconds: float = 0.02,
+        clock: Callable[[], float] = time.monotonic,
+        retries: Optional[RetryRouter] = None,
+        decode: Callable[[object], dict] = decode_transaction,
+        stats: Optional[WorkerStats] = None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        super().__init__(engine, concurrency=batch_size, retries=retries, decode=decode, stats=stats)
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self._buffer: List = []
+        self._oldest: Optional[float] = None
+        self._processing = asyncio.Lock()
+
+    async def dispatch(self, message) -> None:
+        """Agrega el mensaje al lote; lo procesa si quedó lleno"""
+        self._received(message)
+        if not self._buffer:
+            self._oldest = self._clock()
+        self._buffer.append(message)
+        if len(self._buffer) >= self.batch_size:
+            await self.process_pending()
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Segundos hasta que vence el lote actual (None si está vacío)"""
+        if not self._buffer:
+            return None
+        return max(self._oldest + self.max_wait_seconds - self._clock(), 0.0)
+
+    async def process_pending(self) -> None:
+        """Toma el lote actual y lo procesa después de los anteriores"""
+        if not self._buffer:
+            return
+        batch, self._buffer, self._oldest = self._buffer, [], None
+        async with self._processing:
+            self._in_flight += len(batch)
+            try:
+                await self.process(batch)
+            finally:
+                self._in_flight -= len(batch)
+
+    async def process(self, messages: List) -> None:
+        """
+        Evalúa el lote, escribe sus evaluaciones y lo confirma
+
+        - Mensaje ilegible o datos inválidos: parking (o nack sin reencolar)
+        - Error temporal o escritura fallida: reintento diferido (o nack y
+          reencolar)
+        - El resto, y los republicados: un solo ack múltiple hasta el
+          mayor delivery tag
+        """
+        # delivery tag -> (ack, retryable, motivo, resultado para las métricas)
+        decisions: Dict[int, Tuple[bool, bool, str, str]] = {}
+        parsed = []
+        for message in messages:
+            try:
+                parsed.append((message, self.decode(message)))
+            except MessageDecodeError as e:
+                print(f"Error: Invalid message: {e}")
+                decisions[message.delivery_tag] = (False, False, f"invalid message: {e}", "invalid")
+
+        def on_done(message):
+            def record(outcome: WriteOutcome) -> None:
+                decisions[message.delivery_tag] = (
+                    outcome.is_durable,
+                    outcome is WriteOutcome.RETRY,
+                    f"evaluation write {outcome.value}",
+                    outcome.value,
+                )
+            return record
+
+        started = time.monotonic()
+        try:
+            results = await self.engine.evaluate_batch(
+                [(data, on_done(message)) for message, data in parsed]
+            )
+        except Exception as e:
+            print(f"Error evaluating batch of {len(parsed)} messages: {e}")
+            results = [e] * len(parsed)
+        if parsed:
+            self._evaluated(started, len(parsed))
+
+        for (message, _), result in zip(parsed, results):
+            if isinstance(result, ValueError):
+                print(f"Error: Invalid transaction data: {result}")
+                decisions[message.delivery_tag] = (False, False, f"invalid transaction data: {result}", "invalid")
+            elif isinstance(result, Exception):
+                print(f"Error processing transaction: {result}")
+                decisions[message.delivery_tag] = (False, True, f"{type(result).__name__}: {result}", "error")
+            elif not result[1]:
+                decisions[message.delivery_tag] = (True, False, "", "unsaved")
+
+        # Un insert_many para las evaluaciones del lote (en un hilo)
+        await self.engine.writer.flush_async()
+        await self.engine.writer.join()
+
+        acked = []
+        for message in messages:
+            # Sin decisión = la escritura no se notificó: reintentar
+            ack, retryable, reason, outcome = decisions.get(
+                message.delivery_tag, (False, True, "write not reported", WriteOutcome.RETRY.value)
+            )
+            self._observe(message, outcome)
+            if ack or await self._reroute(message, reason, retryable):
+                acked.append(message)
+            else:
+                await self._send(message, ack=False, requeue=retryable or self.retries is not None)
+        if acked:
+            last = max(acked, key=lambda message: message.delivery_tag)
+            await self._send(last, ack=True, multiple=True)
+
+    async def flush_periodically(self) -> None:
+        """Procesa el lote incompleto cuando vence su espera máxima"""
+        while True:
+            delay = self.seconds_until_due()
+            await asyncio.sleep(self.max_wait_seconds if delay is None else delay)
+            if self.seconds_until_due() == 0.0:
+                await self.process_pending()
+
+    async def drain(self) -> None:
+        """Procesa el lote pendiente y espera al que está en curso"""
+        await self.process_pending()
+        async with self._processing:
+            await self.engine.writer.flush_async()
+            await self.engine.writer.join()
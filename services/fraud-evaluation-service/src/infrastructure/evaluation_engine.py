@@ -0,0 +1,230 @@
+"""
+Evaluation Engine - Adaptadores y estrategias de larga vida para el worker
+
+Antes el worker llamaba a `create_use_case()` por mensaje: un MongoClient
+nuevo (con sus `create_index`), clientes de Redis nuevos y una conexión
+bloqueante de RabbitMQ para publicar, todo para evaluar una sola
+transacción, y `asyncio.run` creaba un event loop por mensaje.
+
+El engine se construye una vez al arrancar y se reutiliza:
+
+- Un solo MongoDBAdapter (lecturas de las estrategias y writer por lotes).
+- Un RedisAdapter cuyo pool vive en el event loop del worker: los
+  clientes `redis.asyncio` quedan ligados al loop donde abren sus
+  conexiones, por eso hay un único loop de larga vida.
+- Un publisher para las revisiones manuales: AsyncRabbitMQPublisher (con
+  confirmaciones, en el mismo loop), RabbitMQAdapter si
+  `rabbitmq_async_publisher` está deshabilitado o RedisStreamsPublisher
+  con `message_transport = "redis_streams"`.
+
+Por mensaje solo se crea un WriteBehindRepository y un caso de uso (sin
+conexiones): así varias evaluaciones pueden estar en vuelo a la vez sin
+compartir la evaluación preparada.
+
+En modo micro-lote (`evaluate_batch`) las ubicaciones históricas de todos
+los usuarios del lote se leen en un solo pipeline de Redis, y las
+transacciones de un mismo usuario se evalúan en orden (usuarios distintos
+en paralelo) para que cada una vea la ubicación que dejó la anterior.
+
+MongoDB (pymongo) es bloqueante: el `insert_many` del writer y el historial
+que lee UnusualTimeStrategy corren en hilos (`asyncio.to_thread`, como el
+`run_in_threadpool` del API), así una consulta lenta no frena al resto de
+evaluaciones en vuelo del loop.
+
+La reconexión no ocurre durante el procesamiento: `maintain()` se invoca
+periódicamente, atiende los heartbeats del publisher ocioso y lo reconecta
+si se cayó. MongoDB y Redis reconectan solos dentro de sus pools.
+"""
+import asyncio
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from src.adapters import MongoDBAdapter, RabbitMQAdapter, RedisAdapter
+from src.application.use_cases import EvaluateTransactionUseCase
+from src.config import settings
+from src.infrastructure.async_publisher import AsyncRabbitMQPublisher
+from src.domain.strategies.amount_threshold import AmountThresholdStrategy
+from src.domain.strategies.base import FraudStrategy
+from src.domain.strategies.device_validation import DeviceValidationStrategy
+from src.domain.strategies.location_check import LocationStrategy
+from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
+from src.domain.strategies.unusual_time import UnusualTimeStrategy
+from src.infrastructure.evaluation_writer import (
+    DoneCallback,
+    EvaluationBatchWriter,
+    WriteBehindRepository,
+)
+from src.infrastructure.redis_streams import REDIS_STREAMS, RedisStreamsPublisher
+
+
+def build_strategies(repository, cache: RedisAdapter) -> List[FraudStrategy]:
+    """Las 5 estrategias con la configuración por defecto"""
+    return [
+        AmountThresholdStrategy(threshold=Decimal(str(settings.amount_threshold))),
+        LocationStrategy(radius_km=settings.location_radius_km),
+        DeviceValidationStrategy(redis_client=cache.redis, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state),
+        RapidTransactionStrategy(redis_client=cache.redis, legacy_reads=settings.redis_legacy_key_reads, local_state=cache.local_state),
+        _OffLoopStrategy(UnusualTimeStrategy(audit_repository=repository)),
+    ]
+
+
+class _OffLoopStrategy(FraudStrategy):
+    """Ejecuta una estrategia síncrona con lecturas bloqueantes en un hilo"""
+
+    def __init__(self, strategy: FraudStrategy) -> None:
+        self._strategy = strategy
+
+    async def evaluate(self, transaction, historical_location=None) -> Dict[str, Any]:
+        return await asyncio.to_thread(self._strategy.evaluate, transaction, historical_location)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._strategy, name)
+
+
+class _PrefetchedLocations:
+    """Vista del cache para un micro-lote: ubicaciones ya leídas en bloque"""
+
+    def __init__(self, cache, locations: Dict[str, Optional[dict]]) -> None:
+        self._cache = cache
+        self._locations = locations
+
+    async def get_user_location(self, user_id: str) -> Optional[dict]:
+        if user_id in self._locations:
+            return self._locations[user_id]
+        return await self._cache.get_user_location(user_id)
+
+    async def set_user_location(self, user_id: str, latitude: float, longitude: float, ttl: int = None) -> None:
+        await self._cache.set_user_location(user_id, latitude, longitude, ttl)
+        self._locations[user_id] = {"latitude": latitude, "longitude": longitude}
+
+    def __getattr__(self, name: str):
+        return getattr(self._cache, name)
+
+
+BatchResult = Union[Tuple[dict, bool], Exception]
+
+
+class EvaluationEngine:
+    """
+    Evalúa mensajes con adaptadores compartidos
+
+    Args:
+        repository: Adaptador de MongoDB (lecturas y destino del writer)
+        publisher: Adaptador de mensajería
+        cache: Adaptador de Redis
+        writer: Writer por lotes donde se preparan las evaluaciones
+        strategies: Estrategias (por defecto `build_strategies`)
+    """
+
+    def __init__(self, repository, publisher, cache, writer: EvaluationBatchWriter, strategies=None) -> None:
+        self.repository = repository
+        self.publisher = publisher
+        self.cache = cache
+        self.writer = writer
+        self.strategies = strategies if strategies is not None else build_strategies(repository, cache)
+
+    @classmethod
+    def from_settings(cls) -> "EvaluationEngine":
+        """Crea adaptadores, writer y estrategias una sola vez"""
+        mongo = MongoDBAdapter(settings.mongodb_url, settings.mongodb_database)
+        writer = EvaluationBatchWriter(
+            mongo,
+            # En modo micro-lote, un insert_many por lote de mensajes
+            max_batch_size=max(settings.worker_write_batch_size, settings.worker_batch_size),
+            max_delay_seconds=settings.worker_write_flush_ms / 1000,
+            offload=True,
+        )
+        if settings.message_transport == REDIS_STREAMS:
+            publisher = RedisStreamsPublisher(settings.redis_streams_url or settings.redis_url)
+        elif settings.rabbitmq_async_publisher:
+            publisher = AsyncRabbitMQPublisher(
+                settings.rabbitmq_url,
+                pool_size=settings.rabbitmq_publisher_channels,
+                max_batch=settings.rabbitmq_publish_batch_size,
+                confirm_timeout=settings.rabbitmq_confirm_timeout_seconds,
+            )
+        else:
+            publisher = RabbitMQAdapter(settings.rabbitmq_url)
+        cache = RedisAdapter(settings.redis_url, settings.redis_ttl)
+        return cls(mongo, publisher, cache, writer)
+
+    async def evaluate(self, transaction_data: dict, on_done: DoneCallback) -> Tuple[dict, bool]:
+        """
+        Evalúa una transacción y pasa su evaluación al writer
+
+        Returns:
+            (resultado, diferido): `diferido` es False si el caso de uso no
+            guardó evaluación; entonces `on_done` no se llamará y el mensaje
+            se puede confirmar de inmediato. Si la evaluación falla no queda
+            nada en el writer.
+        """
+        return await self._evaluate(transaction_data, on_done, self.cache)
+
+    async def _evaluate(self, transaction_data: dict, on_done: DoneCallback, cache) -> Tuple[dict, bool]:
+        staging = WriteBehindRepository(self.repository, self.writer)
+        use_case = EvaluateTransactionUseCase(staging, self.publisher, cache, self.strategies)
+        result = await use_case.execute(transaction_data)
+        return result, staging.commit(on_done)
+
+    async def evaluate_batch(self, batch: Sequence[Tuple[dict, DoneCallback]]) -> List[BatchResult]:
+        """
+        Evalúa un micro-lote con la lectura de ubicaciones agrupada
+
+        Returns:
+            Por cada elemento, `(resultado, diferido)` como en `evaluate`, o
+            la excepción con la que falló (un fallo no afecta al resto)
+        """
+        cache = self.cache
+        users = [data.get("user_id") for data, _ in batch if isinstance(data, dict) and data.get("user_id")]
+        get_many = getattr(self.cache, "get_user_locations", None)
+        if users and get_many is not None:
+            try:
+                cache = _PrefetchedLocations(self.cache, await get_many(users))
+            except Exception as e:
+                print(f"Batch location read failed, reading per message: {e}")
+
+        by_user: Dict[object, List[int]] = {}
+        for index, (data, _) in enumerate(batch):
+            user_id = data.get("user_id") if isinstance(data, dict) else None
+            by_user.setdefault(user_id, []).append(index)
+
+        results: List[BatchResult] = [None] * len(batch)
+
+        async def run_user(indexes: List[int]) -> None:
+            for index in indexes:
+                data, on_done = batch[index]
+                try:
+                    results[index] = await self._evaluate(data, on_done, cache)
+                except Exception as e:
+                    results[index] = e
+
+        await asyncio.gather(*(run_user(indexes) for indexes in by_user.values()))
+        return results
+
+    def maintain(self) -> None:
+        """
+        Mantenimiento entre mensajes: heartbeats y reconexión del publisher
+
+        Un fallo aquí no detiene el worker; se reintenta en el siguiente tick
+        y, si persiste, la publicación del mensaje fallará y se reencolará.
+        """
+        keepalive = getattr(self.publisher, "keepalive", None)
+        if keepalive is None:
+            return
+        try:
+            keepalive()
+        except Exception as e:
+            print(f"Publisher maintenance failed: {e}")
+
+    async def aclose(self) -> None:
+        """Escribe lo pendiente y cierra conexiones"""
+        await self.writer.flush_async()
+        await self.writer.join()
+        aclose = getattr(self.publisher, "aclose", None)
+        if aclose is not None:
+            await aclose()
+        else:
+            self.publisher.close()
+        redis = getattr(self.cache, "redis", None)
+        if redis is not None:
+            await redis.aclose()
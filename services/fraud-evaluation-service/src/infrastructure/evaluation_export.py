@@ -0,0 +1,282 @@
+"""
+Evaluation Export - Exportación masiva de evaluaciones en streaming
+
+Recorre un cursor de MongoDB por lotes (`batch_size`) y serializa cada lote
+a medida que llega, así que la memoria máxima depende del tamaño del lote
+y no del total exportado. Formatos:
+
+- ndjson: una evaluación por línea (fechas ISO 8601)
+- csv: mismas columnas que `EXPORT_COLUMNS`, `reasons` separadas por " | "
+- parquet: columnar, un row group por lote (requiere `pyarrow`, opcional)
+
+NDJSON y CSV se comprimen con gzip en el cable (zlib incremental); Parquet
+ya comprime sus columnas internamente y se envía tal cual.
+"""
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import Iterable, Iterator, List, Optional
+
+try:  # pragma: no cover - depende del entorno
+    import pyarrow
+    import pyarrow.parquet as parquet
+except ImportError:  # pragma: no cover
+    pyarrow = None
+    parquet = None
+
+
+EXPORT_FORMATS = ("ndjson", "csv", "parquet")
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+EXPORT_COLUMNS = (
+    "transaction_id",
+    "user_id",
+    "timestamp",
+    "risk_level",
+    "status",
+    "reasons",
+    "amount",
+    "latitude",
+    "longitude",
+    "transaction_type",
+    "description",
+    "user_authenticated",
+    "reviewed_by",
+    "reviewed_at",
+)
+
+# Solo se leen de MongoDB los campos que se exportan
+PROJECTION = {
+    "_id": 0,
+    "transaction_id": 1,
+    "user_id": 1,
+    "timestamp": 1,
+    "risk_level": 1,
+    "status": 1,
+    "reasons": 1,
+    "amount": 1,
+    "location": 1,
+    "transaction_type": 1,
+    "description": 1,
+    "user_authenticated": 1,
+    "reviewed_by": 1,
+    "reviewed_at": 1,
+}
+
+
+def export_query(
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    status: Optional[str] = None,
+) -> dict:
+    """Filtro de MongoDB para el rango [since, until) y estado opcional"""
+    query: dict = {}
+    if since is not None or until is not None:
+        query["timestamp"] = {}
+        if since is not None:
+            query["timestamp"]["$gte"] = since
+        if until is not None:
+            query["timestamp"]["$lt"] = until
+    if status:
+        query["status"] = status
+    return query
+
+
+def to_row(document: dict) -> dict:
+    """Aplana un documento de evaluación a las columnas de exportación"""
+    location = document.get("location") or {}
+    return {
+        "transaction_id": document.get("transaction_id"),
+        "user_id": document.get("user_id"),
+        "timestamp": document.get("timestamp"),
+        "risk_level": document.get("risk_level"),
+        "status": document.get("status"),
+        "reasons": list(document.get("reasons") or []),
+        "amount": float(document["amount"]) if document.get("amount") is not None else None,
+        "latitude": location.get("latitude"),
+        "longitude": location.get("longitude"),
+        "transaction_type": document.get("transaction_type"),
+        "description": document.get("description"),
+        "user_authenticated": document.get("user_authenticated"),
+        "reviewed_by": document.get("reviewed_by"),
+        "reviewed_at": document.get("reviewed_at"),
+    }
+
+
+def _iso(value) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def batched(rows: Iterable[dict], size: int) -> Iterator[List[dict]]:
+    """Agrupa un iterable de filas en listas de `size`"""
+    batch: List[dict] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Un bloque de bytes NDJSON por lote"""
+    for batch in batches:
+        yield "".join(
+            json.dumps(
+                {**row, "timestamp": _iso(row["timestamp"]), "reviewed_at": _iso(row["reviewed_at"])},
+                separators=(",", ":"),
+            ) + "\n"
+            for row in batch
+        ).encode("utf-8")
+
+
+def csv_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """Encabezado y luego un bloque CSV por lote"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow([
+                " | ".join(row["reasons"]) if column == "reasons"
+                else _iso(row[column]) if column in ("timestamp", "reviewed_at")
+                else row[column]
+                for column in EXPORT_COLUMNS
+            ])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    remainder = buffer.getvalue()
+    if remainder:
+        yield remainder.encode("utf-8")
+
+
+class _DrainableSink(io.RawIOBase):
+    """Archivo de solo escritura cuyo contenido se vacía después de cada row group"""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def parquet_schema():
+    """Esquema Parquet de la exportación"""
+    return pyarrow.schema([
+        ("transaction_id", pyarrow.string()),
+        ("user_id", pyarrow.string()),
+        ("timestamp", pyarrow.timestamp("ms")),
+        ("risk_level", pyarrow.string()),
+        ("status", pyarrow.string()),
+        ("reasons", pyarrow.list_(pyarrow.string())),
+        ("amount", pyarrow.float64()),
+        ("latitude", pyarrow.float64()),
+        ("longitude", pyarrow.float64()),
+        ("transaction_type", pyarrow.string()),
+        ("description", pyarrow.string()),
+        ("user_authenticated", pyarrow.bool_()),
+        ("reviewed_by", pyarrow.string()),
+        ("reviewed_at", pyarrow.timestamp("ms")),
+    ])
+
+
+def parquet_chunks(batches: Iterable[List[dict]]) -> Iterator[bytes]:
+    """
+    Parquet en streaming: cada lote se escribe como un row group y los bytes
+    producidos se envían de inmediato; el footer sale al cerrar el writer.
+
+    Raises:
+        RuntimeError: Si `pyarrow` no está instalado
+    """
+    if pyarrow is None:
+        raise RuntimeError("Parquet export requires the 'pyarrow' package")
+    schema = parquet_schema()
+    sink = _DrainableSink()
+    with parquet.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for batch in batches:
+            writer.write_table(pyarrow.Table.from_pylist(batch, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    tail = sink.drain()
+    if tail:
+        yield tail
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """Comprime un flujo de bytes como un único miembro gzip, incrementalmente"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits=31 -> formato gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+SERIALIZERS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+    "parquet": parquet_chunks,
+}
+
+
+class EvaluationExporter:
+    """
+    Exporta evaluaciones desde la colección en streaming
+
+    Args:
+        collection: Colección `evaluations`
+        batch_size: Documentos por lote del cursor y por bloque serializado
+    """
+
+    def __init__(self, collection, batch_size: int = 2000) -> None:
+        self.collection = collection
+        self.batch_size = batch_size
+
+    def rows(self, query: dict) -> Iterator[dict]:
+        """Filas en orden cronológico (recorre el índice de timestamp)"""
+        cursor = (
+            self.collection.find(query, PROJECTION)
+            .sort("timestamp", 1)
+            .batch_size(self.batch_size)
+        )
+        try:
+            for document in cursor:
+                yield to_row(document)
+        finally:
+            cursor.close()
+
+    def stream(self, export_format: str, query: dict, compress: bool = True) -> Iterator[bytes]:
+        """
+        Bytes de la exportación en el formato indicado
+
+        Raises:
+            ValueError: Si el formato no está soportado
+            RuntimeError: Si se pide Parquet sin `pyarrow`
+        """
+        if export_format not in SERIALIZERS:
+            raise ValueError(f"Unsupported export format: {export_format}")
+        if export_format == "parquet" and pyarrow is None:
+            raise RuntimeError("Parquet export requires the 'pyarrow' package")
+
+        chunks = SERIALIZERS[export_format](batched(self.rows(query), self.batch_size))
+        if compress and export_format != "parquet":
+            return gzip_chunks(chunks)
+        return chunks
@@ -0,0 +1,267 @@
+"""
+Evaluation Rollups - Agregados materializados por hora y por día
+Alimenta el endpoint de tendencias sin recorrer la colección de evaluaciones
+
+Cada documento de `evaluation_rollups` representa un bucket de tiempo
+(una hora o un día) con contadores por estado. Los contadores se mantienen
+con upserts `$inc` en el momento de escritura y cuando cambia el estado de
+una evaluación (revisión manual), de modo que leer una serie de N buckets
+cuesta exactamente N lecturas por `_id`, sin importar el volumen histórico.
+
+El `_id` es determinístico (`"hour:2026-01-12T10:00"`), así que tanto los
+upserts como las lecturas usan el índice `_id` y no hace falta otro índice.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from pymongo import ReplaceOne, UpdateOne
+
+
+# Resoluciones soportadas y su duración
+RESOLUTIONS: Dict[str, timedelta] = {
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Formato de la etiqueta que consume el dashboard por cada resolución
+LABEL_FORMATS: Dict[str, str] = {
+    "hour": "%H:00",
+    "day": "%Y-%m-%d",
+}
+
+COUNTER_FIELDS = ("approved", "suspicious", "rejected")
+
+
+def status_counter(status: Optional[str]) -> Optional[str]:
+    """
+    Mapea el estado de una evaluación al contador del rollup
+
+    Returns:
+        'approved', 'suspicious', 'rejected' o None si el estado no se agrega
+    """
+    if status == "APPROVED":
+        return "approved"
+    if status in ("PENDING_REVIEW", "SUSPICIOUS"):
+        return "suspicious"
+    if status == "REJECTED":
+        return "rejected"
+    return None
+
+
+def truncate_timestamp(timestamp: datetime, resolution: str) -> datetime:
+    """Trunca un timestamp al inicio de su bucket"""
+    if resolution == "hour":
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    if resolution == "day":
+        return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+    raise ValueError(f"Unsupported resolution: {resolution}")
+
+
+def bucket_id(resolution: str, bucket_start: datetime) -> str:
+    """Construye el `_id` determinístico de un bucket"""
+    return f"{resolution}:{bucket_start.strftime('%Y-%m-%dT%H:%M')}"
+
+
+class EvaluationRollupStore:
+    """
+    Mantiene y consulta los rollups de evaluaciones
+
+    Las operaciones son síncronas (pymongo), igual que el resto de
+    lecturas del adaptador de MongoDB; las rutas las ejecutan en threadpool.
+    """
+
+    def __init__(self, collection) -> None:
+        """
+        Args:
+            collection: Colección `evaluation_rollups`
+        """
+        self.collection = collection
+
+    def record_evaluation(self, timestamp: datetime, status: str) -> None:
+        """
+        Suma una evaluación nueva en todos los buckets que la contienen
+
+        Un solo `bulk_write` desordenado: un round trip para hora y día.
+        """
+        counter = status_counter(status)
+        if counter is None:
+            return
+        self._apply({counter: 1, "total": 1}, timestamp)
+
+    def record_evaluations(self, items: Iterable[Tuple[datetime, str]]) -> None:
+        """
+        Suma un lote de evaluaciones agrupando los incrementos por bucket
+
+        Un lote de N evaluaciones cuesta un solo `bulk_write`, con una
+        operación por bucket distinto (normalmente 2: la hora y el día).
+
+        Args:
+            items: Pares (timestamp, status)
+        """
+        increments: Dict[Tuple[str, datetime], Dict[str, int]] = {}
+        for timestamp, status in items:
+            counter = status_counter(status)
+            if counter is None:
+                continue
+            for resolution in RESOLUTIONS:
+                key = (resolution, truncate_timestamp(timestamp, resolution))
+                bucket = increments.setdefault(key, {})
+                bucket[counter] = bucket.get(counter, 0) + 1
+                bucket["total"] = bucket.get("total", 0) + 1
+
+        if not increments:
+            return
+        self.collection.bulk_write(
+            [
+                self._upsert(resolution, start, bucket_increments)
+                for (resolution, start), bucket_increments in increments.items()
+            ],
+            ordered=False,
+        )
+
+    def record_status_change(
+        self, timestamp: datetime, old_status: Optional[str], new_status: Optional[str]
+    ) -> None:
+        """
+        Mueve una evaluación de un contador a otro tras una revisión manual
+
+        El bucket es el del timestamp original de la evaluación, no el de
+        la revisión, para que la serie refleje cuándo ocurrió la transacción.
+        """
+        old_counter = status_counter(old_status)
+        new_counter = status_counter(new_status)
+        if old_counter == new_counter:
+            return
+
+        increments: Dict[str, int] = {}
+        if old_counter:
+            increments[old_counter] = -1
+        if new_counter:
+            increments[new_counter] = 1
+        total_delta = (1 if new_counter else 0) - (1 if old_counter else 0)
+        if total_delta:
+            increments["total"] = total_delta
+        self._apply(increments, timestamp)
+
+    def get_series(
+        self, resolution: str = "hour", window: int = 24, now: Optional[datetime] = None
+    ) -> List[dict]:
+        """
+        Retorna los últimos `window` buckets en orden cronológico
+
+        Los buckets sin documento (sin tráfico) se devuelven en cero.
+
+        Raises:
+            ValueError: Si la resolución no está soportada o window < 1
+        """
+        if resolution not in RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}")
+        if window < 1:
+            raise ValueError("Window must be positive")
+
+        step = RESOLUTIONS[resolution]
+        last_bucket = truncate_timestamp(now or datetime.now(), resolution)
+        starts = [last_bucket - step * offset for offset in range(window - 1, -1, -1)]
+        ids = [bucket_id(resolution, start) for start in starts]
+
+        documents = {
+            doc["_id"]: doc
+            for doc in self.collection.find({"_id": {"$in": ids}})
+        }
+
+        label_format = LABEL_FORMATS[resolution]
+        series = []
+        for start, doc_id in zip(starts, ids):
+            doc = documents.get(doc_id, {})
+            series.append({
+                "time": start.strftime(label_format),
+                "bucket": start.isoformat(),
+                **{field: max(int(doc.get(field, 0)), 0) for field in COUNTER_FIELDS},
+            })
+        return series
+
+    def rebuild(self, evaluations, until: Optional[datetime] = None, batch_size: int = 1000) -> int:
+        """
+        Reconstruye los rollups a partir de la colección de evaluaciones (backfill)
+
+        Agrega en el servidor con `$dateTrunc` y reemplaza cada bucket, por lo
+        que es idempotente. Con `until`, solo se reconstruyen los buckets que
+        terminan antes de esa fecha, para no pisar incrementos en vivo.
+
+        Args:
+            evaluations: Colección `evaluations`
+            until: Límite superior (exclusivo) de timestamps a considerar
+            batch_size: Tamaño de cada `bulk_write`
+
+        Returns:
+            Número de buckets escritos
+        """
+        written = 0
+        for resolution in RESOLUTIONS:
+            match: dict = {"timestamp": {"$type": "date"}}
+            if until is not None:
+                match["timestamp"]["$lt"] = truncate_timestamp(until, resolution)
+
+            pipeline = [
+                {"$match": match},
+                {
+                    "$group": {
+                        "_id": {
+                            "bucket": {"$dateTrunc": {"date": "$timestamp", "unit": resolution}},
+                            "status": "$status",
+                        },
+                        "count": {"$sum": 1},
+                    }
+                },
+            ]
+            buckets = self._fold_groups(resolution, evaluations.aggregate(pipeline, allowDiskUse=True))
+
+            operations = [
+                ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in buckets.values()
+            ]
+            for offset in range(0, len(operations), batch_size):
+                self.collection.bulk_write(operations[offset:offset + batch_size], ordered=False)
+            written += len(operations)
+        return written
+
+    def _apply(self, increments: Dict[str, int], timestamp: datetime) -> None:
+        """Aplica los incrementos en el bucket de cada resolución"""
+        operations = [
+            self._upsert(resolution, truncate_timestamp(timestamp, resolution), increments)
+            for resolution in RESOLUTIONS
+        ]
+        self.collection.bulk_write(operations, ordered=False)
+
+    @staticmethod
+    def _upsert(resolution: str, start: datetime, increments: Dict[str, int]) -> UpdateOne:
+        """Operación `$inc` con upsert sobre el bucket indicado"""
+        return UpdateOne(
+            {"_id": bucket_id(resolution, start)},
+            {
+                "$inc": increments,
+                "$setOnInsert": {"resolution": resolution, "bucket": start},
+            },
+            upsert=True,
+        )
+
+    @staticmethod
+    def _fold_groups(resolution: str, groups: Iterable[dict]) -> Dict[str, dict]:
+        """Convierte los grupos (bucket, status) del aggregate en documentos de rollup"""
+        buckets: Dict[str, dict] = {}
+        for group in groups:
+            start = group["_id"]["bucket"]
+            counter = status_counter(group["_id"].get("status"))
+            if counter is None:
+                continue
+            doc_id = bucket_id(resolution, start)
+            doc = buckets.setdefault(doc_id, {
+                "_id": doc_id,
+                "resolution": resolution,
+                "bucket": start,
+                "approved": 0,
+                "suspicious": 0,
+                "rejected": 0,
+                "total": 0,
+            })
+            doc[counter] += group["count"]
+            doc["total"] += group["count"]
+        return buckets
@@ -0,0 +1,196 @@
+"""
+Evaluation Writer - Persistencia write-behind por lotes para el worker
+
+En lugar de un `insert_one` por mensaje, el worker acumula las evaluaciones
+y las escribe con un único `insert_many` desordenado cuando el lote alcanza
+`max_batch_size` o cuando la evaluación más antigua lleva `max_delay_seconds`
+esperando. Cada evaluación registra un callback que se invoca con su
+resultado una vez que el lote se escribió; el worker hace ack (o nack) del
+mensaje en ese callback, por lo que ningún mensaje se confirma antes de que
+su evaluación esté persistida.
+
+Semántica de duplicados: el índice único `transaction_id` rechaza una
+evaluación que ya existe (típicamente un mensaje reentregado tras una caída
+entre el insert y el ack). Esa evaluación ya es durable, así que se reporta
+como DUPLICATE y el mensaje se confirma igual que uno escrito.
+
+pymongo es bloqueante: en el worker asyncio el `insert_many` del lote
+corre en un hilo (`flush_async`, y con `offload` también el lote que se
+llena en `add`), así las demás evaluaciones en vuelo siguen avanzando
+mientras se escribe. Los callbacks se invocan siempre en el event loop.
+"""
+import asyncio
+import time
+from enum import Enum
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+from src.domain.models import FraudEvaluation
+
+
+class WriteOutcome(Enum):
+    """Resultado de persistir una evaluación dentro de un lote"""
+
+    WRITTEN = "written"
+    DUPLICATE = "duplicate"  # Ya existía: durable, se confirma el mensaje
+    FAILED = "failed"  # Error permanente del documento: no reintentar
+    RETRY = "retry"  # El lote completo falló (conexión, timeout): reintentar
+
+    @property
+    def is_durable(self) -> bool:
+        """Indica si la evaluación quedó persistida y el mensaje puede confirmarse"""
+        return self in (WriteOutcome.WRITTEN, WriteOutcome.DUPLICATE)
+
+
+DoneCallback = Callable[[WriteOutcome], None]
+
+
+class EvaluationBatchWriter:
+    """
+    Buffer de evaluaciones que se vacía por tamaño o por tiempo
+
+    No es thread-safe: el worker lo usa desde su único event loop
+    (evaluaciones concurrentes y temporizador comparten ese hilo); solo la
+    escritura de un lote ya tomado corre en otro hilo.
+    """
+
+    def __init__(
+        self,
+        repository,
+        max_batch_size: int = 50,
+        max_delay_seconds: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        offload: bool = False,
+    ) -> None:
+        """
+        Args:
+            repository: Adaptador con `save_evaluations(evaluations)`
+            max_batch_size: Evaluaciones por lote antes de forzar la escritura
+            max_delay_seconds: Espera máxima de la evaluación más antigua
+            clock: Reloj monotónico (inyectable para tests)
+            offload: El lote que se llena en `add` se escribe en un hilo
+                (requiere un event loop en ejecución)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be positive")
+        self.repository = repository
+        self.max_batch_size = max_batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self._clock = clock
+        self._pending: List[Tuple[FraudEvaluation, DoneCallback]] = []
+        self._oldest: Optional[float] = None
+        self.offload = offload
+        # Lotes escribiéndose en un hilo (referencias fuertes hasta que terminan)
+        self._flushing: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, evaluation: FraudEvaluation, on_done: DoneCallback) -> None:
+        """Encola una evaluación; escribe el lote si quedó lleno"""
+        if not self._pending:
+            self._oldest = self._clock()
+        self._pending.append((evaluation, on_done))
+        if len(self._pending) >= self.max_batch_size:
+            if self.offload:
+                task = asyncio.get_running_loop().create_task(self._write_async(self._take()))
+                self._flushing.add(task)
+                task.add_done_callback(self._flushing.discard)
+            else:
+                self.flush()
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Segundos hasta que vence el lote actual (None si está vacío)"""
+        if not self._pending:
+            return None
+        return max(self._oldest + self.max_delay_seconds - self._clock(), 0.0)
+
+    def should_flush(self) -> bool:
+        """Indica si el lote alcanzó el tamaño o la espera máxima"""
+        if not self._pending:
+            return False
+        return len(self._pending) >= self.max_batch_size or self.seconds_until_due() == 0.0
+
+    def flush(self) -> int:
+        """
+        Escribe el lote pendiente y notifica el resultado de cada evaluación
+
+        Returns:
+            Número de evaluaciones procesadas en el lote
+        """
+        batch = self._take()
+        if batch:
+            self._notify(batch, self._save(batch))
+        return len(batch)
+
+    async def flush_async(self) -> int:
+        """Como `flush`, con el `insert_many` en un hilo (no bloquea el event loop)"""
+        return await self._write_async(self._take())
+
+    async def join(self) -> None:
+        """Espera los lotes que se están escribiendo en un hilo"""
+        while self._flushing:
+            await asyncio.gather(*list(self._flushing), return_exceptions=True)
+
+    async def _write_async(self, batch: List[Tuple[FraudEvaluation, DoneCallback]]) -> int:
+        if batch:
+            self._notify(batch, await asyncio.to_thread(self._save, batch))
+        return len(batch)
+
+    def _take(self) -> List[Tuple[FraudEvaluation, DoneCallback]]:
+        batch, self._pending, self._oldest = self._pending, [], None
+        return batch
+
+    def _save(self, batch: List[Tuple[FraudEvaluation, DoneCallback]]) -> List[WriteOutcome]:
+        try:
+            return self.repository.save_evaluations([evaluation for evaluation, _ in batch])
+        except Exception as e:
+            print(f"Error writing evaluation batch ({len(batch)} items): {e}")
+            return [WriteOutcome.RETRY] * len(batch)
+
+    @staticmethod
+    def _notify(batch: List[Tuple[FraudEvaluation, DoneCallback]], outcomes: List[WriteOutcome]) -> None:
+        for (evaluation, on_done), outcome in zip(batch, outcomes):
+            try:
+                on_done(outcome)
+            except Exception as e:
+                print(f"Error notifying write of {evaluation.transaction_id}: {e}")
+
+
+class WriteBehindRepository:
+    """
+    Repositorio que difiere `save_evaluation` al `EvaluationBatchWriter`
+
+    `EvaluateTransactionUseCase` no cambia: su `save_evaluation` solo deja la
+    evaluación preparada, y quien ejecuta el caso de uso decide cuándo
+    confirmarla (`commit`) o descartarla (`discard`). El resto de métodos
+    (lecturas) se delegan al repositorio real.
+    """
+
+    def __init__(self, repository, writer: EvaluationBatchWriter) -> None:
+        self._repository = repository
+        self.writer = writer
+        self._staged: Optional[FraudEvaluation] = None
+
+    async def save_evaluation(self, evaluation: FraudEvaluation) -> None:
+        """Prepara la evaluación para el próximo lote"""
+        self._staged = evaluation
+
+    def commit(self, on_done: DoneCallback) -> bool:
+        """
+        Pasa la evaluación preparada al writer
+
+        Returns:
+            False si el caso de uso no guardó ninguna evaluación
+        """
+        evaluation, self._staged = self._staged, None
+        if evaluation is None:
+            return False
+        self.writer.add(evaluation, on_done)
+        return True
+
+    def discard(self) -> None:
+        """Descarta la evaluación preparada (el caso de uso falló después de guardarla)"""
+        self._staged = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._repository, name)
@@ -0,0 +1,157 @@
+"""
+Hedged Reads - Lecturas idempotentes contra el primario y una réplica
+
+El p99 de la validación lo marcan GETs ocasionalmente lentos en el
+primario. Con hedging cada lectura va primero al primario; si no responde
+en `delay()` (el percentil `percentile` de las latencias recientes), la
+misma lectura se lanza contra la réplica y gana la primera respuesta. La
+otra se cancela (el breaker libera la llamada sin veredicto).
+
+Solo para lecturas idempotentes y tolerantes a lag de replicación
+(milisegundos): la última ubicación (GEOPOS). Las escrituras y los
+comandos cuyo resultado decide algo (SADD de dispositivos, ZADD de la
+ventana rápida) siguen yendo solo al primario.
+
+Si el primario falla rápido (p. ej. breaker abierto) la lectura va
+directamente a la réplica.
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict
+
+
+# Comandos de solo lectura que el proxy puede duplicar
+READ_COMMANDS = frozenset({
+    "get", "mget", "exists", "hget", "hgetall", "sismember", "smembers",
+    "zcount", "zrangebyscore", "geopos", "geodist", "geosearch",
+})
+
+# Muestras necesarias antes de usar el percentil en vez del delay inicial
+MIN_SAMPLES = 50
+# El percentil se recalcula cada tantas muestras (ordenar en cada lectura es caro)
+RECOMPUTE_EVERY = 32
+
+
+class HedgePolicy:
+    """
+    Delay de hedging adaptativo y contadores (compartido por proceso)
+
+    Args:
+        name: Nombre para las métricas
+        percentile: Percentil de latencia del primario a partir del cual se duplica
+        initial_delay: Delay (s) hasta tener MIN_SAMPLES muestras
+        min_delay: Cota inferior del delay (s)
+        max_delay: Cota superior del delay (s)
+        window: Muestras de latencia retenidas
+    """
+
+    def __init__(
+        self,
+        name: str,
+        percentile: float = 0.95,
+        initial_delay: float = 0.005,
+        min_delay: float = 0.001,
+        max_delay: float = 0.05,
+        window: int = 1024,
+    ) -> None:
+        self.name = name
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._pending_samples = 0
+        self._delay = initial_delay
+
+        self.reads_total = 0
+        self.hedged_total = 0
+        self.replica_wins_total = 0
+
+    def delay(self) -> float:
+        return self._delay
+
+    def record(self, seconds: float) -> None:
+        """Registra la latencia de una lectura (hasta la primera respuesta)"""
+        self._samples.append(seconds)
+        self._pending_samples += 1
+        if len(self._samples) >= MIN_SAMPLES and self._pending_samples >= RECOMPUTE_EVERY:
+            self._pending_samples = 0
+            ordered = sorted(self._samples)
+            value = ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+            self._delay = min(self.max_delay, max(self.min_delay, value))
+
+
+class HedgedRedis:
+    """
+    Proxy de lectura: comandos de READ_COMMANDS con hedging, el resto al primario
+
+    `wrapped` es el cliente original del primario (ver redis_keys.is_cluster).
+    """
+
+    def __init__(self, primary, replica, policy: HedgePolicy) -> None:
+        self.primary = primary
+        self.replica = replica
+        self.policy = policy
+        self.wrapped = getattr(primary, "wrapped", primary)
+
+    async def read(self, fn: Callable[[object], Awaitable]):
+        """Ejecuta `fn(cliente)` en el primario y, si tarda, también en la réplica"""
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self.policy.reads_total += 1
+
+        primary = asyncio.ensure_future(fn(self.primary))
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.policy.delay())
+            if done and primary.exception() is None:
+                self.policy.record(loop.time() - started)
+                return primary.result()
+
+            self.policy.hedged_total += 1
+            replica = asyncio.ensure_future(fn(self.replica))
+            pending.add(replica)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        self.policy.record(loop.time() - started)
+                        if task is replica:
+                            self.policy.replica_wins_total += 1
+                        return task.result()
+            # Ninguno respondió: se propaga el error del primario
+            return primary.result()
+        finally:
+            # La respuesta perdedora (o ambas, si se cancela la lectura)
+            for task in pending:
+                task.cancel()
+
+    def __getattr__(self, name):
+        if name not in READ_COMMANDS:
+            return getattr(self.primary, name)
+
+        def command(*args, **kwargs):
+            return self.read(lambda client: getattr(client, name)(*args, **kwargs))
+        return command
+
+
+async def run_read(redis, fn: Callable[[object], Awaitable]):
+    """`fn(redis)`, con hedging si `redis` es un HedgedRedis"""
+    if isinstance(redis, HedgedRedis):
+        return await redis.read(fn)
+    return await fn(redis)
+
+
+_POLICIES: Dict[str, HedgePolicy] = {}
+
+
+def get_hedge_policy(name: str, **config) -> HedgePolicy:
+    """Política compartida del proceso (`config` solo aplica al crearla)"""
+    policy = _POLICIES.get(name)
+    if policy is None:
+        policy = _POLICIES[name] = HedgePolicy(name, **config)
+    return policy
+
+
+def all_hedge_policies() -> Dict[str, HedgePolicy]:
+    return dict(_POLICIES)
@@ -0,0 +1,381 @@
+"""
+Index Catalog - Catálogo declarativo de consultas e índices de MongoDB
+
+Cada `QueryShape` describe una consulta que el código emite (filtro, orden
+y límite con valores de ejemplo) junto con el índice que la sirve. A partir
+de este catálogo:
+
+- `ensure_indexes()` construye los índices (`python -m src.management
+  bootstrap-indexes`); `ensure_indexes_once()` lo hace una sola vez por
+  proceso en el arranque en dev (`mongodb_auto_create_indexes`)
+- `plan_violations()` inspecciona la salida de `explain()` y reporta
+  COLLSCAN o SORT en memoria, para verificar que cada forma esté cubierta
+
+Al agregar una consulta nueva al código, se debe declarar aquí su forma.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Definición de un índice: claves en orden y opciones"""
+
+    keys: Tuple[Tuple[str, int], ...]
+    unique: bool = False
+
+    @property
+    def is_builtin(self) -> bool:
+        """El índice `_id` lo crea MongoDB, no hay que construirlo"""
+        return self.keys == (("_id", 1),)
+
+
+@dataclass(frozen=True)
+class QueryShape:
+    """Forma de una consulta emitida por el código y el índice que la sirve"""
+
+    name: str
+    collection: str
+    filter: Dict[str, Any]
+    index: IndexSpec
+    sort: Optional[Tuple[Tuple[str, int], ...]] = None
+    limit: Optional[int] = None
+    description: str = ""
+
+
+TRANSACTION_ID = IndexSpec(keys=(("transaction_id", 1),), unique=True)
+TIMESTAMP_DESC = IndexSpec(keys=(("timestamp", -1),))
+USER_TIMELINE = IndexSpec(keys=(("user_id", 1), ("timestamp", -1)))
+STATUS_TIMELINE = IndexSpec(keys=(("status", 1), ("timestamp", -1)))
+PRIMARY_ID = IndexSpec(keys=(("_id", 1),))
+USER_BUCKETS = IndexSpec(keys=(("user_id", 1), ("last_ts", -1)))
+REVIEW_ORDER = IndexSpec(keys=(("status", 1), ("rank", -1), ("amount", -1), ("enqueued_at", 1)))
+REVIEW_LEASES = IndexSpec(keys=(("status", 1), ("lease_until", 1)))
+
+
+QUERY_SHAPES: List[QueryShape] = [
+    QueryShape(
+        name="evaluation_by_transaction_id",
+        collection="evaluations",
+        filter={"transaction_id": "txn_00001"},
+        index=TRANSACTION_ID,
+        limit=1,
+        description="get_evaluation_by_id / update_evaluation (find_one_and_update)",
+    ),
+    QueryShape(
+        name="evaluations_latest_first",
+        collection="evaluations",
+        filter={},
+        sort=(("timestamp", -1),),
+        index=TIMESTAMP_DESC,
+        description="get_all_evaluations / transactions log sin filtros",
+    ),
+    QueryShape(
+        name="user_history_latest_first",
+        collection="evaluations",
+        filter={"user_id": "user_0001"},
+        sort=(("timestamp", -1),),
+        index=USER_TIMELINE,
+        description="get_evaluations_by_user (app de usuario, UnusualTimeStrategy)",
+    ),
+    QueryShape(
+        name="user_history_since",
+        collection="evaluations",
+        filter={"user_id": "user_0001", "timestamp": {"$gte": "__days_ago__:90"}},
+        sort=(("timestamp", -1),),
+        limit=100,
+        index=USER_TIMELINE,
+        description="Historial acotado por fecha para patrones horarios",
+    ),
+    QueryShape(
+        name="status_log_latest_first",
+        collection="evaluations",
+        filter={"status": "PENDING_REVIEW"},
+        sort=(("timestamp", -1),),
+        limit=50,
+        index=STATUS_TIMELINE,
+        description="Transactions log filtrado por estado",
+    ),
+    QueryShape(
+        name="user_status_log_latest_first",
+        collection="evaluations",
+        filter={"user_id": "user_0001", "status": "APPROVED"},
+        sort=(("timestamp", -1),),
+        limit=50,
+        index=USER_TIMELINE,
+        description="Transactions log filtrado por usuario y estado",
+    ),
+    QueryShape(
+        name="rollup_series",
+        collection="evaluation_rollups",
+        filter={"_id": {"$in": ["hour:2026-01-12T10:00", "hour:2026-01-12T11:00"]}},
+        index=PRIMARY_ID,
+        description="Serie de tendencias (lectura por _id)",
+    ),
+    QueryShape(
+        name="archive_candidates_oldest_first",
+        collection="evaluations",
+        filter={"timestamp": {"$lt": "__days_ago__:180"}},
+        sort=(("timestamp", 1),),
+        limit=5000,
+        index=TIMESTAMP_DESC,
+        description="EvaluationArchiver: lote de evaluaciones a mover al tier frío",
+    ),
+    QueryShape(
+        name="archived_evaluation_by_transaction_id",
+        collection="evaluation_archive_index",
+        filter={"_id": "txn_00001"},
+        index=PRIMARY_ID,
+        limit=1,
+        description="Fallback de get_evaluation_by_id al archivo",
+    ),
+    QueryShape(
+        name="export_range_oldest_first",
+        collection="evaluations",
+        filter={"timestamp": {"$gte": "__days_ago__:60", "$lt": "__days_ago__:30"}},
+        sort=(("timestamp", 1),),
+        index=TIMESTAMP_DESC,
+        description="Exportación mensual (/admin/export)",
+    ),
+    QueryShape(
+        name="export_status_range_oldest_first",
+        collection="evaluations",
+        filter={
+            "status": "REJECTED",
+            "timestamp": {"$gte": "__days_ago__:60", "$lt": "__days_ago__:30"},
+        },
+        sort=(("timestamp", 1),),
+        index=STATUS_TIMELINE,
+        description="Exportación mensual filtrada por estado",
+    ),
+    QueryShape(
+        name="user_history_rebuild_scan",
+        collection="evaluations",
+        filter={},
+        sort=(("user_id", -1), ("timestamp", 1)),
+        index=USER_TIMELINE,
+        description="UserHistoryBucketStore.rebuild (recorrido inverso del índice)",
+    ),
+    QueryShape(
+        name="user_buckets_latest_first",
+        collection="user_evaluation_buckets",
+        filter={"user_id": "user_0001"},
+        sort=(("last_ts", -1),),
+        index=USER_BUCKETS,
+        description="Timeline de usuario desde los buckets",
+    ),
+    QueryShape(
+        name="user_bucket_open_for_append",
+        collection="user_evaluation_buckets",
+        filter={"user_id": "user_0001", "period": "2026-01", "count": {"$lt": 1000}, "backfill": {"$ne": True}},
+        limit=1,
+        index=USER_BUCKETS,
+        description="Upsert que agrega una entrada al bucket abierto",
+    ),
+    QueryShape(
+        name="user_bucket_by_entry",
+        collection="user_evaluation_buckets",
+        filter={"user_id": "user_0001", "entries.t": "txn_00001"},
+        limit=1,
+        index=USER_BUCKETS,
+        description="Revisión manual reflejada en la entrada del bucket",
+    ),
+    QueryShape(
+        name="review_queue_next",
+        collection="review_queue",
+        filter={"status": "PENDING"},
+        sort=(("rank", -1), ("amount", -1), ("enqueued_at", 1)),
+        limit=1,
+        index=REVIEW_ORDER,
+        description="ReviewQueueStore.claim_next (find_one_and_update) y listado pendiente",
+    ),
+    QueryShape(
+        name="review_queue_expired_claims",
+        collection="review_queue",
+        filter={"status": "CLAIMED", "lease_until": {"$lt": "__days_ago__:0"}},
+        index=REVIEW_LEASES,
+        description="ReviewQueueStore.release_expired",
+    ),
+    QueryShape(
+        name="review_queue_item",
+        collection="review_queue",
+        filter={"_id": "txn_00001"},
+        index=PRIMARY_ID,
+        limit=1,
+        description="Reclamo, liberación y cierre de un ítem",
+    ),
+    QueryShape(
+        name="reviewed_evaluations_in_batch",
+        collection="evaluations",
+        filter={"transaction_id": {"$in": ["txn_00001", "txn_00002"]}, "reviewed_by": {"$ne": None}},
+        index=TRANSACTION_ID,
+        description="ReviewQueueStore.add_many: omitir las ya revisadas",
+    ),
+    QueryShape(
+        name="user_by_user_id",
+        collection="users",
+        filter={"user_id": "user_0001"},
+        index=IndexSpec(keys=(("user_id", 1),), unique=True),
+        limit=1,
+        description="UserRepository.find_by_user_id",
+    ),
+    QueryShape(
+        name="user_by_email",
+        collection="users",
+        filter={"email": "user_0001@example.com"},
+        index=IndexSpec(keys=(("email", 1),), unique=True),
+        limit=1,
+        description="UserRepository.find_by_email",
+    ),
+    QueryShape(
+        name="user_by_verification_token",
+        collection="users",
+        filter={"verification_token": "token_0001"},
+        index=IndexSpec(keys=(("verification_token", 1),)),
+        limit=1,
+        description="UserRepository.find_by_verification_token",
+    ),
+    QueryShape(
+        name="custom_rule_by_id",
+        collection="custom_rules",
+        filter={"id": "rule_0001"},
+        index=IndexSpec(keys=(("id", 1),), unique=True),
+        limit=1,
+        description="Actualización y borrado de reglas personalizadas",
+    ),
+]
+
+
+def catalog_collections(shapes: Iterable[QueryShape] = QUERY_SHAPES) -> List[str]:
+    """Colecciones que aparecen en el catálogo, en orden de declaración"""
+    names: List[str] = []
+    for shape in shapes:
+        if shape.collection not in names:
+            names.append(shape.collection)
+    return names
+
+
+def indexes_for(collection: str, shapes: Iterable[QueryShape] = QUERY_SHAPES) -> List[IndexSpec]:
+    """Índices (sin duplicados) que necesita una colección según el catálogo"""
+    specs: List[IndexSpec] = []
+    for shape in shapes:
+        if shape.collection == collection and not shape.index.is_builtin and shape.index not in specs:
+            specs.append(shape.index)
+    return specs
+
+
+def ensure_indexes(
+    collections: Mapping[str, Any], shapes: Iterable[QueryShape] = QUERY_SHAPES
+) -> Dict[str, List[str]]:
+    """
+    Crea los índices del catálogo en las colecciones indicadas
+
+    `create_index` es idempotente; los nombres se derivan de las claves
+    (p. ej. `user_id_1_timestamp_-1`), igual que los índices existentes.
+
+    Args:
+        collections: Mapa nombre -> colección de pymongo
+
+    Returns:
+        Mapa nombre de colección -> nombres de índices creados/confirmados
+    """
+    shapes = list(shapes)
+    created: Dict[str, List[str]] = {}
+    for name, collection in collections.items():
+        for spec in indexes_for(name, shapes):
+            index_name = collection.create_index(list(spec.keys), unique=spec.unique)
+            created.setdefault(name, []).append(index_name)
+    return created
+
+
+# Colecciones (`full_name`) con los índices ya confirmados en este proceso
+_ENSURED: Set[str] = set()
+
+
+def ensure_indexes_once(collections: Mapping[str, Any]) -> None:
+    """
+    `ensure_indexes` una sola vez por proceso y colección
+
+    La API crea un adaptador por petición: sin esta guarda cada petición
+    pagaría un `create_index` por índice del catálogo.
+    """
+    pending = {
+        name: collection for name, collection in collections.items()
+        if getattr(collection, "full_name", name) not in _ENSURED
+    }
+    if not pending:
+        return
+    ensure_indexes(pending)
+    _ENSURED.update(getattr(collection, "full_name", name) for name, collection in pending.items())
+
+
+def obsolete_indexes(
+    collection_name: str, existing: Mapping[str, dict], shapes: Iterable[QueryShape] = QUERY_SHAPES
+) -> List[str]:
+    """
+    Índices existentes que ninguna forma del catálogo necesita
+
+    Args:
+        existing: Salida de `collection.index_information()`
+    """
+    wanted = {spec.keys for spec in indexes_for(collection_name, shapes)}
+    return [
+        name
+        for name, info in existing.items()
+        if name != "_id_" and tuple((k, int(d)) for k, d in info["key"]) not in wanted
+    ]
+
+
+def _plan_stages(plan: Optional[dict]) -> Iterable[str]:
+    """Recorre un árbol de plan (classic o SBE) y produce los nombres de etapa"""
+    if not plan:
+        return
+    # SBE (MongoDB 7+) anida el plan clásico en queryPlan
+    if "queryPlan" in plan:
+        yield from _plan_stages(plan["queryPlan"])
+        return
+    stage = plan.get("stage")
+    if stage:
+        yield stage
+    if "inputStage" in plan:
+        yield from _plan_stages(plan["inputStage"])
+    for child in plan.get("inputStages", []):
+        yield from _plan_stages(child)
+
+
+def plan_violations(explain: dict) -> List[str]:
+    """
+    Detecta COLLSCAN y SORT en memoria en la salida de `explain()`
+
+    Returns:
+        Lista de etapas problemáticas (vacía si el plan está cubierto)
+    """
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan")
+    return [stage for stage in _plan_stages(winning_plan) if stage in ("COLLSCAN", "SORT")]
+
+
+def resolve_filter(query_filter: Any, now: Optional[datetime] = None) -> Any:
+    """
+    Sustituye los marcadores relativos (`__days_ago__:N`) por fechas reales
+
+    Permite declarar filtros dependientes del tiempo con valores estables.
+    """
+    if isinstance(query_filter, dict):
+        return {key: resolve_filter(value, now) for key, value in query_filter.items()}
+    if isinstance(query_filter, list):
+        return [resolve_filter(value, now) for value in query_filter]
+    if isinstance(query_filter, str) and query_filter.startswith("__days_ago__:"):
+        days = int(query_filter.split(":", 1)[1])
+        return (now or datetime.now()) - timedelta(days=days)
+    return query_filter
+
+
+def explain_shape(db, shape: QueryShape) -> dict:
+    """Ejecuta `explain()` para una forma del catálogo contra una base real"""
+    cursor = db[shape.collection].find(resolve_filter(shape.filter))
+    if shape.sort:
+        cursor = cursor.sort(list(shape.sort))
+    if shape.limit:
+        cursor = cursor.limit(shape.limit)
+    return cursor.explain()
@@ -0,0 +1,130 @@
+"""
+Keyed Executor - Trabajo serializado por clave y paralelo entre claves
+
+Con el consumidor concurrente (ver evaluation_consumer.py) dos
+transacciones del mismo usuario podían evaluarse a la vez y pisarse el
+estado por usuario: la ventana de `rapid_tx`, la última ubicación y el
+registro de dispositivos se leen y se escriben en pasos separados.
+KeyedExecutor ejecuta los trabajos de una misma clave (`user_id`) de a
+uno y en orden de llegada, y los de claves distintas en paralelo:
+
+- Como máximo `concurrency` claves en ejecución a la vez.
+- Cada clave tiene su cola acotada a `max_pending_per_key` trabajos; con
+  la cola llena `submit()` espera (backpressure hacia el consumidor) y
+  los productores que esperan entran en orden de llegada.
+- Equidad round-robin: una clave con trabajo pendiente ejecuta uno y
+  vuelve al final de la fila de claves listas, así un usuario con ráfagas
+  no posterga al resto.
+
+El orden por usuario solo vale dentro de un proceso: las colas con shard
+por `user_id` (ver sharding.py) llevan a cada usuario a un solo worker.
+"""
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Hashable, Set, Tuple
+
+Job = Tuple[Callable[..., Awaitable[None]], tuple]
+
+
+class KeyedExecutor:
+    """
+    Ejecuta corrutinas serializadas por clave con concurrencia acotada
+
+    Args:
+        concurrency: Claves en ejecución a la vez como máximo
+        max_pending_per_key: Trabajos en cola por clave (sin contar el que corre)
+    """
+
+    def __init__(self, concurrency: int = 16, max_pending_per_key: int = 16) -> None:
+        if concurrency < 1:
+            raise ValueError("concurrency must be positive")
+        if max_pending_per_key < 1:
+            raise ValueError("max_pending_per_key must be positive")
+        self.concurrency = concurrency
+        self.max_pending_per_key = max_pending_per_key
+        # Cola de cada clave con trabajo pendiente
+        self._pending: Dict[Hashable, Deque[Job]] = {}
+        # Productores esperando lugar en la cola de su clave
+        self._waiting: Dict[Hashable, Deque[Tuple[asyncio.Future, Job]]] = {}
+        # Claves con trabajo y sin ejecución en curso (cada una una sola vez)
+        self._ready: Deque[Hashable] = deque()
+        self._running: Set[Hashable] = set()
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def in_flight(self) -> int:
+        """Trabajos en ejecución"""
+        return len(self._running)
+
+    @property
+    def pending(self) -> int:
+        """Trabajos en cola, sin contar a los productores que esperan"""
+        return sum(len(queue) for queue in self._pending.values())
+
+    async def submit(self, key: Hashable, function: Callable[..., Awaitable[None]], *args) -> None:
+        """
+        Encola `function(*args)` detrás de los trabajos anteriores de `key`
+
+        Vuelve apenas el trabajo queda en cola (no espera a que termine);
+        espera si la cola de la clave está llena.
+        """
+        job = (function, args)
+        queue = self._pending.get(key)
+        if self._waiting.get(key) or (queue is not None and len(queue) >= self.max_pending_per_key):
+            future = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(key, deque()).append((future, job))
+            # `_admit` encola el trabajo antes de despertar al productor
+            await future
+            return
+        self._enqueue(key, job)
+        self._schedule()
+
+    def _enqueue(self, key: Hashable, job: Job) -> None:
+        queue = self._pending.setdefault(key, deque())
+        queue.append(job)
+        if len(queue) == 1 and key not in self._running:
+            self._ready.append(key)
+
+    def _schedule(self) -> None:
+        """Arranca trabajos de las claves listas mientras haya cupo"""
+        while self._ready and len(self._running) < self.concurrency:
+            key = self._ready.popleft()
+            queue = self._pending[key]
+            job = queue.popleft()
+            if not queue:
+                del self._pending[key]
+            self._running.add(key)
+            self._admit(key)
+            task = asyncio.get_running_loop().create_task(self._run(key, job))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _admit(self, key: Hashable) -> None:
+        """Pasa el trabajo del primer productor en espera a la cola de la clave"""
+        waiting = self._waiting.get(key)
+        while waiting:
+            future, job = waiting.popleft()
+            if not future.done():  # productor cancelado mientras esperaba
+                self._pending.setdefault(key, deque()).append(job)
+                future.set_result(None)
+                break
+        if waiting is not None and not waiting:
+            del self._waiting[key]
+
+    async def _run(self, key: Hashable, job: Job) -> None:
+        function, args = job
+        try:
+            await function(*args)
+        except Exception as e:
+            print(f"Keyed job for {key!r} failed: {e}")
+        finally:
+            self._running.discard(key)
+            if key in self._pending:
+                # Al final de la fila: las demás claves listas van primero
+                self._ready.append(key)
+            self._schedule()
+
+    async def join(self) -> None:
+        """Espera a que terminen los trabajos en cola y en ejecución"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks), return_exceptions=True)
@@ -0,0 +1,87 @@
+"""
+Local Risk State - Estado aproximado por proceso para el modo degradado
+
+Mientras Redis responde, las estrategias y el adaptador copian aquí lo que
+ya saben (dispositivos vistos, transacciones recientes, última ubicación).
+Si el breaker de Redis está abierto o una llamada falla, se responde con
+este estado en lugar de "check_failed":
+
+- Es aproximado: cada proceso (réplica del API, worker) solo ve su parte
+  del tráfico, y se pierde al reiniciar. En el worker con sharding
+  (ver sharding.py) todas las transacciones de un usuario llegan al
+  mismo proceso, así que ahí el estado de cada usuario es completo.
+- Está acotado: LRU de `max_users` usuarios por estructura.
+"""
+from collections import OrderedDict, deque
+from typing import Deque, Optional, Set, Tuple
+
+
+class _LRU(OrderedDict):
+    """OrderedDict que descarta el usuario menos reciente al superar `max_size`"""
+
+    def __init__(self, max_size: int) -> None:
+        super().__init__()
+        self.max_size = max_size
+
+    def touch(self, key, factory):
+        value = self.get(key)
+        if value is None:
+            value = self[key] = factory()
+            if len(self) > self.max_size:
+                self.popitem(last=False)
+        else:
+            self.move_to_end(key)
+        return value
+
+
+class LocalRiskState:
+    """
+    Estado de riesgo en memoria del proceso
+
+    Args:
+        max_users: Usuarios retenidos por estructura (LRU)
+        max_devices_per_user: Dispositivos retenidos por usuario
+    """
+
+    def __init__(self, max_users: int = 100_000, max_devices_per_user: int = 20) -> None:
+        self.max_devices_per_user = max_devices_per_user
+        self._devices = _LRU(max_users)
+        self._windows = _LRU(max_users)
+        self._locations = _LRU(max_users)
+
+    def remember_device(self, user_id: str, device_id: str) -> None:
+        devices: Set[str] = self._devices.touch(user_id, set)
+        if len(devices) < self.max_devices_per_user:
+            devices.add(device_id)
+
+    def knows_device(self, user_id: str, device_id: str) -> bool:
+        return device_id in self._devices.get(user_id, ())
+
+    def record_transaction(self, user_id: str, timestamp: float, window_seconds: float) -> int:
+        """Registra una transacción y retorna cuántas hay en la ventana (incluida ésta)"""
+        window: Deque[float] = self._windows.touch(user_id, deque)
+        window.append(timestamp)
+        while window and window[0] < timestamp - window_seconds:
+            window.popleft()
+        return sum(1 for ts in window if timestamp - window_seconds <= ts <= timestamp)
+
+    def remember_location(self, user_id: str, latitude: float, longitude: float) -> None:
+        self._locations.touch(user_id, lambda: None)
+        self._locations[user_id] = (latitude, longitude)
+
+    def last_location(self, user_id: str) -> Optional[dict]:
+        location: Optional[Tuple[float, float]] = self._locations.get(user_id)
+        if location is None:
+            return None
+        return {"latitude": location[0], "longitude": location[1]}
+
+
+_shared_state: Optional[LocalRiskState] = None
+
+
+def shared_local_state() -> LocalRiskState:
+    """Instancia compartida por todos los adaptadores y estrategias del proceso"""
+    global _shared_state
+    if _shared_state is None:
+        _shared_state = LocalRiskState()
+    return _shared_state
@@ -0,0 +1,523 @@
+"""
+Memory Broker - Broker en memoria para benchmarks y pruebas de punta a punta
+
+Para medir el camino publisher -> cola -> worker -> repositorio hacía
+falta un RabbitMQ, y los resultados variaban con la red y el broker. Este
+módulo reproduce en el mismo proceso la parte de aio-pika que usan el
+publisher, el consumidor y los reintentos:
+
+- InMemoryBroker: colas por nombre, exchange por defecto y exchanges
+  fanout (los de retry_topology.py).
+- InMemoryChannel: `set_qos(prefetch_count)` limita los mensajes sin
+  confirmar del canal; `ack(multiple=...)`, `nack(requeue=...)` y
+  `reject`; al cerrarse el canal sus mensajes sin confirmar vuelven a la
+  cabeza de su cola con `redelivered=True`, igual que en RabbitMQ.
+- Colas con `x-message-ttl` y `x-dead-letter-exchange`: el mensaje
+  vencido se republica con su routing key (reintentos diferidos).
+- Colas con `x-max-priority`: los mensajes de mayor prioridad se
+  entregan primero (la cola de revisión manual).
+- InMemoryPublisher: MessagePublisher con el mismo enrutamiento por
+  shard y el mismo codec que AsyncRabbitMQPublisher.
+- LocalWorker: el bucle de worker.consume (colas por shard, flush y
+  mantenimiento periódicos, drain al detener) contra el broker en memoria.
+
+Los callbacks de consumo corren como tareas del loop, como en aio-pika.
+No hay persistencia ni confirmaciones del broker: `publish` retorna
+cuando el mensaje está encolado.
+"""
+import asyncio
+import itertools
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from src.application.interfaces import MessagePublisher
+from src.config import settings
+from src.infrastructure.admission_control import overflow_queue
+from src.infrastructure.message_codec import (
+    JSON,
+    ManualReviewMessage,
+    TransactionMessage,
+    convert,
+    encode,
+    publishing_codec,
+)
+from src.infrastructure.review_queue import (
+    review_priority,
+    review_priority_queue,
+    review_queue_arguments,
+)
+from src.infrastructure.sharding import shard_queue, transactions_queue
+
+
+Callback = Callable[["InMemoryMessage"], Awaitable[None]]
+
+
+@dataclass
+class OutgoingMessage:
+    """Mensaje a publicar (equivalente a `aio_pika.Message`)"""
+
+    body: bytes
+    headers: Optional[dict] = None
+    content_type: Optional[str] = JSON
+    priority: Optional[int] = None
+
+
+@dataclass
+class _Envelope:
+    body: bytes
+    headers: dict
+    content_type: Optional[str]
+    routing_key: str
+    priority: int = 0
+    redelivered: bool = False
+    expiry: Optional[asyncio.TimerHandle] = None
+
+    def copy(self) -> "_Envelope":
+        """Copia para otra cola (sin estado de entrega)"""
+        return _Envelope(self.body, self.headers, self.content_type, self.routing_key, self.priority)
+
+
+class InMemoryMessage:
+    """Mensaje entregado (interfaz de `aio_pika.IncomingMessage`)"""
+
+    def __init__(self, channel: "InMemoryChannel", queue: "InMemoryQueue", envelope: _Envelope, delivery_tag: int):
+        self.channel = channel
+        self.queue = queue
+        self.envelope = envelope
+        self.delivery_tag = delivery_tag
+        self.processed = False
+        self._redelivered = envelope.redelivered
+
+    @property
+    def body(self) -> bytes:
+        return self.envelope.body
+
+    @property
+    def headers(self) -> dict:
+        return self.envelope.headers
+
+    @property
+    def content_type(self) -> Optional[str]:
+        return self.envelope.content_type
+
+    @property
+    def routing_key(self) -> str:
+        return self.envelope.routing_key
+
+    @property
+    def priority(self) -> int:
+        return self.envelope.priority
+
+    @property
+    def redelivered(self) -> bool:
+        return self._redelivered
+
+    async def ack(self, multiple: bool = False) -> None:
+        self.channel.settle(self.delivery_tag, multiple=multiple, requeue=None)
+
+    async def nack(self, requeue: bool = True, multiple: bool = False) -> None:
+        self.channel.settle(self.delivery_tag, multiple=multiple, requeue=requeue)
+
+    async def reject(self, requeue: bool = False) -> None:
+        self.channel.settle(self.delivery_tag, multiple=False, requeue=requeue)
+
+
+@dataclass
+class _Consumer:
+    tag: str
+    channel: "InMemoryChannel"
+    callback: Callback
+
+
+class InMemoryQueue:
+    """Cola FIFO con consumidores en round robin"""
+
+    def __init__(self, broker: "InMemoryBroker", name: str, arguments: Optional[dict] = None) -> None:
+        self.broker = broker
+        self.name = name
+        self.arguments = dict(arguments or {})
+        self.ready: Deque[_Envelope] = deque()
+        self.consumers: List[_Consumer] = []
+        self._next_consumer = 0
+
+    @property
+    def message_count(self) -> int:
+        return len(self.ready)
+
+    def put(self, envelope: _Envelope, front: bool = False) -> None:
+        max_priority = self.arguments.get("x-max-priority")
+        if max_priority is not None:
+            # Detrás de los de igual o mayor prioridad (delante, si se reencola)
+            priority = min(envelope.priority, max_priority)
+            position = len(self.ready)
+            while position and (
+                self.ready[position - 1].priority < priority
+                or (front and self.ready[position - 1].priority == priority)
+            ):
+                position -= 1
+            self.ready.insert(position, envelope)
+        elif front:
+            self.ready.appendleft(envelope)
+        else:
+            self.ready.append(envelope)
+        ttl = self.arguments.get("x-message-ttl")
+        if ttl is not None and envelope.expiry is None:
+            envelope.expiry = asyncio.get_running_loop().call_later(ttl / 1000, self._expire, envelope)
+        self.broker.schedule(self)
+
+    def _expire(self, envelope: _Envelope) -> None:
+        """Dead-letter del mensaje vencido a su exchange con la routing key original"""
+        try:
+            self.ready.remove(envelope)
+        except ValueError:
+            return
+        exchange = self.arguments.get("x-dead-letter-exchange")
+        if exchange is None:
+            return
+        self.broker.route(
+            exchange,
+            self.arguments.get("x-dead-letter-routing-key", envelope.routing_key),
+            envelope.copy(),
+        )
+
+    async def consume(self, callback: Callback, exclusive: bool = False, channel: "InMemoryChannel" = None) -> str:
+        if exclusive and self.consumers:
+            raise RuntimeError(f"queue {self.name!r} already has a consumer")
+        tag = f"ctag-{next(self.broker.tags)}"
+        self.consumers.append(_Consumer(tag, channel, callback))
+        self.broker.schedule(self)
+        return tag
+
+    async def cancel(self, consumer_tag: str) -> None:
+        self.consumers = [consumer for consumer in self.consumers if consumer.tag != consumer_tag]
+
+    async def bind(self, exchange, routing_key: str = "") -> None:
+        self.broker.bind(exchange.name, self.name)
+
+    def deliver(self) -> None:
+        """Entrega mientras haya mensajes y algún consumidor con cupo de prefetch"""
+        while self.ready and self.consumers:
+            for offset in range(len(self.consumers)):
+                consumer = self.consumers[(self._next_consumer + offset) % len(self.consumers)]
+                if consumer.channel.has_capacity():
+                    break
+            else:
+                return
+            self._next_consumer = (self._next_consumer + offset + 1) % len(self.consumers)
+            envelope = self.ready.popleft()
+            if envelope.expiry is not None:
+                envelope.expiry.cancel()
+                envelope.expiry = None
+            consumer.channel.deliver(self, envelope, consumer.callback)
+
+
+class _BoundQueue:
+    """Cola declarada en un canal: `consume` entrega por ese canal"""
+
+    def __init__(self, queue: InMemoryQueue, channel: "InMemoryChannel") -> None:
+        self._queue = queue
+        self._channel = channel
+
+    async def consume(self, callback: Callback, exclusive: bool = False) -> str:
+        return await self._queue.consume(callback, exclusive=exclusive, channel=self._channel)
+
+    def __getattr__(self, name: str):
+        return getattr(self._queue, name)
+
+
+class InMemoryExchange:
+
+    def __init__(self, broker: "InMemoryBroker", name: str) -> None:
+        self.broker = broker
+        self.name = name
+
+    async def publish(self, message, routing_key: str, timeout: Optional[float] = None) -> None:
+        self.broker.route(
+            self.name,
+            routing_key,
+            _Envelope(
+                message.body,
+                dict(message.headers or {}),
+                message.content_type,
+                routing_key,
+                getattr(message, "priority", None) or 0,
+            ),
+        )
+
+
+class InMemoryChannel:
+    """Canal con prefetch y mensajes sin confirmar propios"""
+
+    def __init__(self, broker: "InMemoryBroker") -> None:
+        self.broker = broker
+        self.prefetch_count = 0  # 0 = sin límite, como en AMQP
+        self.default_exchange = InMemoryExchange(broker, "")
+        self._unacked: "OrderedDict[int, InMemoryMessage]" = OrderedDict()
+        self._tags = itertools.count(1)
+        self._tasks: Set[asyncio.Task] = set()
+        self.closed = False
+
+    @property
+    def unacked(self) -> int:
+        return len(self._unacked)
+
+    async def set_qos(self, prefetch_count: int) -> None:
+        self.prefetch_count = prefetch_count
+        self.broker.schedule_all()
+
+    async def declare_queue(self, name: str, durable: bool = True, arguments: Optional[dict] = None, **_) -> _BoundQueue:
+        return _BoundQueue(self.broker.declare_queue(name, arguments), self)
+
+    async def declare_exchange(self, name: str, type: str = "fanout", durable: bool = True) -> InMemoryExchange:
+        if type != "fanout":
+            raise ValueError("only fanout exchanges are supported")
+        return self.broker.declare_exchange(name)
+
+    def has_capacity(self) -> bool:
+        return not self.closed and (not self.prefetch_count or len(self._unacked) < self.prefetch_count)
+
+    def deliver(self, queue: InMemoryQueue, envelope: _Envelope, callback: Callback) -> None:
+        message = InMemoryMessage(self, queue, envelope, next(self._tags))
+        self._unacked[message.delivery_tag] = message
+        self.broker.delivered_total += 1
+        task = asyncio.get_running_loop().create_task(callback(message))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def settle(self, delivery_tag: int, multiple: bool, requeue: Optional[bool]) -> None:
+        """ack (`requeue` None), nack o reject de uno o de todos hasta `delivery_tag`"""
+        if delivery_tag not in self._unacked:
+            # RabbitMQ cierra el canal con PRECONDITION_FAILED (unknown delivery tag)
+            raise RuntimeError(f"unknown delivery tag {delivery_tag}")
+        tags = [tag for tag in self._unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in tags:
+            message = self._unacked.pop(tag)
+            message.processed = True
+            if requeue is None:
+                self.broker.acked_total += 1
+            elif requeue:
+                self._requeue(message)
+            else:
+                self.broker.dropped_total += 1
+        self.broker.schedule_all()
+
+    def _requeue(self, message: InMemoryMessage) -> None:
+        message.envelope.redelivered = True
+        message.queue.put(message.envelope, front=True)
+        self.broker.redelivered_total += 1
+
+    async def close(self) -> None:
+        """Cierra el canal: los mensajes sin confirmar vuelven a su cola"""
+        self.closed = True
+        for queue in self.broker.queues.values():
+            queue.consumers = [consumer for consumer in queue.consumers if consumer.channel is not self]
+        for message in reversed(list(self._unacked.values())):
+            self._requeue(message)
+        self._unacked.clear()
+
+
+class InMemoryBroker:
+    """Colas, exchanges y entrega de mensajes dentro del proceso"""
+
+    def __init__(self) -> None:
+        self.queues: Dict[str, InMemoryQueue] = {}
+        self.exchanges: Dict[str, InMemoryExchange] = {}
+        self._bindings: Dict[str, Set[str]] = {}
+        self._pending: Set[str] = set()
+        self._scheduled = False
+        self.tags = itertools.count(1)
+        # Contadores para benchmarks/tests
+        self.published_total = 0
+        self.delivered_total = 0
+        self.acked_total = 0
+        self.redelivered_total = 0
+        self.dropped_total = 0
+
+    async def channel(self) -> InMemoryChannel:
+        return InMemoryChannel(self)
+
+    def declare_queue(self, name: str, arguments: Optional[dict] = None) -> InMemoryQueue:
+        queue = self.queues.get(name)
+        if queue is None:
+            queue = self.queues[name] = InMemoryQueue(self, name, arguments)
+        return queue
+
+    def declare_exchange(self, name: str) -> InMemoryExchange:
+        exchange = self.exchanges.get(name)
+        if exchange is None:
+            exchange = self.exchanges[name] = InMemoryExchange(self, name)
+        return exchange
+
+    def bind(self, exchange: str, queue: str) -> None:
+        self._bindings.setdefault(exchange, set()).add(queue)
+
+    def route(self, exchange: str, routing_key: str, envelope: _Envelope) -> None:
+        """Exchange por defecto: la cola `routing_key`; fanout: todas las enlazadas"""
+        names = [routing_key] if exchange == "" else sorted(self._bindings.get(exchange, ()))
+        for name in names:
+            queue = self.queues.get(name)
+            if queue is None:
+                # RabbitMQ descarta en silencio lo que no tiene cola (sin `mandatory`)
+                self.dropped_total += 1
+                continue
+            self.published_total += 1
+            queue.put(envelope.copy())
+
+    def schedule(self, queue: InMemoryQueue) -> None:
+        """Programa la entrega de la cola en el siguiente ciclo del loop"""
+        self._pending.add(queue.name)
+        if not self._scheduled:
+            self._scheduled = True
+            asyncio.get_running_loop().call_soon(self._deliver)
+
+    def schedule_all(self) -> None:
+        for queue in self.queues.values():
+            if queue.ready:
+                self.schedule(queue)
+
+    def _deliver(self) -> None:
+        self._scheduled = False
+        pending, self._pending = self._pending, set()
+        for name in sorted(pending):
+            self.queues[name].deliver()
+
+    def depth(self, names: Optional[List[str]] = None) -> int:
+        """Mensajes listos en las colas indicadas (todas por defecto)"""
+        queues = self.queues.values() if names is None else (self.queues[name] for name in names if name in self.queues)
+        return sum(queue.message_count for queue in queues)
+
+
+# ---------------------------------------------------------------------------
+# Publisher y worker locales
+# ---------------------------------------------------------------------------
+
+
+class InMemoryPublisher(MessagePublisher):
+    """
+    MessagePublisher sobre InMemoryBroker (mismo enrutamiento y codec que
+    AsyncRabbitMQPublisher)
+
+    Args:
+        broker: Broker del proceso
+        codec: Codec de los mensajes (por defecto `rabbitmq_message_codec`)
+    """
+
+    def __init__(self, broker: InMemoryBroker, codec=None) -> None:
+        self.broker = broker
+        self.codec = codec or publishing_codec(settings.rabbitmq_message_codec)
+        self._channel: Optional[InMemoryChannel] = None
+
+    async def publish_transaction_for_processing(self, transaction_data: dict) -> None:
+        routing_key = transactions_queue(
+            settings.rabbitmq_transactions_queue,
+            transaction_data.get("user_id", ""),
+            settings.rabbitmq_shard_count,
+        )
+        await self.publish(routing_key, convert(transaction_data, TransactionMessage))
+
+    async def publish_to_overflow(self, transaction_data: dict) -> None:
+        await self.publish(
+            overflow_queue(settings.rabbitmq_transactions_queue), convert(transaction_data, TransactionMessage)
+        )
+
+    async def publish_for_manual_review(self, evaluation_data: dict) -> None:
+        message = convert(evaluation_data, ManualReviewMessage)
+        await self.publish(
+            review_priority_queue(settings.rabbitmq_manual_review_queue),
+            message,
+            priority=review_priority(message.risk_level, message.amount),
+        )
+
+    async def publish(self, routing_key: str, message, priority: Optional[int] = None) -> None:
+        if self._channel is None:
+            self._channel = await self.broker.channel()
+            declare_queues(self.broker)
+        body, content_type, headers = encode(message, self.codec)
+        await self._channel.default_exchange.publish(
+            OutgoingMessage(body, headers, content_type, priority), routing_key=routing_key
+        )
+
+    async def aclose(self) -> None:
+        self._channel = None
+
+
+def declare_queues(broker: InMemoryBroker) -> None:
+    """Las colas que declaran los publishers de RabbitMQ"""
+    base = settings.rabbitmq_transactions_queue
+    for name in [base, overflow_queue(base)]:
+        broker.declare_queue(name)
+    broker.declare_queue(review_priority_queue(settings.rabbitmq_manual_review_queue), review_queue_arguments())
+    for shard in range(settings.rabbitmq_shard_count):
+        broker.declare_queue(shard_queue(base, shard))
+
+
+class LocalWorker:
+    """
+    Bucle del worker contra el broker en memoria
+
+    Mismo recorrido que `worker.consume`: prefetch del canal, un consumidor
+    por shard (y la cola base), flush y mantenimiento periódicos y, al
+    detenerse, drain de lo pendiente antes de cerrar el canal.
+
+    Args:
+        broker: Broker del proceso
+        consumer: EvaluationConsumer o MicroBatchConsumer
+        prefetch_count: Mensajes sin confirmar del canal
+        shards: Shards a consumir (None = todos los de la configuración)
+        maintenance_seconds: Intervalo de `engine.maintain`
+    """
+
+    def __init__(
+        self,
+        broker: InMemoryBroker,
+        consumer,
+        prefetch_count: int = 100,
+        shards: Optional[List[int]] = None,
+        maintenance_seconds: float = 10.0,
+    ) -> None:
+        self.broker = broker
+        self.consumer = consumer
+        self.prefetch_count = prefetch_count
+        self.shards = shards
+        self.maintenance_seconds = maintenance_seconds
+        self.channel: Optional[InMemoryChannel] = None
+        self._consumers: List = []
+        self._background: List[asyncio.Task] = []
+
+    def queue_names(self) -> List[str]:
+        base = settings.rabbitmq_transactions_queue
+        shards = self.shards
+        if shards is None:
+            shards = list(range(settings.rabbitmq_shard_count))
+        return [shard_queue(base, shard) for shard in shards] + [base]
+
+    async def start(self) -> None:
+        declare_queues(self.broker)
+        self.channel = await self.broker.channel()
+        await self.channel.set_qos(prefetch_count=self.prefetch_count)
+        self._background = [
+            asyncio.create_task(self.consumer.flush_periodically()),
+            asyncio.create_task(self.consumer.maintain_periodically(self.maintenance_seconds)),
+        ]
+        for name in self.queue_names():
+            queue = await self.channel.declare_queue(name, durable=True)
+            self._consumers.append((queue, await queue.consume(self.consumer.dispatch)))
+
+    async def wait_idle(self, poll_interval: float = 0.001) -> None:
+        """Espera a que las colas del worker estén vacías y todo confirmado"""
+        names = self.queue_names()
+        while self.broker.depth(names) or self.channel.unacked:
+            await asyncio.sleep(poll_interval)
+
+    async def stop(self) -> None:
+        for queue, consumer_tag in self._consumers:
+            await queue.cancel(consumer_tag)
+        self._consumers = []
+        await self.consumer.drain()
+        for task in self._background:
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        self._background = []
+        if self.channel is not None:
+            await self.channel.close()
@@ -0,0 +1,264 @@
+"""
+Message Codec - Formato de los mensajes de las colas con versión de esquema
+
+Antes los mensajes de `transactions` y `manual_review` eran texto JSON
+(`json.dumps`) y el worker los leía con `json.loads` a un dict sin validar:
+un campo faltante o con otro tipo se descubría dentro del caso de uso.
+
+Ahora cada mensaje tiene un esquema tipado (dataclasses de este módulo) y
+un codec elegido por `content_type`:
+
+- `application/x-msgpack` (por defecto): MessagePack con `msgspec`, que
+  decodifica directo al esquema validando tipos en una sola pasada.
+- `application/json`: el formato anterior. Se sigue leyendo durante la
+  migración (mensajes encolados antes del cambio, publishers viejos) y es
+  el que se usa si `msgspec` no está instalado.
+
+El header `x-schema-version` lleva la versión del esquema. Un mensaje sin
+header es v1 (JSON anterior). Los campos nuevos se agregan con valor por
+defecto y los desconocidos se ignoran, así que un consumidor acepta las
+versiones <= la suya; una versión mayor se rechaza como inválida (termina
+en el parking y se reinyecta después de actualizar el worker).
+
+Orden de despliegue: primero los workers (leen ambos formatos), después
+los publishers con `rabbitmq_message_codec = "msgpack"`.
+"""
+import json
+from dataclasses import MISSING, asdict, dataclass, field, fields, is_dataclass
+from typing import (
+    ClassVar, Dict, List, Mapping, NamedTuple, Optional, Type, TypeVar, Union,
+    get_args, get_origin, get_type_hints,
+)
+
+try:  # pragma: no cover - depende del entorno
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+SCHEMA_VERSION_HEADER = "x-schema-version"
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+
+
+class MessageDecodeError(ValueError):
+    """Mensaje ilegible o que no cumple su esquema (no se reintenta)"""
+
+
+# ---------------------------------------------------------------------------
+# Esquemas
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class LocationPayload:
+    latitude: float
+    longitude: float
+
+
+@dataclass
+class TransactionMessage:
+    """Transacción a evaluar (cola `transactions` y sus shards)"""
+
+    SCHEMA_VERSION: ClassVar[int] = 1
+
+    id: str
+    amount: float
+    user_id: str
+    location: LocationPayload
+    timestamp: Optional[str] = None
+    device_id: Optional[str] = None
+    transaction_type: Optional[str] = None
+    description: Optional[str] = None
+
+
+@dataclass
+class ManualReviewMessage:
+    """Evaluación enviada a revisión manual (HU-010)"""
+
+    SCHEMA_VERSION: ClassVar[int] = 1
+
+    transaction_id: str
+    risk_level: str
+    amount: float
+    user_id: str
+    reasons: List[str] = field(default_factory=list)
+
+
+Schema = TypeVar("Schema")
+
+
+def to_dict(message) -> dict:
+    """Dict del mensaje (el caso de uso recibe dicts, ver MessagePublisher)"""
+    return asdict(message)
+
+
+def convert(data: Mapping, schema: Type[Schema]) -> Schema:
+    """Valida un dict contra el esquema y construye el mensaje tipado"""
+    if msgspec is not None:
+        try:
+            return msgspec.convert(data, type=schema)
+        except msgspec.ValidationError as e:
+            raise MessageDecodeError(str(e)) from e
+    return _convert(schema, data, "$")
+
+
+def _convert(expected, value, path: str):
+    """Validación equivalente a msgspec.convert para los tipos de los esquemas"""
+    origin = get_origin(expected)
+    if origin is Union:
+        options = get_args(expected)
+        if value is None and type(None) in options:
+            return None
+        expected = next(option for option in options if option is not type(None))
+        origin = get_origin(expected)
+    if is_dataclass(expected):
+        if not isinstance(value, Mapping):
+            raise MessageDecodeError(f"Expected `object`, got `{type(value).__name__}` - at `{path}`")
+        hints = get_type_hints(expected)
+        values = {}
+        for item in fields(expected):
+            if item.name in value:
+                values[item.name] = _convert(hints[item.name], value[item.name], f"{path}.{item.name}")
+            elif item.default is MISSING and item.default_factory is MISSING:
+                raise MessageDecodeError(f"Object missing required field `{item.name}` - at `{path}`")
+        return expected(**values)
+    if origin is list:
+        if not isinstance(value, list):
+            raise MessageDecodeError(f"Expected `array`, got `{type(value).__name__}` - at `{path}`")
+        (item_type,) = get_args(expected)
+        return [_convert(item_type, item, f"{path}[{i}]") for i, item in enumerate(value)]
+    if expected is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if isinstance(value, expected) and not (expected is not bool and isinstance(value, bool)):
+        return value
+    raise MessageDecodeError(f"Expected `{expected.__name__}`, got `{type(value).__name__}` - at `{path}`")
+
+
+# ---------------------------------------------------------------------------
+# Codecs
+# ---------------------------------------------------------------------------
+
+
+class JsonCodec:
+    """JSON (formato anterior); decodifica al esquema con msgspec si está"""
+
+    content_type = JSON
+
+    def encode(self, message) -> bytes:
+        if msgspec is not None:
+            return msgspec.json.encode(message)
+        return json.dumps(to_dict(message)).encode()
+
+    def decode(self, body: bytes, schema: Type[Schema]) -> Schema:
+        if msgspec is not None:
+            try:
+                return msgspec.json.decode(body, type=schema)
+            except msgspec.DecodeError as e:
+                raise MessageDecodeError(str(e)) from e
+        try:
+            data = json.loads(body)
+        except (json.JSONDecodeError, UnicodeDecodeError) as e:
+            raise MessageDecodeError(str(e)) from e
+        return _convert(schema, data, "$")
+
+
+class MsgpackCodec:
+    """MessagePack con msgspec: más compacto y decodifica directo al esquema"""
+
+    content_type = MSGPACK
+
+    def __init__(self) -> None:
+        if msgspec is None:
+            raise RuntimeError("msgspec is required for the msgpack codec")
+        self._encoder = msgspec.msgpack.Encoder()
+        self._decoders: Dict[type, object] = {}
+
+    def encode(self, message) -> bytes:
+        return self._encoder.encode(message)
+
+    def decode(self, body: bytes, schema: Type[Schema]) -> Schema:
+        decoder = self._decoders.get(schema)
+        if decoder is None:
+            decoder = self._decoders[schema] = msgspec.msgpack.Decoder(type=schema)
+        try:
+            return decoder.decode(body)
+        except msgspec.DecodeError as e:
+            raise MessageDecodeError(str(e)) from e
+
+
+_CODECS: Dict[str, object] = {JSON: JsonCodec()}
+if msgspec is not None:
+    _CODECS[MSGPACK] = MsgpackCodec()
+
+
+def get_codec(content_type: Optional[str]):
+    """Codec del `content_type` (sin content_type = JSON anterior)"""
+    codec = _CODECS.get(content_type or JSON)
+    if codec is None:
+        raise MessageDecodeError(f"Unsupported content type {content_type!r}")
+    return codec
+
+
+def publishing_codec(name: str):
+    """Codec para publicar (`rabbitmq_message_codec`); JSON si falta msgspec"""
+    if name == "msgpack" and MSGPACK in _CODECS:
+        return _CODECS[MSGPACK]
+    return _CODECS[JSON]
+
+
+# ---------------------------------------------------------------------------
+# Codificación y decodificación de mensajes
+# ---------------------------------------------------------------------------
+
+
+class EncodedMessage(NamedTuple):
+    body: bytes
+    content_type: str
+    headers: Dict[str, int]
+
+
+def encode(message, codec) -> EncodedMessage:
+    """Cuerpo, content_type y header de versión del mensaje"""
+    return EncodedMessage(
+        codec.encode(message),
+        codec.content_type,
+        {SCHEMA_VERSION_HEADER: type(message).SCHEMA_VERSION},
+    )
+
+
+def decode(body: bytes, content_type: Optional[str], headers: Optional[Mapping], schema: Type[Schema]) -> Schema:
+    """
+    Decodifica y valida un mensaje
+
+    Raises:
+        MessageDecodeError: Cuerpo ilegible, esquema inválido, content_type
+            o versión no soportados
+    """
+    version = (headers or {}).get(SCHEMA_VERSION_HEADER, 1)
+    if not isinstance(version, int) or version > schema.SCHEMA_VERSION:
+        raise MessageDecodeError(
+            f"Unsupported {schema.__name__} schema version {version!r} (max {schema.SCHEMA_VERSION})"
+        )
+    return get_codec(content_type).decode(body, schema)
+
+
+def decode_transaction(message) -> dict:
+    """Transacción validada de un mensaje entrante (`aio_pika.IncomingMessage`)"""
+    transaction = decode(
+        message.body,
+        getattr(message, "content_type", None),
+        getattr(message, "headers", None),
+        TransactionMessage,
+    )
+    return to_dict(transaction)
+
+
+def decode_review(message) -> ManualReviewMessage:
+    """Evaluación validada de un mensaje de revisión manual"""
+    return decode(
+        message.body,
+        getattr(message, "content_type", None),
+        getattr(message, "headers", None),
+        ManualReviewMessage,
+    )
@@ -0,0 +1,251 @@
+"""
+Metrics - Exposición en formato de texto de Prometheus
+
+Sin dependencia de `prometheus_client`: el formato de texto es simple y
+solo se publican contadores, gauges e histogramas del proceso.
+
+La API lo sirve en GET /metrics; el worker, que no tiene servidor HTTP,
+en un puerto lateral con `serve_metrics` (asyncio puro, sin framework).
+"""
+import asyncio
+import math
+from dataclasses import asdict
+from typing import Dict, Iterable, List, Tuple
+
+from src.infrastructure.admission_control import AdmissionController, all_admission_controllers
+from src.infrastructure.async_publisher import AsyncRabbitMQPublisher, all_publishers
+from src.infrastructure.circuit_breaker import STATE_VALUES, CircuitBreaker, all_breakers
+from src.infrastructure.hedged_reads import HedgePolicy, all_hedge_policies
+from src.infrastructure.worker_metrics import LatencyHistogram, WorkerStats, all_worker_stats
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Sample = Tuple[Dict[str, str], float]
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def render_metric(name: str, metric_type: str, help_text: str, samples: Iterable[Sample]) -> List[str]:
+    """Líneas HELP/TYPE y una línea por muestra"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} {metric_type}"]
+    for labels, value in samples:
+        lines.append(f"{name}{_labels(labels)} {value:g}")
+    return lines
+
+
+def render_histogram(
+    name: str, help_text: str, histograms: Iterable[Tuple[Dict[str, str], LatencyHistogram]]
+) -> List[str]:
+    """Líneas HELP/TYPE y las series _bucket, _sum y _count de cada histograma"""
+    lines = [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+    for labels, histogram in histograms:
+        for bound, count in histogram.cumulative():
+            lines.append(f"{name}_bucket{_labels({**labels, 'le': bound})} {count:g}")
+        lines.append(f"{name}_sum{_labels(labels)} {histogram.sum:g}")
+        lines.append(f"{name}_count{_labels(labels)} {histogram.count:g}")
+    return lines
+
+
+def breaker_metrics(breakers: Dict[str, CircuitBreaker]) -> List[str]:
+    """Estado y contadores de los circuit breakers"""
+    items = sorted(breakers.items())
+    lines: List[str] = []
+    lines += render_metric(
+        "fraud_circuit_breaker_state", "gauge",
+        "Circuit breaker state (0=closed, 1=half_open, 2=open)",
+        (({"name": name}, STATE_VALUES[breaker.state]) for name, breaker in items),
+    )
+    for attribute, help_text in (
+        ("calls_total", "Calls allowed through the breaker"),
+        ("failures_total", "Calls that failed with an availability error or timeout"),
+        ("rejected_total", "Calls rejected while the breaker was open"),
+        ("opened_total", "Times the breaker transitioned to open"),
+    ):
+        lines += render_metric(
+            f"fraud_circuit_breaker_{attribute}", "counter", help_text,
+            (({"name": name}, getattr(breaker, attribute)) for name, breaker in items),
+        )
+    return lines
+
+
+def hedge_metrics(policies: Dict[str, HedgePolicy]) -> List[str]:
+    """Delay actual y contadores de las lecturas con hedging"""
+    items = sorted(policies.items())
+    lines: List[str] = []
+    lines += render_metric(
+        "fraud_hedge_delay_seconds", "gauge",
+        "Current delay before a read is duplicated to the replica",
+        (({"name": name}, policy.delay()) for name, policy in items),
+    )
+    for attribute, help_text in (
+        ("reads_total", "Reads issued through the hedging proxy"),
+        ("hedged_total", "Reads duplicated to the replica"),
+        ("replica_wins_total", "Hedged reads answered first by the replica"),
+    ):
+        lines += render_metric(
+            f"fraud_hedge_{attribute}", "counter", help_text,
+            (({"name": name}, getattr(policy, attribute)) for name, policy in items),
+        )
+    return lines
+
+
+def publisher_metrics(publishers: Dict[str, AsyncRabbitMQPublisher]) -> List[str]:
+    """Contadores de los publishers con confirmaciones"""
+    items = sorted(publishers.items())
+    lines: List[str] = []
+    for attribute, help_text in (
+        ("published_total", "Messages handed to the publisher"),
+        ("confirmed_total", "Messages confirmed by the broker"),
+        ("failed_total", "Messages nacked, timed out or not sent"),
+        ("batches_total", "Pipelined publish batches sent"),
+    ):
+        lines += render_metric(
+            f"fraud_publisher_{attribute}", "counter", help_text,
+            (({"name": name}, getattr(publisher, attribute)) for name, publisher in items),
+        )
+    return lines
+
+
+def admission_metrics(controllers: Dict[str, AdmissionController]) -> List[str]:
+    """Watermarks, última muestra del backlog y decisiones del control de admisión"""
+    items = sorted(controllers.items())
+    sampled = [(name, controller.last_sample) for name, controller in items if controller.last_sample]
+    lines: List[str] = []
+    lines += render_metric(
+        "fraud_admission_watermark", "gauge",
+        "Admission watermark (depth in evaluations, lag in seconds)",
+        (
+            ({"name": name, "watermark": watermark}, value)
+            for name, controller in items
+            for watermark, value in asdict(controller.watermarks).items()
+        ),
+    )
+    lines += render_metric(
+        "fraud_admission_backlog", "gauge",
+        "Inline evaluations in flight at the last sample",
+        (({"name": name}, sample.depth) for name, sample in sampled),
+    )
+    lines += render_metric(
+        "fraud_admission_lag_seconds", "gauge",
+        "Estimated seconds to drain the backlog at the current completion rate",
+        (({"name": name}, sample.lag_seconds) for name, sample in sampled if not math.isinf(sample.lag_seconds)),
+    )
+    for attribute, help_text in (
+        ("admitted_total", "Requests admitted"),
+        ("deferred_total", "Low-priority requests deferred to the overflow queue"),
+        ("rejected_total", "Requests rejected with 429"),
+        ("sample_errors_total", "Backlog samples that failed (traffic admitted)"),
+    ):
+        lines += render_metric(
+            f"fraud_admission_{attribute}", "counter", help_text,
+            (({"name": name}, getattr(controller, attribute)) for name, controller in items),
+        )
+    return lines
+
+
+def worker_metrics(workers: Dict[str, WorkerStats]) -> List[str]:
+    """Backlog, throughput, mensajes en vuelo, resultados y latencias del worker"""
+    items = sorted(workers.items())
+    sampled = [(name, stats.last_sample) for name, stats in items if stats.last_sample]
+    lines: List[str] = []
+    lines += render_metric(
+        "fraud_worker_queue_depth", "gauge",
+        "Messages waiting in the transactions queues at the last sample",
+        (({"name": name}, sample.depth) for name, sample in sampled),
+    )
+    lines += render_metric(
+        "fraud_worker_consumer_lag_seconds", "gauge",
+        "Estimated seconds to drain the backlog at the current ack rate",
+        (({"name": name}, sample.lag_seconds) for name, sample in sampled if not math.isinf(sample.lag_seconds)),
+    )
+    lines += render_metric(
+        "fraud_worker_queue_ack_rate", "gauge",
+        "Messages acked per second by all consumers at the last sample",
+        (({"name": name}, sample.ack_rate) for name, sample in sampled),
+    )
+    lines += render_metric(
+        "fraud_worker_messages_per_second", "gauge",
+        "Messages settled per second by this process (moving window)",
+        (({"name": name}, stats.messages_per_second()) for name, stats in items),
+    )
+    lines += render_metric(
+        "fraud_worker_in_flight", "gauge",
+        "Messages delivered to this process and not yet settled",
+        (({"name": name}, stats.in_flight) for name, stats in items),
+    )
+    lines += render_metric(
+        "fraud_worker_messages_total", "counter",
+        "Messages settled by outcome",
+        (
+            ({"name": name, "outcome": outcome}, count)
+            for name, stats in items
+            for outcome, count in sorted(stats.outcomes.items())
+        ),
+    )
+    lines += render_metric(
+        "fraud_worker_sample_errors_total", "counter",
+        "Backlog samples that failed",
+        (({"name": name}, stats.sample_errors_total) for name, stats in items),
+    )
+    lines += render_histogram(
+        "fraud_worker_evaluation_seconds",
+        "Time spent evaluating a transaction (a micro-batch counts once per message)",
+        (({"name": name}, stats.evaluation_latency) for name, stats in items),
+    )
+    lines += render_histogram(
+        "fraud_worker_processing_seconds",
+        "Time from delivery to the ack/nack decision, including the batched write",
+        (({"name": name}, stats.processing_latency) for name, stats in items),
+    )
+    return lines
+
+
+def render_metrics() -> str:
+    """Cuerpo de /metrics"""
+    lines = (
+        breaker_metrics(all_breakers())
+        + hedge_metrics(all_hedge_policies())
+        + publisher_metrics(all_publishers())
+        + admission_metrics(all_admission_controllers())
+        + worker_metrics(all_worker_stats())
+    )
+    return "\n".join(lines) + "\n"
+
+
+async def _handle_http(reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+    """GET /metrics y GET /healthz; cualquier otra ruta es 404"""
+    try:
+        request = await asyncio.wait_for(reader.readline(), timeout=5.0)
+        while (await asyncio.wait_for(reader.readline(), timeout=5.0)).strip():
+            pass  # Headers: no se usan
+        parts = request.decode("latin-1").split()
+        path = parts[1].split("?")[0] if len(parts) > 1 else ""
+        if path == "/metrics":
+            status, content_type, body = "200 OK", CONTENT_TYPE, render_metrics().encode()
+        elif path == "/healthz":
+            status, content_type, body = "200 OK", "text/plain; charset=utf-8", b"ok\n"
+        else:
+            status, content_type, body = "404 Not Found", "text/plain; charset=utf-8", b"not found\n"
+        writer.write(
+            f"HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode() + body
+        )
+        await writer.drain()
+    except Exception as e:
+        print(f"Metrics request failed: {e}")
+    finally:
+        writer.close()
+
+
+async def serve_metrics(port: int, host: str = "0.0.0.0") -> asyncio.AbstractServer:
+    """Servidor de /metrics en un puerto lateral (procesos sin servidor HTTP)"""
+    return await asyncio.start_server(_handle_http, host, port)
@@ -0,0 +1,72 @@
+"""
+Redis Keys - Esquema central de claves de Redis
+
+Todas las claves por usuario llevan el id entre llaves (hash tag), así que
+en Redis Cluster caen en el mismo slot y se pueden leer/escribir juntas en
+un pipeline o un script:
+
+    user:{user_id}:geo        -> set GEO con la última ubicación
+    user:{user_id}:devices    -> set de device_id conocidos (90 días)
+    user:{user_id}:rapid_tx   -> sorted set de transacciones recientes
+
+Las claves anteriores (`user:{id}:location`, `user:{id}:geo` sin llaves,
+`user_devices:{id}`, `rapid_tx:{id}`) se siguen leyendo durante la
+migración (`redis_legacy_key_reads`); ninguna se vuelve a escribir y todas
+expiran solas (la más larga, la de dispositivos, a los 90 días).
+
+El cliente de cluster de redis-py no soporta MULTI: `pipeline()` pide una
+transacción solo cuando el cliente no es de cluster. Las escrituras que
+deben ser atómicas (la ventana de `rapid_tx` y el hash `rule_config`) no
+dependen de MULTI: van en un script Lua sobre una sola clave, que EVAL
+ejecuta atómicamente también en cluster.
+"""
+from redis.asyncio.cluster import RedisCluster
+
+
+# Configuración global de reglas (una sola clave, ver rule_config_store.py)
+RULE_CONFIG_KEY = "rule_config"
+
+
+def user_tag(user_id: str) -> str:
+    """Hash tag del usuario: todas sus claves comparten slot"""
+    return f"{{{user_id}}}"
+
+
+def user_geo_key(user_id: str) -> str:
+    return f"user:{user_tag(user_id)}:geo"
+
+
+def user_devices_key(user_id: str) -> str:
+    return f"user:{user_tag(user_id)}:devices"
+
+
+def rapid_tx_key(user_id: str) -> str:
+    return f"user:{user_tag(user_id)}:rapid_tx"
+
+
+# Esquema anterior (solo lectura durante la migración)
+
+def legacy_location_key(user_id: str) -> str:
+    return f"user:{user_id}:location"
+
+
+def legacy_geo_key(user_id: str) -> str:
+    return f"user:{user_id}:geo"
+
+
+def legacy_devices_key(user_id: str) -> str:
+    return f"user_devices:{user_id}"
+
+
+def legacy_rapid_tx_key(user_id: str) -> str:
+    return f"rapid_tx:{user_id}"
+
+
+def is_cluster(redis) -> bool:
+    # GuardedRedis expone el cliente original en `wrapped`
+    return isinstance(getattr(redis, "wrapped", redis), RedisCluster)
+
+
+def pipeline(redis, transaction: bool = True):
+    """Pipeline del cliente; MULTI/EXEC solo fuera de Redis Cluster"""
+    return redis.pipeline(transaction=transaction and not is_cluster(redis))
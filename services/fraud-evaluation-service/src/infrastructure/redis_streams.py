@@ -0,0 +1,547 @@
+"""
+Redis Streams - Transporte alternativo a RabbitMQ
+
+Redis ya está en el camino de cada evaluación; con
+`message_transport = "redis_streams"` también transporta los mensajes y
+RabbitMQ deja de ser necesario para la API y el worker:
+
+- Cada cola es un stream con el mismo nombre (`transactions.shard.N`,
+  `transactions.overflow`, `manual_review`): mismo enrutamiento por shard
+  y mismo codec que AsyncRabbitMQPublisher (ver message_codec.py).
+- RedisStreamsPublisher: XADD sin recorte. Un `MAXLEN` borraría las
+  entradas más viejas aunque nadie las hubiera entregado ni confirmado;
+  el stream se recorta desde el lado del consumidor (ver `trim`).
+- RedisStreamReader: un consumer group por stream y un XREADGROUP con
+  COUNT para todos los streams del proceso. Entrega a los consumidores
+  existentes (EvaluationConsumer, MicroBatchConsumer, ReviewQueueConsumer)
+  objetos StreamMessage con la interfaz de `aio_pika.IncomingMessage`:
+    - `ack()` hace XACK; `ack(multiple=True)` confirma todo lo entregado
+      por el reader hasta ese delivery tag, como en un canal AMQP;
+    - `nack(requeue=True)` deja la entrada pendiente: después de
+      `claim_idle_ms` sin confirmar la recupera XAUTOCLAIM (reintento
+      diferido sin colas de espera);
+    - `nack(requeue=False)` y las entradas entregadas más de
+      `max_deliveries` veces van al stream de parking con el motivo.
+  `prefetch_count` limita las entregas sin confirmar, como `basic.qos`.
+- Cada barrida de XAUTOCLAIM recorta los streams del reader con
+  `XTRIM MINID ~` en la entrada más vieja que el consumer group todavía
+  necesita (la primera pendiente o, sin pendientes, la última entregada):
+  nunca se borra una entrada sin entregar o sin confirmar.
+- XAUTOCLAIM también recupera lo que dejó pendiente un proceso que murió.
+  El nombre del consumidor es estable por host y posición del proceso
+  en el supervisor: al reiniciarse, el proceso relee primero sus propias
+  entradas pendientes.
+
+La revisión manual pierde la prioridad AMQP (los streams no la tienen);
+el orden de atención de los analistas sale igual del índice de
+`review_queue`. Sin un Redis Cluster: XREADGROUP de varios streams exige
+que estén en el mismo nodo (`redis_streams_url` puede apuntar a un Redis
+aparte).
+
+RedisStreamsSampler mide el backlog de los streams (XINFO GROUPS) para las
+métricas del worker y el autoscaler, como RabbitMQManagementSampler con
+las colas de RabbitMQ.
+"""
+import asyncio
+import itertools
+import json
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Sequence, Tuple
+
+import redis.asyncio as redis_async
+from redis.exceptions import ResponseError
+
+from src.application.interfaces import MessagePublisher
+from src.config import settings
+from src.infrastructure.admission_control import QueueSample, overflow_queue
+from src.infrastructure.message_codec import (
+    JSON,
+    ManualReviewMessage,
+    TransactionMessage,
+    convert,
+    encode,
+    publishing_codec,
+)
+from src.infrastructure.retry_topology import ORIGIN_HEADER, PARKED_AT_HEADER, REASON_HEADER
+from src.infrastructure.sharding import shard_queue, transactions_queue
+
+
+REDIS_STREAMS = "redis_streams"
+
+
+def stream_fields(body: bytes, content_type: str, headers: Optional[dict]) -> Dict[str, bytes]:
+    """Campos de la entrada: cuerpo, content_type y headers en JSON"""
+    fields = {"body": body, "content_type": content_type.encode()}
+    if headers:
+        fields["headers"] = json.dumps(headers).encode()
+    return fields
+
+
+def parse_fields(fields: dict) -> Tuple[bytes, str, dict]:
+    """Cuerpo, content_type y headers de los campos leídos del stream"""
+    content_type = fields.get(b"content_type")
+    headers = fields.get(b"headers")
+    return (
+        fields.get(b"body", b""),
+        content_type.decode() if content_type else JSON,
+        json.loads(headers) if headers else {},
+    )
+
+
+def transaction_streams(shards: Optional[Sequence[int]]) -> List[str]:
+    """Streams de transacciones de un proceso (todos si `shards` es None)"""
+    base = settings.rabbitmq_transactions_queue
+    if not settings.rabbitmq_shard_count:
+        return [base]
+    if shards is None:
+        shards = range(settings.rabbitmq_shard_count)
+    return [shard_queue(base, shard) for shard in shards]
+
+
+def stream_id(message_id) -> Tuple[int, int]:
+    """ID de una entrada (`b"1700000000000-3"`) como tupla comparable"""
+    if isinstance(message_id, bytes):
+        message_id = message_id.decode()
+    milliseconds, _, sequence = str(message_id).partition("-")
+    return int(milliseconds), int(sequence or 0)
+
+
+def _decoded(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+def streams_client(url: str):
+    """Cliente binario (sin decode_responses: los cuerpos msgpack son bytes)"""
+    return redis_async.from_url(url)
+
+
+class RedisStreamsPublisher(MessagePublisher):
+    """
+    MessagePublisher sobre Redis Streams
+
+    XADD responde cuando la entrada quedó en el stream (sin lotes ni
+    confirmaciones aparte: el pool de conexiones del cliente reparte las
+    publicaciones concurrentes).
+
+    Args:
+        url: URL de Redis
+        codec: Codec de los mensajes (por defecto `rabbitmq_message_codec`)
+        client: Cliente de redis.asyncio (inyectable en tests)
+    """
+
+    def __init__(self, url: str, codec=None, client=None) -> None:
+        self.url = url
+        self.codec = codec or publishing_codec(settings.rabbitmq_message_codec)
+        self._client = client
+        # Contadores para logs/tests
+        self.published_total = 0
+        self.failed_total = 0
+
+    @property
+    def redis(self):
+        if self._client is None:
+            self._client = streams_client(self.url)
+        return self._client
+
+    async def publish_transaction_for_processing(self, transaction_data: dict) -> None:
+        stream = transactions_queue(
+            settings.rabbitmq_transactions_queue,
+            transaction_data.get("user_id", ""),
+            settings.rabbitmq_shard_count,
+        )
+        await self.publish(stream, convert(transaction_data, TransactionMessage))
+
+    async def publish_to_overflow(self, transaction_data: dict) -> None:
+        await self.publish(
+            overflow_queue(settings.rabbitmq_transactions_queue), convert(transaction_data, TransactionMessage)
+        )
+
+    async def publish_for_manual_review(self, evaluation_data: dict) -> None:
+        await self.publish(settings.rabbitmq_manual_review_queue, convert(evaluation_data, ManualReviewMessage))
+
+    async def publish(self, stream: str, message) -> None:
+        body, content_type, headers = encode(message, self.codec)
+        try:
+            await self.redis.xadd(stream, stream_fields(body, content_type, headers))
+        except Exception:
+            self.failed_total += 1
+            raise
+        self.published_total += 1
+
+    async def aclose(self) -> None:
+        client, self._client = self._client, None
+        if client is not None:
+            await client.aclose()
+
+
+class StreamMessage:
+    """Entrada entregada por RedisStreamReader (interfaz de `aio_pika.IncomingMessage`)"""
+
+    def __init__(self, reader: "RedisStreamReader", stream: str, message_id, fields: dict, delivery_tag: int,
+                 redelivered: bool = False) -> None:
+        self._reader = reader
+        self.routing_key = stream
+        self.message_id = message_id
+        self.delivery_tag = delivery_tag
+        self.redelivered = redelivered
+        self.body, self.content_type, self.headers = parse_fields(fields)
+
+    async def ack(self, multiple: bool = False) -> None:
+        await self._reader.ack(self, multiple)
+
+    async def nack(self, requeue: bool = True, multiple: bool = False) -> None:
+        await self._reader.nack(self, requeue, multiple)
+
+    async def reject(self, requeue: bool = False) -> None:
+        await self._reader.nack(self, requeue, False)
+
+
+Callback = Callable[[StreamMessage], Awaitable[None]]
+
+
+class RedisStreamReader:
+    """
+    Consumidor de un consumer group sobre uno o más streams
+
+    Args:
+        redis: Cliente de redis.asyncio binario (`streams_client`)
+        streams: Streams a consumir
+        group: Consumer group (compartido por todos los procesos)
+        consumer: Nombre del consumidor (estable entre reinicios del proceso)
+        callback: Corrutina que recibe cada StreamMessage
+        parking: Stream de los mensajes rechazados o agotados
+        prefetch_count: Entregas sin confirmar como máximo
+        read_count: COUNT de cada XREADGROUP (repartido entre los streams)
+        block_ms: Espera máxima de cada XREADGROUP sin mensajes
+        claim_idle_ms: Pendientes sin confirmar por más de esto se reclaman
+        claim_interval: Segundos entre barridas de XAUTOCLAIM
+        max_deliveries: Entregas antes de mandar la entrada al parking
+        clock: Reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        redis,
+        streams: Sequence[str],
+        group: str,
+        consumer: str,
+        callback: Callback,
+        parking: str,
+        prefetch_count: int = 100,
+        read_count: int = 100,
+        block_ms: int = 1000,
+        claim_idle_ms: int = 15000,
+        claim_interval: float = 5.0,
+        max_deliveries: int = 5,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not streams:
+            raise ValueError("at least one stream is required")
+        if prefetch_count < 1 or read_count < 1:
+            raise ValueError("prefetch_count and read_count must be positive")
+        self.redis = redis
+        self.streams = list(streams)
+        self.group = group
+        self.consumer = consumer
+        self.callback = callback
+        self.parking = parking
+        self.prefetch_count = prefetch_count
+        self.read_count = read_count
+        self.block_ms = block_ms
+        self.claim_idle_ms = claim_idle_ms
+        self.claim_interval = claim_interval
+        self.max_deliveries = max_deliveries
+        self.clock = clock
+        self._tags = itertools.count(1)
+        # delivery tag -> mensaje sin confirmar (en orden de entrega)
+        self._unacked: Dict[int, StreamMessage] = {}
+        self._delivered: Dict[Tuple[str, bytes], int] = {}
+        self._released = asyncio.Event()
+        self._claim_cursors: Dict[str, bytes] = {stream: b"0-0" for stream in self.streams}
+        self._next_claim = 0.0
+        # Contadores para logs/tests
+        self.delivered_total = 0
+        self.acked_total = 0
+        self.claimed_total = 0
+        self.parked_total = 0
+        self.trimmed_total = 0
+
+    @property
+    def unacked(self) -> int:
+        return len(self._unacked)
+
+    async def declare(self) -> None:
+        """Crea el consumer group de cada stream (idempotente)"""
+        for stream in self.streams:
+            try:
+                await self.redis.xgroup_create(stream, self.group, id="0", mkstream=True)
+            except ResponseError as e:
+                if "BUSYGROUP" not in str(e):
+                    raise
+
+    async def run(self) -> None:
+        """Entrega mensajes hasta ser cancelado: primero los pendientes propios"""
+        await self.declare()
+        await self.read_own_pending()
+        while True:
+            await self._wait_for_window()
+            if self.clock() >= self._next_claim:
+                self._next_claim = self.clock() + self.claim_interval
+                await self.claim_stuck()
+                await self.trim()
+                continue
+            await self.read_new()
+
+    async def read_new(self) -> int:
+        """Un XREADGROUP de entradas nuevas; retorna cuántas se entregaron"""
+        count = max(1, min(self.read_count, self.prefetch_count - self.unacked) // len(self.streams))
+        response = await self.redis.xreadgroup(
+            self.group, self.consumer, {stream: ">" for stream in self.streams}, count=count, block=self.block_ms
+        )
+        return await self._deliver_response(response, redelivered=False)
+
+    async def read_own_pending(self) -> int:
+        """Reentrega lo que este consumidor tenía sin confirmar antes de reiniciarse"""
+        delivered = 0
+        for stream in self.streams:
+            last_id = b"0"
+            while True:
+                await self._wait_for_window()
+                response = await self.redis.xreadgroup(
+                    self.group, self.consumer, {stream: last_id}, count=self.read_count
+                )
+                entries = response[0][1] if response else []
+                if not entries:
+                    break
+                last_id = entries[-1][0]
+                delivered += await self._deliver_entries(stream, entries, redelivered=True)
+        return delivered
+
+    async def claim_stuck(self) -> int:
+        """
+        XAUTOCLAIM de las entradas pendientes por más de `claim_idle_ms`
+
+        Recupera las de procesos muertos y las que recibieron nack con
+        requeue. Las que superan `max_deliveries` van al parking.
+        """
+        claimed = 0
+        for stream in self.streams:
+            response = await self.redis.xautoclaim(
+                stream, self.group, self.consumer, self.claim_idle_ms,
+                start_id=self._claim_cursors[stream], count=self.read_count,
+            )
+            self._claim_cursors[stream] = response[0]
+            entries = [
+                (message_id, fields) for message_id, fields in response[1]
+                if message_id is not None and (stream, message_id) not in self._delivered
+            ]
+            if not entries:
+                continue
+            pending = await self.redis.xpending_range(
+                stream, self.group, min=entries[0][0], max=entries[-1][0],
+                count=len(entries), consumername=self.consumer,
+            )
+            deliveries = {item["message_id"]: item["times_delivered"] for item in pending}
+            exhausted = [entry for entry in entries if deliveries.get(entry[0], 1) > self.max_deliveries]
+            for message_id, fields in exhausted:
+                await self._park(
+                    stream, message_id, *parse_fields(fields), reason=f"exceeded {self.max_deliveries} deliveries"
+                )
+            fresh = [entry for entry in entries if entry not in exhausted]
+            self.claimed_total += len(fresh)
+            claimed += await self._deliver_entries(stream, fresh, redelivered=True)
+        return claimed
+
+    async def trim(self) -> int:
+        """
+        Recorta las entradas que ningún consumer group necesita (`XTRIM MINID ~`)
+
+        Por stream, el límite es la entrada más vieja pendiente de algún
+        grupo o, si un grupo no tiene pendientes, su última entregada.
+        Un fallo no detiene el reader: se reintenta en la siguiente barrida.
+
+        Returns:
+            Entradas borradas
+        """
+        trimmed = 0
+        for stream in self.streams:
+            try:
+                oldest = None
+                for group in await self.redis.xinfo_groups(stream):
+                    needed = group["last-delivered-id"]
+                    if group["pending"]:
+                        needed = (await self.redis.xpending(stream, _decoded(group["name"])))["min"]
+                    if oldest is None or stream_id(needed) < stream_id(oldest):
+                        oldest = needed
+                if oldest is not None and stream_id(oldest) > (0, 0):
+                    trimmed += await self.redis.xtrim(stream, minid=oldest, approximate=True)
+            except Exception as e:
+                print(f"Could not trim stream {stream}: {e}")
+        self.trimmed_total += trimmed
+        return trimmed
+
+    async def _deliver_response(self, response, redelivered: bool) -> int:
+        delivered = 0
+        for stream, entries in response or []:
+            if isinstance(stream, bytes):
+                stream = stream.decode()
+            delivered += await self._deliver_entries(stream, entries, redelivered)
+        return delivered
+
+    async def _deliver_entries(self, stream: str, entries, redelivered: bool) -> int:
+        delivered = 0
+        for message_id, fields in entries:
+            if not fields:
+                # Borrada (XDEL/XTRIM manual) mientras estaba pendiente: no hay nada que procesar
+                await self.redis.xack(stream, self.group, message_id)
+                continue
+            message = StreamMessage(self, stream, message_id, fields, next(self._tags), redelivered)
+            self._unacked[message.delivery_tag] = message
+            self._delivered[(stream, message_id)] = message.delivery_tag
+            self.delivered_total += 1
+            delivered += 1
+            await self.callback(message)
+        return delivered
+
+    async def _wait_for_window(self) -> None:
+        while self.unacked >= self.prefetch_count:
+            self._released.clear()
+            await self._released.wait()
+
+    def _settle(self, message: StreamMessage, multiple: bool) -> List[StreamMessage]:
+        """Saca del registro los mensajes que cubre el ack/nack"""
+        if multiple:
+            tags = [tag for tag in self._unacked if tag <= message.delivery_tag]
+        else:
+            tags = [message.delivery_tag] if message.delivery_tag in self._unacked else []
+        settled = [self._unacked.pop(tag) for tag in tags]
+        for item in settled:
+            self._delivered.pop((item.routing_key, item.message_id), None)
+        if settled:
+            self._released.set()
+        return settled
+
+    async def ack(self, message: StreamMessage, multiple: bool = False) -> None:
+        settled = self._settle(message, multiple)
+        by_stream: Dict[str, List] = {}
+        for item in settled:
+            by_stream.setdefault(item.routing_key, []).append(item.message_id)
+        for stream, ids in by_stream.items():
+            await self.redis.xack(stream, self.group, *ids)
+        self.acked_total += len(settled)
+
+    async def nack(self, message: StreamMessage, requeue: bool = True, multiple: bool = False) -> None:
+        settled = self._settle(message, multiple)
+        if requeue:
+            # Queda pendiente: XAUTOCLAIM la reentrega pasado `claim_idle_ms`
+            return
+        for item in settled:
+            await self._park(
+                item.routing_key, item.message_id, item.body, item.content_type, item.headers, reason="rejected"
+            )
+
+    async def _park(self, stream: str, message_id, body: bytes, content_type: str, headers: dict,
+                    reason: str) -> None:
+        """Copia la entrada al parking con su origen y motivo, y la confirma"""
+        headers = {
+            **headers,
+            ORIGIN_HEADER: stream,
+            REASON_HEADER: reason,
+            PARKED_AT_HEADER: datetime.now(timezone.utc).isoformat(),
+        }
+        await self.redis.xadd(self.parking, stream_fields(body, content_type, headers))
+        await self.redis.xack(stream, self.group, message_id)
+        self.parked_total += 1
+
+
+class RedisStreamsSampler:
+    """
+    Backlog de los streams de transacciones vía XINFO GROUPS
+
+    Por stream, del consumer group: `lag` (entradas aún no entregadas) más
+    `pending` (entregadas sin confirmar, incluidas las que esperan
+    XAUTOCLAIM). Sin `lag` (Redis < 7, o tras borrar entradas) se usa XLEN.
+    Los streams no tienen tasa de acks: se estima con las confirmadas
+    (`entries-read` - `pending`) entre dos muestras, así que la primera
+    tiene tasa 0 (lag desconocido bajo el mínimo, ver QueueSample.known_lag).
+    Un pipeline por muestra, sin importar el número de shards.
+
+    Args:
+        url: URL de Redis de los streams
+        streams: Streams del backlog (`transaction_streams(None)`)
+        group: Consumer group de los workers
+        client: Cliente síncrono o asíncrono (inyectable en tests)
+        clock: Reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(self, url: str, streams: Sequence[str], group: str, client=None,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.url = url
+        self.streams = list(streams)
+        self.group = group
+        self._client = client
+        self.clock = clock
+        self._previous: Optional[Tuple[float, int]] = None
+
+    def _queue(self, pipe) -> None:
+        for stream in self.streams:
+            pipe.xlen(stream)
+            pipe.xinfo_groups(stream)
+
+    async def __call__(self) -> QueueSample:
+        if self._client is None:
+            self._client = streams_client(self.url)
+        async with self._client.pipeline(transaction=False) as pipe:
+            self._queue(pipe)
+            results = await pipe.execute(raise_on_error=False)
+        return self.parse(results)
+
+    def sample_blocking(self) -> QueueSample:
+        """Muestra sin event loop (supervisor del worker)"""
+        if self._client is None:
+            import redis
+
+            self._client = redis.Redis.from_url(self.url)
+        with self._client.pipeline(transaction=False) as pipe:
+            self._queue(pipe)
+            results = pipe.execute(raise_on_error=False)
+        return self.parse(results)
+
+    def parse(self, results: list) -> QueueSample:
+        """Suma lag y pendientes del grupo; la tasa sale de la muestra anterior"""
+        depth, acked = 0, 0
+        for length, groups in zip(results[::2], results[1::2]):
+            if isinstance(length, Exception) or isinstance(groups, Exception):
+                # Stream todavía inexistente
+                continue
+            group = next((item for item in groups if _decoded(item["name"]) == self.group), None)
+            if group is None:
+                depth += length
+                continue
+            lag = group.get("lag")
+            depth += (length if lag is None else lag) + group["pending"]
+            acked += max((group.get("entries-read") or 0) - group["pending"], 0)
+
+        now = self.clock()
+        ack_rate = 0.0
+        if self._previous is not None and now > self._previous[0]:
+            ack_rate = max(acked - self._previous[1], 0) / (now - self._previous[0])
+        self._previous = (now, acked)
+        return QueueSample(depth, ack_rate)
+
+
+# Un publisher por nombre y proceso (la API crea los adaptadores por petición)
+_PUBLISHERS: Dict[str, RedisStreamsPublisher] = {}
+
+
+def get_streams_publisher(name: str, url: str, **config) -> RedisStreamsPublisher:
+    """Publisher compartido del proceso (`config` solo aplica al crearlo)"""
+    publisher = _PUBLISHERS.get(name)
+    if publisher is None:
+        publisher = _PUBLISHERS[name] = RedisStreamsPublisher(url, **config)
+    return publisher
+
+
+def all_streams_publishers() -> Dict[str, RedisStreamsPublisher]:
+    return dict(_PUBLISHERS)
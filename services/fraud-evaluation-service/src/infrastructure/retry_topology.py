@@ -0,0 +1,245 @@
+"""
+Retry Topology - Reintentos diferidos y parking de mensajes envenenados
+
+Antes un error temporal hacía `nack(requeue=True)`: el mensaje volvía a la
+cabeza de la cola y, con MongoDB o Redis caídos, el worker lo reprocesaba
+en un bucle caliente que quemaba CPU y retrasaba a los mensajes sanos.
+
+Ahora el mensaje que falla se republica en una cola de espera y se
+confirma el original:
+
+    transactions.shard.N --falla--> exchange transactions.retry.<delay>ms (fanout)
+        --> cola transactions.retry.<delay>ms (x-message-ttl = delay)
+        --TTL vencido, dead-letter al exchange por defecto con la routing
+          key original--> transactions.shard.N
+
+- La routing key del mensaje republicado es su cola de origen; el
+  exchange fanout la ignora al encolar y el dead-letter la conserva, así
+  una sola cola de espera por delay sirve a todos los shards.
+- El intento va en el header `x-attempt`; el delay crece en forma
+  exponencial (`retry_delays`). Las colas se nombran por delay, no por
+  intento, para que cambiar la configuración no choque con el TTL de una
+  cola ya declarada.
+- Pasados los intentos (o si el mensaje es inválido) va a la cola de
+  parking `transactions.parking` con el motivo, la cola de origen y la
+  fecha. `python -m src.management parked-list|parked-replay` los revisa
+  y los reinyecta.
+
+El original se confirma solo después de que el broker confirmó la copia.
+"""
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+from src.infrastructure.async_publisher import persistent_message
+
+
+ATTEMPT_HEADER = "x-attempt"
+ORIGIN_HEADER = "x-origin-queue"
+REASON_HEADER = "x-parked-reason"
+PARKED_AT_HEADER = "x-parked-at"
+
+
+def retry_delays(base_seconds: float, max_attempts: int, max_seconds: float) -> List[float]:
+    """Delay de cada intento: base, 2*base, 4*base... hasta `max_seconds`"""
+    return [min(max_seconds, base_seconds * 2 ** attempt) for attempt in range(max_attempts)]
+
+
+def retry_queue(base_queue: str, delay_seconds: float) -> str:
+    return f"{base_queue}.retry.{int(delay_seconds * 1000)}ms"
+
+
+def parking_queue(base_queue: str) -> str:
+    return f"{base_queue}.parking"
+
+
+def attempt_of(headers: Optional[dict]) -> int:
+    """Intentos fallidos registrados en el mensaje"""
+    try:
+        return int((headers or {}).get(ATTEMPT_HEADER, 0))
+    except (TypeError, ValueError):
+        return 0
+
+
+class RetryRouter:
+    """
+    Republica los mensajes fallidos en la cola de espera o en el parking
+
+    Args:
+        channel: Canal de aio-pika con publisher confirms
+        base_queue: Cola base (`rabbitmq_transactions_queue`)
+        delays: Delay (s) de cada intento (ver `retry_delays`)
+        message_factory: Construye el mensaje persistente (body, headers, content_type, priority)
+    """
+
+    def __init__(
+        self,
+        channel,
+        base_queue: str,
+        delays: List[float],
+        message_factory: Callable = persistent_message,
+    ) -> None:
+        self.channel = channel
+        self.base_queue = base_queue
+        self.delays = delays
+        self._message = message_factory
+        self._exchanges: Dict[float, object] = {}
+        # Contadores para logs/tests
+        self.retried_total = 0
+        self.parked_total = 0
+
+    @property
+    def max_attempts(self) -> int:
+        return len(self.delays)
+
+    async def declare(self) -> None:
+        """Declara exchanges y colas de espera y la cola de parking (idempotente)"""
+        for delay in sorted(set(self.delays)):
+            name = retry_queue(self.base_queue, delay)
+            exchange = await self.channel.declare_exchange(name, type="fanout", durable=True)
+            queue = await self.channel.declare_queue(
+                name,
+                durable=True,
+                arguments={
+                    "x-message-ttl": int(delay * 1000),
+                    "x-dead-letter-exchange": "",
+                },
+            )
+            await queue.bind(exchange)
+            self._exchanges[delay] = exchange
+        await self.channel.declare_queue(parking_queue(self.base_queue), durable=True)
+
+    async def retry(self, message, reason: str) -> None:
+        """Programa el siguiente intento, o estaciona el mensaje si ya no quedan"""
+        attempt = attempt_of(message.headers) + 1
+        if attempt > self.max_attempts:
+            await self.park(message, f"{reason} (after {self.max_attempts} attempts)")
+            return
+        delay = self.delays[attempt - 1]
+        headers = dict(message.headers or {})
+        headers[ATTEMPT_HEADER] = attempt
+        await self._exchanges[delay].publish(
+            self._message(message.body, headers, message.content_type, getattr(message, "priority", None)),
+            routing_key=message.routing_key,
+        )
+        self.retried_total += 1
+        print(f"Delivery {message.delivery_tag} retry {attempt}/{self.max_attempts} in {delay:g}s: {reason}")
+
+    async def park(self, message, reason: str) -> None:
+        """Mueve el mensaje a la cola de parking con su motivo"""
+        headers = dict(message.headers or {})
+        headers.update({
+            ORIGIN_HEADER: headers.get(ORIGIN_HEADER, message.routing_key),
+            REASON_HEADER: reason[:500],
+            PARKED_AT_HEADER: datetime.now(timezone.utc).isoformat(),
+        })
+        await self.channel.default_exchange.publish(
+            self._message(message.body, headers, message.content_type, getattr(message, "priority", None)),
+            routing_key=parking_queue(self.base_queue),
+        )
+        self.parked_total += 1
+        print(f"Delivery {message.delivery_tag} parked: {reason}")
+
+
+# ---------------------------------------------------------------------------
+# Inspección y reinyección del parking (CLI, pika bloqueante)
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class ParkedMessage:
+    origin_queue: str
+    attempts: int
+    reason: str
+    parked_at: str
+    body: bytes
+
+    def summary(self, width: int = 120) -> str:
+        body = self.body.decode("utf-8", errors="replace")
+        if len(body) > width:
+            body = body[:width] + "..."
+        return f"[{self.parked_at}] {self.origin_queue} attempts={self.attempts} reason={self.reason!r}\n    {body}"
+
+
+def _parked(properties, body: bytes, default_origin: str) -> ParkedMessage:
+    headers = properties.headers or {}
+    return ParkedMessage(
+        origin_queue=headers.get(ORIGIN_HEADER, default_origin),
+        attempts=attempt_of(headers),
+        reason=headers.get(REASON_HEADER, ""),
+        parked_at=headers.get(PARKED_AT_HEADER, ""),
+        body=body,
+    )
+
+
+def list_parked(channel, base_queue: str, limit: int = 20) -> List[ParkedMessage]:
+    """
+    Primeros `limit` mensajes del parking sin consumirlos
+
+    Se leen con basic_get y se devuelven a la cola (nack con requeue).
+    """
+    parked = []
+    last_tag = None
+    for _ in range(limit):
+        method, properties, body = channel.basic_get(parking_queue(base_queue), auto_ack=False)
+        if method is None:
+            break
+        last_tag = method.delivery_tag
+        parked.append(_parked(properties, body, base_queue))
+    if last_tag is not None:
+        channel.basic_nack(delivery_tag=last_tag, multiple=True, requeue=True)
+    return parked
+
+
+def replay_parked(channel, base_queue: str, limit: Optional[int] = None, origin: Optional[str] = None) -> int:
+    """
+    Reinyecta mensajes del parking en su cola de origen con los intentos en cero
+
+    Args:
+        channel: Canal de pika bloqueante
+        base_queue: Cola base
+        limit: Máximo de mensajes (None = todos)
+        origin: Solo los de esta cola de origen (el resto vuelve al parking)
+
+    Returns:
+        Mensajes reinyectados
+    """
+    import pika
+
+    channel.confirm_delivery()
+    replayed = 0
+    skipped = []
+    while limit is None or replayed < limit:
+        method, properties, body = channel.basic_get(parking_queue(base_queue), auto_ack=False)
+        if method is None:
+            break
+        message = _parked(properties, body, base_queue)
+        if origin is not None and message.origin_queue != origin:
+            skipped.append(method.delivery_tag)
+            continue
+        headers = {
+            key: value for key, value in (properties.headers or {}).items()
+            if key not in (ATTEMPT_HEADER, REASON_HEADER, PARKED_AT_HEADER, ORIGIN_HEADER)
+        }
+        # Con confirm_delivery, basic_publish lanza si el broker no confirma
+        channel.basic_publish(
+            exchange="",
+            routing_key=message.origin_queue,
+            body=body,
+            properties=pika.BasicProperties(
+                delivery_mode=2,
+                content_type=properties.content_type or "application/json",
+                headers=headers,
+            ),
+        )
+        channel.basic_ack(delivery_tag=method.delivery_tag)
+        replayed += 1
+    for delivery_tag in skipped:
+        channel.basic_nack(delivery_tag=delivery_tag, requeue=True)
+    return replayed
+
+
+def parking_depth(channel, base_queue: str) -> int:
+    """Mensajes en el parking"""
+    return channel.queue_declare(parking_queue(base_queue), durable=True, passive=True).method.message_count
+
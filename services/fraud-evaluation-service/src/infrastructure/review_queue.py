@@ -0,0 +1,345 @@
+"""
+Review Queue - Cola de trabajo de los analistas (revisión manual, HU-010)
+
+Las evaluaciones MEDIUM_RISK y HIGH_RISK se publicaban en `manual_review`,
+pero nadie consumía esa cola: los analistas encontraban el trabajo
+recorriendo `/admin/transactions/log`.
+
+Ahora:
+
+- Los publishers envían a `manual_review.priority`, declarada con
+  `x-max-priority`. La prioridad AMQP sale del riesgo y del monto
+  (`review_priority`): con backlog, RabbitMQ entrega primero lo más
+  riesgoso. Es una cola nueva porque los argumentos de una cola existente
+  no se pueden cambiar; la anterior se sigue consumiendo hasta vaciarse.
+- ReviewQueueConsumer (en el worker) materializa los mensajes por lotes
+  en la colección `review_queue`: un documento por transacción (`_id`),
+  con upsert idempotente ante reentregas.
+- ReviewQueueStore atiende a los analistas. El siguiente ítem es el
+  primero del índice (status, rank, amount, enqueued_at) y se reclama con
+  un solo `find_one_and_update`: O(log n) y atómico, dos analistas nunca
+  reciben el mismo ítem. El reclamo dura `lease_seconds`; vencido, el ítem
+  vuelve a estar disponible.
+- Al registrar la decisión del analista (`update_evaluation`) el ítem se
+  elimina; los mensajes de transacciones ya revisadas no se materializan.
+"""
+import asyncio
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from src.infrastructure.message_codec import ManualReviewMessage, MessageDecodeError, decode_review
+
+
+PENDING = "PENDING"
+CLAIMED = "CLAIMED"
+
+# Prioridad AMQP: HIGH_RISK 5-9, MEDIUM_RISK 0-4 según la banda de monto
+MAX_PRIORITY = 9
+RISK_RANKS: Dict[str, int] = {"HIGH_RISK": 2, "MEDIUM_RISK": 1}
+AMOUNT_BANDS: Tuple[float, ...] = (1000.0, 5000.0, 20000.0, 100000.0)
+
+# Orden de atención (debe coincidir con el índice del catálogo)
+REVIEW_ORDER = [("rank", -1), ("amount", -1), ("enqueued_at", 1)]
+
+DUPLICATE_KEY_ERROR = 11000
+
+
+def review_priority_queue(base_queue: str) -> str:
+    """Cola con prioridad de la revisión manual"""
+    return f"{base_queue}.priority"
+
+
+def review_queue_arguments() -> dict:
+    """Argumentos de declaración de la cola con prioridad"""
+    return {"x-max-priority": MAX_PRIORITY}
+
+
+def review_priority(risk_level: str, amount: float) -> int:
+    """Prioridad AMQP (0-9) de una evaluación: primero el riesgo, después el monto"""
+    rank = RISK_RANKS.get(risk_level, 0)
+    return max(rank - 1, 0) * (len(AMOUNT_BANDS) + 1) + bisect_right(AMOUNT_BANDS, amount)
+
+
+class ReviewQueueStore:
+    """
+    Ítems pendientes de revisión y sus reclamos
+
+    Síncrono (pymongo), como el resto del adaptador de MongoDB; las rutas
+    lo ejecutan en threadpool.
+
+    Args:
+        collection: Colección `review_queue`
+        evaluations: Colección `evaluations` (para omitir las ya revisadas)
+        clock: Hora actual (inyectable en tests)
+    """
+
+    def __init__(self, collection, evaluations, clock: Callable[[], datetime] = datetime.now) -> None:
+        self.collection = collection
+        self.evaluations = evaluations
+        self._clock = clock
+
+    def add_many(self, items: Iterable[ManualReviewMessage]) -> int:
+        """
+        Materializa un lote de mensajes con un solo `bulk_write`
+
+        Returns:
+            Ítems nuevos (los reentregados y los ya revisados no cuentan)
+        """
+        items = {item.transaction_id: item for item in items}
+        if not items:
+            return 0
+        reviewed = {
+            doc["transaction_id"]
+            for doc in self.evaluations.find(
+                {"transaction_id": {"$in": list(items)}, "reviewed_by": {"$ne": None}},
+                {"transaction_id": 1},
+            )
+        }
+        now = self._clock()
+        operations = [
+            UpdateOne({"_id": transaction_id}, {"$setOnInsert": self._document(item, now)}, upsert=True)
+            for transaction_id, item in items.items()
+            if transaction_id not in reviewed
+        ]
+        if not operations:
+            return 0
+        try:
+            return self.collection.bulk_write(operations, ordered=False).upserted_count
+        except BulkWriteError as e:
+            # Dos workers insertando el mismo ítem: el otro ya lo materializó
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != DUPLICATE_KEY_ERROR for error in errors):
+                raise
+            return e.details.get("nUpserted", 0)
+
+    @staticmethod
+    def _document(item: ManualReviewMessage, now: datetime) -> dict:
+        return {
+            "transaction_id": item.transaction_id,
+            "user_id": item.user_id,
+            "risk_level": item.risk_level,
+            "amount": item.amount,
+            "reasons": item.reasons,
+            "rank": RISK_RANKS.get(item.risk_level, 0),
+            "status": PENDING,
+            "enqueued_at": now,
+        }
+
+    def pending(self, limit: int = 50) -> List[dict]:
+        """Los próximos `limit` ítems sin reclamar, en orden de atención"""
+        return list(self.collection.find({"status": PENDING}).sort(REVIEW_ORDER).limit(limit))
+
+    def get(self, transaction_id: str) -> Optional[dict]:
+        return self.collection.find_one({"_id": transaction_id})
+
+    def claim_next(self, analyst_id: str, lease_seconds: float) -> Optional[dict]:
+        """Reclama el ítem más prioritario (None si no hay pendientes)"""
+        now = self._clock()
+        self.release_expired(now)
+        return self.collection.find_one_and_update(
+            {"status": PENDING},
+            self._claim(analyst_id, lease_seconds, now),
+            sort=REVIEW_ORDER,
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def claim(self, transaction_id: str, analyst_id: str, lease_seconds: float) -> Optional[dict]:
+        """
+        Reclama un ítem puntual (o renueva el reclamo propio)
+
+        Returns:
+            El ítem reclamado, o None si no existe o lo tiene otro analista
+        """
+        now = self._clock()
+        return self.collection.find_one_and_update(
+            {
+                "_id": transaction_id,
+                "$or": [
+                    {"status": PENDING},
+                    {"claimed_by": analyst_id},
+                    {"lease_until": {"$lt": now}},
+                ],
+            },
+            self._claim(analyst_id, lease_seconds, now),
+            return_document=ReturnDocument.AFTER,
+        )
+
+    @staticmethod
+    def _claim(analyst_id: str, lease_seconds: float, now: datetime) -> dict:
+        return {
+            "$set": {
+                "status": CLAIMED,
+                "claimed_by": analyst_id,
+                "claimed_at": now,
+                "lease_until": now + timedelta(seconds=lease_seconds),
+            }
+        }
+
+    def release(self, transaction_id: str, analyst_id: str) -> bool:
+        """Devuelve a la cola un ítem reclamado por el analista"""
+        result = self.collection.update_one(
+            {"_id": transaction_id, "status": CLAIMED, "claimed_by": analyst_id}, self._unclaim()
+        )
+        return result.modified_count == 1
+
+    def release_expired(self, now: Optional[datetime] = None) -> int:
+        """Devuelve a la cola los reclamos vencidos"""
+        result = self.collection.update_many(
+            {"status": CLAIMED, "lease_until": {"$lt": now or self._clock()}}, self._unclaim()
+        )
+        return result.modified_count
+
+    @staticmethod
+    def _unclaim() -> dict:
+        return {
+            "$set": {"status": PENDING},
+            "$unset": {"claimed_by": "", "claimed_at": "", "lease_until": ""},
+        }
+
+    def complete(self, transaction_id: str) -> None:
+        """Quita el ítem una vez registrada la decisión del analista"""
+        self.collection.delete_one({"_id": transaction_id})
+
+
+class ReviewQueueConsumer:
+    """
+    Consume la cola de revisión manual y la materializa por lotes
+
+    Junta hasta `batch_size` mensajes o espera `max_wait_seconds`, los
+    escribe con un solo `bulk_write` en un hilo (pymongo es bloqueante y el
+    event loop es el mismo de las evaluaciones) y confirma el lote con un
+    ack múltiple (un canal propio: los delivery tags menores son todos de
+    este consumidor).
+
+    Si la escritura falla, cada mensaje del lote va a la cola de espera de
+    su intento y termina en el parking (ver retry_topology.py): reencolarlo
+    en el acto, con MongoDB caído, lo reprocesaría en un bucle caliente.
+    Sin RetryRouter el lote se reencola.
+
+    Args:
+        store: ReviewQueueStore
+        batch_size: Mensajes por lote como máximo
+        max_wait_seconds: Espera máxima del mensaje más antiguo del lote
+        clock: Reloj monotónico (inyectable en tests)
+        decode: Mensaje -> ManualReviewMessage validado
+        retries: RetryRouter de la cola de revisión (None = nack). Sin
+            import: retry_topology depende de async_publisher, que importa
+            este módulo.
+    """
+
+    def __init__(
+        self,
+        store: ReviewQueueStore,
+        batch_size: int = 100,
+        max_wait_seconds: float = 0.05,
+        clock: Callable[[], float] = time.monotonic,
+        decode: Callable[[object], ManualReviewMessage] = decode_review,
+        retries=None,
+    ) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be positive")
+        self.store = store
+        self.retries = retries
+        self.batch_size = batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self._clock = clock
+        self.decode = decode
+        self._buffer: List[Tuple[object, ManualReviewMessage]] = []
+        self._oldest: Optional[float] = None
+        self._processing = asyncio.Lock()
+        # Contadores para logs/tests
+        self.materialized_total = 0
+        self.rejected_total = 0
+
+    async def dispatch(self, message) -> None:
+        """Agrega el mensaje al lote; lo escribe si quedó lleno"""
+        try:
+            item = self.decode(message)
+        except MessageDecodeError as e:
+            print(f"Error: Invalid review message: {e}")
+            self.rejected_total += 1
+            if await self._reroute(message, f"invalid review message: {e}", retryable=False):
+                await self._settle(message.ack(), message)
+            else:
+                await self._settle(message.nack(requeue=False), message)
+            return
+        if not self._buffer:
+            self._oldest = self._clock()
+        self._buffer.append((message, item))
+        if len(self._buffer) >= self.batch_size:
+            await self.process_pending()
+
+    def seconds_until_due(self) -> Optional[float]:
+        """Segundos hasta que vence el lote actual (None si está vacío)"""
+        if not self._buffer:
+            return None
+        return max(self._oldest + self.max_wait_seconds - self._clock(), 0.0)
+
+    async def process_pending(self) -> None:
+        """Escribe el lote actual después de los anteriores y lo confirma"""
+        if not self._buffer:
+            return
+        batch, self._buffer, self._oldest = self._buffer, [], None
+        async with self._processing:
+            last = max((message for message, _ in batch), key=lambda message: message.delivery_tag)
+            try:
+                self.materialized_total += await asyncio.to_thread(
+                    self.store.add_many, [item for _, item in batch]
+                )
+            except Exception as e:
+                print(f"Error materializing {len(batch)} review items: {e}")
+                await self._fail([message for message, _ in batch], last, f"{type(e).__name__}: {e}")
+                return
+            await self._settle(last.ack(multiple=True), last)
+
+    async def _fail(self, messages: List, last, reason: str) -> None:
+        """Lote no escrito: cada mensaje a su cola de espera (o se reencola sin RetryRouter)"""
+        if self.retries is None:
+            await self._settle(last.nack(requeue=True, multiple=True), last)
+            return
+        for message in messages:
+            if await self._reroute(message, reason, retryable=True):
+                await self._settle(message.ack(), message)
+            else:
+                # El broker no confirmó la copia: que vuelva a entregarse
+                await self._settle(message.nack(requeue=True), message)
+
+    async def _reroute(self, message, reason: str, retryable: bool) -> bool:
+        """Republica en la cola de espera o en el parking; False si no se pudo"""
+        if self.retries is None:
+            return False
+        try:
+            if retryable:
+                await self.retries.retry(message, reason)
+            else:
+                await self.retries.park(message, reason)
+            return True
+        except Exception as e:
+            print(f"Could not reroute delivery {message.delivery_tag}: {e}")
+            return False
+
+    @staticmethod
+    async def _settle(settle, message) -> None:
+        try:
+            await settle
+        except Exception as e:
+            print(f"Could not settle delivery {message.delivery_tag}: {e}")
+
+    async def flush_periodically(self) -> None:
+        """Escribe el lote incompleto cuando vence su espera máxima"""
+        while True:
+            delay = self.seconds_until_due()
+            await asyncio.sleep(self.max_wait_seconds if delay is None else delay)
+            if self.seconds_until_due() == 0.0:
+                await self.process_pending()
+
+    async def drain(self) -> None:
+        """Escribe el lote pendiente y espera al que está en curso"""
+        await self.process_pending()
+        async with self._processing:
+            pass
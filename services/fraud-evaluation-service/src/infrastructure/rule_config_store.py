@@ -0,0 +1,247 @@
+"""
+Rule Config Store - Estado de reglas en un único hash de Redis
+
+Antes, una petición de administración leía `config:thresholds`, una clave
+`rule_config:{rule}:{param}` por parámetro (GET secuenciales) y dos sets
+(`disabled_default_rules`, `deleted_default_rules`): siete o más round
+trips. Ahora todo el estado vive en el hash `rule_config`:
+
+    version                              -> contador de escrituras
+    threshold:amount_threshold           -> "1500.0"
+    threshold:location_radius_km         -> "100.0"
+    param:rule_rapid_transaction:max_transactions -> "3"
+    disabled:rule_unusual_time           -> "1"
+    deleted:rule_device_validation       -> "1"
+
+- Lectura: un `HGETALL` (un round trip) devuelve un snapshot consistente.
+- Escritura: un script Lua con los HSET/HDEL más `HINCRBY version`, así
+  ningún lector ve una escritura a medias y `version` identifica cada
+  snapshot. Es una sola clave: EVAL es atómico también en Redis Cluster,
+  donde el pipeline no lleva MULTI.
+
+El hash no tiene TTL: los flags de reglas nunca expiraron y un solo TTL
+para todo el hash los borraría junto con los umbrales.
+
+Migración: si el hash no existe se leen las claves antiguas en un solo
+pipeline y se copian al hash con HSETNX (no pisa escrituras nuevas) junto
+con el campo `migrated`, que se escribe aunque no haya nada que copiar:
+así un despliegue sin configuración no repite el pipeline en cada
+lectura. Después se borran las claves antiguas; si quedaran, un hash
+desalojado volvería a migrar un estado viejo.
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Optional, Set, Tuple
+
+from src.infrastructure.redis_keys import RULE_CONFIG_KEY, pipeline
+
+VERSION_FIELD = "version"
+MIGRATED_FIELD = "migrated"
+THRESHOLD_PREFIX = "threshold:"
+PARAM_PREFIX = "param:"
+DISABLED_PREFIX = "disabled:"
+DELETED_PREFIX = "deleted:"
+
+# ARGV: cantidad de campos a escribir, pares campo/valor, campos a borrar.
+# Devuelve la nueva versión (campo `version`)
+WRITE_SCRIPT = """
+local count = tonumber(ARGV[1])
+for i = 2, 2 * count, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+for i = 2 * count + 2, #ARGV do
+    redis.call('HDEL', KEYS[1], ARGV[i])
+end
+return redis.call('HINCRBY', KEYS[1], 'version', 1)
+"""
+
+# ARGV: pares campo/valor que solo se escriben si el campo no existe
+MIGRATE_SCRIPT = """
+for i = 1, #ARGV, 2 do
+    redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# Claves del esquema anterior (se borran al migrar)
+LEGACY_THRESHOLDS_KEY = "config:thresholds"
+LEGACY_DISABLED_KEY = "disabled_default_rules"
+LEGACY_DELETED_KEY = "deleted_default_rules"
+LEGACY_PARAMETERS: Tuple[Tuple[str, str], ...] = (
+    ("rule_device_validation", "device_memory_days"),
+    ("rule_rapid_transaction", "max_transactions"),
+    ("rule_rapid_transaction", "time_window_minutes"),
+    ("rule_unusual_time", "deviation_threshold"),
+)
+
+
+@dataclass
+class RuleConfigSnapshot:
+    """Estado completo de las reglas leído en un solo round trip"""
+
+    version: int = 0
+    thresholds: Dict[str, float] = field(default_factory=dict)
+    parameters: Dict[str, Dict[str, str]] = field(default_factory=dict)
+    disabled: Set[str] = field(default_factory=set)
+    deleted: Set[str] = field(default_factory=set)
+
+    def parameter(self, rule_id: str, name: str, cast: Callable = str, default=None):
+        """Valor de un parámetro de regla convertido con `cast` (o `default`)"""
+        value = self.parameters.get(rule_id, {}).get(name)
+        if value in (None, ""):
+            return default
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+
+    def threshold_config(self, defaults: Optional[Dict[str, float]] = None) -> Optional[dict]:
+        """
+        Umbrales en el formato de `get_threshold_config` (None si no hay)
+
+        Los umbrales se escriben de a uno: los que falten se completan con
+        `defaults`.
+        """
+        if not self.thresholds:
+            return None
+        return {**(defaults or {}), **self.thresholds}
+
+    def is_empty(self) -> bool:
+        return not (self.thresholds or self.parameters or self.disabled or self.deleted)
+
+    @classmethod
+    def from_hash(cls, fields: Dict[str, str]) -> "RuleConfigSnapshot":
+        snapshot = cls(version=int(fields.get(VERSION_FIELD, 0) or 0))
+        for name, value in fields.items():
+            if name.startswith(THRESHOLD_PREFIX):
+                try:
+                    snapshot.thresholds[name[len(THRESHOLD_PREFIX):]] = float(value)
+                except ValueError:
+                    continue
+            elif name.startswith(PARAM_PREFIX):
+                rule_id, _, param = name[len(PARAM_PREFIX):].partition(":")
+                snapshot.parameters.setdefault(rule_id, {})[param] = value
+            elif name.startswith(DISABLED_PREFIX):
+                snapshot.disabled.add(name[len(DISABLED_PREFIX):])
+            elif name.startswith(DELETED_PREFIX):
+                snapshot.deleted.add(name[len(DELETED_PREFIX):])
+        return snapshot
+
+    def to_hash(self) -> Dict[str, str]:
+        fields: Dict[str, str] = {}
+        for name, value in self.thresholds.items():
+            fields[f"{THRESHOLD_PREFIX}{name}"] = str(value)
+        for rule_id, parameters in self.parameters.items():
+            for name, value in parameters.items():
+                fields[f"{PARAM_PREFIX}{rule_id}:{name}"] = str(value)
+        for rule_id in self.disabled:
+            fields[f"{DISABLED_PREFIX}{rule_id}"] = "1"
+        for rule_id in self.deleted:
+            fields[f"{DELETED_PREFIX}{rule_id}"] = "1"
+        return fields
+
+
+def _as_str_set(members: Optional[Iterable]) -> Set[str]:
+    return {m.decode("utf-8") if isinstance(m, bytes) else m for m in members or ()}
+
+
+class RuleConfigStore:
+    """
+    Lee y escribe el hash `rule_config` con el cliente async de Redis
+
+    Args:
+        redis: Cliente `redis.asyncio` (decode_responses=True)
+    """
+
+    def __init__(self, redis) -> None:
+        self.redis = redis
+
+    async def load(self) -> RuleConfigSnapshot:
+        """Snapshot actual: un HGETALL (o un pipeline de migración la primera vez)"""
+        fields = await self.redis.hgetall(RULE_CONFIG_KEY)
+        if fields:
+            return RuleConfigSnapshot.from_hash(fields)
+        return await self._migrate_legacy()
+
+    async def set_thresholds(self, **thresholds: float) -> int:
+        """Actualiza uno o más umbrales (amount_threshold, location_radius_km)"""
+        return await self._write({
+            f"{THRESHOLD_PREFIX}{name}": str(value) for name, value in thresholds.items()
+        })
+
+    async def set_parameters(self, rule_id: str, **parameters) -> int:
+        """Actualiza parámetros de una regla predeterminada"""
+        return await self._write({
+            f"{PARAM_PREFIX}{rule_id}:{name}": str(value) for name, value in parameters.items()
+        })
+
+    async def set_enabled(self, rule_id: str, enabled: bool) -> int:
+        """Habilita o deshabilita una regla predeterminada"""
+        if enabled:
+            return await self._write({}, delete=[f"{DISABLED_PREFIX}{rule_id}"])
+        return await self._write({f"{DISABLED_PREFIX}{rule_id}": "1"})
+
+    async def mark_deleted(self, rule_id: str) -> int:
+        """Marca una regla predeterminada como eliminada (y la quita de deshabilitadas)"""
+        return await self._write(
+            {f"{DELETED_PREFIX}{rule_id}": "1"}, delete=[f"{DISABLED_PREFIX}{rule_id}"]
+        )
+
+    async def _write(self, mapping: Dict[str, str], delete: Iterable[str] = ()) -> int:
+        """
+        Aplica los cambios de forma atómica (WRITE_SCRIPT)
+
+        Returns:
+            Nueva versión del hash
+        """
+        # La primera escritura no debe ocultar el estado que aún vive en las
+        # claves antiguas: se migra antes de crear el hash
+        if not await self.redis.exists(RULE_CONFIG_KEY):
+            await self._migrate_legacy()
+
+        args = [len(mapping)]
+        for name, value in mapping.items():
+            args += [name, value]
+        args += list(delete)
+        return int(await self.redis.eval(WRITE_SCRIPT, 1, RULE_CONFIG_KEY, *args))
+
+    async def _migrate_legacy(self) -> RuleConfigSnapshot:
+        """Lee el esquema anterior en un pipeline, lo copia al hash y lo borra"""
+        async with pipeline(self.redis, transaction=False) as pipe:
+            pipe.get(LEGACY_THRESHOLDS_KEY)
+            for rule_id, param in LEGACY_PARAMETERS:
+                pipe.get(f"rule_config:{rule_id}:{param}")
+            pipe.smembers(LEGACY_DISABLED_KEY)
+            pipe.smembers(LEGACY_DELETED_KEY)
+            results = await pipe.execute()
+
+        snapshot = RuleConfigSnapshot()
+        thresholds_json, parameter_values = results[0], results[1:1 + len(LEGACY_PARAMETERS)]
+        if thresholds_json:
+            try:
+                snapshot.thresholds = {
+                    name: float(value) for name, value in json.loads(thresholds_json).items()
+                }
+            except (ValueError, TypeError, AttributeError):
+                snapshot.thresholds = {}
+        for (rule_id, param), value in zip(LEGACY_PARAMETERS, parameter_values):
+            if value:
+                snapshot.parameters.setdefault(rule_id, {})[param] = value
+        snapshot.disabled = _as_str_set(results[-2])
+        snapshot.deleted = _as_str_set(results[-1])
+
+        fields = {**snapshot.to_hash(), VERSION_FIELD: "1", MIGRATED_FIELD: "1"}
+        args = [item for pair in fields.items() for item in pair]
+        await self.redis.eval(MIGRATE_SCRIPT, 1, RULE_CONFIG_KEY, *args)
+        snapshot.version = 1
+
+        # Solo cuando la copia ya está en el hash: si el borrado falla, el
+        # campo `migrated` evita que se vuelvan a leer
+        if not snapshot.is_empty():
+            legacy_keys = [LEGACY_THRESHOLDS_KEY, LEGACY_DISABLED_KEY, LEGACY_DELETED_KEY]
+            legacy_keys += [f"rule_config:{rule_id}:{param}" for rule_id, param in LEGACY_PARAMETERS]
+            async with pipeline(self.redis, transaction=False) as pipe:
+                for key in legacy_keys:
+                    pipe.delete(key)
+                await pipe.execute()
+        return snapshot
@@ -0,0 +1,83 @@
+"""
+Sharding - Afinidad de usuario entre el publisher y los procesos del worker
+
+Las transacciones se publican en `rabbitmq_shard_count` colas
+(`transactions.shard.{n}`) elegidas por hash consistente del `user_id`
+(jump consistent hash): todas las transacciones de un usuario van a la
+misma cola.
+
+Cada cola la consume un único proceso del worker (consumidor exclusivo) y
+el supervisor reparte las colas entre procesos (`assign_shards`) de forma
+balanceada: con 64 shards y 8 procesos, 8 cada uno. Así el estado de velocidad, dispositivos y ubicación
+de un usuario lo maneja un solo proceso: la caché local
+(LocalRiskState) es coherente y no hay carreras entre procesos.
+
+Las colas son más que los procesos (shards virtuales) para poder escalar
+sin republicar: al pasar de N a N+1 procesos solo cambian de dueño las
+colas que toma el nuevo proceso (~1/(N+1) de ellas). Nunca hay más
+procesos que shards: un proceso sin cola ocuparía un core sin trabajo.
+"""
+import hashlib
+from typing import List
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), "big")
+
+
+def jump_hash(key: int, buckets: int) -> int:
+    """Jump consistent hash (Lamping & Veach): bucket en [0, buckets)"""
+    if buckets < 1:
+        raise ValueError("buckets must be positive")
+    bucket, candidate = -1, 0
+    while candidate < buckets:
+        bucket = candidate
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        candidate = int((bucket + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return bucket
+
+
+def shard_for(user_id: str, shard_count: int) -> int:
+    """Shard de un usuario"""
+    return jump_hash(_hash64(str(user_id)), shard_count)
+
+
+def shard_queue(base_queue: str, shard: int) -> str:
+    return f"{base_queue}.shard.{shard}"
+
+
+def transactions_queue(base_queue: str, user_id: str, shard_count: int) -> str:
+    """Cola donde se publica la transacción de un usuario (`base_queue` sin sharding)"""
+    if not shard_count:
+        return base_queue
+    return shard_queue(base_queue, shard_for(user_id, shard_count))
+
+
+def assign_shards(shard_count: int, workers: int) -> List[List[int]]:
+    """
+    Reparte los shards entre `workers` procesos, balanceado y estable
+
+    La asignación de N procesos se construye desde la de N - 1: el proceso
+    N - 1 toma `shard_count // N` shards, uno por vez del proceso con más
+    shards (y de sus shards, el de mayor peso `hash(shard:N-1)`, como en
+    rendezvous hashing). Así las cargas difieren a lo sumo en un shard y
+    agregar un proceso solo mueve shards hacia él, aunque casi todos los
+    procesos existentes le ceden alguno.
+
+    Raises:
+        ValueError: Sin procesos, o con más procesos que shards
+    """
+    if workers < 1:
+        raise ValueError("workers must be positive")
+    if workers > max(shard_count, 1):
+        raise ValueError(f"cannot assign {shard_count} shards to {workers} workers")
+    assignment: List[List[int]] = [list(range(shard_count))]
+    for new in range(1, workers):
+        taken = []
+        for _ in range(shard_count // (new + 1)):
+            donor = max(range(new), key=lambda worker: len(assignment[worker]))
+            shard = max(assignment[donor], key=lambda shard: _hash64(f"{shard}:{new}"))
+            assignment[donor].remove(shard)
+            taken.append(shard)
+        assignment.append(sorted(taken))
+    return assignment
@@ -0,0 +1,297 @@
+"""
+User History Buckets - Historial por usuario agrupado en documentos (bucket pattern)
+
+`get_evaluations_by_user` sobre la colección `evaluations` lee una entrada
+de índice y un documento por transacción; para un usuario con 10k+
+transacciones eso son decenas de miles de lecturas. Esta colección guarda
+el mismo historial agrupado: un documento por usuario y período (mes o
+día) con un arreglo acotado de entradas compactas:
+
+    {
+        "user_id": "user_001",
+        "period": "2026-01",
+        "count": 412,
+        "first_ts": ISODate(...),
+        "last_ts": ISODate(...),
+        "entries": [{"t": "txn_1", "ts": ISODate(...), "r": "LOW_RISK", "s": "APPROVED", ...}]
+    }
+
+Cuando un bucket alcanza `cap` entradas, el upsert condicionado a
+`count < cap` deja de coincidir y se crea otro bucket del mismo período.
+Un timeline completo se lee con unos pocos documentos ordenados por
+`last_ts` usando el índice (user_id, last_ts).
+
+La colección `evaluations` sigue siendo la fuente de verdad. Los buckets
+se mantienen en paralelo desde que se despliega la escritura
+(`user_history_buckets_write`), aunque las lecturas sigan en
+`evaluations`; el historial anterior se completa con
+`python -m src.management backfill-user-buckets` y recién después se
+cambian las lecturas (`user_history_buckets_enabled`).
+
+El backfill escribe sus propios buckets (`backfill: true`, `_id`
+determinístico por usuario, período y número), separados de los que
+llena la escritura en vivo: se puede repetir sin duplicar ni borrar
+entradas en vivo.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from pymongo import DeleteMany, ReplaceOne, UpdateOne
+
+
+PERIOD_FORMATS: Dict[str, str] = {
+    "month": "%Y-%m",
+    "day": "%Y-%m-%d",
+}
+
+# Campo del documento de evaluación -> clave compacta de la entrada
+ENTRY_KEYS: Dict[str, str] = {
+    "transaction_id": "t",
+    "timestamp": "ts",
+    "risk_level": "r",
+    "status": "s",
+    "reasons": "rs",
+    "amount": "a",
+    "location": "loc",
+    "reviewed_by": "rb",
+    "reviewed_at": "ra",
+    "user_authenticated": "ua",
+    "user_auth_timestamp": "uat",
+    "transaction_type": "ty",
+    "description": "d",
+}
+DOCUMENT_KEYS: Dict[str, str] = {short: field for field, short in ENTRY_KEYS.items()}
+
+
+def entry_from_document(document: dict) -> dict:
+    """Convierte un documento de `evaluations` en una entrada compacta (sin nulos)"""
+    entry = {}
+    for field, short in ENTRY_KEYS.items():
+        value = document.get(field)
+        if value is None or value == []:
+            continue
+        if field == "location":
+            value = [value["latitude"], value["longitude"]]
+        entry[short] = value
+    return entry
+
+
+def document_from_entry(user_id: str, entry: dict) -> dict:
+    """Reconstruye el documento de evaluación a partir de una entrada"""
+    document = {"user_id": user_id, "reasons": []}
+    for short, value in entry.items():
+        field = DOCUMENT_KEYS.get(short)
+        if field is None:
+            continue
+        if field == "location":
+            value = {"latitude": value[0], "longitude": value[1]}
+        document[field] = value
+    return document
+
+
+class UserHistoryBucketStore:
+    """
+    Mantiene y lee los buckets de historial por usuario
+
+    Args:
+        collection: Colección `user_evaluation_buckets`
+        granularity: 'month' o 'day'
+        cap: Máximo de entradas por documento
+    """
+
+    def __init__(self, collection, granularity: str = "month", cap: int = 1000) -> None:
+        if granularity not in PERIOD_FORMATS:
+            raise ValueError(f"Unsupported bucket granularity: {granularity}")
+        if cap < 1:
+            raise ValueError("Bucket cap must be positive")
+        self.collection = collection
+        self.granularity = granularity
+        self.cap = cap
+
+    def period_of(self, timestamp: datetime) -> str:
+        return timestamp.strftime(PERIOD_FORMATS[self.granularity])
+
+    def _append_operation(self, document: dict) -> UpdateOne:
+        """Upsert que agrega la entrada al bucket abierto del período (o crea uno)"""
+        timestamp = document["timestamp"]
+        return UpdateOne(
+            {
+                "user_id": document["user_id"],
+                "period": self.period_of(timestamp),
+                "count": {"$lt": self.cap},
+                # Los buckets del backfill se reemplazan enteros al repetirlo
+                "backfill": {"$ne": True},
+            },
+            {
+                "$push": {"entries": entry_from_document(document)},
+                "$inc": {"count": 1},
+                "$min": {"first_ts": timestamp},
+                "$max": {"last_ts": timestamp},
+            },
+            upsert=True,
+        )
+
+    def append(self, document: dict) -> None:
+        """Agrega una evaluación (documento de `evaluations`) a su bucket"""
+        self.append_many([document])
+
+    def append_many(self, documents: Iterable[dict]) -> None:
+        """
+        Agrega un lote de evaluaciones en un solo `bulk_write`
+
+        Es ordenado a propósito: varias entradas del mismo bucket deben
+        evaluar `count < cap` una después de la otra.
+        """
+        operations = [self._append_operation(document) for document in documents]
+        if operations:
+            self.collection.bulk_write(operations, ordered=True)
+
+    def update_review(
+        self,
+        user_id: str,
+        transaction_id: str,
+        status: str,
+        reviewed_by: Optional[str],
+        reviewed_at: Optional[datetime],
+    ) -> None:
+        """Refleja una revisión manual en la entrada correspondiente"""
+        self.collection.update_one(
+            {"user_id": user_id, "entries.t": transaction_id},
+            {
+                "$set": {
+                    "entries.$.s": status,
+                    "entries.$.rb": reviewed_by,
+                    "entries.$.ra": reviewed_at,
+                }
+            },
+        )
+
+    def get_history(
+        self, user_id: str, since: Optional[datetime] = None, limit: Optional[int] = None
+    ) -> List[dict]:
+        """
+        Historial del usuario como documentos de evaluación, más recientes primero
+
+        Los buckets se recorren por `last_ts` descendente. Con `limit`, se
+        deja de leer cuando ya hay `limit` entradas y el siguiente bucket es
+        entero más antiguo que la última entrada conservada.
+        """
+        query: dict = {"user_id": user_id}
+        if since is not None:
+            query["last_ts"] = {"$gte": since}
+
+        entries: List[dict] = []
+        for bucket in self.collection.find(query).sort("last_ts", -1):
+            if limit and len(entries) >= limit:
+                entries.sort(key=lambda entry: entry["ts"], reverse=True)
+                del entries[limit:]
+                if bucket["last_ts"] < entries[-1]["ts"]:
+                    break
+            entries.extend(
+                entry for entry in bucket.get("entries", [])
+                if since is None or entry["ts"] >= since
+            )
+
+        entries.sort(key=lambda entry: entry["ts"], reverse=True)
+        if limit:
+            del entries[limit:]
+        return [document_from_entry(user_id, entry) for entry in entries]
+
+    def rebuild(
+        self,
+        evaluations,
+        until: Optional[datetime] = None,
+        settle_seconds: float = 300.0,
+        batch_size: int = 1000,
+    ) -> int:
+        """
+        Completa los buckets con el historial anterior a la escritura en vivo (backfill)
+
+        Recorre las evaluaciones por usuario y en orden cronológico;
+        (user_id -1, timestamp 1) es el recorrido inverso del índice
+        (user_id, timestamp) del historial, sin SORT en memoria. Por
+        usuario, cubre las evaluaciones anteriores a su primera entrada en
+        vivo (y a `until`) y reemplaza sus buckets de backfill por `_id`:
+        repetirlo es idempotente y no toca los buckets en vivo.
+
+        Args:
+            evaluations: Colección `evaluations`
+            until: Límite superior (exclusivo) de timestamps; por defecto
+                ahora menos `settle_seconds`, para no cubrir evaluaciones
+                que la escritura en vivo todavía está agregando
+            settle_seconds: Margen del límite por defecto
+            batch_size: Operaciones por `bulk_write`
+
+        Returns:
+            Número de buckets de backfill escritos
+        """
+        if until is None:
+            until = datetime.now() - timedelta(seconds=settle_seconds)
+        written = 0
+        operations: List = []
+        user_id: Optional[str] = None
+        documents: List[dict] = []
+
+        def flush_user() -> None:
+            nonlocal written, operations
+            if user_id is None:
+                return
+            buckets = self._backfill_buckets(user_id, documents)
+            operations.extend(ReplaceOne({"_id": bucket["_id"]}, bucket, upsert=True) for bucket in buckets)
+            # Buckets de backfill sobrantes de una corrida anterior (p. ej. archivado)
+            operations.append(DeleteMany({
+                "user_id": user_id,
+                "backfill": True,
+                "_id": {"$nin": [bucket["_id"] for bucket in buckets]},
+            }))
+            written += len(buckets)
+            if len(operations) >= batch_size:
+                self.collection.bulk_write(operations, ordered=False)
+                operations = []
+
+        cursor = evaluations.find({"timestamp": {"$lt": until}}).sort([("user_id", -1), ("timestamp", 1)])
+        cutoff = until
+        for document in cursor:
+            if document["user_id"] != user_id:
+                flush_user()
+                user_id, documents = document["user_id"], []
+                cutoff = min(until, self._first_live_timestamp(user_id) or until)
+            if document["timestamp"] < cutoff:
+                documents.append(document)
+        flush_user()
+
+        if operations:
+            self.collection.bulk_write(operations, ordered=False)
+        return written
+
+    def _first_live_timestamp(self, user_id: str) -> Optional[datetime]:
+        """Primera entrada escrita en vivo del usuario (lo posterior ya está en los buckets)"""
+        bucket = self.collection.find_one(
+            {"user_id": user_id, "backfill": {"$ne": True}}, sort=[("first_ts", 1)]
+        )
+        return bucket["first_ts"] if bucket else None
+
+    def _backfill_buckets(self, user_id: str, documents: List[dict]) -> List[dict]:
+        """Buckets de backfill del usuario, partidos por período y `cap`"""
+        buckets: List[dict] = []
+        current: Optional[dict] = None
+        for document in documents:
+            period = self.period_of(document["timestamp"])
+            if current is None or current["period"] != period or current["count"] >= self.cap:
+                number = current["number"] + 1 if current is not None and current["period"] == period else 0
+                current = {
+                    "_id": f"{user_id}:{period}:{number}",
+                    "user_id": user_id,
+                    "period": period,
+                    "number": number,
+                    "backfill": True,
+                    "count": 0,
+                    "first_ts": document["timestamp"],
+                    "last_ts": document["timestamp"],
+                    "entries": [],
+                }
+                buckets.append(current)
+            current["entries"].append(entry_from_document(document))
+            current["count"] += 1
+            current["last_ts"] = document["timestamp"]
+        return buckets
@@ -0,0 +1,119 @@
+"""
+User Location Store - Última ubicación de cada usuario en un set GEO de Redis
+
+Antes la ubicación se guardaba como texto JSON en `user:{id}:location` y
+cada lectura hacía `json.loads`. Ahora vive en un sorted set GEO por
+usuario (`user_geo_key`, miembro `last`): Redis la codifica como un
+geohash de 52 bits en el score (precisión ~0.6 m).
+
+La distancia al punto de la transacción se sigue calculando en
+LocationStrategy (Haversine): el caso de uso ya necesita la última
+ubicación (usuario nuevo, detalle de la alerta) y en micro-lote la lee en
+un pipeline, así que un GEOSEARCH sería un round trip más por mensaje, y
+no vería a los usuarios que aún solo tienen la clave JSON anterior.
+
+Migración (lectura dual, ver redis_keys.py): GEOPOS de la clave actual y
+de las anteriores (set GEO sin hash tag y texto JSON) van en el mismo
+pipeline, en ese orden de preferencia. Cada escritura crea el set GEO
+actual y borra las anteriores, que de todos modos expiran con el TTL.
+
+Redis GEO solo acepta latitudes en ±85.05112878 (proyección Web Mercator);
+las que quedan fuera se guardan en ese límite (no hay tráfico real allí y
+así no hace falta un segundo formato).
+"""
+import json
+from typing import Dict, Iterable, Optional
+
+from src.infrastructure.hedged_reads import run_read
+from src.infrastructure.redis_keys import (
+    legacy_geo_key,
+    legacy_location_key,
+    pipeline,
+    user_geo_key,
+)
+
+
+LOCATION_MEMBER = "last"
+GEO_MAX_LATITUDE = 85.05112878
+
+
+class UserLocationStore:
+    """
+    Lee y escribe la última ubicación de los usuarios
+
+    Args:
+        redis: Cliente `redis.asyncio` (decode_responses=True)
+        ttl: Tiempo de vida por defecto en segundos
+        legacy_reads: Consultar también las claves del esquema anterior
+        reads: Cliente para las lecturas (HedgedRedis); por defecto `redis`
+    """
+
+    def __init__(self, redis, ttl: int, legacy_reads: bool = True, reads=None) -> None:
+        self.redis = redis
+        self.reads = reads if reads is not None else redis
+        self.ttl = ttl
+        self.legacy_reads = legacy_reads
+
+    async def get(self, user_id: str) -> Optional[dict]:
+        """Última ubicación (`{"latitude", "longitude"}`) en un round trip"""
+        async def read(client):
+            async with pipeline(client, transaction=False) as pipe:
+                self._queue_get(pipe, user_id)
+                return await pipe.execute()
+
+        return self._parse(await run_read(self.reads, read))
+
+    async def get_many(self, user_ids: Iterable[str]) -> Dict[str, Optional[dict]]:
+        """Última ubicación de varios usuarios en un solo pipeline (micro-lotes del worker)"""
+        user_ids = list(dict.fromkeys(user_ids))
+        if not user_ids:
+            return {}
+
+        async def read(client):
+            async with pipeline(client, transaction=False) as pipe:
+                for user_id in user_ids:
+                    self._queue_get(pipe, user_id)
+                return await pipe.execute()
+
+        results = await run_read(self.reads, read)
+        per_user = len(results) // len(user_ids)
+        return {
+            user_id: self._parse(results[i * per_user:(i + 1) * per_user])
+            for i, user_id in enumerate(user_ids)
+        }
+
+    def _queue_get(self, pipe, user_id: str) -> None:
+        pipe.geopos(user_geo_key(user_id), LOCATION_MEMBER)
+        if self.legacy_reads:
+            pipe.geopos(legacy_geo_key(user_id), LOCATION_MEMBER)
+            pipe.get(legacy_location_key(user_id))
+
+    @staticmethod
+    def _parse(results: list) -> Optional[dict]:
+        for positions in results[:2]:
+            position = positions[0] if positions else None
+            if position is not None:
+                longitude, latitude = position
+                return {"latitude": float(latitude), "longitude": float(longitude)}
+
+        legacy = results[2] if len(results) > 2 else None
+        if legacy is None:
+            return None
+        try:
+            return json.loads(legacy)
+        except json.JSONDecodeError:
+            return None
+
+    async def set(self, user_id: str, latitude: float, longitude: float, ttl: int = None) -> None:
+        """Reemplaza la última ubicación del usuario y borra las claves anteriores"""
+        if ttl is None:
+            ttl = self.ttl
+
+        latitude = max(-GEO_MAX_LATITUDE, min(GEO_MAX_LATITUDE, latitude))
+
+        async with pipeline(self.redis) as pipe:
+            pipe.geoadd(user_geo_key(user_id), (longitude, latitude, LOCATION_MEMBER))
+            pipe.expire(user_geo_key(user_id), ttl)
+            pipe.delete(legacy_geo_key(user_id))
+            pipe.delete(legacy_location_key(user_id))
+            await pipe.execute()
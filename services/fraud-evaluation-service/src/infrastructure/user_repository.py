@@ -6,6 +6,8 @@ from typing import Optional
 from datetime import datetime
 from pymongo import MongoClient
 from src.domain.models import User
+from src.config import settings
+from src.infrastructure.index_catalog import ensure_indexes_once
 
 
 class UserRepository:
@@ -26,10 +28,9 @@ class UserRepository:
         self.db = self.client[database_name]
         self.users = self.db.users
         
-        # Crear índices para optimizar búsquedas
-        self.users.create_index("user_id", unique=True)
-        self.users.create_index("email", unique=True)
-        self.users.create_index("verification_token")
+        # Crear índices para optimizar búsquedas (declarados en el catálogo)
+        if settings.mongodb_auto_create_indexes:
+            ensure_indexes_once({"users": self.users})
     
     async def save_user(self, user: User) -> None:
         """
@@ -0,0 +1,131 @@
+"""
+Worker Autoscaler - Número de procesos del worker según el lag de la cola
+
+Los procesos del worker se escalaban a mano (`kill -TTIN/-TTOU` al
+supervisor). WorkerAutoscaler recomienda cuántos hacen falta con la
+muestra del backlog de las métricas del worker (profundidad y tasa de
+acks de las colas o streams de transacciones, ver `backlog_sampler` en
+worker_metrics.py), y el supervisor aplica la recomendación con `scale()`:
+
+- Regla proporcional (como el HorizontalPodAutoscaler de Kubernetes):
+  deseados = ceil(actuales * lag / lag objetivo). Dentro de la tolerancia
+  no se cambia nada; cada paso a lo sumo duplica los procesos.
+- Backlog sin acks (lag infinito): un proceso más por paso, solo desde
+  `min_depth` mensajes listos. Con menos, la tasa de acks todavía no se
+  midió o decayó a 0 tras un rato sin tráfico: el lag es desconocido y
+  se mantiene el número actual (cada paso reinicia procesos y reparte
+  los shards de nuevo).
+- Hacia arriba se escala en el acto; hacia abajo se usa la recomendación
+  más alta de los últimos `scale_down_seconds`, para no quitar procesos
+  por un bache de tráfico y volver a agregarlos al minuto.
+- Siempre entre `min_workers` y `max_workers`. Si la muestra falla (API
+  de management o Redis caídos) se mantiene el número actual.
+
+Los ajustes manuales con SIGTTIN/SIGTTOU siguen funcionando, pero con el
+autoscaler activo duran hasta la siguiente evaluación.
+"""
+import math
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from src.infrastructure.admission_control import QueueSample
+
+
+class WorkerAutoscaler:
+    """
+    Recomienda el número de procesos del worker
+
+    Síncrono: corre en el bucle del supervisor, que no tiene event loop.
+
+    Args:
+        sample: Función que devuelve la QueueSample actual
+        min_workers: Procesos mínimos
+        max_workers: Procesos máximos
+        target_lag_seconds: Lag del consumidor que se busca sostener
+        interval: Segundos entre evaluaciones
+        scale_down_seconds: Ventana de estabilización para reducir
+        tolerance: Desvío relativo del lag que no provoca cambios
+        min_depth: Mensajes listos desde los que un backlog sin acks escala
+        clock: Reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        sample: Callable[[], QueueSample],
+        min_workers: int,
+        max_workers: int,
+        target_lag_seconds: float,
+        interval: float = 15.0,
+        scale_down_seconds: float = 300.0,
+        tolerance: float = 0.1,
+        min_depth: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if min_workers < 1 or max_workers < min_workers:
+            raise ValueError("worker bounds must satisfy 1 <= min_workers <= max_workers")
+        if target_lag_seconds <= 0:
+            raise ValueError("target_lag_seconds must be positive")
+        self._sample = sample
+        self.min_workers = min_workers
+        self.max_workers = max_workers
+        self.target_lag_seconds = target_lag_seconds
+        self.interval = interval
+        self.scale_down_seconds = scale_down_seconds
+        self.tolerance = tolerance
+        self.min_depth = min_depth
+        self.clock = clock
+        self.last_sample: Optional[QueueSample] = None
+        self._next_check = 0.0
+        # (momento, recomendación) dentro de la ventana de estabilización
+        self._recommendations: Deque[Tuple[float, int]] = deque()
+        self.sample_errors_total = 0
+
+    def recommend(self, current: int, sample: QueueSample) -> int:
+        """Procesos necesarios para el lag de la muestra (sin estabilizar)"""
+        lag = sample.known_lag(self.min_depth)
+        if lag is None:
+            desired = current
+        elif math.isinf(lag):
+            desired = current + 1
+        else:
+            ratio = lag / self.target_lag_seconds
+            if abs(ratio - 1.0) <= self.tolerance:
+                desired = current
+            else:
+                desired = min(math.ceil(current * ratio), 2 * current)
+        return max(self.min_workers, min(self.max_workers, desired))
+
+    def desired(self, current: int) -> Optional[int]:
+        """
+        Número de procesos a aplicar, o None si no toca evaluar o no cambia
+
+        Se llama en cada vuelta del supervisor; solo muestrea cada `interval`.
+        """
+        now = self.clock()
+        if now < self._next_check:
+            return None
+        self._next_check = now + self.interval
+        try:
+            self.last_sample = self._sample()
+        except Exception as e:
+            self.sample_errors_total += 1
+            self.last_sample = None
+            print(f"Autoscaler sample failed, keeping {current} workers: {e}")
+            return None
+
+        self._recommendations.append((now, self.recommend(current, self.last_sample)))
+        while self._recommendations[0][0] < now - self.scale_down_seconds:
+            self._recommendations.popleft()
+        latest = self._recommendations[-1][1]
+        if latest > current:
+            workers = latest
+        else:
+            workers = min(current, max(workers for _, workers in self._recommendations))
+        if workers == current:
+            return None
+        print(
+            f"Autoscaler: {current} -> {workers} workers "
+            f"(depth {self.last_sample.depth}, ack rate {self.last_sample.ack_rate:.1f}/s)"
+        )
+        return workers
@@ -0,0 +1,177 @@
+"""
+Worker Metrics - Señales del worker para observarlo y escalarlo
+
+El worker solo escribía líneas con `print`: para decidir cuántos procesos
+hacen falta había que mirar la consola de RabbitMQ. Cada proceso del
+worker lleva ahora un WorkerStats, que el consumidor alimenta en cada
+entrega y en cada decisión de ack/nack:
+
+- Mensajes por resultado (`written`, `duplicate`, `failed`, `retry`,
+  `invalid`, `error`, `unsaved`) y mensajes por segundo (ventana móvil).
+- En vuelo: entregados y todavía sin decisión (incluye los que esperan
+  la escritura de su lote).
+- Latencias en histogramas: la evaluación (llamada al engine) y el
+  procesamiento completo (entrega -> ack/nack, con la escritura).
+- Profundidad del backlog y lag del consumidor de las colas que consume
+  el worker, tomada cada `worker_metrics_sample_seconds`: API de
+  management de RabbitMQ o XINFO GROUPS con
+  `message_transport = "redis_streams"` (ver `backlog_sampler`).
+
+Se exponen en formato Prometheus en el puerto lateral del worker (ver
+`serve_metrics` en metrics.py) y los usa WorkerAutoscaler (ver
+worker_autoscaler.py).
+"""
+import asyncio
+import time
+from bisect import bisect_left
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Sequence, Tuple
+
+from src.config import settings
+from src.infrastructure.admission_control import QueueSample, RabbitMQManagementSampler
+from src.infrastructure.redis_streams import REDIS_STREAMS, RedisStreamsSampler, transaction_streams
+
+
+# Segundos; cubren desde una evaluación con caché caliente hasta un lote lento
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    """Histograma acumulable con los buckets `le` de Prometheus"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float, count: int = 1) -> None:
+        self._counts[bisect_left(self.buckets, seconds)] += count
+        self.sum += seconds * count
+        self.count += count
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(`le`, observaciones <= le) por bucket, terminando en `+Inf`"""
+        result, total = [], 0
+        for bound, count in zip(self.buckets, self._counts):
+            total += count
+            result.append((f"{bound:g}", total))
+        result.append(("+Inf", self.count))
+        return result
+
+
+class ThroughputMeter:
+    """
+    Eventos por segundo en una ventana móvil
+
+    Cuenta por segundo entero (memoria acotada a `window` contadores, no
+    un timestamp por mensaje).
+    """
+
+    def __init__(self, window: float = 10.0, clock: Callable[[], float] = time.monotonic) -> None:
+        if window <= 0:
+            raise ValueError("window must be positive")
+        self.window = window
+        self._clock = clock
+        self._seconds: Deque[List[int]] = deque()
+
+    def add(self, count: int = 1) -> None:
+        second = int(self._clock())
+        if self._seconds and self._seconds[-1][0] == second:
+            self._seconds[-1][1] += count
+        else:
+            self._seconds.append([second, count])
+        self._trim(second)
+
+    def rate(self) -> float:
+        self._trim(int(self._clock()))
+        return sum(count for _, count in self._seconds) / self.window
+
+    def _trim(self, second: int) -> None:
+        while self._seconds and self._seconds[0][0] <= second - self.window:
+            self._seconds.popleft()
+
+
+class WorkerStats:
+    """
+    Contadores, latencias y última muestra del backlog de un proceso
+
+    Los mensajes se siguen por identidad del objeto (no por delivery tag):
+    tras una reconexión los tags se reinician y los mensajes viejos todavía
+    reciben su decisión.
+
+    Args:
+        window: Ventana (s) de los mensajes por segundo
+        clock: Reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(self, window: float = 10.0, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self._received: Dict[int, float] = {}
+        self.outcomes: Dict[str, int] = {}
+        self.throughput = ThroughputMeter(window, clock)
+        self.evaluation_latency = LatencyHistogram()
+        self.processing_latency = LatencyHistogram()
+        self.last_sample: Optional[QueueSample] = None
+        self.sample_errors_total = 0
+
+    @property
+    def in_flight(self) -> int:
+        """Mensajes entregados todavía sin ack/nack decidido"""
+        return len(self._received)
+
+    def received(self, message) -> None:
+        self._received.setdefault(id(message), self._clock())
+
+    def evaluated(self, seconds: float, count: int = 1) -> None:
+        """Duración de la evaluación (en micro-lotes, la del lote para cada mensaje)"""
+        self.evaluation_latency.observe(seconds, count)
+
+    def observe(self, message, outcome: str) -> None:
+        """Decisión final del mensaje: resultado, throughput y latencia"""
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.throughput.add()
+        started = self._received.pop(id(message), None)
+        if started is not None:
+            self.processing_latency.observe(self._clock() - started)
+
+    def messages_per_second(self) -> float:
+        return self.throughput.rate()
+
+    async def sample_periodically(self, sample: Callable[[], Awaitable[QueueSample]], interval: float) -> None:
+        """Actualiza la muestra del backlog; un fallo deja la muestra vacía"""
+        while True:
+            try:
+                self.last_sample = await sample()
+            except Exception as e:
+                self.sample_errors_total += 1
+                self.last_sample = None
+                print(f"Worker backlog sample failed: {e}")
+            await asyncio.sleep(interval)
+
+
+def backlog_sampler(timeout: float = 2.0):
+    """Muestra del backlog de todas las colas (o streams) de transacciones según el transporte"""
+    if settings.message_transport == REDIS_STREAMS:
+        return RedisStreamsSampler(
+            settings.redis_streams_url or settings.redis_url, transaction_streams(None), settings.redis_stream_group
+        )
+    return RabbitMQManagementSampler(
+        settings.rabbitmq_management_url, settings.rabbitmq_transactions_queue, timeout=timeout
+    )
+
+
+# Un WorkerStats por nombre y proceso
+_STATS: Dict[str, WorkerStats] = {}
+
+
+def get_worker_stats(name: str, **config) -> WorkerStats:
+    """WorkerStats compartido del proceso (`config` solo aplica al crearlo)"""
+    stats = _STATS.get(name)
+    if stats is None:
+        stats = _STATS[name] = WorkerStats(**config)
+    return stats
+
+
+def all_worker_stats() -> Dict[str, WorkerStats]:
+    return dict(_STATS)
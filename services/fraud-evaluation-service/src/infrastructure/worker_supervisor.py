@@ -0,0 +1,263 @@
+"""
+Worker Supervisor - N procesos del worker con afinidad de usuario
+
+Un solo proceso de Python evalúa en un solo core. El supervisor hace fork
+de `workers` procesos, le asigna a cada uno sus shards (ver sharding.py) y
+los mantiene vivos:
+
+- Reinicio: un proceso que muere se vuelve a arrancar con backoff
+  exponencial (se reinicia el backoff si vivió `stable_seconds`).
+- Escalado: `scale(n)` recalcula la asignación y reinicia los procesos
+  cuyos shards cambian. Nunca hay más procesos que shards. Para mantener
+  el balance cada proceso existente cede algún shard, así que en la
+  práctica casi todos se reinician en cada paso (y pierden su estado
+  local, ver local_risk_state.py). Los afectados se detienen juntos
+  (SIGTERM a todos y después se espera a que drenen y confirmen lo
+  pendiente, a lo sumo `stop_timeout` en total) y recién entonces
+  arrancan con sus nuevos shards, para que un shard nunca tenga dos
+  consumidores; además el consumo es exclusivo.
+
+Señales (convención de gunicorn): SIGTTIN agrega un proceso, SIGTTOU
+quita uno, SIGTERM/SIGINT detienen todos ordenadamente. Los handlers solo
+anotan el cambio pedido; el bucle de `run()` lo aplica entre vueltas, así
+un `scale()` nunca interrumpe a `reconcile()` a mitad de camino.
+
+Con `shard_count = 0` todos los procesos consumen la cola única (sin
+afinidad): `target` recibe None.
+
+Con un WorkerAutoscaler (ver worker_autoscaler.py) el supervisor ajusta
+el número de procesos según el lag de la cola en cada vuelta del bucle.
+Cada hijo conoce su posición (`worker_index()`), p. ej. para elegir su
+puerto de métricas.
+"""
+import multiprocessing
+import signal
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+from src.infrastructure.sharding import assign_shards
+from src.infrastructure.worker_autoscaler import WorkerAutoscaler
+
+
+WorkerTarget = Callable[[Optional[List[int]]], None]
+
+
+@dataclass
+class _Slot:
+    shards: Optional[List[int]]
+    process: Optional[multiprocessing.Process] = None
+    started_at: float = 0.0
+    failures: int = 0
+    next_start: float = 0.0
+
+
+# Posición del proceso hijo en el supervisor (None fuera de un supervisor)
+_WORKER_INDEX: Optional[int] = None
+
+
+def worker_index() -> Optional[int]:
+    return _WORKER_INDEX
+
+
+def _child_main(target: WorkerTarget, shards: Optional[List[int]], index: Optional[int] = None) -> None:
+    """Entrada del proceso hijo: las señales de escalado son del supervisor"""
+    global _WORKER_INDEX
+    _WORKER_INDEX = index
+    for sig in (signal.SIGTTIN, signal.SIGTTOU):
+        signal.signal(sig, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    target(shards)
+
+
+class WorkerSupervisor:
+    """
+    Arranca, reinicia y escala los procesos del worker
+
+    Args:
+        target: Función del proceso hijo; recibe sus shards
+        workers: Procesos iniciales
+        shard_count: Colas por shard (0 = cola única)
+        context: Contexto de multiprocessing (fork por defecto)
+        restart_backoff: Espera inicial (s) antes de reiniciar un proceso caído
+        max_backoff: Espera máxima entre reinicios
+        stable_seconds: Vida a partir de la cual se olvidan los fallos previos
+        stop_timeout: Espera (s) a que un proceso drene antes de matarlo
+        clock: Reloj monotónico (inyectable en tests)
+        autoscaler: Escalado según el lag de la cola (None = manual)
+    """
+
+    def __init__(
+        self,
+        target: WorkerTarget,
+        workers: int,
+        shard_count: int,
+        context=None,
+        restart_backoff: float = 1.0,
+        max_backoff: float = 30.0,
+        stable_seconds: float = 30.0,
+        stop_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic,
+        autoscaler: Optional[WorkerAutoscaler] = None,
+    ) -> None:
+        if workers < 1:
+            raise ValueError("workers must be positive")
+        self.target = target
+        self.shard_count = shard_count
+        self.context = context or multiprocessing.get_context("fork")
+        self.restart_backoff = restart_backoff
+        self.max_backoff = max_backoff
+        self.stable_seconds = stable_seconds
+        self.stop_timeout = stop_timeout
+        self.clock = clock
+        self.autoscaler = autoscaler
+        self.restarts_total = 0
+        self._running = False
+        # Procesos pedidos por SIGTTIN/SIGTTOU y aún no aplicados
+        self._requested_delta = 0
+        self._slots: Dict[int, _Slot] = {
+            index: _Slot(shards) for index, shards in enumerate(self._assignment(self._capped(workers)))
+        }
+
+    @property
+    def workers(self) -> int:
+        return len(self._slots)
+
+    def assignment(self) -> Dict[int, Optional[List[int]]]:
+        return {index: slot.shards for index, slot in self._slots.items()}
+
+    def _capped(self, workers: int) -> int:
+        """Cada proceso debe tener al menos un shard"""
+        if self.shard_count and workers > self.shard_count:
+            print(f"Only {self.shard_count} shards: capping {workers} workers to {self.shard_count}")
+            return self.shard_count
+        return workers
+
+    def _assignment(self, workers: int) -> List[Optional[List[int]]]:
+        if not self.shard_count:
+            return [None] * workers
+        return assign_shards(self.shard_count, workers)
+
+    def reconcile(self) -> None:
+        """Arranca los procesos que faltan o murieron (respetando el backoff)"""
+        now = self.clock()
+        for index, slot in self._slots.items():
+            process = slot.process
+            if process is not None and process.is_alive():
+                if now - slot.started_at >= self.stable_seconds:
+                    slot.failures = 0
+                continue
+            if process is not None:
+                # Murió: programar el reinicio con backoff
+                print(f"Worker {index} exited with code {process.exitcode}")
+                slot.process = None
+                slot.failures += 1
+                slot.next_start = now + min(
+                    self.max_backoff, self.restart_backoff * 2 ** (slot.failures - 1)
+                )
+                self.restarts_total += 1
+            if now >= slot.next_start:
+                self._start(index, slot)
+
+    def _start(self, index: int, slot: _Slot) -> None:
+        process = self.context.Process(
+            target=_child_main, args=(self.target, slot.shards, index), name=f"worker-{index}"
+        )
+        process.start()
+        slot.process = process
+        slot.started_at = self.clock()
+        print(f"Worker {index} started (pid {process.pid}, shards {slot.shards})")
+
+    def _stop(self, slots: Dict[int, _Slot]) -> None:
+        """
+        Detiene varios procesos en paralelo
+
+        SIGTERM a todos primero (drenan y confirman lo pendiente a la vez)
+        y después se espera con un plazo común de `stop_timeout`: detener
+        N procesos no tarda N veces el drenado.
+        """
+        stopping = []
+        for index, slot in slots.items():
+            process, slot.process = slot.process, None
+            if process is not None and process.is_alive():
+                process.terminate()
+                stopping.append((index, process))
+        deadline = self.clock() + self.stop_timeout
+        for index, process in stopping:
+            process.join(max(0.0, deadline - self.clock()))
+            if process.is_alive():
+                print(f"Worker {index} did not stop in {self.stop_timeout}s, killing it")
+                process.kill()
+                process.join()
+
+    def scale(self, workers: int) -> None:
+        """Cambia el número de procesos reiniciando los que cambian de shards"""
+        if workers < 1:
+            return
+        workers = self._capped(workers)
+        if workers == self.workers:
+            return
+        target = dict(enumerate(self._assignment(workers)))
+
+        # Primero detener, todos juntos: procesos sobrantes y los que
+        # cambian de shards
+        affected = {
+            index: slot for index, slot in self._slots.items()
+            if index not in target or slot.shards != target[index]
+        }
+        self._stop(affected)
+        for index, slot in affected.items():
+            if index not in target:
+                del self._slots[index]
+                continue
+            slot.shards = target[index]
+            slot.failures = 0
+            slot.next_start = 0.0
+
+        for index, shards in target.items():
+            self._slots.setdefault(index, _Slot(shards))
+        print(f"Scaled to {workers} workers")
+        if self._running:
+            self.reconcile()
+
+    def request_scale(self, delta: int) -> None:
+        """Pide agregar o quitar procesos (seguro desde un handler de señal)"""
+        self._requested_delta += delta
+
+    def apply_requested_scale(self) -> None:
+        """Aplica los cambios pedidos por señales desde la última vuelta"""
+        delta, self._requested_delta = self._requested_delta, 0
+        if delta:
+            self.scale(max(1, self.workers + delta))
+
+    def autoscale(self) -> None:
+        """Aplica la recomendación del autoscaler, si cambió"""
+        if self.autoscaler is None:
+            return
+        workers = self.autoscaler.desired(self.workers)
+        if workers is not None:
+            self.scale(workers)
+
+    def stop(self) -> None:
+        self._running = False
+
+    def stop_all(self) -> None:
+        self._stop(self._slots)
+
+    def run(self, poll_interval: float = 1.0) -> None:
+        """Bucle del supervisor hasta SIGTERM/SIGINT"""
+        self._running = True
+        signal.signal(signal.SIGTERM, lambda *_: self.stop())
+        signal.signal(signal.SIGINT, lambda *_: self.stop())
+        signal.signal(signal.SIGTTIN, lambda *_: self.request_scale(1))
+        signal.signal(signal.SIGTTOU, lambda *_: self.request_scale(-1))
+        try:
+            while self._running:
+                self.apply_requested_scale()
+                self.reconcile()
+                self.autoscale()
+                time.sleep(poll_interval)
+        finally:
+            print("Stopping workers...")
+            self.stop_all()
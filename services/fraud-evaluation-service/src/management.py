@@ -0,0 +1,221 @@
+"""
+Comandos de mantenimiento (CLI)
+
+Tareas operativas que no pertenecen al camino de una petición HTTP ni al
+del worker: backfills, bootstrap de índices, etc.
+
+Uso (desde el directorio que contiene `src/`, p. ej. /app en los contenedores):
+    python -m src.management backfill-rollups [--until 2026-01-12T10:00]
+    python -m src.management bootstrap-indexes [--prune]
+    python -m src.management archive [--older-than-days 180]
+    python -m src.management backfill-user-buckets [--until 2026-01-12T10:00]
+    python -m src.management parked-list [--limit 20]
+    python -m src.management parked-replay [--limit N] [--origin transactions.shard.3]
+    python -m src.management overflow-replay [--limit N] [--max-depth 10000]
+"""
+import argparse
+import sys
+from datetime import datetime
+from typing import List, Optional
+from src.config import settings
+
+
+def _build_repository():
+    """
+    Crea el adaptador de MongoDB con la configuración del entorno
+
+    Sin `mongodb_timeout_ms`: ese límite es para las peticiones, y los
+    backfills y el archivado recorren colecciones enteras (como
+    `bootstrap_indexes`, que usa un cliente sin límite).
+    """
+    from src.adapters import MongoDBAdapter
+
+    return MongoDBAdapter(settings.mongodb_url, settings.mongodb_database, timeout_ms=0)
+
+
+def backfill_rollups(args: argparse.Namespace) -> int:
+    """Reconstruye `evaluation_rollups` desde la colección de evaluaciones"""
+    repository = _build_repository()
+    until = datetime.fromisoformat(args.until) if args.until else None
+    written = repository.rollups.rebuild(repository.evaluations, until=until)
+    print(f"Rollups rebuilt: {written} buckets written")
+    return 0
+
+
+def bootstrap_indexes(args: argparse.Namespace) -> int:
+    """Construye los índices del catálogo y opcionalmente elimina los obsoletos"""
+    from pymongo import MongoClient
+    from src.infrastructure.index_catalog import (
+        catalog_collections,
+        ensure_indexes,
+        obsolete_indexes,
+    )
+
+    db = MongoClient(settings.mongodb_url)[settings.mongodb_database]
+    collections = {name: db[name] for name in catalog_collections()}
+
+    for name, index_names in ensure_indexes(collections).items():
+        print(f"{name}: {', '.join(index_names)}")
+
+    if args.prune:
+        for name, collection in collections.items():
+            for index_name in obsolete_indexes(name, collection.index_information()):
+                collection.drop_index(index_name)
+                print(f"{name}: dropped obsolete index {index_name}")
+    return 0
+
+
+def archive_evaluations(args: argparse.Namespace) -> int:
+    """Mueve las evaluaciones antiguas del tier caliente al archivo"""
+    from src.infrastructure.evaluation_archive import EvaluationArchiver
+
+    repository = _build_repository()
+    archiver = EvaluationArchiver(
+        repository.evaluations, repository.archive, batch_size=args.batch_size
+    )
+    moved = archiver.run(args.older_than_days)
+    print(f"Archived {moved} evaluations older than {args.older_than_days} days")
+    return 0
+
+
+def backfill_user_buckets(args: argparse.Namespace) -> int:
+    """Completa `user_evaluation_buckets` con el historial anterior a la escritura en vivo"""
+    repository = _build_repository()
+    until = datetime.fromisoformat(args.until) if args.until else None
+    written = repository.user_buckets.rebuild(repository.evaluations, until=until)
+    print(f"User history buckets backfilled: {written} buckets written")
+    return 0
+
+
+def _rabbitmq_channel():
+    """Canal de pika bloqueante con la configuración del entorno"""
+    import pika
+
+    connection = pika.BlockingConnection(pika.URLParameters(settings.rabbitmq_url))
+    return connection, connection.channel()
+
+
+def parked_list(args: argparse.Namespace) -> int:
+    """Muestra los mensajes de la cola de parking sin consumirlos"""
+    from src.infrastructure.retry_topology import list_parked, parking_depth
+
+    connection, channel = _rabbitmq_channel()
+    try:
+        depth = parking_depth(channel, settings.rabbitmq_transactions_queue)
+        parked = list_parked(channel, settings.rabbitmq_transactions_queue, limit=args.limit)
+    finally:
+        connection.close()
+    print(f"Parked messages: {depth} (showing {len(parked)})")
+    for message in parked:
+        print(message.summary())
+    return 0
+
+
+def parked_replay(args: argparse.Namespace) -> int:
+    """Reinyecta los mensajes estacionados en su cola de origen"""
+    from src.infrastructure.retry_topology import replay_parked
+
+    connection, channel = _rabbitmq_channel()
+    try:
+        replayed = replay_parked(
+            channel, settings.rabbitmq_transactions_queue, limit=args.limit, origin=args.origin
+        )
+    finally:
+        connection.close()
+    print(f"Replayed {replayed} parked messages")
+    return 0
+
+
+def overflow_replay(args: argparse.Namespace) -> int:
+    """Reinyecta las transacciones diferidas por el control de admisión"""
+    from src.infrastructure.admission_control import replay_overflow
+
+    connection, channel = _rabbitmq_channel()
+    try:
+        replayed = replay_overflow(
+            channel,
+            settings.rabbitmq_transactions_queue,
+            settings.rabbitmq_shard_count,
+            limit=args.limit,
+            max_depth=args.max_depth,
+        )
+    finally:
+        connection.close()
+    print(f"Replayed {replayed} deferred transactions")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Define los subcomandos disponibles"""
+    parser = argparse.ArgumentParser(prog="python -m src.management")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    rollups = subcommands.add_parser(
+        "backfill-rollups", help="Rebuild hourly/daily trend rollups from evaluations"
+    )
+    rollups.add_argument(
+        "--until",
+        help="Only rebuild buckets before this ISO timestamp (avoids overwriting live increments)",
+    )
+    rollups.set_defaults(handler=backfill_rollups)
+
+    indexes = subcommands.add_parser(
+        "bootstrap-indexes", help="Build the indexes declared in the index catalog"
+    )
+    indexes.add_argument(
+        "--prune", action="store_true", help="Drop indexes that no catalogued query needs"
+    )
+    indexes.set_defaults(handler=bootstrap_indexes)
+
+    archive = subcommands.add_parser(
+        "archive", help="Move old evaluations to compressed day-partitioned archive files"
+    )
+    archive.add_argument(
+        "--older-than-days", type=int, default=settings.archive_after_days,
+        help="Archive evaluations older than this many days",
+    )
+    archive.add_argument("--batch-size", type=int, default=5000)
+    archive.set_defaults(handler=archive_evaluations)
+
+    buckets = subcommands.add_parser(
+        "backfill-user-buckets", help="Backfill per-user bucketed history from evaluations"
+    )
+    buckets.add_argument(
+        "--until", help="Only evaluations before this ISO timestamp (default: now minus 5 minutes)"
+    )
+    buckets.set_defaults(handler=backfill_user_buckets)
+
+    listing = subcommands.add_parser(
+        "parked-list", help="Show messages parked after exhausting their retries"
+    )
+    listing.add_argument("--limit", type=int, default=20)
+    listing.set_defaults(handler=parked_list)
+
+    replay = subcommands.add_parser(
+        "parked-replay", help="Move parked messages back to their origin queue with attempts reset"
+    )
+    replay.add_argument("--limit", type=int, default=None, help="Replay at most this many messages")
+    replay.add_argument("--origin", help="Only replay messages parked from this queue")
+    replay.set_defaults(handler=parked_replay)
+
+    overflow = subcommands.add_parser(
+        "overflow-replay", help="Move transactions deferred by admission control to their shard queues"
+    )
+    overflow.add_argument("--limit", type=int, default=None, help="Replay at most this many messages")
+    overflow.add_argument(
+        "--max-depth", type=int, default=settings.overflow_replay_max_depth,
+        help="Stop when the transactions backlog reaches this many messages",
+    )
+    overflow.set_defaults(handler=overflow_replay)
+
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Punto de entrada de la CLI"""
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Supervisor del worker - Un proceso de evaluación por core
+
+Arranca `worker_processes` procesos del worker (0 = uno por core) y les
+reparte los shards de transacciones por `user_id`, de modo que el estado
+de cada usuario lo maneja un solo proceso (ver
+infrastructure/worker_supervisor.py).
+
+Escalado en caliente: `kill -TTIN <pid>` agrega un proceso y
+`kill -TTOU <pid>` quita uno. Con `worker_autoscale_enabled` el número de
+procesos se ajusta solo según el lag de la cola (ver
+infrastructure/worker_autoscaler.py).
+"""
+import os
+from typing import Optional
+
+from src.config import settings
+from src.infrastructure.worker_autoscaler import WorkerAutoscaler
+from src.infrastructure.worker_metrics import backlog_sampler
+from src.infrastructure.worker_supervisor import WorkerSupervisor
+from worker.worker import start_worker
+
+
+def build_autoscaler() -> Optional[WorkerAutoscaler]:
+    """Autoscaler según la configuración (None si está deshabilitado)"""
+    if not settings.worker_autoscale_enabled:
+        return None
+    max_workers = settings.worker_autoscale_max or os.cpu_count() or 1
+    if settings.rabbitmq_shard_count:
+        # Más procesos que shards quedarían sin cola que consumir
+        max_workers = min(max_workers, settings.rabbitmq_shard_count)
+    return WorkerAutoscaler(
+        backlog_sampler().sample_blocking,
+        min_workers=min(settings.worker_autoscale_min, max_workers),
+        max_workers=max_workers,
+        target_lag_seconds=settings.worker_autoscale_target_lag_seconds,
+        interval=settings.worker_autoscale_interval_seconds,
+        scale_down_seconds=settings.worker_autoscale_scale_down_seconds,
+        min_depth=settings.worker_autoscale_min_depth,
+    )
+
+
+def start_supervisor():
+    workers = settings.worker_processes or os.cpu_count() or 1
+    autoscaler = build_autoscaler()
+    if autoscaler is not None:
+        workers = max(autoscaler.min_workers, min(autoscaler.max_workers, workers))
+        print(f"Autoscaling between {autoscaler.min_workers} and {autoscaler.max_workers} worker processes")
+    print(f"Starting {workers} worker processes ({settings.rabbitmq_shard_count} shards)")
+    WorkerSupervisor(
+        start_worker, workers, settings.rabbitmq_shard_count, autoscaler=autoscaler
+    ).run()
+
+
+if __name__ == "__main__":
+    start_supervisor()
@@ -7,151 +7,393 @@ Cumple Single Responsibility: Solo consume mensajes y ejecuta casos de uso
 Nota del desarrollador (María Gutiérrez):
 La IA sugirió procesar los mensajes en el mismo hilo. Agregué manejo
 de errores y dead letter queue para mayor resiliencia.
+
+Las evaluaciones se persisten por lotes (write-behind): cada mensaje se
+confirma recién cuando el lote que contiene su evaluación fue escrito.
+
+El consumidor es asyncio (aio-pika) con un único event loop de larga vida:
+hasta `worker_concurrency` evaluaciones en vuelo y `worker_prefetch_count`
+mensajes sin confirmar (ver infrastructure/evaluation_consumer.py).
+
+Con `worker_batch_size` > 0 los mensajes se evalúan y confirman por
+micro-lotes (un ack múltiple por lote).
+
+Los mensajes que fallan se reintentan con backoff en colas de espera y
+terminan en la cola de parking (ver infrastructure/retry_topology.py).
+
+Con `rabbitmq_shard_count` > 0 el proceso consume solo los shards que le
+asigna el supervisor (ver supervisor.py e infrastructure/sharding.py).
+
+Cada proceso también materializa la cola de revisión manual en la
+colección `review_queue` de los analistas (ver infrastructure/review_queue.py).
+
+Métricas (backlog, lag, mensajes por segundo, en vuelo, resultados y
+latencias) en `http://<host>:<worker_metrics_port + índice>/metrics`
+(ver infrastructure/worker_metrics.py).
+
+Con `message_transport = "redis_streams"` los mismos consumidores leen de
+Redis Streams con un consumer group en lugar de RabbitMQ (ver
+`consume_streams` e infrastructure/redis_streams.py).
 """
-import pika
-import json
 import asyncio
-from decimal import Decimal
-from src.adapters import (
-    MongoDBAdapter,
-    RedisAdapter,
-    RabbitMQAdapter,
-)
+import signal
+import socket
+from typing import List, Optional
+
+import aio_pika
+
 from src.config import settings
-from src.domain.strategies.amount_threshold import AmountThresholdStrategy
-from src.domain.strategies.location_check import LocationStrategy
-from src.domain.strategies.device_validation import DeviceValidationStrategy
-from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
-from src.domain.strategies.unusual_time import UnusualTimeStrategy
-from src.application.use_cases import EvaluateTransactionUseCase
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.evaluation_engine import EvaluationEngine
+from src.infrastructure.retry_topology import RetryRouter, parking_queue, retry_delays
+from src.infrastructure.review_queue import (
+    ReviewQueueConsumer,
+    review_priority_queue,
+    review_queue_arguments,
+)
+from src.infrastructure.metrics import serve_metrics
+from src.infrastructure.redis_streams import (
+    REDIS_STREAMS,
+    RedisStreamReader,
+    streams_client,
+    transaction_streams,
+)
+from src.infrastructure.sharding import shard_queue
+from src.infrastructure.worker_metrics import WorkerStats, backlog_sampler, get_worker_stats
+from src.infrastructure.worker_supervisor import worker_index
 
 
-def create_use_case() -> EvaluateTransactionUseCase:
+# Engine de larga vida (adaptadores, writer y estrategias)
+_engine: Optional[EvaluationEngine] = None
+
+
+def get_engine() -> EvaluationEngine:
     """
-    Crea el caso de uso con todas sus dependencias
-    
+    Engine compartido por todos los mensajes del proceso
+
     Nota del desarrollador:
-    La IA sugirió crear esto en cada callback. Lo extraje a una función
-    para cumplir con DRY y facilitar testing.
+    Antes se creaba el caso de uso (MongoClient, clientes de Redis y una
+    conexión a RabbitMQ) en cada callback. Ahora se construye una vez y
+    sobrevive a las reconexiones del consumidor.
     """
-    repository = MongoDBAdapter(settings.mongodb_url, settings.mongodb_database)
-    publisher = RabbitMQAdapter(settings.rabbitmq_url)
-    cache = RedisAdapter(settings.redis_url, settings.redis_ttl)
-
-    strategies = [
-        AmountThresholdStrategy(threshold=Decimal(str(settings.amount_threshold))),
-        LocationStrategy(radius_km=settings.location_radius_km),
-        DeviceValidationStrategy(redis_client=cache.redis_sync),
-        RapidTransactionStrategy(redis_client=cache.redis_sync),
-        UnusualTimeStrategy(audit_repository=repository),
-    ]
+    global _engine
+    if _engine is None:
+        _engine = EvaluationEngine.from_settings()
+    return _engine
 
-    return EvaluateTransactionUseCase(repository, publisher, cache, strategies)
 
-
-def callback(ch, method, properties, body):
+async def connect(max_retries: int = 10, retry_delay: float = 2) -> aio_pika.abc.AbstractRobustConnection:
     """
-    Callback para procesar mensajes de la cola
-    
-    Args:
-        ch: Canal de RabbitMQ
-        method: Método de entrega
-        properties: Propiedades del mensaje
-        body: Cuerpo del mensaje (JSON)
-    
+    Conexión robusta a RabbitMQ (aio-pika reconecta y restablece el consumo)
+
     Nota del desarrollador:
-    La IA olvidó agregar manejo de errores. Agregué try/except para
-    evitar que un mensaje corrupto detenga el worker (resilience pattern).
+    Agregué retry logic con backoff exponencial porque el worker puede
+    iniciar antes de que RabbitMQ esté completamente listo (race condition).
+    La conexión robusta solo cubre las caídas posteriores al primer connect.
     """
-    try:
-        transaction_data = json.loads(body)
-        print(f"Processing transaction: {transaction_data['id']}")
+    for attempt in range(max_retries):
+        try:
+            print(f"Connecting to RabbitMQ: {settings.rabbitmq_url} (attempt {attempt + 1}/{max_retries})")
+            return await aio_pika.connect_robust(settings.rabbitmq_url)
+        except (ConnectionError, aio_pika.exceptions.AMQPConnectionError) as e:
+            if attempt == max_retries - 1:
+                print(f"❌ Failed to connect after {max_retries} attempts")
+                raise
+            print(f"❌ Connection failed: {e}")
+            print(f"⏳ Retrying in {retry_delay} seconds...")
+            await asyncio.sleep(retry_delay)
+            retry_delay *= 2  # Backoff exponencial
 
-        # Ejecutar caso de uso
-        use_case = create_use_case()
-        result = asyncio.run(use_case.execute(transaction_data))
 
-        print(
-            f"Transaction {transaction_data['id']} evaluated as {result['risk_level']}"
+def build_consumer(
+    engine: EvaluationEngine, retries: Optional[RetryRouter], stats: Optional[WorkerStats] = None
+) -> EvaluationConsumer:
+    """Consumidor por mensaje o por micro-lotes según la configuración"""
+    if settings.worker_batch_size:
+        return MicroBatchConsumer(
+            engine,
+            batch_size=settings.worker_batch_size,
+            max_wait_seconds=settings.worker_batch_wait_ms / 1000,
+            retries=retries,
+            stats=stats,
         )
+    return EvaluationConsumer(
+        engine,
+        concurrency=settings.worker_concurrency,
+        retries=retries,
+        stats=stats,
+        max_pending_per_user=settings.worker_max_pending_per_user,
+    )
+
+
+async def start_metrics(stats: WorkerStats, background: list):
+    """
+    Puerto lateral de métricas y muestra periódica del backlog
 
-        # Acknowledge el mensaje
-        ch.basic_ack(delivery_tag=method.delivery_tag)
+    Cada proceso del supervisor usa `worker_metrics_port + índice`. Si el
+    puerto está ocupado el worker sigue sin métricas.
+    """
+    background.append(
+        asyncio.create_task(stats.sample_periodically(backlog_sampler(), settings.worker_metrics_sample_seconds))
+    )
+    port = settings.worker_metrics_port + (worker_index() or 0)
+    try:
+        server = await serve_metrics(port)
+    except OSError as e:
+        print(f"Could not serve worker metrics on port {port}: {e}")
+        return None
+    print(f"Worker metrics on port {port}")
+    return server
 
-    except json.JSONDecodeError as e:
-        print(f"Error: Invalid JSON in message: {e}")
-        # Rechazar mensaje y no reencolar (está corrupto)
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
 
-    except ValueError as e:
-        print(f"Error: Invalid transaction data: {e}")
-        # Rechazar mensaje y no reencolar (datos inválidos)
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=False)
+async def consume_reviews(connection, engine: EvaluationEngine, consumers: list) -> ReviewQueueConsumer:
+    """
+    Materializa la revisión manual en `review_queue` (canal y prefetch propios)
 
-    except Exception as e:
-        print(f"Error processing transaction: {e}")
-        # Rechazar mensaje y reencolar (error temporal, puede recuperarse)
-        ch.basic_nack(delivery_tag=method.delivery_tag, requeue=True)
+    Consume la cola con prioridad y la anterior sin prioridad, que puede
+    tener mensajes publicados antes del cambio. Los lotes que no se pueden
+    escribir van a las colas de espera de `manual_review` (mismos intentos
+    y delays que las transacciones) y después a `manual_review.parking`.
+    """
+    channel = await connection.channel()
+    await channel.set_qos(prefetch_count=2 * settings.review_queue_batch_size)
+    retries = None
+    if settings.worker_retry_max_attempts:
+        retries = RetryRouter(
+            channel,
+            settings.rabbitmq_manual_review_queue,
+            retry_delays(
+                settings.worker_retry_base_delay_seconds,
+                settings.worker_retry_max_attempts,
+                settings.worker_retry_max_delay_seconds,
+            ),
+        )
+        await retries.declare()
+    review = ReviewQueueConsumer(
+        engine.repository.review_queue,
+        batch_size=settings.review_queue_batch_size,
+        max_wait_seconds=settings.review_queue_batch_wait_ms / 1000,
+        retries=retries,
+    )
+    priority = await channel.declare_queue(
+        review_priority_queue(settings.rabbitmq_manual_review_queue),
+        durable=True,
+        arguments=review_queue_arguments(),
+    )
+    legacy = await channel.declare_queue(settings.rabbitmq_manual_review_queue, durable=True)
+    for queue in (priority, legacy):
+        consumers.append((queue, await queue.consume(review.dispatch)))
+    return review
 
 
-def start_worker():
+async def consume(shards: Optional[List[int]] = None) -> None:
     """
-    Inicia el worker que consume mensajes de RabbitMQ
-    
+    Consume la cola de transacciones (o los shards asignados) hasta ser cancelado
+
     Nota del desarrollador:
-    La IA sugirió basic_consume sin prefetch_count. Agregué prefetch_count=1
-    para evitar que un worker acumule todos los mensajes y distribuir
-    la carga equitativamente (fair dispatch pattern).
-    
-    También agregué retry logic con backoff exponencial porque el worker puede
-    iniciar antes de que RabbitMQ esté completamente listo (race condition).
+    La IA sugirió basic_consume sin prefetch_count. El prefetch es
+    configurable y debe ser al menos el tamaño del lote de escritura: los
+    mensajes no se confirman hasta escribir su lote, así que con menos el
+    lote nunca se llenaría.
+
+    Cada shard se consume en modo exclusivo: si otro proceso todavía lo
+    tiene (rebalanceo en curso), RabbitMQ rechaza el consumo y el proceso
+    termina para que el supervisor lo reinicie con backoff.
     """
-    import time
-    
-    max_retries = 10
-    retry_delay = 2
-    
-    for attempt in range(max_retries):
-        try:
-            print(f"Connecting to RabbitMQ: {settings.rabbitmq_url} (attempt {attempt + 1}/{max_retries})")
-            connection = pika.BlockingConnection(
-                pika.URLParameters(settings.rabbitmq_url)
+    connection = await connect()
+    engine = get_engine()
+    consumer = None
+    review = None
+    metrics_server = None
+    background = []
+    consumers = []
+
+    try:
+        channel = await connection.channel()
+        await channel.set_qos(prefetch_count=settings.worker_prefetch_count)
+        retries = None
+        if settings.worker_retry_max_attempts:
+            retries = RetryRouter(
+                channel,
+                settings.rabbitmq_transactions_queue,
+                retry_delays(
+                    settings.worker_retry_base_delay_seconds,
+                    settings.worker_retry_max_attempts,
+                    settings.worker_retry_max_delay_seconds,
+                ),
             )
-            channel = connection.channel()
+            await retries.declare()
+        stats = get_worker_stats("transactions")
+        consumer = build_consumer(engine, retries, stats)
+        background = [
+            asyncio.create_task(consumer.flush_periodically()),
+            asyncio.create_task(consumer.maintain_periodically(settings.worker_maintenance_seconds)),
+        ]
+        if settings.worker_metrics_port:
+            metrics_server = await start_metrics(stats, background)
+
+        base = await channel.declare_queue(settings.rabbitmq_transactions_queue, durable=True)
+        if shards is None and settings.rabbitmq_shard_count:
+            # Proceso único (sin supervisor): todos los shards
+            shards = list(range(settings.rabbitmq_shard_count))
+
+        if shards is None:
+            consumers.append((base, await base.consume(consumer.dispatch)))
+        else:
+            for shard in shards:
+                queue = await channel.declare_queue(
+                    shard_queue(settings.rabbitmq_transactions_queue, shard), durable=True
+                )
+                consumers.append((queue, await queue.consume(consumer.dispatch, exclusive=True)))
+            if 0 in shards:
+                # La cola única puede tener mensajes previos al sharding
+                consumers.append((base, await base.consume(consumer.dispatch)))
+
+        if settings.review_queue_consumer_enabled:
+            review = await consume_reviews(connection, engine, consumers)
+            background.append(asyncio.create_task(review.flush_periodically()))
+
+        print(
+            f"✅ Worker started successfully. Waiting for messages from {len(consumers)} queue(s) "
+            f"(prefetch {settings.worker_prefetch_count}, concurrency {settings.worker_concurrency})"
+        )
+        await asyncio.Future()
+    finally:
+        # Terminar lo que está en vuelo, escribir y confirmar antes de cerrar
+        print("\nStopping worker...")
+        for queue, consumer_tag in consumers:
+            try:
+                await queue.cancel(consumer_tag)
+            except Exception as e:
+                print(f"Could not cancel consumer {consumer_tag}: {e}")
+        if consumer is not None:
+            await consumer.drain()
+        if review is not None:
+            await review.drain()
+        for task in background:
+            task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await engine.aclose()
+        await connection.close()
+        print("Worker stopped")
 
-            # Declarar cola (idempotente)
-            channel.queue_declare(queue=settings.rabbitmq_transactions_queue, durable=True)
 
-            # Prefetch count = 1: procesar un mensaje a la vez
-            channel.basic_qos(prefetch_count=1)
+def stream_reader(client, streams: List[str], callback, parking: str, prefetch_count: int) -> RedisStreamReader:
+    """Reader del consumer group con un nombre estable por host y proceso"""
+    return RedisStreamReader(
+        client,
+        streams,
+        settings.redis_stream_group,
+        f"{socket.gethostname()}-{worker_index() or 0}",
+        callback,
+        parking=parking,
+        prefetch_count=prefetch_count,
+        read_count=settings.redis_stream_read_count,
+        block_ms=settings.redis_stream_block_ms,
+        claim_idle_ms=settings.redis_stream_claim_idle_ms,
+        claim_interval=settings.redis_stream_claim_interval_seconds,
+        max_deliveries=settings.redis_stream_max_deliveries,
+    )
 
-            # Consumir mensajes
-            channel.basic_consume(
-                queue=settings.rabbitmq_transactions_queue, on_message_callback=callback
+
+async def consume_streams(shards: Optional[List[int]] = None) -> None:
+    """
+    Consume los streams de transacciones (o los shards asignados) hasta ser cancelado
+
+    Sin RetryRouter: el nack con requeue deja la entrada pendiente y
+    XAUTOCLAIM la reentrega pasado `redis_stream_claim_idle_ms`; las
+    inválidas y las que superan `redis_stream_max_deliveries` entregas van
+    al stream de parking.
+    """
+    client = streams_client(settings.redis_streams_url or settings.redis_url)
+    engine = get_engine()
+    consumer = None
+    review = None
+    metrics_server = None
+    readers = []
+    tasks = []
+    background = []
+
+    try:
+        stats = get_worker_stats("transactions")
+        consumer = build_consumer(engine, None, stats)
+        background = [
+            asyncio.create_task(consumer.flush_periodically()),
+            asyncio.create_task(consumer.maintain_periodically(settings.worker_maintenance_seconds)),
+        ]
+        if settings.worker_metrics_port:
+            metrics_server = await start_metrics(stats, background)
+
+        base = settings.rabbitmq_transactions_queue
+        streams = transaction_streams(shards)
+        if streams:
+            readers.append(stream_reader(
+                client, streams, consumer.dispatch, parking_queue(base), settings.worker_prefetch_count,
+            ))
+        else:
+            # Sin shards asignados: solo la cola de revisión (si está habilitada)
+            print("⚠️ No transaction shards assigned to this process")
+        if settings.review_queue_consumer_enabled:
+            review = ReviewQueueConsumer(
+                engine.repository.review_queue,
+                batch_size=settings.review_queue_batch_size,
+                max_wait_seconds=settings.review_queue_batch_wait_ms / 1000,
             )
+            background.append(asyncio.create_task(review.flush_periodically()))
+            review_stream = settings.rabbitmq_manual_review_queue
+            readers.append(stream_reader(
+                client, [review_stream], review.dispatch, parking_queue(review_stream),
+                2 * settings.review_queue_batch_size,
+            ))
+
+        tasks = [asyncio.create_task(reader.run()) for reader in readers]
+        print(
+            f"✅ Worker started successfully. Reading {len(streams)} transaction stream(s) "
+            f"(prefetch {settings.worker_prefetch_count})"
+        )
+        if tasks:
+            await asyncio.gather(*tasks)
+        else:
+            # Nada que leer: esperar la cancelación en lugar de salir y
+            # que el supervisor reinicie el proceso en bucle
+            await asyncio.Event().wait()
+    finally:
+        print("\nStopping worker...")
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if consumer is not None:
+            await consumer.drain()
+        if review is not None:
+            await review.drain()
+        for task in background:
+            task.cancel()
+        if metrics_server is not None:
+            metrics_server.close()
+        await engine.aclose()
+        await client.aclose()
+        print("Worker stopped")
 
-            print(f"✅ Worker started successfully. Waiting for messages from {settings.rabbitmq_transactions_queue}")
-            print("To exit press CTRL+C")
 
-            try:
-                channel.start_consuming()
-            except KeyboardInterrupt:
-                print("\nStopping worker...")
-                channel.stop_consuming()
-                connection.close()
-                print("Worker stopped")
-            
-            break  # Salir del loop de retry si se conectó exitosamente
-            
-        except pika.exceptions.AMQPConnectionError as e:
-            if attempt < max_retries - 1:
-                print(f"❌ Connection failed: {e}")
-                print(f"⏳ Retrying in {retry_delay} seconds...")
-                time.sleep(retry_delay)
-                retry_delay *= 2  # Backoff exponencial
-            else:
-                print(f"❌ Failed to connect after {max_retries} attempts")
-                raise
+async def run_worker(shards: Optional[List[int]] = None) -> None:
+    """Ejecuta el consumidor; SIGINT/SIGTERM lo detienen ordenadamente"""
+    if settings.message_transport == REDIS_STREAMS:
+        task = asyncio.create_task(consume_streams(shards))
+    else:
+        task = asyncio.create_task(consume(shards))
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def start_worker(shards: Optional[List[int]] = None):
+    """Inicia el worker con un único event loop para todo el proceso"""
+    asyncio.run(run_worker(shards))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,48 @@
+"""
+Proxy TCP para inyectar fallos entre un cliente y un servicio real.
+
+- `latency`: segundos añadidos a cada bloque reenviado
+- `slow_fraction`: fracción de bloques que reciben `latency` (1.0 = todos)
+- `blackhole`: acepta bytes y nunca responde
+"""
+import asyncio
+import random
+
+
+class FaultProxy:
+    """Proxy TCP con latencia y modo agujero negro configurables"""
+
+    def __init__(self, upstream_host: str, upstream_port: int, seed: int = 0):
+        self.upstream = (upstream_host, upstream_port)
+        self.latency = 0.0
+        self.slow_fraction = 1.0
+        self.blackhole = False
+        self.server = None
+        self._random = random.Random(seed)
+
+    async def start(self) -> int:
+        self.server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+
+    async def _handle(self, client_reader, client_writer):
+        upstream_reader, upstream_writer = await asyncio.open_connection(*self.upstream)
+        await asyncio.gather(
+            self._pipe(client_reader, upstream_writer),
+            self._pipe(upstream_reader, client_writer),
+            return_exceptions=True,
+        )
+        client_writer.close()
+        upstream_writer.close()
+
+    async def _pipe(self, reader, writer):
+        while data := await reader.read(65536):
+            if self.blackhole:
+                continue
+            if self.latency and self._random.random() < self.slow_fraction:
+                await asyncio.sleep(self.latency)
+            writer.write(data)
+            await writer.drain()
@@ -0,0 +1,132 @@
+"""
+Pruebas de caída de Redis con un proxy TCP que inyecta fallos.
+
+El proxy se pone entre el cliente y un Redis real (REDIS_TEST_URL, por
+defecto redis://localhost:6379) y permite añadir latencia o "agujero
+negro" (acepta bytes y nunca responde). Se comprueba que:
+
+- con Redis colgado la latencia de cada evaluación queda acotada por el
+  timeout del breaker y, una vez abierto, las llamadas fallan al instante;
+- las estrategias responden con el estado local mientras dura la caída;
+- el circuito se cierra solo cuando Redis vuelve.
+
+Si Redis no está disponible los tests se omiten.
+"""
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import Location, RiskLevel, Transaction
+from src.domain.strategies.device_validation import DeviceValidationStrategy
+from src.infrastructure.circuit_breaker import CircuitBreaker, CircuitState, GuardedRedis
+from src.infrastructure.local_risk_state import LocalRiskState
+from src.infrastructure.redis_keys import user_devices_key
+from tests.integration.fault_proxy import FaultProxy
+
+pytestmark = pytest.mark.integration
+
+CALL_TIMEOUT = 0.05
+RESET_TIMEOUT = 0.5
+
+
+@pytest.fixture
+async def proxied_redis():
+    import redis.asyncio as redis_async
+
+    url = urlparse(os.getenv("REDIS_TEST_URL", "redis://localhost:6379"))
+    probe = redis_async.Redis(host=url.hostname, port=url.port or 6379, socket_connect_timeout=1)
+    try:
+        await probe.ping()
+    except Exception as exc:
+        pytest.skip(f"Redis not available at {url.geturl()}: {exc}")
+    finally:
+        await probe.aclose()
+
+    proxy = FaultProxy(url.hostname, url.port or 6379)
+    port = await proxy.start()
+    client = redis_async.Redis(host="127.0.0.1", port=port, decode_responses=True)
+    breaker = CircuitBreaker(
+        "redis-outage-test",
+        failure_threshold=3,
+        reset_timeout=RESET_TIMEOUT,
+        call_timeout=CALL_TIMEOUT,
+    )
+
+    yield proxy, GuardedRedis(client, breaker), breaker
+
+    proxy.blackhole = False
+    proxy.latency = 0.0
+    await client.delete(user_devices_key("outage_user"))
+    await client.aclose()
+    await proxy.stop()
+
+
+def make_transaction(i: int) -> Transaction:
+    return Transaction(
+        id=f"outage_txn_{i}",
+        amount=Decimal("100.0"),
+        user_id="outage_user",
+        location=Location(latitude=4.7110, longitude=-74.0721),
+        timestamp=datetime.now(),
+        device_id="device_001",
+    )
+
+
+def p99(samples):
+    ordered = sorted(samples)
+    return ordered[int(len(ordered) * 0.99) - 1]
+
+
+@pytest.mark.asyncio
+async def test_blackholed_redis_keeps_latency_bounded(proxied_redis):
+    proxy, redis, breaker = proxied_redis
+    strategy = DeviceValidationStrategy(redis, legacy_reads=False, local_state=LocalRiskState())
+
+    # Redis sano: el dispositivo queda registrado (y en el estado local)
+    await strategy.evaluate(make_transaction(0))
+
+    proxy.blackhole = True
+    latencies = []
+    for i in range(100):
+        started = time.perf_counter()
+        result = await strategy.evaluate(make_transaction(i + 1))
+        latencies.append(time.perf_counter() - started)
+        assert result["risk_level"] == RiskLevel.LOW_RISK
+
+    assert breaker.state is CircuitState.OPEN
+    assert breaker.failures_total == 3
+    assert p99(latencies) < CALL_TIMEOUT * 2
+    assert max(latencies) < CALL_TIMEOUT * 4
+
+
+@pytest.mark.asyncio
+async def test_breaker_recovers_when_redis_returns(proxied_redis):
+    proxy, redis, breaker = proxied_redis
+
+    proxy.latency = CALL_TIMEOUT * 4
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            await redis.ping()
+    assert breaker.state is CircuitState.OPEN
+
+    proxy.latency = 0.0
+    await asyncio.sleep(RESET_TIMEOUT)
+    # La conexión que expiró a mitad de respuesta puede quedar sucia:
+    # la primera prueba reabre el circuito como mucho una vez más
+    for _ in range(3):
+        try:
+            assert await redis.ping()
+            break
+        except Exception:
+            await asyncio.sleep(RESET_TIMEOUT)
+
+    assert breaker.state is CircuitState.CLOSED
@@ -0,0 +1,135 @@
+"""
+Hedged reads contra un par primario/réplica local.
+
+El primario (REDIS_TEST_URL, por defecto redis://localhost:6379) se
+alcanza a través de FaultProxy, que retrasa una fracción de las
+respuestas. La réplica (REDIS_REPLICA_TEST_URL, por defecto
+redis://localhost:6380) debe replicar del primario, por ejemplo:
+
+    docker run -d --name redis-primary -p 6379:6379 redis:7
+    docker run -d --name redis-replica -p 6380:6379 --link redis-primary redis:7 \\
+        redis-server --replicaof redis-primary 6379
+
+Se compara el p99 de la lectura de ubicación sin y con hedging (con -s se
+imprime el histograma; `scripts/benchmark_hedged_reads.py` hace lo mismo
+con más muestras). Si el par no está disponible los tests se omiten.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from urllib.parse import urlparse
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.hedged_reads import HedgedRedis, HedgePolicy
+from src.infrastructure.redis_keys import user_geo_key
+from src.infrastructure.user_location_store import UserLocationStore
+from tests.integration.fault_proxy import FaultProxy
+
+pytestmark = pytest.mark.integration
+
+USER_ID = "hedge_user"
+READS = 400
+SLOW_LATENCY = 0.05
+
+
+async def connect(url: str):
+    import redis.asyncio as redis_async
+
+    client = redis_async.from_url(url, decode_responses=True, socket_connect_timeout=1)
+    try:
+        await client.ping()
+    except Exception as exc:
+        await client.aclose()
+        pytest.skip(f"Redis not available at {url}: {exc}")
+    return client
+
+
+@pytest.fixture
+async def primary_and_replica():
+    import redis.asyncio as redis_async
+
+    primary_url = os.getenv("REDIS_TEST_URL", "redis://localhost:6379")
+    primary = await connect(primary_url)
+    replica = await connect(os.getenv("REDIS_REPLICA_TEST_URL", "redis://localhost:6380"))
+    if (await replica.info("replication")).get("role") != "slave":
+        await primary.aclose()
+        await replica.aclose()
+        pytest.skip("REDIS_REPLICA_TEST_URL is not a replica")
+
+    await UserLocationStore(primary, ttl=60, legacy_reads=False).set(USER_ID, 4.7110, -74.0721)
+    await primary.wait(1, 1000)
+
+    url = urlparse(primary_url)
+    proxy = FaultProxy(url.hostname, url.port or 6379)
+    port = await proxy.start()
+    slow_primary = redis_async.Redis(host="127.0.0.1", port=port, decode_responses=True)
+
+    yield proxy, slow_primary, replica
+
+    await primary.delete(user_geo_key(USER_ID))
+    for client in (slow_primary, primary, replica):
+        await client.aclose()
+    await proxy.stop()
+
+
+async def measure(store: UserLocationStore):
+    latencies = []
+    for _ in range(READS):
+        started = time.perf_counter()
+        location = await store.get(USER_ID)
+        latencies.append(time.perf_counter() - started)
+        assert location["latitude"] == pytest.approx(4.7110, abs=1e-4)
+    return sorted(latencies)
+
+
+def p99(ordered):
+    return ordered[int(len(ordered) * 0.99) - 1]
+
+
+def histogram(ordered, buckets=(0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1)):
+    lines = []
+    lower = 0.0
+    for upper in buckets + (float("inf"),):
+        count = sum(1 for value in ordered if lower <= value < upper)
+        lines.append(f"  < {upper * 1000:>6.0f} ms {count:>5} {'#' * (60 * count // len(ordered))}")
+        lower = upper
+    return "\n".join(lines)
+
+
+@pytest.mark.asyncio
+async def test_hedging_cuts_p99_of_slow_primary(primary_and_replica):
+    proxy, slow_primary, replica = primary_and_replica
+    proxy.latency = SLOW_LATENCY
+    proxy.slow_fraction = 0.03
+
+    plain = await measure(UserLocationStore(slow_primary, ttl=60, legacy_reads=False))
+    policy = HedgePolicy("hedge-test", initial_delay=0.005)
+    hedged = await measure(UserLocationStore(
+        slow_primary, ttl=60, legacy_reads=False,
+        reads=HedgedRedis(slow_primary, replica, policy),
+    ))
+
+    print(f"\nprimary only (p99 {p99(plain) * 1000:.1f} ms)\n{histogram(plain)}")
+    print(f"hedged (p99 {p99(hedged) * 1000:.1f} ms)\n{histogram(hedged)}")
+
+    assert p99(plain) >= SLOW_LATENCY
+    assert p99(hedged) < SLOW_LATENCY / 2
+    assert 0 < policy.hedged_total < READS * 0.25
+    assert policy.replica_wins_total > 0
+
+
+@pytest.mark.asyncio
+async def test_writes_are_never_sent_to_replica(primary_and_replica):
+    _, slow_primary, replica = primary_and_replica
+    store = UserLocationStore(
+        slow_primary, ttl=60, legacy_reads=False,
+        reads=HedgedRedis(slow_primary, replica, HedgePolicy("hedge-test-writes")),
+    )
+
+    await store.set(USER_ID, 6.2442, -75.5812)
+
+    assert (await store.get(USER_ID))["latitude"] == pytest.approx(6.2442, abs=1e-4)
@@ -0,0 +1,98 @@
+"""
+Verificación de planes de consulta contra un mongod local.
+
+Siembra una base de datos temporal, construye los índices del catálogo y
+ejecuta explain() para cada forma de consulta declarada. Falla si algún
+plan ganador usa COLLSCAN o SORT en memoria.
+
+Requiere un mongod accesible en MONGODB_TEST_URL (por defecto
+mongodb://localhost:27017); si no está disponible los tests se omiten.
+"""
+import os
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.index_catalog import (
+    QUERY_SHAPES,
+    catalog_collections,
+    ensure_indexes,
+    explain_shape,
+    plan_violations,
+)
+
+pytestmark = pytest.mark.integration
+
+SEED_EVALUATIONS = 5000
+SEED_USERS = 200
+STATUSES = ["APPROVED", "PENDING_REVIEW", "REJECTED"]
+
+
+@pytest.fixture(scope="module")
+def seeded_db():
+    """Base de datos temporal sembrada con datos representativos."""
+    pymongo = pytest.importorskip("pymongo")
+    url = os.getenv("MONGODB_TEST_URL", "mongodb://localhost:27017")
+    client = pymongo.MongoClient(url, serverSelectionTimeoutMS=1000)
+    try:
+        client.admin.command("ping")
+    except Exception as exc:
+        pytest.skip(f"Local mongod not available at {url}: {exc}")
+
+    db = client["fraud_detection_index_plans"]
+    client.drop_database(db.name)
+
+    now = datetime.now()
+    db.evaluations.insert_many([
+        {
+            "transaction_id": f"txn_{i:05d}",
+            "user_id": f"user_{i % SEED_USERS:04d}",
+            "risk_level": "LOW_RISK",
+            "reasons": [],
+            "status": STATUSES[i % len(STATUSES)],
+            "timestamp": now - timedelta(minutes=i * 7),
+            "amount": float(i),
+        }
+        for i in range(SEED_EVALUATIONS)
+    ])
+    db.users.insert_many([
+        {
+            "user_id": f"user_{i:04d}",
+            "email": f"user_{i:04d}@example.com",
+            "verification_token": f"token_{i:04d}",
+        }
+        for i in range(SEED_USERS)
+    ])
+    db.custom_rules.insert_many([{"id": f"rule_{i:04d}", "name": "r"} for i in range(50)])
+    db.user_evaluation_buckets.insert_many([
+        {
+            "user_id": f"user_{i % SEED_USERS:04d}",
+            "period": f"2026-{i // SEED_USERS + 1:02d}",
+            "count": 1,
+            "last_ts": now - timedelta(days=i),
+            "entries": [{"t": f"txn_{i:05d}", "ts": now - timedelta(days=i)}],
+        }
+        for i in range(SEED_USERS * 3)
+    ])
+    db.evaluation_rollups.insert_many([
+        {"_id": f"hour:2026-01-12T{h:02d}:00", "approved": 1} for h in range(24)
+    ])
+
+    ensure_indexes({name: db[name] for name in catalog_collections()})
+    yield db
+    client.drop_database(db.name)
+    client.close()
+
+
+@pytest.mark.parametrize("shape", QUERY_SHAPES, ids=[shape.name for shape in QUERY_SHAPES])
+def test_catalogued_query_is_index_backed(seeded_db, shape):
+    """Test: Cada forma del catálogo se resuelve sin COLLSCAN ni SORT en memoria."""
+    explain = explain_shape(seeded_db, shape)
+
+    assert plan_violations(explain) == [], (
+        f"{shape.name} ({shape.description}) is not served by {shape.index.keys}"
+    )
@@ -0,0 +1,97 @@
+"""
+Verificación del esquema de claves contra un Redis Cluster local.
+
+Ejecuta las estrategias de Redis y el almacén de ubicaciones con el cliente
+de cluster y comprueba que todas las claves de un usuario queden en el
+mismo slot (y por tanto en el mismo nodo).
+
+Requiere un cluster de varios nodos en REDIS_CLUSTER_TEST_URL (por defecto
+redis://localhost:7000), por ejemplo:
+
+    docker run -d -e IP=0.0.0.0 -p 7000-7005:7000-7005 grokzen/redis-cluster:7.0.10
+
+Si no está disponible los tests se omiten.
+"""
+import os
+import sys
+from datetime import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import Location, RiskLevel, Transaction
+from src.domain.strategies.device_validation import DeviceValidationStrategy
+from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
+from src.infrastructure.redis_keys import rapid_tx_key, user_devices_key, user_geo_key
+from src.infrastructure.user_location_store import UserLocationStore
+
+pytestmark = pytest.mark.integration
+
+USERS = [f"cluster_user_{i}" for i in range(20)]
+
+
+@pytest.fixture
+async def cluster():
+    """Cliente de cluster; limpia las claves de los usuarios de prueba."""
+    from redis.asyncio.cluster import RedisCluster
+
+    url = os.getenv("REDIS_CLUSTER_TEST_URL", "redis://localhost:7000")
+    client = RedisCluster.from_url(url, decode_responses=True, socket_connect_timeout=1)
+    try:
+        await client.initialize()
+    except Exception as exc:
+        pytest.skip(f"Local Redis Cluster not available at {url}: {exc}")
+    if len(client.get_primaries()) < 2:
+        await client.aclose()
+        pytest.skip("Redis Cluster needs at least two primaries")
+
+    yield client
+
+    for user_id in USERS:
+        await client.delete(user_geo_key(user_id), user_devices_key(user_id), rapid_tx_key(user_id))
+    await client.aclose()
+
+
+def make_transaction(user_id: str, i: int) -> Transaction:
+    return Transaction(
+        id=f"{user_id}_txn_{i}",
+        amount=Decimal("100.0"),
+        user_id=user_id,
+        location=Location(latitude=4.7110, longitude=-74.0721),
+        timestamp=datetime.now(),
+        device_id="device_001",
+    )
+
+
+@pytest.mark.asyncio
+async def test_user_keys_live_on_one_node(cluster):
+    device = DeviceValidationStrategy(redis_client=cluster)
+    rapid = RapidTransactionStrategy(redis_client=cluster, max_transactions=1)
+    locations = UserLocationStore(cluster, ttl=60)
+
+    nodes = set()
+    for user_id in USERS:
+        first = await device.evaluate(make_transaction(user_id, 0))
+        second = await device.evaluate(make_transaction(user_id, 1))
+        await rapid.evaluate(make_transaction(user_id, 0))
+        burst = await rapid.evaluate(make_transaction(user_id, 1))
+        await locations.set(user_id, 4.7110, -74.0721)
+
+        assert first["risk_level"] == RiskLevel.HIGH_RISK
+        assert second["risk_level"] == RiskLevel.LOW_RISK
+        assert burst["risk_level"] == RiskLevel.HIGH_RISK
+        assert (await locations.get(user_id))["latitude"] == pytest.approx(4.7110, abs=1e-4)
+
+        user_nodes = {
+            cluster.get_node_from_key(key).name
+            for key in (user_geo_key(user_id), user_devices_key(user_id), rapid_tx_key(user_id))
+        }
+        assert len(user_nodes) == 1
+        nodes |= user_nodes
+
+    # Los usuarios se reparten entre nodos; cada uno queda completo en el suyo
+    assert len(nodes) > 1
+
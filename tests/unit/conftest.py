@@ -0,0 +1,75 @@
+"""
+Utilidades compartidas por los tests unitarios del worker, de los
+transportes y del control de admisión.
+
+Mensaje falso con la interfaz de aio_pika.IncomingMessage, decodificador
+JSON sin esquema, transacciones de ejemplo, EvaluationEngine con
+repositorio y caché falsos y reloj manual. Se importan con
+`from tests.unit.conftest import ...`.
+"""
+import json
+from unittest.mock import AsyncMock, Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_engine import EvaluationEngine
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter, WriteOutcome
+from src.infrastructure.message_codec import MessageDecodeError
+
+
+class FakeMessage:
+    """Mensaje con la interfaz de aio_pika.IncomingMessage; anota cada ack/nack en `settled`."""
+
+    def __init__(self, delivery_tag, body, settled, headers=None, routing_key="transactions.shard.3"):
+        self.delivery_tag = delivery_tag
+        self.body = body
+        self.headers = headers
+        self.routing_key = routing_key
+        self.content_type = None
+        self._settled = settled
+
+    async def ack(self, multiple=False):
+        self._settled.append((self.delivery_tag, "ack-multiple" if multiple else "ack"))
+
+    async def nack(self, requeue=True):
+        self._settled.append((self.delivery_tag, "requeue" if requeue else "reject"))
+
+
+def decode_json(message):
+    """Cuerpo JSON sin esquema (los mensajes de prueba llevan sus propios campos)."""
+    try:
+        return json.loads(message.body)
+    except json.JSONDecodeError as e:
+        raise MessageDecodeError(str(e)) from e
+
+
+def transaction_data(i, user_id=None, users=7):
+    return {
+        "id": f"txn_{i:04d}",
+        "amount": 100.0,
+        "user_id": user_id or f"user_{i % users}",
+        "location": {"latitude": 4.711, "longitude": -74.0721},
+    }
+
+
+def make_engine(publisher, outcome=WriteOutcome.WRITTEN, max_batch_size=20, strategies=None):
+    """EvaluationEngine con repositorio y caché falsos; devuelve (engine, repository)."""
+    repository = Mock()
+    repository.save_evaluations = Mock(side_effect=lambda batch: [outcome] * len(batch))
+    cache = Mock()
+    cache.get_user_location = AsyncMock(return_value=None)
+    cache.set_user_location = AsyncMock()
+    writer = EvaluationBatchWriter(repository, max_batch_size=max_batch_size, max_delay_seconds=0.01)
+    engine = EvaluationEngine(repository, publisher, cache, writer, strategies=list(strategies or []))
+    return engine, repository
+
+
+class FakeClock:
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -49,13 +49,27 @@ class TestMongoDBAdapter:
     async def test_mongodb_adapter_initialization(self, mock_mongo_client):
         """Test: Inicialización del adaptador MongoDB."""
         from src.adapters import MongoDBAdapter
+        import src.infrastructure.index_catalog as index_catalog
         
         _, _, mock_collection = mock_mongo_client
+        index_catalog._ENSURED.clear()
         
-        _ = MongoDBAdapter("mongodb://localhost:27017", "test_db")
+        _ = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=True)
         
-        # Verificar que se crearon índices
+        # Verificar que se crearon índices (los crea el bootstrap o el primer adaptador)
         assert mock_collection.create_index.call_count >= 3
+        index_catalog._ENSURED.clear()
+    
+    def test_operation_timeout(self, mock_mongo_client):
+        """Test: Límite por operación de settings salvo que se pida otro (0 = sin límite)."""
+        from src.adapters import MongoDBAdapter
+        from src.config import settings
+        
+        mock_client, _, _ = mock_mongo_client
+        MongoDBAdapter("mongodb://localhost:27017", "test_db")
+        MongoDBAdapter("mongodb://localhost:27017", "test_db", timeout_ms=0)
+        
+        assert [c.kwargs["timeoutMS"] for c in mock_client.call_args_list] == [settings.mongodb_timeout_ms, 0]
     
     @pytest.mark.asyncio
     async def test_save_evaluation(self, mock_mongo_client, sample_evaluation):
@@ -171,15 +185,15 @@ class TestRedisAdapter:
     
     @pytest.mark.asyncio
     async def test_get_user_location(self, mock_redis_client):
-        """Test: Obtener ubicación de usuario."""
+        """Test: Obtener ubicación de usuario (delegado al set GEO)."""
         from src.adapters import RedisAdapter
         
-        mock_redis_client.get.return_value = '{"latitude": 4.7110, "longitude": -74.0721}'
-        
         adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
+        adapter.locations = Mock()
+        adapter.locations.get = AsyncMock(return_value={"latitude": 4.7110, "longitude": -74.0721})
         location = await adapter.get_user_location("user_001")
         
-        mock_redis_client.get.assert_called_with("user:user_001:location")
+        adapter.locations.get.assert_awaited_once_with("user_001")
         assert abs(location["latitude"] - 4.7110) < 0.0001
     
     @pytest.mark.asyncio
@@ -188,21 +202,27 @@ class TestRedisAdapter:
         from src.adapters import RedisAdapter
         
         adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
+        adapter.locations = Mock()
+        adapter.locations.set = AsyncMock()
         await adapter.set_user_location("user_001", 4.7110, -74.0721)
         
-        mock_redis_client.setex.assert_called_once()
+        adapter.locations.set.assert_awaited_once_with("user_001", 4.7110, -74.0721, None)
     
     @pytest.mark.asyncio
     async def test_get_threshold_config(self, mock_redis_client):
         """Test: Obtener configuración de umbrales."""
         from src.adapters import RedisAdapter
         
-        mock_redis_client.get.return_value = '{"amount_threshold": 1500.0, "location_radius_km": 100.0}'
+        mock_redis_client.hgetall.return_value = {
+            "version": "3",
+            "threshold:amount_threshold": "1500.0",
+            "threshold:location_radius_km": "100.0",
+        }
         
         adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
         config = await adapter.get_threshold_config()
         
-        mock_redis_client.get.assert_called_with("config:thresholds")
+        mock_redis_client.hgetall.assert_called_with("rule_config")
         assert abs(config["amount_threshold"] - 1500.0) < 0.001
 
 
@@ -235,7 +255,12 @@ class TestRabbitMQAdapter:
         _, mock_channel = mock_pika
         adapter = RabbitMQAdapter("amqp://localhost:5672")
         
-        await adapter.publish_transaction_for_processing({"transaction_id": "txn_001"})
+        await adapter.publish_transaction_for_processing({
+            "id": "txn_001",
+            "amount": 1500.0,
+            "user_id": "user_001",
+            "location": {"latitude": 4.711, "longitude": -74.0721},
+        })
         
         # Verificar que se publicó el mensaje
         mock_channel.basic_publish.assert_called_once()
@@ -248,7 +273,13 @@ class TestRabbitMQAdapter:
         _, mock_channel = mock_pika
         adapter = RabbitMQAdapter("amqp://localhost:5672")
         
-        await adapter.publish_for_manual_review({"evaluation_id": "eval_001"})
+        await adapter.publish_for_manual_review({
+            "transaction_id": "txn_001",
+            "risk_level": "HIGH_RISK",
+            "amount": 1500.0,
+            "user_id": "user_001",
+            "reasons": ["amount_threshold"],
+        })
         
         # Verificar que se publicó el mensaje
         assert mock_channel.basic_publish.call_count >= 1
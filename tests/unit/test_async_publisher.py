@@ -0,0 +1,178 @@
+"""
+Tests unitarios para el publisher asíncrono con confirmaciones.
+
+Usa una conexión falsa con la interfaz de aio-pika: valida que las
+publicaciones concurrentes salgan en lotes por los canales del pool, que
+cada llamador reciba el resultado de su confirmación y que un broker
+caído falle rápido sin bloquear.
+"""
+import asyncio
+import json
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.async_publisher import AsyncRabbitMQPublisher, get_async_publisher
+from src.infrastructure.message_codec import JsonCodec, ManualReviewMessage
+from src.infrastructure.metrics import publisher_metrics
+from src.infrastructure.sharding import shard_for, shard_queue
+
+
+class FakeExchange:
+
+    def __init__(self, channel):
+        self.channel = channel
+
+    async def publish(self, message, routing_key, timeout=None):
+        self.channel.sent.append((routing_key, json.loads(message)))
+        await asyncio.sleep(self.channel.confirm_delay)
+        if routing_key in self.channel.nacked:
+            raise RuntimeError("nacked by broker")
+        return "ack"
+
+
+class FakeChannel:
+
+    def __init__(self, confirm_delay=0.0, nacked=()):
+        self.confirm_delay = confirm_delay
+        self.nacked = set(nacked)
+        self.sent = []
+        self.declared = []
+        self.default_exchange = FakeExchange(self)
+
+    async def declare_queue(self, name, durable, arguments=None):
+        self.declared.append(name)
+
+
+class FakeConnection:
+
+    def __init__(self, **channel_config):
+        self.channels = []
+        self.channel_config = channel_config
+        self.closed = False
+
+    async def channel(self, publisher_confirms):
+        assert publisher_confirms
+        channel = FakeChannel(**self.channel_config)
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.closed = True
+
+
+def make_publisher(connection, **config):
+    connects = []
+
+    async def connect(url):
+        connects.append(url)
+        if isinstance(connection, Exception):
+            raise connection
+        return connection
+
+    publisher = AsyncRabbitMQPublisher(
+        "amqp://localhost:5672",
+        connect=connect,
+        message_factory=lambda body, headers, content_type, priority: body,
+        codec=JsonCodec(),
+        **config,
+    )
+    return publisher, connects
+
+
+def review(n):
+    return ManualReviewMessage(transaction_id=f"txn_{n}", risk_level="HIGH_RISK", amount=1500.0, user_id="user_001")
+
+
+class TestAsyncRabbitMQPublisher:
+
+    @pytest.mark.asyncio
+    async def test_concurrent_publishes_are_batched_across_channels(self):
+        connection = FakeConnection(confirm_delay=0.01)
+        publisher, connects = make_publisher(connection, pool_size=2, max_batch=10)
+
+        await asyncio.gather(*(publisher.publish("manual_review", review(i)) for i in range(25)))
+
+        assert connects == ["amqp://localhost:5672"]
+        assert publisher.batches_total == 3
+        assert publisher.confirmed_total == 25
+        sent = [payload["transaction_id"] for channel in connection.channels for _, payload in channel.sent]
+        assert sorted(sent) == sorted(f"txn_{i}" for i in range(25))
+        assert all(channel.sent for channel in connection.channels)
+
+    @pytest.mark.asyncio
+    async def test_batch_confirms_are_awaited_together(self):
+        connection = FakeConnection(confirm_delay=0.05)
+        publisher, _ = make_publisher(connection, pool_size=1)
+
+        start = asyncio.get_running_loop().time()
+        await asyncio.gather(*(publisher.publish("manual_review", review(i)) for i in range(20)))
+        elapsed = asyncio.get_running_loop().time() - start
+
+        # Pipelining: 20 confirmaciones en ~1 espera, no en 20
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_nack_fails_only_its_publish(self):
+        connection = FakeConnection(nacked={"manual_review"})
+        publisher, _ = make_publisher(connection)
+
+        results = await asyncio.gather(
+            publisher.publish("manual_review", review(1)),
+            publisher.publish("transactions", review(2)),
+            return_exceptions=True,
+        )
+
+        assert isinstance(results[0], RuntimeError)
+        assert results[1] is None
+        assert (publisher.confirmed_total, publisher.failed_total) == (1, 1)
+
+    @pytest.mark.asyncio
+    async def test_broker_down_fails_fast(self):
+        publisher, connects = make_publisher(ConnectionError("refused"))
+
+        with pytest.raises(ConnectionError):
+            await asyncio.wait_for(publisher.publish("manual_review", review(1)), timeout=1)
+        with pytest.raises(ConnectionError):
+            await publisher.publish("manual_review", review(2))
+
+        # Reintenta la conexión en cada lote
+        assert len(connects) == 2
+        assert publisher.failed_total == 2
+
+    @pytest.mark.asyncio
+    async def test_transactions_go_to_user_shard_and_queues_are_declared(self):
+        connection = FakeConnection()
+        publisher, _ = make_publisher(connection, pool_size=1)
+
+        await publisher.publish_transaction_for_processing({
+            "id": "txn_001",
+            "amount": 1500.0,
+            "user_id": "user_001",
+            "location": {"latitude": 4.711, "longitude": -74.0721},
+        })
+
+        routing_key, _ = connection.channels[0].sent[0]
+        assert routing_key == shard_queue("transactions", shard_for("user_001", 64))
+        assert len(connection.channels[0].declared) == 3 + 64
+
+    @pytest.mark.asyncio
+    async def test_aclose_waits_for_confirms(self):
+        connection = FakeConnection(confirm_delay=0.02)
+        publisher, _ = make_publisher(connection)
+
+        task = asyncio.create_task(publisher.publish("manual_review", review(1)))
+        await asyncio.sleep(0.005)
+        await publisher.aclose()
+
+        assert task.done() and task.result() is None
+        assert connection.closed
+
+    def test_process_registry_and_metrics(self):
+        publisher = get_async_publisher("test-publisher", "amqp://localhost:5672")
+
+        assert get_async_publisher("test-publisher", "amqp://other") is publisher
+        lines = publisher_metrics({"test-publisher": publisher})
+        assert 'fraud_publisher_confirmed_total{name="test-publisher"} 0' in lines
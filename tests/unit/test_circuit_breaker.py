@@ -0,0 +1,219 @@
+"""
+Tests unitarios para el circuit breaker, GuardedRedis y /metrics.
+
+Valida las transiciones closed -> open -> half-open -> closed con un reloj
+falso, el timeout estricto por comando y el formato de las métricas.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from redis.exceptions import ConnectionError as RedisConnectionError, ResponseError
+
+from src.infrastructure.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CircuitState,
+    GuardedRedis,
+    guarded,
+)
+from src.infrastructure.metrics import breaker_metrics
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def breaker(clock):
+    return CircuitBreaker(
+        "redis",
+        failure_threshold=3,
+        reset_timeout=5.0,
+        failure_types=(RedisConnectionError,),
+        clock=clock,
+    )
+
+
+async def fail():
+    raise RedisConnectionError("down")
+
+
+async def ok():
+    return "PONG"
+
+
+class TestCircuitBreaker:
+
+    @pytest.mark.asyncio
+    async def test_opens_after_consecutive_failures(self, breaker):
+        for _ in range(3):
+            with pytest.raises(RedisConnectionError):
+                await breaker.call(fail)
+
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.opened_total == 1
+
+        called = AsyncMock()
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(called)
+        called.assert_not_called()
+        assert breaker.rejected_total == 1
+
+    @pytest.mark.asyncio
+    async def test_success_resets_failure_count(self, breaker):
+        for _ in range(2):
+            with pytest.raises(RedisConnectionError):
+                await breaker.call(fail)
+        await breaker.call(ok)
+        with pytest.raises(RedisConnectionError):
+            await breaker.call(fail)
+
+        assert breaker.state is CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_closes_circuit(self, breaker, clock):
+        for _ in range(3):
+            with pytest.raises(RedisConnectionError):
+                await breaker.call(fail)
+
+        clock.now = 5.0
+        assert breaker.state is CircuitState.HALF_OPEN
+        assert await breaker.call(ok) == "PONG"
+        assert breaker.state is CircuitState.CLOSED
+
+    @pytest.mark.asyncio
+    async def test_half_open_probe_failure_reopens(self, breaker, clock):
+        for _ in range(3):
+            with pytest.raises(RedisConnectionError):
+                await breaker.call(fail)
+
+        clock.now = 5.0
+        with pytest.raises(RedisConnectionError):
+            await breaker.call(fail)
+
+        assert breaker.state is CircuitState.OPEN
+        assert breaker.opened_total == 2
+
+    def test_half_open_allows_single_probe(self, breaker, clock):
+        breaker._open()
+        clock.now = 5.0
+
+        breaker.before_call()
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+    @pytest.mark.asyncio
+    async def test_service_errors_do_not_count_as_failures(self, breaker):
+        async def wrong_type():
+            raise ResponseError("WRONGTYPE")
+
+        for _ in range(5):
+            with pytest.raises(ResponseError):
+                await breaker.call(wrong_type)
+
+        assert breaker.state is CircuitState.CLOSED
+        assert breaker.failures_total == 0
+
+    @pytest.mark.asyncio
+    async def test_call_timeout_counts_as_failure(self, clock):
+        breaker = CircuitBreaker("redis", failure_threshold=1, call_timeout=0.01, clock=clock)
+
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(asyncio.sleep, 1)
+
+        assert breaker.state is CircuitState.OPEN
+
+    def test_guarded_sync_method(self, clock):
+        class Adapter:
+            def __init__(self):
+                self.breaker = CircuitBreaker("mongodb", failure_threshold=1, clock=clock)
+
+            @guarded
+            def save(self, fail):
+                if fail:
+                    raise TimeoutError("server selection")
+                return "saved"
+
+        adapter = Adapter()
+        assert adapter.save(False) == "saved"
+        with pytest.raises(TimeoutError):
+            adapter.save(True)
+        with pytest.raises(CircuitOpenError):
+            adapter.save(False)
+
+
+class TestGuardedRedis:
+
+    @pytest.mark.asyncio
+    async def test_commands_go_through_breaker(self, breaker):
+        client = MagicMock()
+        client.get = AsyncMock(return_value="value")
+        redis = GuardedRedis(client, breaker)
+
+        assert await redis.get("key") == "value"
+        client.get.assert_awaited_once_with("key")
+        assert breaker.calls_total == 1
+
+    @pytest.mark.asyncio
+    async def test_slow_redis_is_bounded_by_call_timeout(self, clock):
+        async def hang(*args):
+            await asyncio.sleep(10)
+
+        client = MagicMock()
+        client.get = hang
+        breaker = CircuitBreaker("redis", failure_threshold=2, call_timeout=0.02, clock=clock)
+        redis = GuardedRedis(client, breaker)
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await redis.get("key")
+        with pytest.raises(CircuitOpenError):
+            await redis.get("key")
+
+        assert loop.time() - started < 1.0
+
+    @pytest.mark.asyncio
+    async def test_pipeline_execute_is_one_guarded_call(self, breaker):
+        pipe = MagicMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        pipe.execute = AsyncMock(return_value=[1, True])
+        client = MagicMock()
+        client.pipeline.return_value = pipe
+        redis = GuardedRedis(client, breaker)
+
+        async with redis.pipeline(transaction=True) as p:
+            p.sadd("k", "v").expire("k", 10)
+            results = await p.execute()
+
+        assert results == [1, True]
+        pipe.sadd.assert_called_once_with("k", "v")
+        assert breaker.calls_total == 1
+
+
+class TestBreakerMetrics:
+
+    def test_renders_state_and_counters(self, breaker):
+        breaker._open()
+
+        text = "\n".join(breaker_metrics({"redis": breaker}))
+
+        assert "# TYPE fraud_circuit_breaker_state gauge" in text
+        assert 'fraud_circuit_breaker_state{name="redis"} 2' in text
+        assert 'fraud_circuit_breaker_opened_total{name="redis"} 1' in text
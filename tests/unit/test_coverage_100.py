@@ -21,6 +21,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud
 
 from src.domain.models import FraudEvaluation, RiskLevel, Transaction, Location
 from src.adapters import MongoDBAdapter, RedisAdapter
+from src.infrastructure.rule_config_store import RuleConfigSnapshot
 
 
 class TestAdaptersComplete:
@@ -49,9 +50,7 @@ class TestAdaptersComplete:
     def test_update_evaluation_not_found(self, mock_mongo_client):
         """Test: update_evaluation lanza ValueError si no existe (línea 148)."""
         _, _, mock_collection = mock_mongo_client
-        mock_result = MagicMock()
-        mock_result.matched_count = 0
-        mock_collection.update_one.return_value = mock_result
+        mock_collection.find_one_and_update.return_value = None
         
         adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db")
         evaluation = FraudEvaluation(
@@ -69,9 +68,9 @@ class TestAdaptersComplete:
     def test_update_evaluation_success(self, mock_mongo_client):
         """Test: update_evaluation exitoso (líneas 134-147)."""
         _, _, mock_collection = mock_mongo_client
-        mock_result = MagicMock()
-        mock_result.matched_count = 1
-        mock_collection.update_one.return_value = mock_result
+        mock_collection.find_one_and_update.return_value = {
+            "status": "PENDING_REVIEW", "timestamp": datetime(2026, 1, 12, 10, 30)
+        }
         
         adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db")
         evaluation = FraudEvaluation(
@@ -86,74 +85,63 @@ class TestAdaptersComplete:
         )
         
         adapter.update_evaluation(evaluation)
-        mock_collection.update_one.assert_called_once()
+        mock_collection.find_one_and_update.assert_called_once()
     
     @pytest.mark.asyncio
-    async def test_get_user_location_none(self):
-        """Test: get_user_location retorna None (línea 216)."""
-        with patch('src.adapters.redis_async.from_url') as mock_redis:
-            mock_client = AsyncMock()
-            mock_client.get.return_value = None
-            mock_redis.return_value = mock_client
-            
-            adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
-            result = await adapter.get_user_location("user_001")
-            
-            assert result is None
-    
-    @pytest.mark.asyncio
-    async def test_get_user_location_json_error(self):
-        """Test: get_user_location con JSON inválido (líneas 220-221)."""
+    async def test_get_threshold_config_none(self):
+        """Test: get_threshold_config retorna None si no hay umbrales guardados."""
         with patch('src.adapters.redis_async.from_url') as mock_redis:
-            mock_client = AsyncMock()
-            mock_client.get.return_value = "invalid json"
-            mock_redis.return_value = mock_client
+            mock_redis.return_value = AsyncMock()
             
             adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
-            result = await adapter.get_user_location("user_001")
+            adapter.rule_config = AsyncMock()
+            adapter.rule_config.load.return_value = RuleConfigSnapshot()
+            result = await adapter.get_threshold_config()
             
             assert result is None
     
     @pytest.mark.asyncio
-    async def test_get_threshold_config_none(self):
-        """Test: get_threshold_config retorna None (línea 241)."""
+    async def test_get_threshold_config_from_rule_config(self):
+        """Test: get_threshold_config lee los umbrales del hash rule_config."""
         with patch('src.adapters.redis_async.from_url') as mock_redis:
-            mock_client = AsyncMock()
-            mock_client.get.return_value = None
-            mock_redis.return_value = mock_client
+            mock_redis.return_value = AsyncMock()
             
             adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
+            adapter.rule_config = AsyncMock()
+            adapter.rule_config.load.return_value = RuleConfigSnapshot(
+                thresholds={"amount_threshold": 2000.0, "location_radius_km": 150.0}
+            )
             result = await adapter.get_threshold_config()
             
-            assert result is None
+            assert result == {"amount_threshold": 2000.0, "location_radius_km": 150.0}
     
     @pytest.mark.asyncio
-    async def test_get_threshold_config_json_error(self):
-        """Test: get_threshold_config con JSON inválido (líneas 245-246)."""
+    async def test_get_threshold_config_fills_defaults(self):
+        """Test: get_threshold_config completa con settings los umbrales no escritos."""
+        from src.config import settings
         with patch('src.adapters.redis_async.from_url') as mock_redis:
-            mock_client = AsyncMock()
-            mock_client.get.return_value = "not valid json"
-            mock_redis.return_value = mock_client
+            mock_redis.return_value = AsyncMock()
             
             adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
+            adapter.rule_config = AsyncMock()
+            adapter.rule_config.load.return_value = RuleConfigSnapshot(thresholds={"amount_threshold": 2000.0})
             result = await adapter.get_threshold_config()
             
-            assert result is None
+            assert result == {"amount_threshold": 2000.0, "location_radius_km": settings.location_radius_km}
     
     @pytest.mark.asyncio
     async def test_set_threshold_config(self):
-        """Test: set_threshold_config (líneas 259-266)."""
+        """Test: set_threshold_config escribe ambos umbrales en una transacción."""
         with patch('src.adapters.redis_async.from_url') as mock_redis:
-            mock_client = AsyncMock()
-            mock_redis.return_value = mock_client
+            mock_redis.return_value = AsyncMock()
             
             adapter = RedisAdapter("redis://localhost:6379", ttl=3600)
+            adapter.rule_config = AsyncMock()
             await adapter.set_threshold_config(2000.0, 150.0)
             
-            mock_client.setex.assert_called_once()
-            call_args = mock_client.setex.call_args[0]
-            assert call_args[0] == "config:thresholds"
-            assert call_args[1] == 31536000  # 1 año
+            adapter.rule_config.set_thresholds.assert_awaited_once_with(
+                amount_threshold=2000.0, location_radius_km=150.0
+            )
 
 
 class TestModelsComplete:
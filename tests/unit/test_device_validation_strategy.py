@@ -18,6 +18,30 @@ from src.domain.models import Transaction, Location, RiskLevel
 from src.domain.strategies.device_validation import DeviceValidationStrategy
 
 
+class MockPipeline:
+    """Pipeline async que reenvía cada comando encolado al mock en execute()."""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis_client.round_trips += 1
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
 class TestDeviceValidationStrategy:
     """Tests para la estrategia de validación de dispositivos."""
     
@@ -25,15 +49,16 @@ class TestDeviceValidationStrategy:
     def mock_redis_client(self):
         """Mock del cliente Redis."""
         redis_client = Mock()
-        redis_client.sismember = Mock(return_value=False)
-        redis_client.sadd = Mock(return_value=1)
+        redis_client.round_trips = 0
+        redis_client.pipeline = Mock(side_effect=lambda transaction=True: MockPipeline(redis_client))
+        redis_client.sadd = Mock(return_value=1)  # 1 = no estaba en el set
         redis_client.expire = Mock(return_value=True)
         return redis_client
     
     @pytest.fixture
     def strategy(self, mock_redis_client):
         """Instancia de la estrategia con Redis mockeado."""
-        return DeviceValidationStrategy(redis_client=mock_redis_client)
+        return DeviceValidationStrategy(redis_client=mock_redis_client, legacy_reads=False)
     
     @pytest.fixture
     def sample_transaction(self):
@@ -48,13 +73,14 @@ class TestDeviceValidationStrategy:
             device_id="device_abc123"
         )
     
-    def test_new_device_detected_as_high_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_new_device_detected_as_high_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Un dispositivo nuevo debe ser detectado como HIGH_RISK."""
         # Arrange
-        mock_redis_client.sismember.return_value = False  # Dispositivo no conocido
+        mock_redis_client.sadd.return_value = 1  # Dispositivo no conocido
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.HIGH_RISK
@@ -62,26 +88,30 @@ class TestDeviceValidationStrategy:
         assert "device_abc123" in result["details"]
         
         # Verificar que se registró el dispositivo
-        mock_redis_client.sadd.assert_called_once_with("user_devices:user_123", "device_abc123")
-        mock_redis_client.expire.assert_called_once_with("user_devices:user_123", 90 * 24 * 60 * 60)
+        mock_redis_client.sadd.assert_called_once_with("user:{user_123}:devices", "device_abc123")
+        mock_redis_client.expire.assert_called_once_with("user:{user_123}:devices", 90 * 24 * 60 * 60)
+        assert mock_redis_client.round_trips == 1
     
-    def test_known_device_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_known_device_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Un dispositivo conocido debe retornar LOW_RISK sin violaciones."""
         # Arrange
-        mock_redis_client.sismember.return_value = True  # Dispositivo conocido
+        mock_redis_client.sadd.return_value = 0  # Dispositivo conocido
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.LOW_RISK
         assert result["reasons"] == []  # Sin violaciones
         assert "registrado previamente" in result["details"]
         
-        # No debe registrar el dispositivo nuevamente
-        mock_redis_client.sadd.assert_not_called()
+        # SADD no lo agrega de nuevo; solo se renueva la expiración
+        mock_redis_client.sadd.assert_called_once_with("user:{user_123}:devices", "device_abc123")
+        assert mock_redis_client.round_trips == 1
     
-    def test_transaction_without_device_id_medium_risk(self, strategy, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_transaction_without_device_id_medium_risk(self, strategy, mock_redis_client):
         """Test: Transacción sin device_id debe ser MEDIUM_RISK."""
         # Arrange
         location = Location(latitude=4.7110, longitude=-74.0721)
@@ -95,13 +125,14 @@ class TestDeviceValidationStrategy:
         )
         
         # Act
-        result = strategy.evaluate(transaction)
+        result = await strategy.evaluate(transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.MEDIUM_RISK
         assert "No se proporcionó device_id" in result["reasons"]
     
-    def test_transaction_with_empty_device_id_medium_risk(self, strategy, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_transaction_with_empty_device_id_medium_risk(self, strategy, mock_redis_client):
         """Test: Transacción con device_id vacío debe ser MEDIUM_RISK."""
         # Arrange
         location = Location(latitude=4.7110, longitude=-74.0721)
@@ -115,25 +146,27 @@ class TestDeviceValidationStrategy:
         )
         
         # Act
-        result = strategy.evaluate(transaction)
+        result = await strategy.evaluate(transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.MEDIUM_RISK
         assert "No se proporcionó device_id" in result["reasons"]
     
-    def test_redis_error_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_redis_error_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Error en Redis debe retornar LOW_RISK para no bloquear transacciones."""
         # Arrange
-        mock_redis_client.sismember.side_effect = Exception("Redis connection failed")
+        mock_redis_client.sadd.side_effect = Exception("Redis connection failed")
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.LOW_RISK
         assert "Error en validación de dispositivo" in result["reasons"]
     
-    def test_multiple_devices_per_user(self, strategy, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_multiple_devices_per_user(self, strategy, mock_redis_client):
         """Test: Un usuario puede tener múltiples dispositivos registrados."""
         # Arrange
         location = Location(latitude=4.7110, longitude=-74.0721)
@@ -154,34 +187,52 @@ class TestDeviceValidationStrategy:
             device_id="device_002"
         )
         
-        mock_redis_client.sismember.return_value = False
+        mock_redis_client.sadd.return_value = 1
         
         # Act
-        result1 = strategy.evaluate(device1_transaction)
-        result2 = strategy.evaluate(device2_transaction)
+        result1 = await strategy.evaluate(device1_transaction)
+        result2 = await strategy.evaluate(device2_transaction)
         
         # Assert
         assert result1["risk_level"] == RiskLevel.HIGH_RISK  # Primer dispositivo
         assert result2["risk_level"] == RiskLevel.HIGH_RISK  # Segundo dispositivo
         assert mock_redis_client.sadd.call_count == 2
     
-    def test_redis_key_format(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_redis_key_format(self, strategy, mock_redis_client, sample_transaction):
         """Test: Verificar el formato correcto de la clave Redis."""
         # Act
-        strategy.evaluate(sample_transaction)
+        await strategy.evaluate(sample_transaction)
         
         # Assert
-        expected_key = "user_devices:user_123"
-        mock_redis_client.sismember.assert_called_once_with(expected_key, "device_abc123")
+        expected_key = "user:{user_123}:devices"
+        mock_redis_client.sadd.assert_called_once_with(expected_key, "device_abc123")
     
-    def test_device_expiration_time(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_device_expiration_time(self, strategy, mock_redis_client, sample_transaction):
         """Test: Los dispositivos deben expirar después de 90 días."""
         # Arrange
-        mock_redis_client.sismember.return_value = False
+        mock_redis_client.sadd.return_value = 1
         
         # Act
-        strategy.evaluate(sample_transaction)
+        await strategy.evaluate(sample_transaction)
         
         # Assert
         expected_expiration = 90 * 24 * 60 * 60  # 90 días en segundos
-        mock_redis_client.expire.assert_called_once_with("user_devices:user_123", expected_expiration)
+        mock_redis_client.expire.assert_called_once_with("user:{user_123}:devices", expected_expiration)
+
+    @pytest.mark.asyncio
+    async def test_device_in_legacy_set_is_known(self, mock_redis_client, sample_transaction):
+        """Test: Durante la migración, un dispositivo del set anterior es conocido."""
+        # Arrange
+        strategy = DeviceValidationStrategy(redis_client=mock_redis_client)
+        mock_redis_client.sadd.return_value = 1  # Nuevo en la clave con hash tag
+        mock_redis_client.sismember = Mock(return_value=True)
+
+        # Act
+        result = await strategy.evaluate(sample_transaction)
+
+        # Assert
+        assert result["risk_level"] == RiskLevel.LOW_RISK
+        mock_redis_client.sismember.assert_called_once_with("user_devices:user_123", "device_abc123")
+        assert mock_redis_client.round_trips == 1
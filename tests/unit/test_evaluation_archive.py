@@ -0,0 +1,167 @@
+"""
+Tests unitarios para el tier frío de evaluaciones.
+
+Valida el formato de los archivos (NDJSON comprimido por día), el orden
+escribir -> indexar -> borrar del archivador y el fallback de lectura de
+get_evaluation_by_id.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure import evaluation_archive
+from src.infrastructure.evaluation_archive import (
+    EvaluationArchive,
+    EvaluationArchiver,
+    decode_line,
+    encode_document,
+)
+
+
+def make_document(i: int, timestamp: datetime) -> dict:
+    return {
+        "_id": f"oid_{i}",
+        "transaction_id": f"txn_{i:03d}",
+        "user_id": "user_001",
+        "risk_level": "LOW_RISK",
+        "reasons": [],
+        "status": "APPROVED",
+        "timestamp": timestamp,
+        "reviewed_at": None,
+        "amount": 100.0 + i,
+        "location": {"latitude": 4.6, "longitude": -74.1},
+    }
+
+
+class FakeIndex:
+    """Colección `evaluation_archive_index` en memoria."""
+
+    def __init__(self):
+        self.entries = {}
+
+    def bulk_write(self, operations, ordered=True):
+        for op in operations:
+            self.entries[op._filter["_id"]] = dict(op._doc["$set"])
+
+    def find_one(self, query):
+        entry = self.entries.get(query["_id"])
+        return dict(entry, _id=query["_id"]) if entry else None
+
+
+@pytest.fixture(params=["gzip", "zstd"])
+def archive(request, tmp_path):
+    if request.param == "zstd" and evaluation_archive.zstandard is None:
+        pytest.skip("zstandard not installed")
+    return EvaluationArchive(str(tmp_path), FakeIndex(), compression=request.param)
+
+
+class TestEncoding:
+
+    def test_roundtrip_preserves_dates_and_drops_object_id(self):
+        document = make_document(1, datetime(2026, 1, 12, 10, 30, 5))
+
+        decoded = decode_line(encode_document(document))
+
+        assert "_id" not in decoded
+        assert decoded["timestamp"] == datetime(2026, 1, 12, 10, 30, 5)
+        assert decoded["location"] == {"latitude": 4.6, "longitude": -74.1}
+
+
+class TestEvaluationArchive:
+
+    def test_partition_layout(self, archive):
+        day = datetime(2026, 1, 12)
+        relative = archive.write_partition(day, [make_document(1, datetime(2026, 1, 12, 9))])
+
+        assert relative.startswith("date=2026-01-12/part-")
+        assert relative.endswith(archive.extension)
+        assert archive.partitions() == ["2026-01-12"]
+        # No quedan archivos temporales tras el rename atómico
+        assert not list(archive.root.rglob("*.tmp"))
+
+    def test_find_uses_index_entry(self, archive):
+        day = datetime(2026, 1, 12)
+        documents = [make_document(i, datetime(2026, 1, 12, 9, i)) for i in range(3)]
+        relative = archive.write_partition(day, documents)
+        archive.register(relative, documents, day)
+
+        found = archive.find("txn_002")
+
+        assert found["amount"] == 102.0
+        assert archive.find("txn_999") is None
+
+    def test_invalid_compression(self, tmp_path):
+        with pytest.raises(ValueError):
+            EvaluationArchive(str(tmp_path), FakeIndex(), compression="lz4")
+
+
+class TestEvaluationArchiver:
+
+    def test_moves_old_evaluations_partitioned_by_day(self, tmp_path):
+        """Test: Escribe un archivo por día, indexa y recién después borra."""
+        archive = EvaluationArchive(str(tmp_path), FakeIndex(), compression="gzip")
+        documents = [
+            make_document(1, datetime(2026, 1, 10, 8)),
+            make_document(2, datetime(2026, 1, 10, 22)),
+            make_document(3, datetime(2026, 1, 11, 9)),
+        ]
+        evaluations = MagicMock()
+        evaluations.find.return_value.sort.return_value.limit.side_effect = [documents, []]
+
+        def assert_indexed_before_delete(query):
+            assert set(archive.index.entries) == {"txn_001", "txn_002", "txn_003"}
+
+        evaluations.delete_many.side_effect = assert_indexed_before_delete
+
+        moved = EvaluationArchiver(evaluations, archive).run(older_than_days=30, now=datetime(2026, 2, 15, 13))
+
+        assert moved == 3
+        assert evaluations.find.call_args_list[0].args[0] == {"timestamp": {"$lt": datetime(2026, 1, 16)}}
+        assert archive.partitions() == ["2026-01-10", "2026-01-11"]
+        evaluations.delete_many.assert_called_once_with({"_id": {"$in": ["oid_1", "oid_2", "oid_3"]}})
+
+    def test_write_failure_keeps_hot_copy(self, tmp_path):
+        archive = MagicMock()
+        archive.write_partition.side_effect = OSError("disk full")
+        evaluations = MagicMock()
+        evaluations.find.return_value.sort.return_value.limit.return_value = [
+            make_document(1, datetime(2026, 1, 10, 8))
+        ]
+
+        with pytest.raises(OSError):
+            EvaluationArchiver(evaluations, archive).run(older_than_days=30, now=datetime(2026, 2, 15))
+
+        evaluations.delete_many.assert_not_called()
+
+
+class TestArchiveFallback:
+
+    @pytest.fixture
+    def adapter(self):
+        with patch('src.adapters.MongoClient') as mock_client:
+            mock_client.return_value.__getitem__.return_value = MagicMock()
+            from src.adapters import MongoDBAdapter
+            adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+            adapter.evaluations.find_one.return_value = None
+            adapter.archive = MagicMock()
+            yield adapter
+
+    def test_get_evaluation_by_id_reads_archive(self, adapter):
+        document = make_document(7, datetime(2025, 6, 1, 12))
+        del document["_id"]
+        adapter.archive.find.return_value = document
+
+        evaluation = adapter.get_evaluation_by_id("txn_007")
+
+        adapter.archive.find.assert_called_once_with("txn_007")
+        assert evaluation.transaction_id == "txn_007"
+        assert evaluation.timestamp == datetime(2025, 6, 1, 12)
+
+    def test_unreadable_archive_returns_none(self, adapter):
+        adapter.archive.find.side_effect = OSError("missing file")
+
+        assert adapter.get_evaluation_by_id("txn_007") is None
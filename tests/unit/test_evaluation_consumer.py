@@ -0,0 +1,243 @@
+"""
+Tests unitarios para el consumidor asyncio del worker.
+
+Valida la concurrencia acotada, que cada mensaje se confirme con su
+propio delivery tag aunque las evaluaciones terminen en otro orden y
+que el modo micro-lote confirme cada lote con un solo ack múltiple.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter, WriteOutcome
+from tests.unit.conftest import FakeMessage, decode_json
+
+
+class FakeEngine:
+    """Engine cuya evaluación tarda lo indicado en el mensaje."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.running = 0
+        self.max_running = 0
+        self.finished = []
+
+    async def evaluate(self, transaction_data, on_done):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        try:
+            await asyncio.sleep(transaction_data["delay"])
+            if transaction_data.get("invalid"):
+                raise ValueError("invalid amount")
+            if transaction_data.get("flaky"):
+                raise ConnectionError("redis down")
+        finally:
+            self.running -= 1
+        self.finished.append(transaction_data["id"])
+        self.writer.add(Mock(transaction_id=transaction_data["id"]), on_done)
+        return {"risk_level": "LOW_RISK"}, True
+
+    def maintain(self):
+        pass
+
+
+@pytest.fixture
+def settled():
+    return []
+
+
+@pytest.fixture
+def repository():
+    repository = Mock()
+    repository.save_evaluations = Mock(side_effect=lambda batch: [WriteOutcome.WRITTEN] * len(batch))
+    return repository
+
+
+@pytest.fixture
+def engine(repository):
+    return FakeEngine(EvaluationBatchWriter(repository, max_batch_size=100, max_delay_seconds=10))
+
+
+def message(tag, settled, delay=0.0, **extra):
+    body = json.dumps({"id": f"txn_{tag}", "delay": delay, **extra}).encode()
+    return FakeMessage(tag, body, settled)
+
+
+class TestEvaluationConsumer:
+
+    @pytest.mark.asyncio
+    async def test_out_of_order_completion_acks_each_own_tag(self, engine, settled):
+        consumer = EvaluationConsumer(engine, concurrency=4, decode=decode_json)
+        delays = {1: 0.04, 2: 0.01, 3: 0.03, 4: 0.0}
+
+        for tag, delay in delays.items():
+            await consumer.dispatch(message(tag, settled, delay))
+        await consumer.drain()
+
+        assert engine.finished == ["txn_4", "txn_2", "txn_3", "txn_1"]
+        assert sorted(settled) == [(1, "ack"), (2, "ack"), (3, "ack"), (4, "ack")]
+
+    @pytest.mark.asyncio
+    async def test_concurrency_is_bounded(self, engine, settled):
+        consumer = EvaluationConsumer(engine, concurrency=3, decode=decode_json)
+
+        for tag in range(10):
+            await consumer.dispatch(message(tag, settled, 0.01))
+            assert consumer.in_flight <= 3
+        await consumer.drain()
+
+        assert engine.max_running == 3
+        assert len(settled) == 10
+
+    @pytest.mark.asyncio
+    async def test_ack_waits_for_batch_write(self, engine, settled, repository):
+        consumer = EvaluationConsumer(engine, concurrency=2, decode=decode_json)
+
+        await consumer.dispatch(message(1, settled))
+        while consumer.in_flight:
+            await asyncio.sleep(0)
+
+        assert settled == []
+        repository.save_evaluations.assert_not_called()
+
+        await consumer.drain()
+
+        assert settled == [(1, "ack")]
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_requeues_its_messages(self, engine, settled, repository):
+        repository.save_evaluations.side_effect = ConnectionError("mongo down")
+        consumer = EvaluationConsumer(engine, concurrency=2, decode=decode_json)
+
+        await consumer.dispatch(message(1, settled))
+        await consumer.dispatch(message(2, settled))
+        await consumer.drain()
+
+        assert sorted(settled) == [(1, "requeue"), (2, "requeue")]
+
+    @pytest.mark.asyncio
+    async def test_invalid_messages_are_rejected(self, engine, settled):
+        consumer = EvaluationConsumer(engine, concurrency=2, decode=decode_json)
+
+        await consumer.dispatch(FakeMessage(1, b"invalid json {{", settled))
+        await consumer.dispatch(message(2, settled, invalid=True))
+        await consumer.dispatch(message(3, settled, flaky=True))
+        await consumer.drain()
+
+        assert sorted(settled) == [(1, "reject"), (2, "reject"), (3, "requeue")]
+
+    @pytest.mark.asyncio
+    async def test_settle_failure_is_logged(self, engine):
+        consumer = EvaluationConsumer(engine, concurrency=1, decode=decode_json)
+        broken = Mock(delivery_tag=7, body=json.dumps({"id": "txn_7", "delay": 0}).encode())
+        broken.ack = Mock(side_effect=RuntimeError("channel closed"))
+
+        await consumer.dispatch(broken)
+        await consumer.drain()
+
+        broken.ack.assert_called_once()
+
+    def test_concurrency_must_be_positive(self, engine):
+        with pytest.raises(ValueError):
+            EvaluationConsumer(engine, concurrency=0)
+
+
+class FakeBatchEngine:
+    """Engine con `evaluate_batch`; registra el tamaño de cada lote."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.batches = []
+
+    async def evaluate_batch(self, batch):
+        self.batches.append(len(batch))
+        results = []
+        for data, on_done in batch:
+            if data.get("invalid"):
+                results.append(ValueError("invalid amount"))
+            elif data.get("flaky"):
+                results.append(ConnectionError("redis down"))
+            else:
+                self.writer.add(Mock(transaction_id=data["id"]), on_done)
+                results.append(({"risk_level": "LOW_RISK"}, True))
+        return results
+
+    def maintain(self):
+        pass
+
+
+def batch_message(tag, settled, **extra):
+    body = json.dumps({"id": f"txn_{tag}", **extra}).encode()
+    return FakeMessage(tag, body, settled)
+
+
+class TestMicroBatchConsumer:
+
+    @pytest.fixture
+    def batch_engine(self, repository):
+        return FakeBatchEngine(EvaluationBatchWriter(repository, max_batch_size=100, max_delay_seconds=10))
+
+    @pytest.mark.asyncio
+    async def test_full_batch_is_acked_once(self, batch_engine, settled, repository):
+        consumer = MicroBatchConsumer(batch_engine, batch_size=4, max_wait_seconds=10, decode=decode_json)
+
+        for tag in range(1, 5):
+            await consumer.dispatch(batch_message(tag, settled))
+
+        assert batch_engine.batches == [4]
+        repository.save_evaluations.assert_called_once()
+        assert settled == [(4, "ack-multiple")]
+
+    @pytest.mark.asyncio
+    async def test_failures_are_nacked_before_multi_ack(self, batch_engine, settled):
+        consumer = MicroBatchConsumer(batch_engine, batch_size=5, max_wait_seconds=10, decode=decode_json)
+
+        await consumer.dispatch(batch_message(1, settled))
+        await consumer.dispatch(FakeMessage(2, b"invalid json {{", settled))
+        await consumer.dispatch(batch_message(3, settled, invalid=True))
+        await consumer.dispatch(batch_message(4, settled))
+        await consumer.dispatch(batch_message(5, settled, flaky=True))
+
+        assert settled == [(2, "reject"), (3, "reject"), (5, "requeue"), (4, "ack-multiple")]
+
+    @pytest.mark.asyncio
+    async def test_failed_write_requeues_whole_batch(self, batch_engine, settled, repository):
+        repository.save_evaluations.side_effect = ConnectionError("mongo down")
+        consumer = MicroBatchConsumer(batch_engine, batch_size=2, max_wait_seconds=10, decode=decode_json)
+
+        await consumer.dispatch(batch_message(1, settled))
+        await consumer.dispatch(batch_message(2, settled))
+
+        assert settled == [(1, "requeue"), (2, "requeue")]
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_is_processed_after_max_wait(self, batch_engine, settled):
+        consumer = MicroBatchConsumer(batch_engine, batch_size=64, max_wait_seconds=0.01, decode=decode_json)
+        timer = asyncio.create_task(consumer.flush_periodically())
+
+        await consumer.dispatch(batch_message(1, settled))
+        await consumer.dispatch(batch_message(2, settled))
+        await asyncio.sleep(0.05)
+        timer.cancel()
+
+        assert batch_engine.batches == [2]
+        assert settled == [(2, "ack-multiple")]
+
+    @pytest.mark.asyncio
+    async def test_drain_processes_pending_messages(self, batch_engine, settled):
+        consumer = MicroBatchConsumer(batch_engine, batch_size=64, max_wait_seconds=10, decode=decode_json)
+
+        await consumer.dispatch(batch_message(1, settled))
+        await consumer.drain()
+
+        assert settled == [(1, "ack-multiple")]
+
+    def test_batch_size_must_be_positive(self, batch_engine):
+        with pytest.raises(ValueError):
+            MicroBatchConsumer(batch_engine, batch_size=0)
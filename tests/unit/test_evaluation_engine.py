@@ -0,0 +1,208 @@
+"""
+Tests unitarios para el engine de larga vida del worker.
+
+Valida que los adaptadores se construyan una sola vez, que las
+evaluaciones concurrentes no compartan la evaluación preparada y que el
+mantenimiento del publisher no interrumpa el procesamiento.
+"""
+import asyncio
+import threading
+from datetime import datetime
+import pytest
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_engine import EvaluationEngine
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter, WriteOutcome
+
+
+@pytest.fixture
+def engine():
+    mongo = Mock()
+    writer = EvaluationBatchWriter(mongo, max_batch_size=10)
+    publisher = Mock()
+    publisher.publish_for_manual_review = AsyncMock()
+    cache = Mock()
+    cache.get_user_location = AsyncMock(return_value=None)
+    cache.set_user_location = AsyncMock()
+    cache.redis.aclose = AsyncMock()
+    return EvaluationEngine(mongo, publisher, cache, writer, strategies=[])
+
+
+def transaction_data(i: int = 1) -> dict:
+    return {
+        "id": f"txn_{i:03d}",
+        "amount": 100.0,
+        "user_id": "user_001",
+        "location": {"latitude": 4.7110, "longitude": -74.0721},
+    }
+
+
+class TestEvaluationEngine:
+
+    @pytest.mark.asyncio
+    async def test_evaluation_is_staged_in_writer(self, engine):
+        on_done = Mock()
+
+        result, deferred = await engine.evaluate(transaction_data(), on_done)
+
+        assert result["transaction_id"] == "txn_001"
+        assert deferred is True
+        assert len(engine.writer) == 1
+
+    @pytest.mark.asyncio
+    async def test_concurrent_evaluations_do_not_share_staging(self, engine):
+        callbacks = [Mock() for _ in range(5)]
+
+        await asyncio.gather(*(
+            engine.evaluate(transaction_data(i), callbacks[i]) for i in range(5)
+        ))
+        engine.repository.save_evaluations.side_effect = lambda batch: [WriteOutcome.WRITTEN] * len(batch)
+        written = [evaluation.transaction_id for evaluation, _ in engine.writer._pending]
+        engine.writer.flush()
+
+        assert sorted(written) == [f"txn_{i:03d}" for i in range(5)]
+        for callback in callbacks:
+            callback.assert_called_once_with(WriteOutcome.WRITTEN)
+
+    @pytest.mark.asyncio
+    async def test_failed_evaluation_leaves_nothing_staged(self, engine):
+        with pytest.raises(Exception):
+            await engine.evaluate({"id": "txn_bad"}, Mock())
+
+        assert len(engine.writer) == 0
+
+    def test_from_settings_builds_adapters_once(self):
+        with patch("src.infrastructure.evaluation_engine.MongoDBAdapter") as mongo, \
+                patch("src.infrastructure.evaluation_engine.AsyncRabbitMQPublisher") as rabbit, \
+                patch("src.infrastructure.evaluation_engine.RedisAdapter") as redis:
+            redis.return_value.local_state = None
+            engine = EvaluationEngine.from_settings()
+
+        mongo.assert_called_once()
+        rabbit.assert_called_once()
+        redis.assert_called_once()
+        # El writer por lotes y las lecturas comparten el adaptador
+        assert engine.writer.repository is mongo.return_value
+        assert engine.repository is mongo.return_value
+        assert len(engine.strategies) == 5
+        # pymongo fuera del event loop: writer e historial en hilos
+        assert engine.writer.offload is True
+
+    @pytest.mark.asyncio
+    async def test_history_strategy_runs_off_the_event_loop(self):
+        from src.infrastructure.evaluation_engine import build_strategies
+
+        loop_thread = threading.get_ident()
+        reads = []
+        repository = Mock()
+        repository.get_evaluations_by_user.side_effect = lambda *args, **kwargs: reads.append(threading.get_ident()) or []
+        strategy = build_strategies(repository, Mock(local_state=None))[-1]
+
+        transaction = Mock(user_id="user_001", timestamp=datetime(2026, 1, 12, 3, 0))
+        result = await strategy.evaluate(transaction)
+
+        assert strategy.get_name() == "unusual_time"
+        assert reads and reads[0] != loop_thread
+        assert "risk_level" in result
+
+    def test_maintain_keeps_publisher_alive(self, engine):
+        engine.maintain()
+
+        engine.publisher.keepalive.assert_called_once()
+
+    def test_maintain_failure_does_not_raise(self, engine):
+        engine.publisher.keepalive.side_effect = ConnectionError("broker down")
+
+        engine.maintain()
+
+    @pytest.mark.asyncio
+    async def test_aclose_flushes_and_closes_connections(self, engine):
+        engine.writer.flush_async = AsyncMock()
+        engine.publisher.aclose = AsyncMock()
+
+        await engine.aclose()
+
+        engine.writer.flush_async.assert_awaited_once()
+        engine.publisher.aclose.assert_awaited_once()
+        engine.cache.redis.aclose.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_aclose_closes_blocking_publisher(self, engine):
+        del engine.publisher.aclose
+
+        await engine.aclose()
+
+        engine.publisher.close.assert_called_once()
+
+
+class TestPublisherKeepalive:
+
+    @pytest.fixture
+    def mock_pika(self):
+        with patch("src.adapters.pika.BlockingConnection") as mock_conn:
+            mock_conn.return_value.channel.return_value = MagicMock()
+            mock_conn.return_value.is_closed = False
+            yield mock_conn
+
+    def test_keepalive_processes_heartbeats(self, mock_pika):
+        from src.adapters import RabbitMQAdapter
+
+        adapter = RabbitMQAdapter("amqp://localhost:5672")
+        adapter.keepalive()
+
+        mock_pika.return_value.process_data_events.assert_called_once_with(time_limit=0)
+        assert mock_pika.call_count == 1
+
+    def test_keepalive_reconnects_lost_connection(self, mock_pika):
+        import pika
+        from src.adapters import RabbitMQAdapter
+
+        adapter = RabbitMQAdapter("amqp://localhost:5672")
+        mock_pika.return_value.process_data_events.side_effect = pika.exceptions.StreamLostError("lost")
+        adapter.keepalive()
+
+        assert mock_pika.call_count == 2
+
+
+class TestEvaluateBatch:
+
+    @pytest.mark.asyncio
+    async def test_locations_are_read_once_per_batch(self, engine):
+        engine.cache.get_user_locations = AsyncMock(return_value={"user_001": None})
+
+        results = await engine.evaluate_batch([(transaction_data(i), Mock()) for i in range(3)])
+
+        engine.cache.get_user_locations.assert_awaited_once_with(["user_001"] * 3)
+        engine.cache.get_user_location.assert_not_awaited()
+        assert [result["transaction_id"] for result, _ in results] == ["txn_000", "txn_001", "txn_002"]
+        assert len(engine.writer) == 3
+
+    @pytest.mark.asyncio
+    async def test_same_user_sees_previous_location(self, engine):
+        seen = []
+        engine.cache.get_user_locations = AsyncMock(return_value={"user_001": None})
+
+        class RecordingStrategy:
+            async def evaluate(self, transaction, historical_location):
+                seen.append(historical_location)
+                return {"reasons": []}
+
+        engine.strategies = [RecordingStrategy()]
+        await engine.evaluate_batch([(transaction_data(i), Mock()) for i in range(2)])
+
+        assert seen[0] is None
+        assert (seen[1].latitude, seen[1].longitude) == (4.7110, -74.0721)
+
+    @pytest.mark.asyncio
+    async def test_failures_are_returned_per_item(self, engine):
+        engine.cache.get_user_locations = AsyncMock(side_effect=ConnectionError("redis down"))
+
+        results = await engine.evaluate_batch([({"id": "txn_bad"}, Mock()), (transaction_data(), Mock())])
+
+        assert isinstance(results[0], ValueError)
+        assert results[1][0]["transaction_id"] == "txn_001"
+        engine.cache.get_user_location.assert_awaited_once()
@@ -0,0 +1,144 @@
+"""
+Tests unitarios para la exportación masiva en streaming.
+
+Valida que el cursor se recorra por lotes, que cada formato se serialice
+incrementalmente y que el gzip resultante sea un único flujo válido.
+"""
+import csv
+import gzip
+import io
+import json
+import pytest
+from unittest.mock import MagicMock
+from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_export import (
+    EXPORT_COLUMNS,
+    EvaluationExporter,
+    export_query,
+    to_row,
+)
+
+
+def make_documents(count: int):
+    base = datetime(2026, 1, 1)
+    for i in range(count):
+        yield {
+            "transaction_id": f"txn_{i:05d}",
+            "user_id": f"user_{i % 7}",
+            "timestamp": base + timedelta(minutes=i),
+            "risk_level": "HIGH_RISK" if i % 3 == 0 else "LOW_RISK",
+            "status": "REJECTED" if i % 3 == 0 else "APPROVED",
+            "reasons": ["Amount exceeds threshold", "New device"] if i % 3 == 0 else [],
+            "amount": 10.5 * i,
+            "location": {"latitude": 4.6, "longitude": -74.1},
+            "reviewed_at": None,
+        }
+
+
+class FakeCursor:
+    """Cursor que registra cuántos documentos se consumieron."""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self.consumed = 0
+        self.closed = False
+
+    def sort(self, *args):
+        self.sort_args = args
+        return self
+
+    def batch_size(self, size):
+        self.batch = size
+        return self
+
+    def __iter__(self):
+        for document in self.documents:
+            self.consumed += 1
+            yield document
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def collection():
+    collection = MagicMock()
+    collection.cursor = FakeCursor(make_documents(25))
+    collection.find.return_value = collection.cursor
+    return collection
+
+
+class TestExportQuery:
+
+    def test_range_and_status(self):
+        since, until = datetime(2026, 1, 1), datetime(2026, 2, 1)
+        assert export_query(since, until, "REJECTED") == {
+            "timestamp": {"$gte": since, "$lt": until},
+            "status": "REJECTED",
+        }
+
+    def test_no_filters(self):
+        assert export_query() == {}
+
+    def test_to_row_flattens_location(self):
+        row = to_row(next(make_documents(1)))
+        assert row["latitude"] == 4.6
+        assert set(row) == set(EXPORT_COLUMNS)
+
+
+class TestEvaluationExporter:
+
+    def test_ndjson_gzip_roundtrip(self, collection):
+        exporter = EvaluationExporter(collection, batch_size=10)
+
+        body = b"".join(exporter.stream("ndjson", {}))
+
+        lines = gzip.decompress(body).decode().splitlines()
+        assert len(lines) == 25
+        first = json.loads(lines[0])
+        assert first["timestamp"] == "2026-01-01T00:00:00"
+        assert first["reasons"] == ["Amount exceeds threshold", "New device"]
+        assert collection.cursor.sort_args == ("timestamp", 1)
+        assert collection.cursor.batch == 10
+        assert collection.cursor.closed
+
+    def test_stream_is_incremental(self, collection):
+        """Test: El primer bloque se produce sin leer todo el cursor."""
+        exporter = EvaluationExporter(collection, batch_size=10)
+
+        chunks = exporter.stream("ndjson", {}, compress=False)
+        first = next(chunks)
+
+        assert first.count(b"\n") == 10
+        assert collection.cursor.consumed <= 11
+
+    def test_csv_has_header_and_joined_reasons(self, collection):
+        exporter = EvaluationExporter(collection, batch_size=10)
+
+        body = b"".join(exporter.stream("csv", {}, compress=False)).decode()
+
+        rows = list(csv.reader(io.StringIO(body)))
+        assert rows[0] == list(EXPORT_COLUMNS)
+        assert len(rows) == 26
+        assert rows[1][EXPORT_COLUMNS.index("reasons")] == "Amount exceeds threshold | New device"
+
+    def test_parquet_row_groups(self, collection):
+        parquet = pytest.importorskip("pyarrow.parquet")
+        exporter = EvaluationExporter(collection, batch_size=10)
+
+        body = b"".join(exporter.stream("parquet", {}))
+
+        parquet_file = parquet.ParquetFile(io.BytesIO(body))
+        assert parquet_file.metadata.num_rows == 25
+        assert parquet_file.metadata.num_row_groups == 3
+        table = parquet_file.read()
+        assert table.column("reasons")[0].as_py() == ["Amount exceeds threshold", "New device"]
+
+    def test_unknown_format(self, collection):
+        with pytest.raises(ValueError):
+            EvaluationExporter(collection).stream("xml", {})
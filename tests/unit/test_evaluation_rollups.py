@@ -0,0 +1,254 @@
+"""
+Tests unitarios para los rollups materializados de evaluaciones.
+
+Valida que los contadores por hora/día se mantengan con upserts $inc,
+que los cambios de estado muevan los contadores y que la serie de
+tendencias lea solo los buckets solicitados.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import FraudEvaluation, RiskLevel
+from src.infrastructure.evaluation_rollups import (
+    EvaluationRollupStore,
+    bucket_id,
+    status_counter,
+    truncate_timestamp,
+)
+
+
+class TestRollupHelpers:
+    """Tests para las funciones auxiliares de buckets."""
+
+    def test_status_counter_mapping(self):
+        assert status_counter("APPROVED") == "approved"
+        assert status_counter("PENDING_REVIEW") == "suspicious"
+        assert status_counter("SUSPICIOUS") == "suspicious"
+        assert status_counter("REJECTED") == "rejected"
+        assert status_counter("UNKNOWN") is None
+
+    def test_truncate_timestamp(self):
+        ts = datetime(2026, 1, 12, 10, 45, 12, 500)
+        assert truncate_timestamp(ts, "hour") == datetime(2026, 1, 12, 10, 0)
+        assert truncate_timestamp(ts, "day") == datetime(2026, 1, 12, 0, 0)
+
+    def test_truncate_timestamp_invalid_resolution(self):
+        with pytest.raises(ValueError):
+            truncate_timestamp(datetime.now(), "week")
+
+    def test_bucket_id_is_deterministic(self):
+        assert bucket_id("hour", datetime(2026, 1, 12, 10)) == "hour:2026-01-12T10:00"
+
+
+class TestEvaluationRollupStore:
+    """Tests para EvaluationRollupStore."""
+
+    @pytest.fixture
+    def collection(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def store(self, collection):
+        return EvaluationRollupStore(collection)
+
+    def test_record_evaluation_upserts_hour_and_day(self, store, collection):
+        """Test: Una evaluación incrementa el bucket horario y diario en un solo bulk_write."""
+        store.record_evaluation(datetime(2026, 1, 12, 10, 45), "REJECTED")
+
+        collection.bulk_write.assert_called_once()
+        operations = collection.bulk_write.call_args[0][0]
+        ids = [op._filter["_id"] for op in operations]
+        assert ids == ["hour:2026-01-12T10:00", "day:2026-01-12T00:00"]
+        assert all(op._doc["$inc"] == {"rejected": 1, "total": 1} for op in operations)
+        assert all(op._upsert for op in operations)
+
+    def test_record_evaluation_ignores_unknown_status(self, store, collection):
+        store.record_evaluation(datetime(2026, 1, 12, 10), "UNKNOWN")
+        collection.bulk_write.assert_not_called()
+
+    def test_record_evaluations_aggregates_batch_per_bucket(self, store, collection):
+        """Test: Un lote se agrega por bucket en un solo bulk_write."""
+        store.record_evaluations([
+            (datetime(2026, 1, 12, 10, 5), "APPROVED"),
+            (datetime(2026, 1, 12, 10, 50), "APPROVED"),
+            (datetime(2026, 1, 12, 11, 15), "REJECTED"),
+            (datetime(2026, 1, 12, 11, 20), "UNKNOWN"),
+        ])
+
+        collection.bulk_write.assert_called_once()
+        operations = {op._filter["_id"]: op._doc["$inc"] for op in collection.bulk_write.call_args[0][0]}
+        assert operations == {
+            "hour:2026-01-12T10:00": {"approved": 2, "total": 2},
+            "day:2026-01-12T00:00": {"approved": 2, "rejected": 1, "total": 3},
+            "hour:2026-01-12T11:00": {"rejected": 1, "total": 1},
+        }
+
+    def test_record_evaluations_empty_batch(self, store, collection):
+        store.record_evaluations([])
+        collection.bulk_write.assert_not_called()
+
+    def test_record_status_change_moves_counter(self, store, collection):
+        """Test: Revisar una transacción mueve el conteo de sospechosa a aprobada."""
+        store.record_status_change(datetime(2026, 1, 12, 10, 5), "PENDING_REVIEW", "APPROVED")
+
+        operations = collection.bulk_write.call_args[0][0]
+        assert operations[0]._doc["$inc"] == {"suspicious": -1, "approved": 1}
+
+    def test_record_status_change_same_counter_is_noop(self, store, collection):
+        store.record_status_change(datetime(2026, 1, 12, 10), "PENDING_REVIEW", "SUSPICIOUS")
+        collection.bulk_write.assert_not_called()
+
+    def test_get_series_reads_only_requested_buckets(self, store, collection):
+        """Test: La serie de 24h consulta exactamente 24 _id y rellena huecos con 0."""
+        now = datetime(2026, 1, 12, 10, 30)
+        collection.find.return_value = [
+            {"_id": "hour:2026-01-12T10:00", "approved": 3, "suspicious": 1, "rejected": 2},
+            {"_id": "hour:2026-01-11T11:00", "approved": 1},
+        ]
+
+        series = store.get_series("hour", 24, now=now)
+
+        requested = collection.find.call_args[0][0]["_id"]["$in"]
+        assert len(requested) == 24
+        assert len(series) == 24
+        assert series[0]["time"] == "11:00"
+        assert series[0]["approved"] == 1
+        assert series[-1] == {
+            "time": "10:00",
+            "bucket": "2026-01-12T10:00:00",
+            "approved": 3,
+            "suspicious": 1,
+            "rejected": 2,
+        }
+        assert series[5]["approved"] == 0
+
+    def test_get_series_daily_window(self, store, collection):
+        """Test: 30 días a resolución diaria leen 30 documentos."""
+        collection.find.return_value = []
+
+        series = store.get_series("day", 30, now=datetime(2026, 1, 30, 8))
+
+        assert len(collection.find.call_args[0][0]["_id"]["$in"]) == 30
+        assert series[0]["time"] == "2026-01-01"
+        assert series[-1]["time"] == "2026-01-30"
+
+    def test_get_series_invalid_arguments(self, store):
+        with pytest.raises(ValueError):
+            store.get_series("minute", 10)
+        with pytest.raises(ValueError):
+            store.get_series("hour", 0)
+
+    def test_rebuild_replaces_buckets_from_aggregate(self, store, collection):
+        """Test: El backfill agrega en servidor y reemplaza cada bucket (idempotente)."""
+        evaluations = MagicMock()
+        hour = datetime(2026, 1, 12, 10)
+        day = datetime(2026, 1, 12)
+        evaluations.aggregate.side_effect = [
+            [
+                {"_id": {"bucket": hour, "status": "APPROVED"}, "count": 5},
+                {"_id": {"bucket": hour, "status": "REJECTED"}, "count": 2},
+            ],
+            [
+                {"_id": {"bucket": day, "status": "APPROVED"}, "count": 5},
+                {"_id": {"bucket": day, "status": "REJECTED"}, "count": 2},
+            ],
+        ]
+
+        written = store.rebuild(evaluations)
+
+        assert written == 2
+        hour_ops = collection.bulk_write.call_args_list[0][0][0]
+        assert hour_ops[0]._doc == {
+            "_id": "hour:2026-01-12T10:00",
+            "resolution": "hour",
+            "bucket": hour,
+            "approved": 5,
+            "suspicious": 0,
+            "rejected": 2,
+            "total": 7,
+        }
+
+    def test_rebuild_until_limits_match(self, store, collection):
+        evaluations = MagicMock()
+        evaluations.aggregate.return_value = []
+
+        store.rebuild(evaluations, until=datetime(2026, 1, 12, 10, 20))
+
+        first_pipeline = evaluations.aggregate.call_args_list[0][0][0]
+        assert first_pipeline[0]["$match"]["timestamp"]["$lt"] == datetime(2026, 1, 12, 10)
+        collection.bulk_write.assert_not_called()
+
+
+class TestMongoDBAdapterRollups:
+    """Tests de integración entre MongoDBAdapter y los rollups."""
+
+    @pytest.fixture
+    def mock_db(self):
+        with patch('src.adapters.MongoClient') as mock_client:
+            mock_db = MagicMock()
+            mock_client.return_value.__getitem__.return_value = mock_db
+            yield mock_db
+
+    @pytest.mark.asyncio
+    async def test_save_evaluation_records_rollup(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db")
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001",
+            user_id="user_001",
+            risk_level=RiskLevel.MEDIUM_RISK,
+            reasons=["test"],
+            timestamp=datetime(2026, 1, 12, 10, 15),
+        )
+
+        await adapter.save_evaluation(evaluation)
+
+        operations = mock_db.evaluation_rollups.bulk_write.call_args[0][0]
+        assert operations[0]._doc["$inc"] == {"suspicious": 1, "total": 1}
+
+    @pytest.mark.asyncio
+    async def test_save_evaluation_survives_rollup_failure(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        mock_db.evaluation_rollups.bulk_write.side_effect = Exception("rollup down")
+        adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db")
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001",
+            user_id="user_001",
+            risk_level=RiskLevel.LOW_RISK,
+            reasons=[],
+            timestamp=datetime(2026, 1, 12, 10, 15),
+        )
+
+        await adapter.save_evaluation(evaluation)
+
+        mock_db.evaluations.insert_one.assert_called_once()
+
+    def test_update_evaluation_moves_rollup_on_status_change(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        mock_db.evaluations.find_one_and_update.return_value = {
+            "status": "PENDING_REVIEW",
+            "timestamp": datetime(2026, 1, 12, 9, 59),
+        }
+        adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db")
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001",
+            user_id="user_001",
+            risk_level=RiskLevel.MEDIUM_RISK,
+            reasons=["test"],
+            timestamp=datetime(2026, 1, 12, 9, 59),
+            status="REJECTED",
+        )
+
+        adapter.update_evaluation(evaluation)
+
+        operations = mock_db.evaluation_rollups.bulk_write.call_args[0][0]
+        assert operations[0]._filter["_id"] == "hour:2026-01-12T09:00"
+        assert operations[0]._doc["$inc"] == {"suspicious": -1, "rejected": 1}
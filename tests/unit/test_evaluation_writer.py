@@ -0,0 +1,266 @@
+"""
+Tests unitarios para la persistencia write-behind de evaluaciones.
+
+Valida que el writer escriba por tamaño o por tiempo, que cada evaluación
+reciba su resultado después de la escritura y que los duplicados del
+índice único se traten como durables.
+"""
+import asyncio
+import threading
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+from decimal import Decimal
+import sys
+from pathlib import Path
+
+from pymongo.errors import BulkWriteError, AutoReconnect
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import FraudEvaluation, RiskLevel
+from src.infrastructure.evaluation_writer import (
+    EvaluationBatchWriter,
+    WriteBehindRepository,
+    WriteOutcome,
+)
+
+
+def make_evaluation(transaction_id: str, risk_level: RiskLevel = RiskLevel.LOW_RISK) -> FraudEvaluation:
+    return FraudEvaluation(
+        transaction_id=transaction_id,
+        user_id="user_001",
+        risk_level=risk_level,
+        reasons=[],
+        timestamp=datetime(2026, 1, 12, 10, 30),
+        amount=Decimal("100"),
+    )
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestEvaluationBatchWriter:
+    """Tests para EvaluationBatchWriter."""
+
+    @pytest.fixture
+    def repository(self):
+        repository = MagicMock()
+        repository.save_evaluations.side_effect = lambda evaluations: [WriteOutcome.WRITTEN] * len(evaluations)
+        return repository
+
+    @pytest.fixture
+    def clock(self):
+        return FakeClock()
+
+    def test_flushes_when_batch_is_full(self, repository, clock):
+        """Test: Al llenarse el lote se escribe con una sola llamada."""
+        writer = EvaluationBatchWriter(repository, max_batch_size=3, clock=clock)
+        results = []
+
+        for i in range(3):
+            writer.add(make_evaluation(f"txn_{i}"), results.append)
+
+        repository.save_evaluations.assert_called_once()
+        assert len(repository.save_evaluations.call_args.args[0]) == 3
+        assert results == [WriteOutcome.WRITTEN] * 3
+        assert len(writer) == 0
+
+    def test_callbacks_not_invoked_before_flush(self, repository, clock):
+        """Test: Ningún mensaje se confirma antes de que su lote se escriba."""
+        writer = EvaluationBatchWriter(repository, max_batch_size=10, clock=clock)
+        results = []
+
+        writer.add(make_evaluation("txn_1"), results.append)
+
+        assert results == []
+        repository.save_evaluations.assert_not_called()
+
+    def test_should_flush_after_max_delay(self, repository, clock):
+        writer = EvaluationBatchWriter(repository, max_batch_size=10, max_delay_seconds=0.1, clock=clock)
+        writer.add(make_evaluation("txn_1"), lambda outcome: None)
+
+        assert writer.should_flush() is False
+        assert writer.seconds_until_due() == pytest.approx(0.1)
+
+        clock.now = 0.25
+        assert writer.should_flush() is True
+        assert writer.seconds_until_due() == 0.0
+
+    def test_empty_writer_has_nothing_due(self, repository, clock):
+        writer = EvaluationBatchWriter(repository, clock=clock)
+
+        assert writer.seconds_until_due() is None
+        assert writer.should_flush() is False
+        assert writer.flush() == 0
+
+    def test_failed_batch_is_reported_as_retry(self, repository, clock):
+        """Test: Si el lote completo falla, todos los mensajes se reencolan."""
+        repository.save_evaluations.side_effect = AutoReconnect("connection lost")
+        writer = EvaluationBatchWriter(repository, max_batch_size=2, clock=clock)
+        results = []
+
+        writer.add(make_evaluation("txn_1"), results.append)
+        writer.add(make_evaluation("txn_2"), results.append)
+
+        assert results == [WriteOutcome.RETRY, WriteOutcome.RETRY]
+
+    def test_callback_error_does_not_stop_other_notifications(self, repository, clock):
+        writer = EvaluationBatchWriter(repository, max_batch_size=2, clock=clock)
+        results = []
+
+        def broken(outcome):
+            raise RuntimeError("channel closed")
+
+        writer.add(make_evaluation("txn_1"), broken)
+        writer.add(make_evaluation("txn_2"), results.append)
+
+        assert results == [WriteOutcome.WRITTEN]
+
+    @pytest.mark.asyncio
+    async def test_async_flush_writes_in_a_thread(self, repository, clock):
+        """Test: El insert_many no bloquea el event loop; los callbacks vuelven al loop."""
+        loop_thread = threading.get_ident()
+        release = threading.Event()
+        save_threads, callback_threads = [], []
+
+        def slow_save(evaluations):
+            save_threads.append(threading.get_ident())
+            release.wait(timeout=5)
+            return [WriteOutcome.WRITTEN] * len(evaluations)
+
+        repository.save_evaluations.side_effect = slow_save
+        writer = EvaluationBatchWriter(repository, max_batch_size=10, clock=clock)
+        writer.add(make_evaluation("txn_1"), lambda outcome: callback_threads.append(threading.get_ident()))
+
+        flushing = asyncio.ensure_future(writer.flush_async())
+        # El loop sigue atendiendo otras tareas mientras se escribe
+        await asyncio.sleep(0.01)
+        assert not flushing.done()
+        release.set()
+
+        assert await flushing == 1
+        assert save_threads and save_threads[0] != loop_thread
+        assert callback_threads == [loop_thread]
+
+    @pytest.mark.asyncio
+    async def test_offloaded_full_batch_is_written_in_background(self, repository, clock):
+        """Test: Con offload, el lote lleno se escribe en un hilo y join lo espera."""
+        writer = EvaluationBatchWriter(repository, max_batch_size=2, clock=clock, offload=True)
+        results = []
+
+        writer.add(make_evaluation("txn_1"), results.append)
+        writer.add(make_evaluation("txn_2"), results.append)
+        assert len(writer) == 0
+        assert results == []
+
+        await writer.join()
+
+        repository.save_evaluations.assert_called_once()
+        assert results == [WriteOutcome.WRITTEN] * 2
+
+    def test_invalid_batch_size(self, repository):
+        with pytest.raises(ValueError):
+            EvaluationBatchWriter(repository, max_batch_size=0)
+
+    def test_outcome_durability(self):
+        assert WriteOutcome.WRITTEN.is_durable
+        assert WriteOutcome.DUPLICATE.is_durable
+        assert not WriteOutcome.FAILED.is_durable
+        assert not WriteOutcome.RETRY.is_durable
+
+
+class TestWriteBehindRepository:
+    """Tests para WriteBehindRepository."""
+
+    @pytest.mark.asyncio
+    async def test_save_is_staged_until_commit(self):
+        writer = MagicMock()
+        repository = WriteBehindRepository(MagicMock(), writer)
+        evaluation = make_evaluation("txn_1")
+        on_done = MagicMock()
+
+        await repository.save_evaluation(evaluation)
+        writer.add.assert_not_called()
+
+        assert repository.commit(on_done) is True
+        writer.add.assert_called_once_with(evaluation, on_done)
+        assert repository.commit(on_done) is False
+
+    @pytest.mark.asyncio
+    async def test_discard_drops_staged_evaluation(self):
+        writer = MagicMock()
+        repository = WriteBehindRepository(MagicMock(), writer)
+
+        await repository.save_evaluation(make_evaluation("txn_1"))
+        repository.discard()
+
+        assert repository.commit(MagicMock()) is False
+        writer.add.assert_not_called()
+
+    def test_reads_are_delegated(self):
+        inner = MagicMock()
+        inner.get_evaluations_by_user.return_value = ["evaluation"]
+        repository = WriteBehindRepository(inner, MagicMock())
+
+        assert repository.get_evaluations_by_user("user_001") == ["evaluation"]
+
+
+class TestMongoDBAdapterBatchSave:
+    """Tests para MongoDBAdapter.save_evaluations."""
+
+    @pytest.fixture
+    def adapter(self):
+        with patch('src.adapters.MongoClient') as mock_client:
+            mock_db = MagicMock()
+            mock_client.return_value.__getitem__.return_value = mock_db
+            from src.adapters import MongoDBAdapter
+            adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+            adapter.rollups = MagicMock()
+            yield adapter
+
+    def test_single_unordered_insert_many(self, adapter):
+        """Test: Un lote cuesta un insert_many desordenado y un bulk_write de rollups."""
+        evaluations = [make_evaluation(f"txn_{i}") for i in range(5)]
+
+        outcomes = adapter.save_evaluations(evaluations)
+
+        adapter.evaluations.insert_many.assert_called_once()
+        documents = adapter.evaluations.insert_many.call_args.args[0]
+        assert [d["transaction_id"] for d in documents] == [f"txn_{i}" for i in range(5)]
+        assert adapter.evaluations.insert_many.call_args.kwargs["ordered"] is False
+        assert outcomes == [WriteOutcome.WRITTEN] * 5
+        adapter.rollups.record_evaluations.assert_called_once()
+        assert len(adapter.rollups.record_evaluations.call_args.args[0]) == 5
+
+    def test_duplicate_and_failed_documents(self, adapter):
+        """Test: 11000 es DUPLICATE; otros errores de documento son FAILED."""
+        adapter.evaluations.insert_many.side_effect = BulkWriteError({
+            "writeErrors": [
+                {"index": 1, "code": 11000, "errmsg": "duplicate key"},
+                {"index": 2, "code": 121, "errmsg": "document failed validation"},
+            ]
+        })
+        evaluations = [make_evaluation(f"txn_{i}") for i in range(3)]
+
+        outcomes = adapter.save_evaluations(evaluations)
+
+        assert outcomes == [WriteOutcome.WRITTEN, WriteOutcome.DUPLICATE, WriteOutcome.FAILED]
+        # Solo las escritas nuevas suman en los rollups
+        assert len(adapter.rollups.record_evaluations.call_args.args[0]) == 1
+
+    def test_empty_batch(self, adapter):
+        assert adapter.save_evaluations([]) == []
+        adapter.evaluations.insert_many.assert_not_called()
+
+    def test_rollup_error_does_not_fail_batch(self, adapter):
+        adapter.rollups.record_evaluations.side_effect = Exception("rollups down")
+
+        outcomes = adapter.save_evaluations([make_evaluation("txn_1")])
+
+        assert outcomes == [WriteOutcome.WRITTEN]
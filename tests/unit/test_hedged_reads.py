@@ -0,0 +1,148 @@
+"""
+Tests unitarios para las lecturas con hedging (primario + réplica).
+
+Los clientes falsos responden tras un retardo configurable para simular
+un primario lento.
+"""
+import asyncio
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+
+from src.infrastructure.hedged_reads import MIN_SAMPLES, RECOMPUTE_EVERY, HedgedRedis, HedgePolicy, run_read
+from src.infrastructure.metrics import hedge_metrics
+
+
+class SlowClient:
+    """Cliente cuyo GET responde `name` tras `delay` segundos."""
+
+    def __init__(self, name, delay=0.0, error=None):
+        self.name = name
+        self.delay = delay
+        self.error = error
+        self.calls = []
+        self.cancelled = 0
+
+    async def get(self, key):
+        self.calls.append(("get", key))
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.error:
+            raise self.error
+        return self.name
+
+    async def set(self, key, value):
+        self.calls.append(("set", key))
+        return True
+
+
+@pytest.fixture
+def policy():
+    return HedgePolicy("test", initial_delay=0.01)
+
+
+class TestHedgedRedis:
+
+    @pytest.mark.asyncio
+    async def test_fast_primary_is_not_hedged(self, policy):
+        primary, replica = SlowClient("primary"), SlowClient("replica")
+        redis = HedgedRedis(primary, replica, policy)
+
+        assert await redis.get("k") == "primary"
+        assert replica.calls == []
+        assert policy.hedged_total == 0
+
+    @pytest.mark.asyncio
+    async def test_slow_primary_is_hedged_and_replica_wins(self, policy):
+        primary, replica = SlowClient("primary", delay=1.0), SlowClient("replica")
+        redis = HedgedRedis(primary, replica, policy)
+
+        started = asyncio.get_running_loop().time()
+        assert await redis.get("k") == "replica"
+        elapsed = asyncio.get_running_loop().time() - started
+
+        assert elapsed < 0.5
+        assert policy.hedged_total == 1
+        assert policy.replica_wins_total == 1
+        await asyncio.sleep(0)
+        assert primary.cancelled == 1
+
+    @pytest.mark.asyncio
+    async def test_primary_can_still_win_after_hedge(self, policy):
+        primary, replica = SlowClient("primary", delay=0.02), SlowClient("replica", delay=1.0)
+        redis = HedgedRedis(primary, replica, policy)
+
+        assert await redis.get("k") == "primary"
+        assert policy.hedged_total == 1
+        assert policy.replica_wins_total == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_primary_goes_to_replica_immediately(self, policy):
+        primary = SlowClient("primary", error=RedisConnectionError("down"))
+        redis = HedgedRedis(primary, SlowClient("replica"), policy)
+
+        assert await redis.get("k") == "replica"
+
+    @pytest.mark.asyncio
+    async def test_both_failing_raises_primary_error(self, policy):
+        primary = SlowClient("primary", error=RedisConnectionError("primary down"))
+        replica = SlowClient("replica", error=RedisConnectionError("replica down"))
+        redis = HedgedRedis(primary, replica, policy)
+
+        with pytest.raises(RedisConnectionError, match="primary down"):
+            await redis.get("k")
+
+    @pytest.mark.asyncio
+    async def test_writes_go_only_to_primary(self, policy):
+        primary, replica = SlowClient("primary"), SlowClient("replica")
+        redis = HedgedRedis(primary, replica, policy)
+
+        await redis.set("k", "v")
+
+        assert primary.calls == [("set", "k")]
+        assert replica.calls == []
+
+    @pytest.mark.asyncio
+    async def test_run_read_without_hedging(self):
+        client = SlowClient("primary")
+
+        assert await run_read(client, lambda c: c.get("k")) == "primary"
+
+
+class TestHedgePolicy:
+
+    def test_initial_delay_until_enough_samples(self, policy):
+        for _ in range(MIN_SAMPLES - 1):
+            policy.record(0.002)
+
+        assert policy.delay() == 0.01
+
+    def test_delay_tracks_percentile(self):
+        policy = HedgePolicy("test", percentile=0.9, min_delay=0.0001)
+        # Uno de cada cinco lento: el p90 cae en los lentos
+        for i in range(MIN_SAMPLES + 4 * RECOMPUTE_EVERY):
+            policy.record(0.02 if i % 5 == 4 else 0.001)
+
+        assert policy.delay() == pytest.approx(0.02)
+
+    def test_delay_is_clamped(self):
+        policy = HedgePolicy("test", max_delay=0.05)
+        for _ in range(MIN_SAMPLES + RECOMPUTE_EVERY):
+            policy.record(1.0)
+
+        assert policy.delay() == 0.05
+
+    def test_metrics(self, policy):
+        policy.hedged_total = 3
+
+        text = "\n".join(hedge_metrics({"redis": policy}))
+
+        assert 'fraud_hedge_hedged_total{name="redis"} 3' in text
+        assert 'fraud_hedge_delay_seconds{name="redis"} 0.01' in text
@@ -0,0 +1,198 @@
+"""
+Tests unitarios para el catálogo declarativo de índices.
+
+Valida la construcción de índices a partir del catálogo y la detección
+de COLLSCAN / SORT en memoria en la salida de explain().
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.index_catalog import (
+    QUERY_SHAPES,
+    catalog_collections,
+    ensure_indexes,
+    indexes_for,
+    obsolete_indexes,
+    plan_violations,
+    resolve_filter,
+)
+
+
+class TestIndexCatalog:
+    """Tests para la declaración del catálogo."""
+
+    def test_shape_names_are_unique(self):
+        names = [shape.name for shape in QUERY_SHAPES]
+        assert len(names) == len(set(names))
+
+    def test_user_history_uses_compound_index(self):
+        """Test: El historial por usuario ordenado por fecha usa (user_id, timestamp)."""
+        shape = next(s for s in QUERY_SHAPES if s.name == "user_history_latest_first")
+        assert shape.index.keys == (("user_id", 1), ("timestamp", -1))
+
+    def test_sorted_shapes_end_with_sort_key(self):
+        """Test: Toda forma con sort tiene el campo de orden en su índice (evita SORT en memoria)."""
+        for shape in QUERY_SHAPES:
+            if shape.sort:
+                index_fields = [key for key, _ in shape.index.keys]
+                assert shape.sort[0][0] in index_fields, shape.name
+
+    def test_indexes_for_deduplicates_and_skips_builtin(self):
+        evaluation_indexes = indexes_for("evaluations")
+        assert len(evaluation_indexes) == len(set(evaluation_indexes))
+        assert indexes_for("evaluation_rollups") == []
+
+    def test_catalog_collections(self):
+        assert catalog_collections()[:2] == ["evaluations", "evaluation_rollups"]
+        assert "users" in catalog_collections()
+
+    def test_ensure_indexes_creates_declared_indexes(self):
+        collection = MagicMock()
+        collection.create_index.side_effect = lambda keys, unique: "_".join(f"{k}_{d}" for k, d in keys)
+
+        created = ensure_indexes({"evaluations": collection})
+
+        assert "transaction_id_1" in created["evaluations"]
+        assert "user_id_1_timestamp_-1" in created["evaluations"]
+        assert "status_1_timestamp_-1" in created["evaluations"]
+        unique_calls = [c for c in collection.create_index.call_args_list if c.kwargs["unique"]]
+        assert unique_calls[0].args[0] == [("transaction_id", 1)]
+
+    def test_obsolete_indexes_detects_replaced_single_field_index(self):
+        """Test: El índice simple user_id_1 queda obsoleto por el compuesto."""
+        existing = {
+            "_id_": {"key": [("_id", 1)]},
+            "user_id_1": {"key": [("user_id", 1)]},
+            "user_id_1_timestamp_-1": {"key": [("user_id", 1), ("timestamp", -1)]},
+        }
+        assert obsolete_indexes("evaluations", existing) == ["user_id_1"]
+
+    def test_resolve_filter_relative_dates(self):
+        now = datetime(2026, 4, 1)
+        resolved = resolve_filter({"timestamp": {"$gte": "__days_ago__:90"}}, now=now)
+        assert resolved["timestamp"]["$gte"] == datetime(2026, 1, 1)
+
+
+class TestPlanViolations:
+    """Tests para el análisis de planes de explain()."""
+
+    def test_index_scan_has_no_violations(self):
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "LIMIT",
+                    "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+                }
+            }
+        }
+        assert plan_violations(explain) == []
+
+    def test_collscan_is_reported(self):
+        explain = {"queryPlanner": {"winningPlan": {"stage": "COLLSCAN"}}}
+        assert plan_violations(explain) == ["COLLSCAN"]
+
+    def test_in_memory_sort_is_reported(self):
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "SORT",
+                    "inputStage": {"stage": "FETCH", "inputStage": {"stage": "IXSCAN"}},
+                }
+            }
+        }
+        assert plan_violations(explain) == ["SORT"]
+
+    def test_sbe_plan_is_unwrapped(self):
+        """Test: Los planes SBE (MongoDB 7) anidan el plan en queryPlan."""
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "queryPlan": {"stage": "SORT", "inputStage": {"stage": "COLLSCAN"}},
+                    "slotBasedPlan": {},
+                }
+            }
+        }
+        assert plan_violations(explain) == ["SORT", "COLLSCAN"]
+
+    def test_or_plans_walk_all_inputs(self):
+        explain = {
+            "queryPlanner": {
+                "winningPlan": {
+                    "stage": "OR",
+                    "inputStages": [{"stage": "IXSCAN"}, {"stage": "COLLSCAN"}],
+                }
+            }
+        }
+        assert plan_violations(explain) == ["COLLSCAN"]
+
+
+class TestMongoDBAdapterIndexes:
+    """Tests para la creación de índices desde el adaptador."""
+
+    @pytest.fixture
+    def mock_db(self):
+        with patch('src.adapters.MongoClient') as mock_client:
+            mock_db = MagicMock()
+            mock_client.return_value.__getitem__.return_value = mock_db
+            yield mock_db
+
+    def test_adapter_can_skip_index_creation(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+
+        mock_db.evaluations.create_index.assert_not_called()
+
+    def test_indexes_are_not_created_by_default(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        MongoDBAdapter("mongodb://localhost:27017", "test_db")
+
+        mock_db.evaluations.create_index.assert_not_called()
+
+    def test_indexes_are_created_once_per_process(self, mock_db):
+        from src.adapters import MongoDBAdapter
+        import src.infrastructure.index_catalog as index_catalog
+
+        index_catalog._ENSURED.clear()
+        for _ in range(3):
+            MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=True)
+
+        calls = mock_db.evaluations.create_index.call_count
+        assert calls == len(index_catalog.indexes_for("evaluations", index_catalog.QUERY_SHAPES))
+        index_catalog._ENSURED.clear()
+
+    def test_find_evaluations_pushes_filters_to_mongo(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        cursor = mock_db.evaluations.find.return_value.sort.return_value
+        cursor.limit.return_value = []
+        adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+
+        adapter.find_evaluations(status="PENDING_REVIEW", user_id="user_001", limit=10)
+
+        mock_db.evaluations.find.assert_called_once_with(
+            {"status": "PENDING_REVIEW", "user_id": "user_001"}
+        )
+        mock_db.evaluations.find.return_value.sort.assert_called_once_with("timestamp", -1)
+        cursor.limit.assert_called_once_with(10)
+
+    def test_get_evaluations_by_user_since_and_limit(self, mock_db):
+        from src.adapters import MongoDBAdapter
+
+        since = datetime(2026, 1, 1)
+        cursor = mock_db.evaluations.find.return_value.sort.return_value
+        cursor.limit.return_value = []
+        adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+
+        adapter.get_evaluations_by_user("user_001", since=since, limit=100)
+
+        mock_db.evaluations.find.assert_called_once_with(
+            {"user_id": "user_001", "timestamp": {"$gte": since}}
+        )
+        cursor.limit.assert_called_once_with(100)
@@ -0,0 +1,293 @@
+"""
+Tests unitarios para el ejecutor serializado por clave.
+
+Valida que los trabajos de una clave corran de a uno y en orden mientras
+los de claves distintas corren en paralelo, la cola acotada por clave,
+la equidad entre claves y, con el consumidor del worker y la estrategia
+real de transacciones rápidas sobre un sorted set falso, que el conteo
+por usuario sea exacto bajo concurrencia y que el tiempo total baje al
+subir la concurrencia.
+"""
+import asyncio
+import json
+import time
+import pytest
+from unittest.mock import AsyncMock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import RiskLevel
+from src.domain.strategies.rapid_transaction import RAPID_TX_SCRIPT, RapidTransactionStrategy
+from src.infrastructure.evaluation_consumer import EvaluationConsumer
+from src.infrastructure.keyed_executor import KeyedExecutor
+from tests.unit.conftest import FakeMessage, decode_json, make_engine
+
+
+class Recorder:
+    """Trabajos que registran su inicio y fin y cuántos corren a la vez."""
+
+    def __init__(self):
+        self.events = []
+        self.running = 0
+        self.max_running = 0
+
+    async def job(self, key, index, delay=0.0):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        self.events.append(("start", key, index))
+        try:
+            await asyncio.sleep(delay)
+        finally:
+            self.running -= 1
+        self.events.append(("end", key, index))
+
+    def started(self, key=None):
+        return [index for kind, k, index in self.events if kind == "start" and key in (None, k)]
+
+
+class TestKeyedExecutor:
+
+    @pytest.mark.asyncio
+    async def test_same_key_runs_one_at_a_time_in_order(self):
+        recorder = Recorder()
+        executor = KeyedExecutor(concurrency=8)
+
+        for index, delay in enumerate((0.03, 0.0, 0.02, 0.01)):
+            await executor.submit("user_1", recorder.job, "user_1", index, delay)
+        await executor.join()
+
+        assert recorder.max_running == 1
+        assert [index for kind, _, index in recorder.events if kind == "end"] == [0, 1, 2, 3]
+
+    @pytest.mark.asyncio
+    async def test_different_keys_run_in_parallel_up_to_concurrency(self):
+        recorder = Recorder()
+        executor = KeyedExecutor(concurrency=3)
+
+        for index in range(6):
+            await executor.submit(f"user_{index}", recorder.job, f"user_{index}", index, 0.01)
+            assert executor.in_flight <= 3
+        await executor.join()
+
+        assert recorder.max_running == 3
+        assert sorted(recorder.started()) == list(range(6))
+
+    @pytest.mark.asyncio
+    async def test_full_key_queue_blocks_submit_in_arrival_order(self):
+        recorder = Recorder()
+        executor = KeyedExecutor(concurrency=2, max_pending_per_key=2)
+        gate = asyncio.Event()
+
+        async def blocked():
+            await gate.wait()
+
+        await executor.submit("hot", blocked)
+        await executor.submit("hot", recorder.job, "hot", 1)
+        await executor.submit("hot", recorder.job, "hot", 2)
+        producers = [
+            asyncio.create_task(executor.submit("hot", recorder.job, "hot", index)) for index in (3, 4)
+        ]
+        await asyncio.sleep(0.01)
+
+        assert not any(producer.done() for producer in producers)
+        assert executor.pending == 2
+
+        # Otra clave no queda bloqueada por la cola llena
+        await asyncio.wait_for(executor.submit("other", recorder.job, "other", 0), timeout=1)
+
+        gate.set()
+        await asyncio.gather(*producers)
+        await executor.join()
+
+        assert recorder.started("hot") == [1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_hot_key_does_not_starve_other_keys(self):
+        recorder = Recorder()
+        executor = KeyedExecutor(concurrency=1, max_pending_per_key=10)
+
+        for index in range(5):
+            await executor.submit("hot", recorder.job, "hot", index)
+        await executor.submit("cold", recorder.job, "cold", 0)
+        await executor.join()
+
+        # Round-robin: la clave fría corre después del primer trabajo de la caliente
+        order = [key for kind, key, _ in recorder.events if kind == "start"]
+        assert order.index("cold") == 1
+
+    @pytest.mark.asyncio
+    async def test_failed_job_does_not_stop_its_key(self):
+        recorder = Recorder()
+        executor = KeyedExecutor(concurrency=1)
+
+        async def broken():
+            raise RuntimeError("boom")
+
+        await executor.submit("user_1", broken)
+        await executor.submit("user_1", recorder.job, "user_1", 1)
+        await executor.join()
+
+        assert recorder.started() == [1]
+        assert executor.in_flight == 0 and executor.pending == 0
+
+    def test_limits_must_be_positive(self):
+        with pytest.raises(ValueError):
+            KeyedExecutor(concurrency=0)
+        with pytest.raises(ValueError):
+            KeyedExecutor(max_pending_per_key=0)
+
+
+class FakeSortedSetRedis:
+    """
+    Sorted sets en memoria que ejecutan RAPID_TX_SCRIPT
+
+    Cada round trip espera `latency(transacción)` antes de aplicarse, como
+    la red: dos evaluaciones simultáneas del mismo usuario pueden llegar
+    a Redis en otro orden que el de entrega.
+    """
+
+    def __init__(self, latency):
+        self.latency = latency
+        self.sets = {}
+        self.seen = {}
+        self.running = 0
+        self.max_running = 0
+
+    def pipeline(self, transaction=True):
+        return FakeSortedSetPipeline(self)
+
+    def run_script(self, script, numkeys, key, member, now, window_start, ttl):
+        assert script == RAPID_TX_SCRIPT
+        scores = self.sets.setdefault(key, {})
+        scores[member] = now
+        for old in [m for m, score in scores.items() if score <= window_start]:
+            del scores[old]
+        count = sum(1 for score in scores.values() if window_start <= score <= now)
+        self.seen.setdefault(key, []).append((member, count))
+        return count
+
+
+class FakeSortedSetPipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def eval(self, *args):
+        self.commands.append(args)
+        return self
+
+    async def execute(self):
+        self.redis.running += 1
+        self.redis.max_running = max(self.redis.max_running, self.redis.running)
+        try:
+            await asyncio.sleep(max(self.redis.latency(args[3]) for args in self.commands))
+        finally:
+            self.redis.running -= 1
+        return [self.redis.run_script(*args) for args in self.commands]
+
+
+# Todas con el mismo timestamp: el conteo depende solo del orden en que
+# las transacciones llegan a Redis
+TIMESTAMP = "2026-10-19T09:00:00"
+
+
+def transactions(users, per_user):
+    """Transacciones intercaladas entre usuarios, en orden de entrega."""
+    return [
+        {
+            "id": f"txn_{user}_{n}",
+            "user_id": f"user_{user}",
+            "amount": 100.0,
+            "location": {"latitude": 4.711, "longitude": -74.0721},
+            "timestamp": TIMESTAMP,
+        }
+        for n in range(per_user)
+        for user in range(users)
+    ]
+
+
+def uneven_latency(member):
+    """Las pares tardan más: sin orden por usuario, la siguiente se adelanta."""
+    return 0.002 if int(member.rsplit("_", 1)[1]) % 2 == 0 else 0.0
+
+
+def rapid_engine(redis, max_transactions=3):
+    strategy = RapidTransactionStrategy(redis, max_transactions=max_transactions, legacy_reads=False)
+    return make_engine(AsyncMock(), max_batch_size=100, strategies=[strategy])
+
+
+def written_risk(repository):
+    return {
+        evaluation.transaction_id: evaluation.risk_level
+        for call in repository.save_evaluations.call_args_list
+        for evaluation in call.args[0]
+    }
+
+
+class TestPerUserOrderingStress:
+
+    @pytest.mark.asyncio
+    async def test_rapid_counts_are_exact_under_concurrency(self):
+        redis = FakeSortedSetRedis(uneven_latency)
+        engine, repository = rapid_engine(redis)
+        settled = []
+        consumer = EvaluationConsumer(engine, concurrency=16, decode=decode_json, max_pending_per_user=4)
+        batch = transactions(users=10, per_user=30)
+
+        producers = [
+            asyncio.create_task(consumer.dispatch(FakeMessage(tag, json.dumps(data).encode(), settled)))
+            for tag, data in enumerate(batch)
+        ]
+        await asyncio.gather(*producers)
+        await consumer.drain()
+
+        for user in range(10):
+            assert redis.seen[f"user:{{user_{user}}}:rapid_tx"] == [(f"txn_{user}_{n}", n + 1) for n in range(30)]
+        # Desde la cuarta transacción de cada usuario (límite 3) la regla
+        # se viola y la evaluación deja de ser LOW_RISK
+        risk = written_risk(repository)
+        assert len(risk) == len(batch)
+        assert {txn for txn, level in risk.items() if level != RiskLevel.LOW_RISK} == {
+            f"txn_{user}_{n}" for user in range(10) for n in range(3, 30)
+        }
+        assert redis.max_running == 10
+        assert sorted(settled) == [(tag, "ack") for tag in range(len(batch))]
+
+    @pytest.mark.asyncio
+    async def test_without_keys_transactions_reach_redis_out_of_order(self):
+        # Control: la misma carga sin serializar por usuario cuenta mal
+        redis = FakeSortedSetRedis(uneven_latency)
+        engine, _ = rapid_engine(redis)
+        executor = KeyedExecutor(concurrency=16)
+        for index, data in enumerate(transactions(users=2, per_user=20)):
+            await executor.submit(index, engine.evaluate, data, lambda outcome: None)
+        await executor.join()
+
+        expected = [(f"txn_0_{n}", n + 1) for n in range(20)]
+        assert redis.seen["user:{user_0}:rapid_tx"] != expected
+
+    @pytest.mark.asyncio
+    async def test_throughput_scales_with_concurrency(self):
+        async def elapsed(concurrency):
+            engine, _ = rapid_engine(FakeSortedSetRedis(lambda member: 0.01))
+            consumer = EvaluationConsumer(engine, concurrency=concurrency, decode=decode_json)
+            started = time.perf_counter()
+            for tag, data in enumerate(transactions(users=20, per_user=2)):
+                await consumer.dispatch(FakeMessage(tag, json.dumps(data).encode(), []))
+            await consumer.drain()
+            return time.perf_counter() - started
+
+        serial = await elapsed(1)
+        parallel = await elapsed(20)
+
+        # 40 evaluaciones de 10 ms: ~400 ms de a una, ~20 ms con 20 usuarios a la vez
+        assert parallel < serial / 4
@@ -0,0 +1,112 @@
+"""
+Tests unitarios para el estado local del modo degradado.
+
+Valida el LRU acotado y que las estrategias de Redis respondan con el
+estado local cuando Redis no está disponible.
+"""
+import pytest
+from unittest.mock import Mock
+from datetime import datetime, timedelta
+from decimal import Decimal
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.domain.models import Location, RiskLevel, Transaction
+from src.domain.strategies.device_validation import DeviceValidationStrategy
+from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
+from src.infrastructure.circuit_breaker import CircuitOpenError
+from src.infrastructure.local_risk_state import LocalRiskState
+
+
+def make_transaction(i: int = 0, device_id: str = "device_001", timestamp=None) -> Transaction:
+    return Transaction(
+        id=f"txn_{i}",
+        amount=Decimal("100.0"),
+        user_id="user_001",
+        location=Location(latitude=4.7110, longitude=-74.0721),
+        timestamp=timestamp or datetime(2024, 1, 15, 10, 0, 0),
+        device_id=device_id,
+    )
+
+
+@pytest.fixture
+def unavailable_redis():
+    """Cliente cuyo pipeline falla como con el circuito abierto."""
+    client = Mock()
+    client.pipeline = Mock(side_effect=CircuitOpenError("redis", 5.0))
+    return client
+
+
+class TestLocalRiskState:
+
+    def test_devices_are_per_user(self):
+        state = LocalRiskState()
+        state.remember_device("user_001", "device_001")
+
+        assert state.knows_device("user_001", "device_001")
+        assert not state.knows_device("user_002", "device_001")
+
+    def test_least_recent_user_is_evicted(self):
+        state = LocalRiskState(max_users=2)
+        state.remember_device("user_001", "d")
+        state.remember_device("user_002", "d")
+        state.remember_device("user_001", "d2")
+        state.remember_device("user_003", "d")
+
+        assert state.knows_device("user_001", "d")
+        assert not state.knows_device("user_002", "d")
+
+    def test_transaction_window(self):
+        state = LocalRiskState()
+
+        counts = [state.record_transaction("user_001", ts, 300) for ts in (0, 100, 200, 350)]
+
+        assert counts == [1, 2, 3, 3]
+
+    def test_last_location(self):
+        state = LocalRiskState()
+        assert state.last_location("user_001") is None
+
+        state.remember_location("user_001", 4.7110, -74.0721)
+
+        assert state.last_location("user_001") == {"latitude": 4.7110, "longitude": -74.0721}
+
+
+class TestDegradedStrategies:
+
+    @pytest.mark.asyncio
+    async def test_known_device_is_low_risk_without_redis(self, unavailable_redis):
+        state = LocalRiskState()
+        state.remember_device("user_001", "device_001")
+        strategy = DeviceValidationStrategy(unavailable_redis, legacy_reads=False, local_state=state)
+
+        result = await strategy.evaluate(make_transaction())
+
+        assert result["risk_level"] == RiskLevel.LOW_RISK
+        assert result["reasons"] == []
+
+    @pytest.mark.asyncio
+    async def test_unknown_device_keeps_failure_result(self, unavailable_redis):
+        strategy = DeviceValidationStrategy(unavailable_redis, legacy_reads=False, local_state=LocalRiskState())
+
+        result = await strategy.evaluate(make_transaction())
+
+        assert result["reasons"] == ["Error en validación de dispositivo"]
+
+    @pytest.mark.asyncio
+    async def test_rapid_transactions_detected_locally(self, unavailable_redis):
+        strategy = RapidTransactionStrategy(
+            unavailable_redis, max_transactions=3, legacy_reads=False, local_state=LocalRiskState()
+        )
+        start = datetime(2024, 1, 15, 10, 0, 0)
+
+        results = [
+            await strategy.evaluate(make_transaction(i, timestamp=start + timedelta(seconds=i)))
+            for i in range(4)
+        ]
+
+        assert results[2]["risk_level"] == RiskLevel.LOW_RISK
+        assert results[3]["risk_level"] == RiskLevel.HIGH_RISK
+        assert "local estimate" in results[3]["details"]
@@ -0,0 +1,234 @@
+"""
+Tests unitarios para el broker en memoria y el worker local.
+
+Valida la semántica de entrega que imita a RabbitMQ (prefetch, ack
+múltiple, nack con y sin reencolar, redelivery al cerrar el canal, TTL
+con dead-letter) y el recorrido completo publisher -> cola -> worker ->
+repositorio en un solo proceso, con y sin micro-lotes y con reintentos.
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.evaluation_writer import WriteOutcome
+from src.infrastructure.memory_broker import (
+    InMemoryBroker,
+    InMemoryPublisher,
+    LocalWorker,
+    OutgoingMessage,
+)
+from src.infrastructure.message_codec import JsonCodec
+from src.infrastructure.retry_topology import RetryRouter, parking_queue
+from src.infrastructure.sharding import shard_for, shard_queue
+from tests.unit.conftest import make_engine, transaction_data
+
+
+async def settle_loop():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def publish_all(broker, queue, count):
+    channel = await broker.channel()
+    await channel.declare_queue(queue)
+    for i in range(count):
+        await channel.default_exchange.publish(OutgoingMessage(f"m{i}".encode()), routing_key=queue)
+
+
+class TestInMemoryBroker:
+
+    @pytest.mark.asyncio
+    async def test_prefetch_limits_unacked_deliveries(self):
+        broker = InMemoryBroker()
+        await publish_all(broker, "work", 10)
+        channel = await broker.channel()
+        await channel.set_qos(prefetch_count=3)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        queue = await channel.declare_queue("work")
+        await queue.consume(on_message)
+        await settle_loop()
+        assert len(received) == 3
+
+        await received[0].ack()
+        await settle_loop()
+        assert len(received) == 4
+        assert broker.depth(["work"]) == 6
+
+    @pytest.mark.asyncio
+    async def test_multiple_ack_settles_all_lower_tags(self):
+        broker = InMemoryBroker()
+        await publish_all(broker, "work", 5)
+        channel = await broker.channel()
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        await (await channel.declare_queue("work")).consume(on_message)
+        await settle_loop()
+        await received[2].ack(multiple=True)
+
+        assert channel.unacked == 2
+        assert broker.acked_total == 3
+        with pytest.raises(RuntimeError, match="unknown delivery tag"):
+            await received[0].ack()
+
+    @pytest.mark.asyncio
+    async def test_nack_requeues_at_head_with_redelivered_flag(self):
+        broker = InMemoryBroker()
+        await publish_all(broker, "work", 2)
+        channel = await broker.channel()
+        await channel.set_qos(prefetch_count=1)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+            if len(received) == 1:
+                await message.nack(requeue=True)
+
+        await (await channel.declare_queue("work")).consume(on_message)
+        await settle_loop()
+
+        assert [m.body for m in received] == [b"m0", b"m0"]
+        assert [m.redelivered for m in received] == [False, True]
+
+    @pytest.mark.asyncio
+    async def test_reject_without_requeue_drops_message(self):
+        broker = InMemoryBroker()
+        await publish_all(broker, "work", 1)
+        channel = await broker.channel()
+
+        async def on_message(message):
+            await message.nack(requeue=False)
+
+        await (await channel.declare_queue("work")).consume(on_message)
+        await settle_loop()
+
+        assert broker.depth() == 0
+        assert broker.dropped_total == 1
+
+    @pytest.mark.asyncio
+    async def test_closing_channel_redelivers_unacked_messages(self):
+        broker = InMemoryBroker()
+        await publish_all(broker, "work", 3)
+        first = await broker.channel()
+        await (await first.declare_queue("work")).consume(AsyncMock())
+        await settle_loop()
+        assert first.unacked == 3
+
+        await first.close()
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+            await message.ack()
+
+        second = await broker.channel()
+        await (await second.declare_queue("work")).consume(on_message)
+        await settle_loop()
+
+        assert [m.body for m in received] == [b"m0", b"m1", b"m2"]
+        assert all(m.redelivered for m in received)
+
+    @pytest.mark.asyncio
+    async def test_exclusive_consumer_is_refused_when_queue_is_taken(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("work")
+        await queue.consume(AsyncMock(), exclusive=True)
+
+        with pytest.raises(RuntimeError):
+            await queue.consume(AsyncMock(), exclusive=True)
+
+    @pytest.mark.asyncio
+    async def test_ttl_queue_dead_letters_to_original_routing_key(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        await channel.declare_queue("work")
+        exchange = await channel.declare_exchange("work.retry.10ms", type="fanout")
+        delay = await channel.declare_queue(
+            "work.retry.10ms", arguments={"x-message-ttl": 10, "x-dead-letter-exchange": ""}
+        )
+        await delay.bind(exchange)
+
+        await exchange.publish(OutgoingMessage(b"retry me", {"x-attempt": 1}), routing_key="work")
+        assert broker.depth(["work.retry.10ms"]) == 1
+        await asyncio.sleep(0.03)
+
+        assert broker.depth(["work.retry.10ms"]) == 0
+        assert broker.queues["work"].ready[0].headers == {"x-attempt": 1}
+
+
+def written_ids(repository):
+    return sorted(
+        evaluation.transaction_id
+        for call in repository.save_evaluations.call_args_list
+        for evaluation in call.args[0]
+    )
+
+
+class TestLocalPipeline:
+
+    @pytest.mark.asyncio
+    async def test_publisher_routes_to_user_shard(self):
+        broker = InMemoryBroker()
+
+        await InMemoryPublisher(broker).publish_transaction_for_processing(transaction_data(1, "user_001"))
+
+        assert broker.depth([shard_queue("transactions", shard_for("user_001", 64))]) == 1
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batch_size", [0, 8])
+    async def test_every_published_transaction_is_written_and_acked(self, batch_size):
+        broker = InMemoryBroker()
+        engine, repository = make_engine(InMemoryPublisher(broker, codec=JsonCodec()))
+        if batch_size:
+            consumer = MicroBatchConsumer(engine, batch_size=batch_size, max_wait_seconds=0.005)
+        else:
+            consumer = EvaluationConsumer(engine, concurrency=4)
+        worker = LocalWorker(broker, consumer, prefetch_count=32)
+        await worker.start()
+
+        publisher = InMemoryPublisher(broker, codec=JsonCodec())
+        for i in range(100):
+            await publisher.publish_transaction_for_processing(transaction_data(i))
+        await asyncio.wait_for(worker.wait_idle(), timeout=5)
+        await worker.stop()
+
+        assert written_ids(repository) == sorted(f"txn_{i:04d}" for i in range(100))
+        assert broker.acked_total == 100
+        assert worker.channel.unacked == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_write_is_retried_through_delay_queue(self):
+        broker = InMemoryBroker()
+        engine, repository = make_engine(InMemoryPublisher(broker, codec=JsonCodec()))
+        outcomes = iter([[WriteOutcome.RETRY]])
+        repository.save_evaluations = Mock(
+            side_effect=lambda batch: next(outcomes, [WriteOutcome.WRITTEN] * len(batch))
+        )
+        worker_channel = await broker.channel()
+        retries = RetryRouter(worker_channel, "transactions", [0.01], message_factory=OutgoingMessage)
+        await retries.declare()
+        worker = LocalWorker(broker, EvaluationConsumer(engine, concurrency=1, retries=retries), prefetch_count=1)
+        await worker.start()
+
+        await InMemoryPublisher(broker, codec=JsonCodec()).publish_transaction_for_processing(transaction_data(1))
+        await asyncio.sleep(0.05)
+        await asyncio.wait_for(worker.wait_idle(), timeout=5)
+        await worker.stop()
+
+        assert retries.retried_total == 1
+        # primer intento (RETRY) y el que llega desde la cola de espera
+        assert written_ids(repository) == ["txn_0001", "txn_0001"]
+        assert broker.acked_total == 2
+        assert broker.depth([parking_queue("transactions")]) == 0
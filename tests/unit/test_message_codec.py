@@ -0,0 +1,138 @@
+"""
+Tests unitarios para el codec de mensajes con versión de esquema.
+
+Valida la ida y vuelta de los mensajes tipados, que los mensajes JSON
+anteriores (sin headers) se sigan leyendo, que un mensaje inválido o de
+una versión más nueva se rechace y el formato MessagePack con msgspec.
+"""
+import json
+import pytest
+from types import SimpleNamespace
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.message_codec import (
+    JSON,
+    MSGPACK,
+    SCHEMA_VERSION_HEADER,
+    JsonCodec,
+    LocationPayload,
+    ManualReviewMessage,
+    MessageDecodeError,
+    TransactionMessage,
+    convert,
+    decode,
+    decode_transaction,
+    encode,
+    publishing_codec,
+)
+
+
+TRANSACTION = {
+    "id": "txn_001",
+    "amount": 1500.0,
+    "user_id": "user_001",
+    "location": {"latitude": 4.711, "longitude": -74.0721},
+    "device_id": "device_001",
+}
+
+
+class TestMessageCodec:
+
+    def test_json_round_trip(self):
+        message = convert(TRANSACTION, TransactionMessage)
+
+        body, content_type, headers = encode(message, JsonCodec())
+
+        assert content_type == JSON
+        assert headers == {SCHEMA_VERSION_HEADER: 1}
+        assert decode(body, content_type, headers, TransactionMessage) == message
+
+    def test_legacy_json_without_headers_is_accepted(self):
+        legacy = SimpleNamespace(body=json.dumps(TRANSACTION).encode(), content_type=None, headers=None)
+
+        transaction = decode_transaction(legacy)
+
+        assert transaction["location"] == {"latitude": 4.711, "longitude": -74.0721}
+        assert transaction["device_id"] == "device_001"
+        assert transaction["timestamp"] is None
+
+    def test_unknown_fields_are_ignored(self):
+        body = json.dumps({**TRANSACTION, "merchant": "shop_01"}).encode()
+
+        message = decode(body, JSON, None, TransactionMessage)
+
+        assert message.id == "txn_001"
+
+    def test_integer_amount_is_a_float(self):
+        message = convert({**TRANSACTION, "amount": 1500}, TransactionMessage)
+
+        assert message.amount == 1500.0
+        assert isinstance(message.amount, float)
+
+    def test_newer_schema_version_is_rejected(self):
+        body = json.dumps(TRANSACTION).encode()
+
+        with pytest.raises(MessageDecodeError, match="schema version"):
+            decode(body, JSON, {SCHEMA_VERSION_HEADER: 2}, TransactionMessage)
+
+    @pytest.mark.parametrize("data", [
+        {key: value for key, value in TRANSACTION.items() if key != "amount"},
+        {**TRANSACTION, "amount": "1500"},
+        {**TRANSACTION, "location": {"latitude": 4.711}},
+        {**TRANSACTION, "user_id": None},
+    ])
+    def test_invalid_payload_is_rejected(self, data):
+        with pytest.raises(MessageDecodeError):
+            decode(json.dumps(data).encode(), JSON, None, TransactionMessage)
+
+    def test_unreadable_body_is_rejected(self):
+        with pytest.raises(MessageDecodeError):
+            decode(b"invalid json {{", JSON, None, TransactionMessage)
+
+    def test_unknown_content_type_is_rejected(self):
+        with pytest.raises(MessageDecodeError, match="content type"):
+            decode(b"<xml/>", "application/xml", None, TransactionMessage)
+
+    def test_decode_error_is_a_value_error(self):
+        assert issubclass(MessageDecodeError, ValueError)
+
+    def test_manual_review_defaults(self):
+        message = convert(
+            {"transaction_id": "txn_001", "risk_level": "HIGH_RISK", "amount": 10.0, "user_id": "user_001"},
+            ManualReviewMessage,
+        )
+
+        assert message.reasons == []
+
+    def test_json_codec_is_used_when_configured(self):
+        assert publishing_codec("json").content_type == JSON
+
+
+class TestMsgpackCodec:
+
+    @pytest.fixture(autouse=True)
+    def _msgspec(self):
+        pytest.importorskip("msgspec")
+
+    def test_msgpack_round_trip_is_smaller_than_json(self):
+        codec = publishing_codec("msgpack")
+        message = TransactionMessage(
+            id="txn_001", amount=1500.0, user_id="user_001", location=LocationPayload(4.711, -74.0721)
+        )
+
+        body, content_type, headers = encode(message, codec)
+
+        assert content_type == MSGPACK
+        assert decode(body, content_type, headers, TransactionMessage) == message
+        assert len(body) < len(encode(message, JsonCodec()).body)
+
+    def test_invalid_msgpack_payload_is_rejected(self):
+        import msgspec
+
+        body = msgspec.msgpack.encode({"id": "txn_001", "amount": "1500"})
+
+        with pytest.raises(MessageDecodeError):
+            decode(body, MSGPACK, None, TransactionMessage)
@@ -6,10 +6,36 @@ from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
 from src.domain.models import Transaction, Location, RiskLevel
 
 
+class DummyPipeline:
+    """Encola los comandos y los aplica sobre DummyRedis en execute()."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((getattr(self.redis, name), args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        return [command(*args, **kwargs) for command, args, kwargs in self.commands]
+
+
 class DummyRedis:
     def __init__(self):
         self.store = {}
 
+    def pipeline(self, transaction=True):
+        return DummyPipeline(self)
+
     def zadd(self, key, mapping):
         if key not in self.store:
             self.store[key] = {}
@@ -33,12 +59,20 @@ class DummyRedis:
         ]
         for member in to_remove:
             del self.store[key][member]
+        return len(to_remove)
 
     def zcount(self, key, min_score, max_score):
         if key not in self.store:
             return 0
         return sum(1 for v in self.store[key].values() if min_score <= v <= max_score)
 
+    def eval(self, script, numkeys, key, member, now, window_start, ttl):
+        """Replica RAPID_TX_SCRIPT con los comandos del dummy."""
+        self.zadd(key, {member: now})
+        self.expire(key, ttl)
+        self.zremrangebyscore(key, 0, window_start)
+        return self.zcount(key, window_start, now)
+
 
 def make_transaction(tx_id: str, seconds_offset: int = 0):
     return Transaction(
@@ -50,35 +84,38 @@ def make_transaction(tx_id: str, seconds_offset: int = 0):
     )
 
 
-def test_rapid_transactions_below_limit():
+@pytest.mark.asyncio
+async def test_rapid_transactions_below_limit():
     redis = DummyRedis()
     strat = RapidTransactionStrategy(redis_client=redis, max_transactions=3, window_minutes=5)
 
     # add three transactions within window
     for i in range(3):
         tx = make_transaction(f"t{i}", seconds_offset=i)
-        res = strat.evaluate(tx)
+        res = await strat.evaluate(tx)
         assert res['risk_level'] == RiskLevel.LOW_RISK
 
 
-def test_rapid_transactions_exceed_limit():
+@pytest.mark.asyncio
+async def test_rapid_transactions_exceed_limit():
     redis = DummyRedis()
     strat = RapidTransactionStrategy(redis_client=redis, max_transactions=2, window_minutes=5)
 
     # add three transactions within window -> exceed when >2
     for i in range(3):
         tx = make_transaction(f"t{i}", seconds_offset=i)
-        res = strat.evaluate(tx)
+        res = await strat.evaluate(tx)
     assert res['risk_level'] == RiskLevel.HIGH_RISK
 
 
-def test_rapid_transactions_redis_error_handling(monkeypatch):
-    class BadRedis:
+@pytest.mark.asyncio
+async def test_rapid_transactions_redis_error_handling(monkeypatch):
+    class BadRedis(DummyRedis):
         def zadd(self, *a, **k):
             raise Exception("redis down")
 
     strat = RapidTransactionStrategy(redis_client=BadRedis(), max_transactions=3, window_minutes=5)
     tx = make_transaction('t1')
-    res = strat.evaluate(tx)
+    res = await strat.evaluate(tx)
     assert res['risk_level'] == RiskLevel.LOW_RISK
     assert 'rapid_transaction_check_failed' in res['reasons']
@@ -15,7 +15,31 @@ from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
 
 from src.domain.models import Transaction, Location, RiskLevel
-from src.domain.strategies.rapid_transaction import RapidTransactionStrategy
+from src.domain.strategies.rapid_transaction import RAPID_TX_SCRIPT, RapidTransactionStrategy
+
+
+class MockPipeline:
+    """Pipeline async que reenvía cada comando encolado al mock en execute()."""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis_client.round_trips += 1
+        return [getattr(self.redis_client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
 
 
 class TestRapidTransactionStrategy:
@@ -25,10 +49,21 @@ class TestRapidTransactionStrategy:
     def mock_redis_client(self):
         """Mock del cliente Redis."""
         redis_client = Mock()
+        redis_client.round_trips = 0
+        redis_client.pipeline = Mock(side_effect=lambda transaction=True: MockPipeline(redis_client))
         redis_client.zadd = Mock(return_value=1)
         redis_client.expire = Mock(return_value=True)
         redis_client.zremrangebyscore = Mock(return_value=0)
         redis_client.zcount = Mock(return_value=1)
+
+        def run_script(script, numkeys, key, member, now, window_start, ttl):
+            # Los mismos comandos que RAPID_TX_SCRIPT, sobre los mocks
+            redis_client.zadd(key, {member: now})
+            redis_client.expire(key, ttl)
+            redis_client.zremrangebyscore(key, 0, window_start)
+            return redis_client.zcount(key, window_start, now)
+
+        redis_client.eval = Mock(side_effect=run_script)
         return redis_client
     
     @pytest.fixture
@@ -37,7 +72,8 @@ class TestRapidTransactionStrategy:
         return RapidTransactionStrategy(
             redis_client=mock_redis_client,
             max_transactions=3,
-            window_minutes=5
+            window_minutes=5,
+            legacy_reads=False
         )
     
     @pytest.fixture
@@ -52,39 +88,48 @@ class TestRapidTransactionStrategy:
             timestamp=datetime.now()
         )
     
-    def test_first_transaction_low_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_first_transaction_low_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: La primera transacción debe ser LOW_RISK."""
         # Arrange
         mock_redis_client.zcount.return_value = 1  # Solo esta transacción
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.LOW_RISK
         assert result["reasons"] == []
         assert "1 transactions in 5 minutes" in result["details"]
+        # ZADD, EXPIRE, ZREMRANGEBYSCORE y ZCOUNT en un solo script (atómico
+        # también en Redis Cluster, donde el pipeline no lleva MULTI)
+        mock_redis_client.pipeline.assert_called_once_with(transaction=False)
+        script, numkeys, key = mock_redis_client.eval.call_args[0][:3]
+        assert (script, numkeys, key) == (RAPID_TX_SCRIPT, 1, "user:{user_123}:rapid_tx")
+        assert mock_redis_client.round_trips == 1
     
-    def test_three_transactions_within_limit_low_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_three_transactions_within_limit_low_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: 3 transacciones o menos deben ser LOW_RISK."""
         # Arrange
         mock_redis_client.zcount.return_value = 3  # Justo en el límite
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.LOW_RISK
         assert result["reasons"] == []
         assert "3 transactions in 5 minutes" in result["details"]
     
-    def test_four_transactions_exceeds_limit_high_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_four_transactions_exceeds_limit_high_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Más de 3 transacciones debe ser HIGH_RISK."""
         # Arrange
         mock_redis_client.zcount.return_value = 4  # Excede el límite
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.HIGH_RISK
@@ -92,48 +137,52 @@ class TestRapidTransactionStrategy:
         assert "4 transactions in 5 minutes" in result["details"]
         assert "limit: 3" in result["details"]
     
-    def test_multiple_rapid_transactions_high_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_multiple_rapid_transactions_high_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Múltiples transacciones rápidas deben ser HIGH_RISK."""
         # Arrange
         mock_redis_client.zcount.return_value = 7  # Muchas transacciones
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.HIGH_RISK
         assert "rapid_transactions_detected" in result["reasons"]
         assert "7 transactions in 5 minutes" in result["details"]
     
-    def test_transaction_added_to_redis(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_transaction_added_to_redis(self, strategy, mock_redis_client, sample_transaction):
         """Test: La transacción debe ser añadida a Redis."""
         # Arrange
         mock_redis_client.zcount.return_value = 1
         
         # Act
-        strategy.evaluate(sample_transaction)
+        await strategy.evaluate(sample_transaction)
         
         # Assert
-        expected_key = "rapid_tx:user_123"
+        expected_key = "user:{user_123}:rapid_tx"
         mock_redis_client.zadd.assert_called_once()
         call_args = mock_redis_client.zadd.call_args
         assert call_args[0][0] == expected_key
         assert sample_transaction.id in call_args[0][1]
     
-    def test_redis_key_expiration_set(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_redis_key_expiration_set(self, strategy, mock_redis_client, sample_transaction):
         """Test: La clave Redis debe tener expiración configurada."""
         # Arrange
         mock_redis_client.zcount.return_value = 1
         
         # Act
-        strategy.evaluate(sample_transaction)
+        await strategy.evaluate(sample_transaction)
         
         # Assert
-        expected_key = "rapid_tx:user_123"
+        expected_key = "user:{user_123}:rapid_tx"
         expected_expiration = 5 * 60  # 5 minutos en segundos
         mock_redis_client.expire.assert_called_once_with(expected_key, expected_expiration)
     
-    def test_old_transactions_removed(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_old_transactions_removed(self, strategy, mock_redis_client, sample_transaction):
         """Test: Las transacciones antiguas deben ser eliminadas."""
         # Arrange
         mock_redis_client.zcount.return_value = 2
@@ -141,23 +190,25 @@ class TestRapidTransactionStrategy:
         window_seconds = 5 * 60
         
         # Act
-        strategy.evaluate(sample_transaction)
+        await strategy.evaluate(sample_transaction)
         
         # Assert
-        expected_key = "rapid_tx:user_123"
+        expected_key = "user:{user_123}:rapid_tx"
         mock_redis_client.zremrangebyscore.assert_called_once()
         call_args = mock_redis_client.zremrangebyscore.call_args
         assert call_args[0][0] == expected_key
         assert call_args[0][1] == 0
         assert abs(call_args[0][2] - (current_timestamp - window_seconds)) < 1.0
     
-    def test_custom_time_window(self, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_custom_time_window(self, mock_redis_client):
         """Test: Debe permitir configurar ventana de tiempo personalizada."""
         # Arrange
         strategy = RapidTransactionStrategy(
             redis_client=mock_redis_client,
             max_transactions=5,
-            window_minutes=10
+            window_minutes=10,
+            legacy_reads=False
         )
         location = Location(latitude=4.7110, longitude=-74.0721)
         transaction = Transaction(
@@ -170,20 +221,22 @@ class TestRapidTransactionStrategy:
         mock_redis_client.zcount.return_value = 6
         
         # Act
-        result = strategy.evaluate(transaction)
+        result = await strategy.evaluate(transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.HIGH_RISK
         assert "6 transactions in 10 minutes" in result["details"]
         assert "limit: 5" in result["details"]
     
-    def test_custom_max_transactions(self, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_custom_max_transactions(self, mock_redis_client):
         """Test: Debe permitir configurar número máximo de transacciones."""
         # Arrange
         strategy = RapidTransactionStrategy(
             redis_client=mock_redis_client,
             max_transactions=2,
-            window_minutes=5
+            window_minutes=5,
+            legacy_reads=False
         )
         location = Location(latitude=4.7110, longitude=-74.0721)
         transaction = Transaction(
@@ -196,19 +249,20 @@ class TestRapidTransactionStrategy:
         mock_redis_client.zcount.return_value = 3
         
         # Act
-        result = strategy.evaluate(transaction)
+        result = await strategy.evaluate(transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.HIGH_RISK
         assert "limit: 2" in result["details"]
     
-    def test_redis_error_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
+    @pytest.mark.asyncio
+    async def test_redis_error_returns_low_risk(self, strategy, mock_redis_client, sample_transaction):
         """Test: Error en Redis debe retornar LOW_RISK para no bloquear transacciones."""
         # Arrange
         mock_redis_client.zadd.side_effect = Exception("Redis connection failed")
         
         # Act
-        result = strategy.evaluate(sample_transaction)
+        result = await strategy.evaluate(sample_transaction)
         
         # Assert
         assert result["risk_level"] == RiskLevel.LOW_RISK
@@ -217,7 +271,8 @@ class TestRapidTransactionStrategy:
         """Test: Verificar que el nombre de la estrategia es correcto."""
         assert strategy.get_name() == "rapid_transaction"
     
-    def test_different_users_tracked_separately(self, strategy, mock_redis_client):
+    @pytest.mark.asyncio
+    async def test_different_users_tracked_separately(self, strategy, mock_redis_client):
         """Test: Diferentes usuarios deben ser rastreados por separado."""
         # Arrange
         location = Location(latitude=4.7110, longitude=-74.0721)
@@ -238,11 +293,27 @@ class TestRapidTransactionStrategy:
         mock_redis_client.zcount.return_value = 1
         
         # Act
-        strategy.evaluate(user1_transaction)
-        strategy.evaluate(user2_transaction)
+        await strategy.evaluate(user1_transaction)
+        await strategy.evaluate(user2_transaction)
         
         # Assert
         # Verificar que se usaron claves diferentes para cada usuario
         zadd_calls = mock_redis_client.zadd.call_args_list
-        assert zadd_calls[0][0][0] == "rapid_tx:user_001"
-        assert zadd_calls[1][0][0] == "rapid_tx:user_002"
+        assert zadd_calls[0][0][0] == "user:{user_001}:rapid_tx"
+        assert zadd_calls[1][0][0] == "user:{user_002}:rapid_tx"
+
+    @pytest.mark.asyncio
+    async def test_legacy_window_is_counted(self, mock_redis_client, sample_transaction):
+        """Test: Durante la migración se suma la ventana de la clave anterior."""
+        # Arrange
+        strategy = RapidTransactionStrategy(redis_client=mock_redis_client)
+        mock_redis_client.zcount.side_effect = [2, 2]  # Clave nueva, clave anterior
+
+        # Act
+        result = await strategy.evaluate(sample_transaction)
+
+        # Assert
+        assert result["risk_level"] == RiskLevel.HIGH_RISK
+        keys = [call[0][0] for call in mock_redis_client.zcount.call_args_list]
+        assert keys == ["user:{user_123}:rapid_tx", "rapid_tx:user_123"]
+        assert mock_redis_client.round_trips == 1
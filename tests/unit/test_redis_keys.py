@@ -0,0 +1,57 @@
+"""
+Tests unitarios para el esquema central de claves de Redis.
+
+Valida que las claves de un usuario compartan slot de Redis Cluster y que
+el pipeline solo pida MULTI fuera de cluster.
+"""
+import pytest
+from unittest.mock import MagicMock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from redis.asyncio.cluster import RedisCluster
+from redis.crc import key_slot
+
+from src.infrastructure.redis_keys import (
+    legacy_devices_key,
+    legacy_rapid_tx_key,
+    pipeline,
+    rapid_tx_key,
+    user_devices_key,
+    user_geo_key,
+)
+
+
+class TestRedisKeys:
+
+    @pytest.mark.parametrize("user_id", ["user_001", "user:with:colons", "b7e4-uuid", "odd}id"])
+    def test_user_keys_share_slot(self, user_id):
+        keys = [user_geo_key(user_id), user_devices_key(user_id), rapid_tx_key(user_id)]
+
+        assert len({key_slot(key.encode()) for key in keys}) == 1
+
+    def test_key_format(self):
+        assert user_geo_key("user_001") == "user:{user_001}:geo"
+        assert user_devices_key("user_001") == "user:{user_001}:devices"
+        assert rapid_tx_key("user_001") == "user:{user_001}:rapid_tx"
+        assert legacy_devices_key("user_001") == "user_devices:user_001"
+        assert legacy_rapid_tx_key("user_001") == "rapid_tx:user_001"
+
+    def test_pipeline_is_transactional_outside_cluster(self):
+        client = MagicMock()
+
+        pipeline(client)
+        pipeline(client, transaction=False)
+
+        assert [c.kwargs for c in client.pipeline.call_args_list] == [
+            {"transaction": True}, {"transaction": False},
+        ]
+
+    def test_pipeline_without_multi_on_cluster(self):
+        client = MagicMock(spec=RedisCluster)
+
+        pipeline(client)
+
+        client.pipeline.assert_called_once_with(transaction=False)
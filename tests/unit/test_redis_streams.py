@@ -0,0 +1,486 @@
+"""
+Tests unitarios para el transporte de Redis Streams.
+
+Usa un Redis falso en memoria con la semántica de los comandos usados
+(XADD, consumer groups con lista de pendientes, XREADGROUP, XACK,
+XAUTOCLAIM, XPENDING, XINFO GROUPS y XTRIM MINID). Valida el enrutamiento
+del publisher, el prefetch y el ack múltiple del reader, la reentrega con
+XAUTOCLAIM, el parking, el recorte sin perder entradas, la muestra del
+backlog y el recorrido completo con los consumidores del worker.
+"""
+import asyncio
+import itertools
+import json
+import pytest
+from unittest.mock import AsyncMock, Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from redis.exceptions import ResponseError
+
+from src.config import settings
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.message_codec import JsonCodec, TransactionMessage, convert, decode_transaction
+from src.infrastructure.admission_control import QueueSample
+from src.infrastructure.redis_streams import (
+    RedisStreamReader,
+    RedisStreamsPublisher,
+    RedisStreamsSampler,
+    transaction_streams,
+)
+from src.infrastructure.retry_topology import ORIGIN_HEADER, REASON_HEADER
+from src.infrastructure.sharding import shard_for, shard_queue
+from tests.unit.conftest import make_engine, transaction_data
+
+
+class FakeStreams:
+    """Subconjunto de redis.asyncio para streams (respuestas como las parsea redis-py)"""
+
+    def __init__(self):
+        self.now_ms = 0
+        self.streams = {}
+        # (stream, group) -> {"last": id, "read": n, "pending": {id: [consumer, delivered_at, deliveries]}}
+        self.groups = {}
+        self._ids = itertools.count(1)
+
+    def entries(self, stream):
+        return self.streams.get(stream, [])
+
+    def pending(self, stream, group):
+        return self.groups[(stream, group)]["pending"]
+
+    async def xadd(self, name, fields):
+        message_id = f"{next(self._ids)}-0".encode()
+        entry = {key.encode() if isinstance(key, str) else key: value for key, value in fields.items()}
+        self.streams.setdefault(name, []).append((message_id, entry))
+        return message_id
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        if (name, groupname) in self.groups:
+            raise ResponseError("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(name, [])
+        self.groups[(name, groupname)] = {"last": b"0-0", "read": 0, "pending": {}}
+
+    @staticmethod
+    def _key(message_id):
+        return tuple(int(part) for part in message_id.decode().split("-"))
+
+    async def xreadgroup(self, groupname, consumername, streams, count=None, block=None):
+        response = []
+        for name, start in streams.items():
+            group = self.groups[(name, groupname)]
+            if start == ">":
+                entries = [e for e in self.entries(name) if self._key(e[0]) > self._key(group["last"])][:count]
+                for message_id, _ in entries:
+                    group["pending"][message_id] = [consumername, self.now_ms, 1]
+                if entries:
+                    group["last"] = entries[-1][0]
+                    group["read"] += len(entries)
+            else:
+                start = start if isinstance(start, bytes) else str(start).encode()
+                start = start if b"-" in start else start + b"-0"
+                by_id = dict(self.entries(name))
+                entries = [
+                    (message_id, by_id.get(message_id))
+                    for message_id, (owner, _, _) in sorted(group["pending"].items(), key=lambda i: self._key(i[0]))
+                    if owner == consumername and self._key(message_id) > self._key(start)
+                ][:count]
+            if entries:
+                response.append([name.encode(), entries])
+        if not response and block:
+            await asyncio.sleep(block / 1000)
+        return response
+
+    async def xack(self, name, groupname, *ids):
+        pending = self.pending(name, groupname)
+        return sum(pending.pop(message_id, None) is not None for message_id in ids)
+
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, start_id="0-0", count=None):
+        pending = self.pending(name, groupname)
+        by_id = dict(self.entries(name))
+        claimed = []
+        for message_id in sorted(pending, key=self._key):
+            owner, delivered_at, deliveries = pending[message_id]
+            if self.now_ms - delivered_at >= min_idle_time:
+                pending[message_id] = [consumername, self.now_ms, deliveries + 1]
+                claimed.append((message_id, by_id.get(message_id)))
+        return [b"0-0", claimed[:count], []]
+
+    async def xpending_range(self, name, groupname, min, max, count, consumername=None):
+        return [
+            {"message_id": message_id, "consumer": owner.encode(), "time_since_delivered": 0,
+             "times_delivered": deliveries}
+            for message_id, (owner, _, deliveries) in sorted(self.pending(name, groupname).items())
+            if owner == consumername and self._key(min) <= self._key(message_id) <= self._key(max)
+        ][:count]
+
+    def _xlen(self, name):
+        return len(self.entries(name))
+
+    async def xinfo_groups(self, name):
+        return self._xinfo_groups(name)
+
+    def _xinfo_groups(self, name):
+        if name not in self.streams:
+            raise ResponseError("no such key")
+        return [
+            {
+                "name": group.encode(),
+                "consumers": 1,
+                "pending": len(state["pending"]),
+                "last-delivered-id": state["last"],
+                "entries-read": state["read"],
+                "lag": sum(self._key(e[0]) > self._key(state["last"]) for e in self.entries(name)),
+            }
+            for (stream, group), state in self.groups.items() if stream == name
+        ]
+
+    async def xpending(self, name, groupname):
+        pending = sorted(self.pending(name, groupname), key=self._key)
+        return {"pending": len(pending), "min": pending[0] if pending else None,
+                "max": pending[-1] if pending else None, "consumers": []}
+
+    async def xtrim(self, name, maxlen=None, approximate=True, minid=None):
+        before = len(self.entries(name))
+        self.streams[name] = [e for e in self.entries(name) if self._key(e[0]) >= self._key(minid)]
+        return before - len(self.streams[name])
+
+    def pipeline(self, transaction=True):
+        return FakeStreamsPipeline(self)
+
+
+class FakeStreamsPipeline:
+    """Pipeline sin transacción de la muestra (XLEN y XINFO GROUPS)."""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def xlen(self, name):
+        self.calls.append(lambda: self.redis._xlen(name))
+
+    def xinfo_groups(self, name):
+        self.calls.append(lambda: self.redis._xinfo_groups(name))
+
+    async def execute(self, raise_on_error=True):
+        results = []
+        for call in self.calls:
+            try:
+                results.append(call())
+            except ResponseError as e:
+                if raise_on_error:
+                    raise
+                results.append(e)
+        return results
+
+
+def reader(redis, streams, callback, **config):
+    return RedisStreamReader(
+        redis, streams, "workers", "host-0", callback, parking="transactions.parking",
+        block_ms=1, claim_interval=3600, **config,
+    )
+
+
+async def run_until(reader, condition, timeout=2.0):
+    task = asyncio.create_task(reader.run())
+    try:
+        async def wait():
+            while not condition():
+                await asyncio.sleep(0.001)
+        await asyncio.wait_for(wait(), timeout)
+    finally:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+async def add_raw(redis, stream, count):
+    for i in range(count):
+        await redis.xadd(stream, {"body": f"m{i}".encode(), "content_type": b"text/plain"})
+
+
+class TestRedisStreamsPublisher:
+
+    @pytest.mark.asyncio
+    async def test_transactions_go_to_the_user_shard_untrimmed(self):
+        redis = FakeStreams()
+        publisher = RedisStreamsPublisher("redis://unused", codec=JsonCodec(), client=redis)
+
+        for i in range(3):
+            await publisher.publish_transaction_for_processing(transaction_data(i, "user_001"))
+
+        stream = shard_queue(settings.rabbitmq_transactions_queue, shard_for("user_001", settings.rabbitmq_shard_count))
+        # Sin MAXLEN: nada se borra antes de que el grupo lo confirme
+        assert len(redis.entries(stream)) == 3
+        assert publisher.published_total == 3
+
+    @pytest.mark.asyncio
+    async def test_entries_decode_like_amqp_messages(self):
+        redis = FakeStreams()
+        publisher = RedisStreamsPublisher("redis://unused", client=redis)
+        await publisher.publish("work", convert(transaction_data(1), TransactionMessage))
+        received = []
+
+        async def on_message(message):
+            received.append(decode_transaction(message))
+            await message.ack()
+
+        await run_until(reader(redis, ["work"], on_message), lambda: received)
+
+        assert received[0]["id"] == "txn_0001"
+        assert redis.pending("work", "workers") == {}
+
+    def test_one_stream_per_assigned_shard(self):
+        assert transaction_streams([3, 5]) == [
+            shard_queue(settings.rabbitmq_transactions_queue, 3),
+            shard_queue(settings.rabbitmq_transactions_queue, 5),
+        ]
+
+
+class TestRedisStreamReader:
+
+    @pytest.mark.asyncio
+    async def test_existing_group_is_reused(self):
+        redis = FakeStreams()
+        await redis.xgroup_create("work", "workers", id="0", mkstream=True)
+
+        await reader(redis, ["work"], AsyncMock()).declare()
+
+    @pytest.mark.asyncio
+    async def test_prefetch_limits_unacked_deliveries(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 10)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        stream_reader = reader(redis, ["work"], on_message, prefetch_count=3)
+        await run_until(stream_reader, lambda: len(received) == 3)
+        await asyncio.sleep(0.01)
+
+        assert len(received) == 3
+        assert stream_reader.unacked == 3
+
+    @pytest.mark.asyncio
+    async def test_multiple_ack_settles_lower_tags_across_streams(self):
+        redis = FakeStreams()
+        await add_raw(redis, "a", 2)
+        await add_raw(redis, "b", 2)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        stream_reader = reader(redis, ["a", "b"], on_message)
+        await run_until(stream_reader, lambda: len(received) == 4)
+        last = max(received, key=lambda message: message.delivery_tag)
+        await received[0].nack(requeue=True)
+        await last.ack(multiple=True)
+
+        assert stream_reader.unacked == 0
+        assert stream_reader.acked_total == 3
+        assert list(redis.pending(received[0].routing_key, "workers")) == [received[0].message_id]
+
+    @pytest.mark.asyncio
+    async def test_requeued_entry_is_reclaimed_and_parked_after_max_deliveries(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 1)
+        deliveries = []
+
+        async def on_message(message):
+            deliveries.append(message.redelivered)
+            await message.nack(requeue=True)
+
+        stream_reader = reader(redis, ["work"], on_message, claim_idle_ms=1000, max_deliveries=3)
+        await stream_reader.declare()
+        await stream_reader.read_new()
+        for _ in range(3):
+            redis.now_ms += 1000
+            await stream_reader.claim_stuck()
+
+        assert deliveries == [False, True, True]
+        assert stream_reader.parked_total == 1
+        assert redis.pending("work", "workers") == {}
+        parked = json.loads(redis.entries("transactions.parking")[0][1][b"headers"])
+        assert parked[ORIGIN_HEADER] == "work"
+        assert "deliveries" in parked[REASON_HEADER]
+
+    @pytest.mark.asyncio
+    async def test_claim_skips_entries_still_in_flight(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 1)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        stream_reader = reader(redis, ["work"], on_message, claim_idle_ms=1000)
+        await stream_reader.declare()
+        await stream_reader.read_new()
+        redis.now_ms += 5000
+
+        assert await stream_reader.claim_stuck() == 0
+        assert len(received) == 1
+
+    @pytest.mark.asyncio
+    async def test_rejected_entry_goes_to_parking(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 1)
+
+        async def on_message(message):
+            await message.nack(requeue=False)
+
+        stream_reader = reader(redis, ["work"], on_message)
+        await run_until(stream_reader, lambda: stream_reader.parked_total == 1)
+
+        assert redis.pending("work", "workers") == {}
+        assert redis.entries("transactions.parking")[0][1][b"body"] == b"m0"
+
+    @pytest.mark.asyncio
+    async def test_restarted_consumer_rereads_its_own_pending_entries_first(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 3)
+        first = reader(redis, ["work"], AsyncMock())
+        await first.declare()
+        await first.read_new()
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+            await message.ack()
+
+        restarted = reader(redis, ["work"], on_message)
+        await run_until(restarted, lambda: len(received) == 3)
+
+        assert [message.redelivered for message in received] == [True, True, True]
+        assert redis.pending("work", "workers") == {}
+
+
+class TestStreamTrimming:
+
+    @pytest.mark.asyncio
+    async def test_trim_keeps_undelivered_and_unacked_entries(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 10)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        stream_reader = reader(redis, ["work"], on_message, read_count=4, prefetch_count=4)
+        await stream_reader.declare()
+        await stream_reader.read_new()
+        await received[0].ack()
+        await received[1].ack()
+        await received[3].ack()  # el tercero sigue pendiente
+
+        assert await stream_reader.trim() == 2
+        assert [entry[0] for entry in redis.entries("work")][0] == received[2].message_id
+        assert len(redis.entries("work")) == 8
+
+    @pytest.mark.asyncio
+    async def test_trim_without_pending_stops_at_last_delivered(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 5)
+
+        async def on_message(message):
+            await message.ack()
+
+        stream_reader = reader(redis, ["work"], on_message, read_count=3, prefetch_count=3)
+        await stream_reader.declare()
+        await stream_reader.read_new()
+
+        assert await stream_reader.trim() == 2
+        # La última entregada y las dos sin entregar quedan
+        assert len(redis.entries("work")) == 3
+
+    @pytest.mark.asyncio
+    async def test_untouched_group_blocks_trimming(self):
+        redis = FakeStreams()
+        await add_raw(redis, "work", 3)
+        await redis.xgroup_create("work", "auditors", id="0")
+        stream_reader = reader(redis, ["work"], lambda message: message.ack())
+        await stream_reader.declare()
+
+        assert await stream_reader.trim() == 0
+        assert len(redis.entries("work")) == 3
+
+
+class TestRedisStreamsSampler:
+
+    @pytest.mark.asyncio
+    async def test_backlog_is_lag_plus_pending_and_rate_from_acks(self):
+        redis = FakeStreams()
+        clock = Mock(return_value=0.0)
+        await add_raw(redis, "work.0", 6)
+        await add_raw(redis, "work.1", 2)
+        received = []
+
+        async def on_message(message):
+            received.append(message)
+
+        stream_reader = reader(redis, ["work.0", "work.1"], on_message, read_count=8)
+        await stream_reader.declare()
+        sampler = RedisStreamsSampler("redis://unused", ["work.0", "work.1", "work.2"], "workers",
+                                      client=redis, clock=clock)
+
+        # Stream inexistente (work.2) ignorado; la primera muestra no tiene tasa
+        assert await sampler() == QueueSample(depth=8, ack_rate=0.0)
+
+        await stream_reader.read_new()
+        for message in received[:4]:
+            await message.ack()
+        clock.return_value = 2.0
+
+        # 6 entregadas (4 + 2), 4 confirmadas en 2 s: 2 pendientes y 2 sin entregar
+        assert len(received) == 6
+        assert await sampler() == QueueSample(depth=4, ack_rate=2.0)
+
+    def test_stream_without_the_group_counts_its_length(self):
+        sampler = RedisStreamsSampler("redis://unused", ["work"], "workers", clock=Mock(return_value=0.0))
+
+        assert sampler.parse([7, []]) == QueueSample(depth=7, ack_rate=0.0)
+
+    def test_missing_lag_falls_back_to_length(self):
+        sampler = RedisStreamsSampler("redis://unused", ["work"], "workers", clock=Mock(return_value=0.0))
+        groups = [{"name": b"workers", "pending": 2, "last-delivered-id": b"5-0", "entries-read": None, "lag": None}]
+
+        assert sampler.parse([9, groups]).depth == 11
+
+
+class TestStreamsPipeline:
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("batch_size", [0, 8])
+    async def test_every_published_transaction_is_written_and_acked(self, batch_size):
+        redis = FakeStreams()
+        publisher = RedisStreamsPublisher("redis://unused", client=redis)
+        engine, repository = make_engine(publisher)
+        if batch_size:
+            consumer = MicroBatchConsumer(engine, batch_size=batch_size, max_wait_seconds=0.005)
+        else:
+            consumer = EvaluationConsumer(engine, concurrency=4)
+        streams = transaction_streams(None)
+        stream_reader = reader(redis, streams, consumer.dispatch, prefetch_count=32)
+        flusher = asyncio.create_task(consumer.flush_periodically())
+
+        for i in range(50):
+            await publisher.publish_transaction_for_processing(transaction_data(i))
+        await run_until(stream_reader, lambda: stream_reader.acked_total == 50)
+        flusher.cancel()
+
+        written = sorted(
+            evaluation.transaction_id
+            for call in repository.save_evaluations.call_args_list
+            for evaluation in call.args[0]
+        )
+        assert written == [f"txn_{i:04d}" for i in range(50)]
+        assert all(redis.pending(stream, "workers") == {} for stream in streams)
@@ -0,0 +1,276 @@
+"""
+Tests unitarios para los reintentos diferidos y la cola de parking.
+
+Valida la topología declarada (colas de espera con TTL y dead-letter),
+el header de intentos, el parking tras agotar los intentos, el uso desde
+el consumidor y la inspección/reinyección del parking desde la CLI.
+"""
+import json
+import pytest
+from types import SimpleNamespace
+from unittest.mock import Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.evaluation_writer import EvaluationBatchWriter, WriteOutcome
+from src.infrastructure.retry_topology import (
+    ATTEMPT_HEADER,
+    ORIGIN_HEADER,
+    REASON_HEADER,
+    RetryRouter,
+    list_parked,
+    parking_queue,
+    replay_parked,
+    retry_delays,
+    retry_queue,
+)
+from tests.unit.conftest import FakeMessage, decode_json
+
+
+class FakeExchange:
+
+    def __init__(self, name, published):
+        self.name = name
+        self.published = published
+        self.fail = False
+
+    async def publish(self, message, routing_key):
+        if self.fail:
+            raise ConnectionError("channel closed")
+        self.published.append((self.name, routing_key, message))
+
+
+class FakeQueue:
+
+    def __init__(self, name, arguments):
+        self.name = name
+        self.arguments = arguments
+        self.bound_to = None
+
+    async def bind(self, exchange):
+        self.bound_to = exchange.name
+
+
+class FakeChannel:
+    """Canal con la interfaz de aio-pika usada por RetryRouter."""
+
+    def __init__(self):
+        self.published = []
+        self.exchanges = {}
+        self.queues = {}
+        self.default_exchange = FakeExchange("", self.published)
+
+    async def declare_exchange(self, name, type, durable):
+        assert type == "fanout" and durable
+        exchange = self.exchanges[name] = FakeExchange(name, self.published)
+        return exchange
+
+    async def declare_queue(self, name, durable, arguments=None):
+        queue = self.queues[name] = FakeQueue(name, arguments)
+        return queue
+
+
+def message_factory(body, headers, content_type, priority=None):
+    return {"body": body, "headers": headers, "content_type": content_type, "priority": priority}
+
+
+@pytest.fixture
+def channel():
+    return FakeChannel()
+
+
+@pytest.fixture
+async def router(channel):
+    router = RetryRouter(channel, "transactions", retry_delays(1.0, 3, 300.0), message_factory=message_factory)
+    await router.declare()
+    return router
+
+
+class TestRetryRouter:
+
+    def test_delays_grow_exponentially_up_to_max(self):
+        assert retry_delays(1.0, 5, 10.0) == [1.0, 2.0, 4.0, 8.0, 10.0]
+
+    @pytest.mark.asyncio
+    async def test_declares_delay_queues_that_dead_letter_back(self, router, channel):
+        for delay in (1.0, 2.0, 4.0):
+            queue = channel.queues[retry_queue("transactions", delay)]
+            assert queue.arguments == {"x-message-ttl": int(delay * 1000), "x-dead-letter-exchange": ""}
+            assert queue.bound_to == retry_queue("transactions", delay)
+        assert parking_queue("transactions") in channel.queues
+
+    @pytest.mark.asyncio
+    async def test_retry_increments_attempt_and_keeps_origin(self, router, channel):
+        await router.retry(FakeMessage(1, b"{}", [], headers={ATTEMPT_HEADER: 1}), "redis down")
+
+        exchange, routing_key, message = channel.published[0]
+        assert exchange == "transactions.retry.2000ms"
+        assert routing_key == "transactions.shard.3"
+        assert message["headers"][ATTEMPT_HEADER] == 2
+
+    @pytest.mark.asyncio
+    async def test_retry_keeps_priority(self, router, channel):
+        """Test: La revisión manual reintentada conserva su prioridad AMQP."""
+        message = FakeMessage(1, b"{}", [], routing_key="manual_review.priority")
+        message.priority = 7
+
+        await router.retry(message, "mongo down")
+
+        assert channel.published[0][2]["priority"] == 7
+
+    @pytest.mark.asyncio
+    async def test_exhausted_retries_are_parked(self, router, channel):
+        await router.retry(FakeMessage(1, b"{}", [], headers={ATTEMPT_HEADER: 3}), "redis down")
+
+        exchange, routing_key, message = channel.published[0]
+        assert (exchange, routing_key) == ("", "transactions.parking")
+        assert message["headers"][ORIGIN_HEADER] == "transactions.shard.3"
+        assert "after 3 attempts" in message["headers"][REASON_HEADER]
+        assert router.parked_total == 1
+
+
+class FlakyEngine:
+
+    def __init__(self):
+        self.writer = EvaluationBatchWriter(Mock(), max_batch_size=100)
+        self.writer.repository.save_evaluations = lambda batch: [WriteOutcome.WRITTEN] * len(batch)
+
+    async def evaluate(self, transaction_data, on_done):
+        if transaction_data.get("invalid"):
+            raise ValueError("invalid amount")
+        raise ConnectionError("mongo down")
+
+    async def evaluate_batch(self, batch):
+        results = []
+        for data, on_done in batch:
+            if data.get("flaky"):
+                results.append(ConnectionError("mongo down"))
+            else:
+                self.writer.add(Mock(transaction_id=data["id"]), on_done)
+                results.append(({"risk_level": "LOW_RISK"}, True))
+        return results
+
+
+class TestConsumerRetries:
+
+    @pytest.mark.asyncio
+    async def test_temporary_error_is_delayed_not_requeued(self, router, channel):
+        settled = []
+        consumer = EvaluationConsumer(FlakyEngine(), concurrency=2, retries=router, decode=decode_json)
+
+        await consumer.dispatch(FakeMessage(1, json.dumps({"id": "txn_1"}).encode(), settled))
+        await consumer.drain()
+
+        assert settled == [(1, "ack")]
+        assert channel.published[0][0] == "transactions.retry.1000ms"
+
+    @pytest.mark.asyncio
+    async def test_invalid_message_is_parked(self, router, channel):
+        settled = []
+        consumer = EvaluationConsumer(FlakyEngine(), concurrency=2, retries=router, decode=decode_json)
+
+        await consumer.dispatch(FakeMessage(1, b"invalid json {{", settled))
+        await consumer.drain()
+
+        assert settled == [(1, "ack")]
+        assert channel.published[0][1] == "transactions.parking"
+
+    @pytest.mark.asyncio
+    async def test_failed_reroute_falls_back_to_requeue(self, router, channel):
+        settled = []
+        for exchange in channel.exchanges.values():
+            exchange.fail = True
+        consumer = EvaluationConsumer(FlakyEngine(), concurrency=2, retries=router, decode=decode_json)
+
+        await consumer.dispatch(FakeMessage(1, json.dumps({"id": "txn_1"}).encode(), settled))
+        await consumer.drain()
+
+        assert settled == [(1, "requeue")]
+
+    @pytest.mark.asyncio
+    async def test_batch_includes_rerouted_messages_in_multi_ack(self, router, channel):
+        settled = []
+        consumer = MicroBatchConsumer(FlakyEngine(), batch_size=3, max_wait_seconds=10, retries=router, decode=decode_json)
+
+        await consumer.dispatch(FakeMessage(1, json.dumps({"id": "txn_1"}).encode(), settled))
+        await consumer.dispatch(FakeMessage(2, json.dumps({"id": "txn_2", "flaky": True}).encode(), settled))
+        await consumer.dispatch(FakeMessage(3, b"invalid json {{", settled))
+
+        assert settled == [(3, "ack-multiple")]
+        assert [routing_key for _, routing_key, _ in channel.published] == [
+            "transactions.shard.3", "transactions.parking",
+        ]
+
+
+class FakePikaChannel:
+    """basic_get/ack/nack/publish de pika sobre una lista."""
+
+    def __init__(self, parked):
+        self.parked = list(parked)
+        self.unacked = {}
+        self.published = []
+        self.next_tag = 0
+        self.confirming = False
+
+    def confirm_delivery(self):
+        self.confirming = True
+
+    def basic_get(self, queue, auto_ack):
+        assert queue == "transactions.parking"
+        if not self.parked:
+            return None, None, None
+        self.next_tag += 1
+        headers, body = self.parked.pop(0)
+        self.unacked[self.next_tag] = (headers, body)
+        return SimpleNamespace(delivery_tag=self.next_tag), SimpleNamespace(headers=headers, content_type="application/json"), body
+
+    def basic_ack(self, delivery_tag):
+        del self.unacked[delivery_tag]
+
+    def basic_nack(self, delivery_tag, multiple=False, requeue=True):
+        tags = [tag for tag in self.unacked if tag <= delivery_tag] if multiple else [delivery_tag]
+        for tag in sorted(tags):
+            self.parked.append(self.unacked.pop(tag))
+
+    def basic_publish(self, exchange, routing_key, body, properties):
+        self.published.append((routing_key, body, properties.headers))
+
+
+def parked_entry(origin, n):
+    return ({ORIGIN_HEADER: origin, ATTEMPT_HEADER: 5, REASON_HEADER: "mongo down"}, f'{{"id": "txn_{n}"}}'.encode())
+
+
+class TestParkingCli:
+
+    def test_list_does_not_consume(self):
+        channel = FakePikaChannel([parked_entry("transactions.shard.1", n) for n in range(3)])
+
+        parked = list_parked(channel, "transactions", limit=2)
+
+        assert [message.body for message in parked] == [b'{"id": "txn_0"}', b'{"id": "txn_1"}']
+        assert parked[0].attempts == 5 and parked[0].reason == "mongo down"
+        assert len(channel.parked) == 3 and not channel.unacked
+
+    def test_replay_resets_attempts_and_routes_to_origin(self):
+        channel = FakePikaChannel([
+            parked_entry("transactions.shard.1", 0),
+            parked_entry("transactions.shard.2", 1),
+            parked_entry("transactions.shard.1", 2),
+        ])
+
+        replayed = replay_parked(channel, "transactions", origin="transactions.shard.1")
+
+        assert replayed == 2
+        assert channel.confirming
+        assert [routing_key for routing_key, _, _ in channel.published] == ["transactions.shard.1"] * 2
+        assert all(headers == {} for _, _, headers in channel.published)
+        assert len(channel.parked) == 1 and not channel.unacked
+
+    def test_replay_respects_limit(self):
+        channel = FakePikaChannel([parked_entry("transactions", n) for n in range(5)])
+
+        assert replay_parked(channel, "transactions", limit=2) == 2
+        assert len(channel.parked) == 3
@@ -0,0 +1,265 @@
+"""
+Tests unitarios para la cola de trabajo de los analistas.
+
+Valida la prioridad AMQP por riesgo y monto, la materialización
+idempotente en `review_queue` (omitiendo las ya revisadas), el reclamo
+atómico en orden del índice, la liberación de reclamos vencidos y el
+consumidor por lotes con ack múltiple sobre el broker en memoria (con los
+lotes fallidos diferidos en las colas de espera).
+"""
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+from unittest.mock import AsyncMock, MagicMock, Mock
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+
+from src.config import settings
+from src.infrastructure.index_catalog import QUERY_SHAPES
+from src.infrastructure.memory_broker import InMemoryBroker, InMemoryPublisher, OutgoingMessage
+from src.infrastructure.message_codec import JsonCodec, ManualReviewMessage
+from src.infrastructure.review_queue import (
+    CLAIMED,
+    PENDING,
+    REVIEW_ORDER,
+    ReviewQueueConsumer,
+    ReviewQueueStore,
+    review_priority,
+    review_priority_queue,
+)
+
+
+NOW = datetime(2026, 10, 19, 9, 0)
+
+
+def review(n, risk_level="MEDIUM_RISK", amount=100.0):
+    return ManualReviewMessage(
+        transaction_id=f"txn_{n}", risk_level=risk_level, amount=amount, user_id="user_001", reasons=["amount_threshold"]
+    )
+
+
+class TestReviewPriority:
+
+    def test_high_risk_always_outranks_medium(self):
+        assert review_priority("HIGH_RISK", 10.0) > review_priority("MEDIUM_RISK", 1_000_000.0)
+
+    def test_amount_bands_order_within_risk_level(self):
+        priorities = [review_priority("MEDIUM_RISK", amount) for amount in (50, 2000, 10000, 50000, 500000)]
+        assert priorities == [0, 1, 2, 3, 4]
+        assert review_priority("HIGH_RISK", 500000) == 9
+
+    def test_catalog_covers_claim_order(self):
+        shape = next(s for s in QUERY_SHAPES if s.name == "review_queue_next")
+        assert shape.index.keys[0] == ("status", 1)
+        assert list(shape.index.keys[1:]) == REVIEW_ORDER
+
+
+class TestReviewQueueStore:
+
+    @pytest.fixture
+    def collection(self):
+        return MagicMock()
+
+    @pytest.fixture
+    def evaluations(self):
+        evaluations = MagicMock()
+        evaluations.find.return_value = []
+        return evaluations
+
+    @pytest.fixture
+    def store(self, collection, evaluations):
+        return ReviewQueueStore(collection, evaluations, clock=lambda: NOW)
+
+    def test_add_many_upserts_by_transaction_id(self, store, collection):
+        collection.bulk_write.return_value.upserted_count = 2
+
+        added = store.add_many([review(1, "HIGH_RISK"), review(2), review(1, "HIGH_RISK")])
+
+        operations = collection.bulk_write.call_args.args[0]
+        assert added == 2
+        assert [op._filter for op in operations] == [{"_id": "txn_1"}, {"_id": "txn_2"}]
+        document = operations[0]._doc["$setOnInsert"]
+        assert (document["rank"], document["status"], document["enqueued_at"]) == (2, PENDING, NOW)
+
+    def test_add_many_skips_reviewed_transactions(self, store, collection, evaluations):
+        evaluations.find.return_value = [{"transaction_id": "txn_1"}]
+
+        store.add_many([review(1), review(2)])
+
+        query = evaluations.find.call_args.args[0]
+        assert query == {"transaction_id": {"$in": ["txn_1", "txn_2"]}, "reviewed_by": {"$ne": None}}
+        assert [op._filter for op in collection.bulk_write.call_args.args[0]] == [{"_id": "txn_2"}]
+
+    def test_concurrent_upsert_duplicate_is_not_an_error(self, store, collection):
+        collection.bulk_write.side_effect = BulkWriteError(
+            {"writeErrors": [{"code": 11000, "index": 0}], "nUpserted": 1}
+        )
+
+        assert store.add_many([review(1), review(2)]) == 1
+
+    def test_other_write_errors_propagate(self, store, collection):
+        collection.bulk_write.side_effect = BulkWriteError({"writeErrors": [{"code": 121, "index": 0}]})
+
+        with pytest.raises(BulkWriteError):
+            store.add_many([review(1)])
+
+    def test_claim_next_is_one_sorted_find_one_and_update(self, store, collection):
+        collection.find_one_and_update.return_value = {"_id": "txn_1", "status": CLAIMED}
+
+        item = store.claim_next("analyst_1", lease_seconds=600)
+
+        assert item["_id"] == "txn_1"
+        query, update = collection.find_one_and_update.call_args.args
+        kwargs = collection.find_one_and_update.call_args.kwargs
+        assert query == {"status": PENDING}
+        assert kwargs["sort"] == REVIEW_ORDER
+        assert kwargs["return_document"] is ReturnDocument.AFTER
+        assert update["$set"]["claimed_by"] == "analyst_1"
+        assert update["$set"]["lease_until"] == NOW + timedelta(seconds=600)
+
+    def test_claim_next_releases_expired_claims_first(self, store, collection):
+        store.claim_next("analyst_1", lease_seconds=600)
+
+        query, update = collection.update_many.call_args.args
+        assert query == {"status": CLAIMED, "lease_until": {"$lt": NOW}}
+        assert update["$set"] == {"status": PENDING}
+
+    def test_claim_only_matches_free_own_or_expired_items(self, store, collection):
+        store.claim("txn_1", "analyst_1", lease_seconds=600)
+
+        query = collection.find_one_and_update.call_args.args[0]
+        assert query["_id"] == "txn_1"
+        assert {"claimed_by": "analyst_1"} in query["$or"]
+        assert {"lease_until": {"$lt": NOW}} in query["$or"]
+
+    def test_release_requires_the_claiming_analyst(self, store, collection):
+        collection.update_one.return_value.modified_count = 0
+
+        assert not store.release("txn_1", "analyst_2")
+        assert collection.update_one.call_args.args[0] == {"_id": "txn_1", "status": CLAIMED, "claimed_by": "analyst_2"}
+
+
+class TestReviewQueueConsumer:
+
+    @pytest.mark.asyncio
+    async def test_high_risk_reviews_are_materialized_first(self):
+        broker = InMemoryBroker()
+        publisher = InMemoryPublisher(broker, codec=JsonCodec())
+        await publisher.publish_for_manual_review({**vars(review(1)), "amount": 50.0})
+        await publisher.publish_for_manual_review({**vars(review(2)), "amount": 50000.0})
+        await publisher.publish_for_manual_review({**vars(review(3)), "risk_level": "HIGH_RISK"})
+
+        store = Mock()
+        store.add_many = Mock(side_effect=len)
+        consumer = ReviewQueueConsumer(store, batch_size=1)
+        channel = await broker.channel()
+        await channel.set_qos(prefetch_count=1)
+        queue = await channel.declare_queue(review_priority_queue(settings.rabbitmq_manual_review_queue))
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+
+        ids = [[item.transaction_id for item in call.args[0]] for call in store.add_many.call_args_list]
+        assert ids == [["txn_3"], ["txn_2"], ["txn_1"]]
+        assert channel.unacked == 0
+
+    @pytest.mark.asyncio
+    async def test_batch_is_acked_once_and_requeued_on_write_failure(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("reviews")
+        codec = JsonCodec()
+        for n in range(3):
+            await channel.default_exchange.publish(OutgoingMessage(codec.encode(review(n))), routing_key="reviews")
+
+        store = Mock()
+        store.add_many = Mock(side_effect=[ConnectionError("mongo down"), 3])
+        consumer = ReviewQueueConsumer(store, batch_size=3)
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+
+        assert store.add_many.call_count == 2
+        assert broker.redelivered_total == 3
+        assert broker.acked_total == 3
+        assert consumer.materialized_total == 3
+
+    @pytest.mark.asyncio
+    async def test_write_failure_goes_to_the_delay_queues(self):
+        """Test: Con RetryRouter el lote fallido se difiere en vez de reencolarse en el acto."""
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("reviews")
+        codec = JsonCodec()
+        for n in range(3):
+            await channel.default_exchange.publish(OutgoingMessage(codec.encode(review(n))), routing_key="reviews")
+
+        store = Mock()
+        store.add_many = Mock(side_effect=ConnectionError("mongo down"))
+        retries = AsyncMock()
+        consumer = ReviewQueueConsumer(store, batch_size=3, retries=retries)
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+
+        assert store.add_many.call_count == 1
+        assert retries.retry.await_count == 3
+        assert broker.redelivered_total == 0
+        assert broker.acked_total == 3
+        assert channel.unacked == 0
+
+    @pytest.mark.asyncio
+    async def test_write_failure_requeues_what_could_not_be_rerouted(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("reviews")
+        await channel.default_exchange.publish(OutgoingMessage(JsonCodec().encode(review(1))), routing_key="reviews")
+
+        store = Mock()
+        store.add_many = Mock(side_effect=[ConnectionError("mongo down"), 1])
+        retries = AsyncMock()
+        retries.retry.side_effect = ConnectionError("channel closed")
+        consumer = ReviewQueueConsumer(store, batch_size=1, retries=retries)
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+
+        assert broker.redelivered_total == 1
+        assert consumer.materialized_total == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_message_is_parked(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("reviews")
+        await channel.default_exchange.publish(OutgoingMessage(b"invalid json {{"), routing_key="reviews")
+
+        retries = AsyncMock()
+        consumer = ReviewQueueConsumer(Mock(), retries=retries)
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+
+        retries.park.assert_awaited_once()
+        assert broker.dropped_total == 0
+        assert broker.acked_total == 1
+
+    @pytest.mark.asyncio
+    async def test_invalid_message_is_rejected_without_blocking_the_batch(self):
+        broker = InMemoryBroker()
+        channel = await broker.channel()
+        queue = await channel.declare_queue("reviews")
+        await channel.default_exchange.publish(OutgoingMessage(b"invalid json {{"), routing_key="reviews")
+        await channel.default_exchange.publish(OutgoingMessage(JsonCodec().encode(review(1))), routing_key="reviews")
+
+        store = Mock()
+        store.add_many = Mock(return_value=1)
+        consumer = ReviewQueueConsumer(store, batch_size=10, max_wait_seconds=0.001)
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+        await consumer.drain()
+
+        assert consumer.rejected_total == 1
+        assert broker.dropped_total == 1
+        assert broker.acked_total == 1
+        assert channel.unacked == 0
@@ -0,0 +1,258 @@
+"""
+Tests unitarios para el hash único de configuración de reglas.
+
+Valida que la lectura sea un solo HGETALL, que las escrituras vayan en un
+script atómico incrementando la versión y que el estado del esquema
+anterior se migre sin pisar escrituras nuevas.
+"""
+import json
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.rule_config_store import (
+    MIGRATE_SCRIPT,
+    RULE_CONFIG_KEY,
+    WRITE_SCRIPT,
+    RuleConfigSnapshot,
+    RuleConfigStore,
+)
+
+
+class FakePipeline:
+    """Pipeline que encola comandos y los aplica en execute()."""
+
+    def __init__(self, redis, transaction):
+        self.redis = redis
+        self.transaction = transaction
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        self.redis.executed.append((self.transaction, [name for name, _, _ in self.commands]))
+        return [getattr(self.redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """Subconjunto en memoria de redis.asyncio con contador de round trips."""
+
+    def __init__(self):
+        self.strings = {}
+        self.sets = {}
+        self.hashes = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self, transaction)
+
+    # Comandos directos (un round trip cada uno)
+    async def hgetall(self, key):
+        self.round_trips += 1
+        return self._hgetall(key)
+
+    async def exists(self, key):
+        self.round_trips += 1
+        return int(key in self.hashes or key in self.strings)
+
+    async def eval(self, script, numkeys, *keys_and_args):
+        self.round_trips += 1
+        self.executed.append(("eval", [script]))
+        return self._eval(script, numkeys, *keys_and_args)
+
+    def _eval(self, script, numkeys, key, *args):
+        """Replica WRITE_SCRIPT y MIGRATE_SCRIPT con los comandos del fake."""
+        args = [str(arg) for arg in args]
+        if script == MIGRATE_SCRIPT:
+            for name, value in zip(args[::2], args[1::2]):
+                self._hsetnx(key, name, value)
+            return 1
+        count = int(args[0])
+        pairs = args[1:1 + 2 * count]
+        if pairs:
+            self._hset(key, mapping=dict(zip(pairs[::2], pairs[1::2])))
+        if args[1 + 2 * count:]:
+            self._hdel(key, *args[1 + 2 * count:])
+        return self._hincrby(key, "version", 1)
+
+    # Implementaciones compartidas con el pipeline
+    def _hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def _get(self, key):
+        return self.strings.get(key)
+
+    def _smembers(self, key):
+        return set(self.sets.get(key, set()))
+
+    def _hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update({k: str(v) for k, v in mapping.items()})
+        return len(mapping)
+
+    def _hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = str(value)
+        return 1
+
+    def _hdel(self, key, *fields):
+        return sum(1 for f in fields if self.hashes.get(key, {}).pop(f, None) is not None)
+
+    def _hincrby(self, key, field, amount):
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = str(int(fields.get(field, 0)) + amount)
+        return int(fields[field])
+
+    def _expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    def _delete(self, key):
+        return sum(1 for store in (self.strings, self.sets, self.hashes) if store.pop(key, None) is not None)
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def store(redis):
+    return RuleConfigStore(redis)
+
+
+class TestRuleConfigStore:
+
+    @pytest.mark.asyncio
+    async def test_load_is_single_round_trip(self, store, redis):
+        redis.hashes[RULE_CONFIG_KEY] = {
+            "version": "7",
+            "threshold:amount_threshold": "2000.0",
+            "param:rule_rapid_transaction:max_transactions": "5",
+            "disabled:rule_unusual_time": "1",
+            "deleted:rule_device_validation": "1",
+        }
+
+        snapshot = await store.load()
+
+        assert redis.round_trips == 1
+        assert snapshot.version == 7
+        assert snapshot.threshold_config() == {"amount_threshold": 2000.0}
+        assert snapshot.parameter("rule_rapid_transaction", "max_transactions", int) == 5
+        assert snapshot.disabled == {"rule_unusual_time"}
+        assert snapshot.deleted == {"rule_device_validation"}
+
+    @pytest.mark.asyncio
+    async def test_writes_are_transactional_and_versioned(self, store, redis):
+        redis.hashes[RULE_CONFIG_KEY] = {"version": "1"}
+
+        version = await store.set_parameters("rule_rapid_transaction", max_transactions=4, time_window_minutes=10)
+
+        assert version == 2
+        # Un solo EVAL: atómico también en Redis Cluster (sin MULTI)
+        assert redis.executed[-1] == ("eval", [WRITE_SCRIPT])
+        # Los flags de reglas nunca expiraron: el hash no lleva TTL
+        assert RULE_CONFIG_KEY not in redis.ttls
+        snapshot = await store.load()
+        assert snapshot.parameters["rule_rapid_transaction"] == {
+            "max_transactions": "4", "time_window_minutes": "10",
+        }
+
+    @pytest.mark.asyncio
+    async def test_enable_disable_and_delete(self, store, redis):
+        redis.hashes[RULE_CONFIG_KEY] = {"version": "1"}
+
+        await store.set_enabled("rule_unusual_time", False)
+        assert (await store.load()).disabled == {"rule_unusual_time"}
+
+        await store.set_enabled("rule_unusual_time", True)
+        assert (await store.load()).disabled == set()
+
+        await store.set_enabled("rule_location_check", False)
+        await store.mark_deleted("rule_location_check")
+        snapshot = await store.load()
+        assert snapshot.deleted == {"rule_location_check"}
+        assert snapshot.disabled == set()
+        assert snapshot.version == 5
+
+    @pytest.mark.asyncio
+    async def test_legacy_keys_are_migrated_in_one_pipeline(self, store, redis):
+        redis.strings["config:thresholds"] = json.dumps({"amount_threshold": 1800, "location_radius_km": 50})
+        redis.strings["rule_config:rule_unusual_time:deviation_threshold"] = "0.4"
+        redis.sets["disabled_default_rules"] = {"rule_rapid_transaction"}
+        redis.sets["deleted_default_rules"] = {b"rule_device_validation"}
+
+        snapshot = await store.load()
+
+        assert snapshot.thresholds == {"amount_threshold": 1800.0, "location_radius_km": 50.0}
+        assert snapshot.parameter("rule_unusual_time", "deviation_threshold", float) == 0.4
+        assert snapshot.disabled == {"rule_rapid_transaction"}
+        assert snapshot.deleted == {"rule_device_validation"}
+        # HGETALL + pipeline de lectura + EVAL de migración + borrado
+        assert redis.round_trips == 4
+        assert RuleConfigSnapshot.from_hash(redis.hashes[RULE_CONFIG_KEY]).deleted == {"rule_device_validation"}
+        # Las claves antiguas se borran: un hash desalojado no vuelve a migrarlas
+        assert redis.strings == {}
+        assert redis.sets == {}
+        assert RULE_CONFIG_KEY not in redis.ttls
+
+    @pytest.mark.asyncio
+    async def test_first_write_keeps_legacy_state(self, store, redis):
+        """Test: La primera escritura migra antes de crear el hash."""
+        redis.sets["disabled_default_rules"] = {"rule_unusual_time"}
+
+        await store.set_thresholds(amount_threshold=2500.0)
+
+        snapshot = await store.load()
+        assert snapshot.disabled == {"rule_unusual_time"}
+        assert snapshot.thresholds == {"amount_threshold": 2500.0}
+
+    @pytest.mark.asyncio
+    async def test_empty_state(self, store, redis):
+        snapshot = await store.load()
+
+        assert snapshot.is_empty()
+        assert snapshot.threshold_config() is None
+        assert redis.hashes[RULE_CONFIG_KEY]["migrated"] == "1"
+
+    @pytest.mark.asyncio
+    async def test_empty_state_migrates_once(self, store, redis):
+        """Test: Sin configuración, las lecturas siguientes son un solo HGETALL."""
+        await store.load()
+        redis.round_trips = 0
+
+        snapshot = await store.load()
+
+        assert redis.round_trips == 1
+        assert snapshot.is_empty()
+        assert snapshot.version == 1
+
+    @pytest.mark.asyncio
+    async def test_partial_thresholds_use_defaults(self, store, redis):
+        """Test: Un umbral escrito solo no deja al otro fuera de la respuesta."""
+        await store.set_thresholds(amount_threshold=2500.0)
+
+        config = (await store.load()).threshold_config({"amount_threshold": 1500.0, "location_radius_km": 100.0})
+
+        assert config == {"amount_threshold": 2500.0, "location_radius_km": 100.0}
+
+    def test_parameter_cast_fallback(self):
+        snapshot = RuleConfigSnapshot(parameters={"rule_device_validation": {"device_memory_days": "abc"}})
+        assert snapshot.parameter("rule_device_validation", "device_memory_days", int, 90) == 90
+        assert snapshot.parameter("rule_missing", "x", int, 3) == 3
@@ -0,0 +1,121 @@
+"""
+Tests unitarios para el sharding por usuario del worker.
+
+Valida que cada usuario tenga un shard estable, que el publisher use la
+cola de su shard y que escalar los procesos mueva pocos shards.
+"""
+import pytest
+from collections import Counter
+from unittest.mock import MagicMock, patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.sharding import assign_shards, jump_hash, shard_for, shard_queue
+
+
+TRANSACTION = {
+    "id": "txn_001",
+    "amount": 1500.0,
+    "user_id": "user_001",
+    "location": {"latitude": 4.711, "longitude": -74.0721},
+}
+
+
+class TestShardFor:
+
+    def test_user_shard_is_stable(self):
+        assert shard_for("user_001", 64) == shard_for("user_001", 64)
+        assert 0 <= shard_for("user_001", 64) < 64
+
+    def test_users_spread_across_shards(self):
+        counts = Counter(shard_for(f"user_{i}", 16) for i in range(16000))
+
+        assert len(counts) == 16
+        assert max(counts.values()) < 1.2 * 1000
+
+    def test_growing_shards_moves_few_users(self):
+        users = [f"user_{i}" for i in range(5000)]
+        moved = sum(shard_for(user, 64) != shard_for(user, 65) for user in users)
+
+        # Jump hash: solo ~1/65 de los usuarios cambia de shard
+        assert moved < len(users) * 0.03
+
+    def test_buckets_must_be_positive(self):
+        with pytest.raises(ValueError):
+            jump_hash(1, 0)
+
+
+class TestAssignShards:
+
+    def test_every_shard_has_exactly_one_owner(self):
+        assignment = assign_shards(64, 5)
+
+        owned = [shard for shards in assignment for shard in shards]
+        assert sorted(owned) == list(range(64))
+        assert all(assignment)
+
+    def test_scale_out_only_moves_shards_to_new_worker(self):
+        before = assign_shards(64, 4)
+        after = assign_shards(64, 5)
+
+        for worker in range(4):
+            # Los procesos existentes solo pierden shards, nunca ganan
+            assert set(after[worker]) <= set(before[worker])
+        assert set(after[4]) == set(range(64)) - {s for shards in after[:4] for s in shards}
+
+
+    def test_load_is_balanced(self):
+        for workers in (3, 5, 8, 32, 64):
+            loads = [len(shards) for shards in assign_shards(64, workers)]
+
+            assert max(loads) - min(loads) <= 1, workers
+            assert max(loads) / min(loads) <= 1.5, workers
+
+    def test_more_workers_than_shards_is_rejected(self):
+        with pytest.raises(ValueError):
+            assign_shards(64, 65)
+
+
+class TestPublisherRouting:
+
+    @pytest.fixture
+    def mock_channel(self):
+        import src.adapters as adapters
+
+        adapters._declared_shard_queues.clear()
+        with patch("src.adapters.pika.BlockingConnection") as mock_conn:
+            channel = MagicMock()
+            mock_conn.return_value.channel.return_value = channel
+            yield channel
+
+    @pytest.mark.asyncio
+    async def test_transaction_goes_to_user_shard_queue(self, mock_channel):
+        from src.adapters import RabbitMQAdapter
+
+        adapter = RabbitMQAdapter("amqp://localhost:5672")
+        await adapter.publish_transaction_for_processing(TRANSACTION)
+
+        routing_key = mock_channel.basic_publish.call_args.kwargs["routing_key"]
+        assert routing_key == shard_queue("transactions", shard_for("user_001", 64))
+
+    def test_shard_queues_declared_once_per_process(self, mock_channel):
+        from src.adapters import RabbitMQAdapter
+
+        RabbitMQAdapter("amqp://localhost:5672")
+        first = mock_channel.queue_declare.call_count
+        RabbitMQAdapter("amqp://localhost:5672")
+
+        assert first == 3 + 64
+        assert mock_channel.queue_declare.call_count == first + 3
+
+    @pytest.mark.asyncio
+    async def test_single_queue_when_sharding_disabled(self, mock_channel):
+        from src.adapters import RabbitMQAdapter
+
+        with patch("src.adapters.settings.rabbitmq_shard_count", 0):
+            adapter = RabbitMQAdapter("amqp://localhost:5672")
+            await adapter.publish_transaction_for_processing(TRANSACTION)
+
+        assert mock_channel.basic_publish.call_args.kwargs["routing_key"] == "transactions"
@@ -166,7 +166,40 @@ class TestEvaluateTransactionUseCase:
         # Assert
         strategy1.evaluate.assert_called_once()
         strategy2.evaluate.assert_called_once()
-    
+
+    @pytest.mark.asyncio
+    async def test_evaluate_transaction_awaits_async_strategies(
+        self, mock_repository, mock_publisher, mock_cache, sample_transaction_data
+    ):
+        """Test: Las estrategias async (Redis) se esperan junto a las síncronas."""
+        # Arrange
+        sync_strategy = Mock()
+        sync_strategy.evaluate = Mock(return_value={
+            "risk_level": RiskLevel.LOW_RISK,
+            "reasons": [],
+            "details": ""
+        })
+        async_strategy = Mock()
+        async_strategy.evaluate = AsyncMock(return_value={
+            "risk_level": RiskLevel.HIGH_RISK,
+            "reasons": ["Dispositivo nuevo o no reconocido"],
+            "details": "test"
+        })
+
+        use_case = EvaluateTransactionUseCase(
+            repository=mock_repository,
+            publisher=mock_publisher,
+            cache=mock_cache,
+            strategies=[sync_strategy, async_strategy]
+        )
+
+        # Act
+        result = await use_case.execute(sample_transaction_data)
+
+        # Assert
+        async_strategy.evaluate.assert_awaited_once()
+        assert result["risk_level"] == "MEDIUM_RISK"
+
     @pytest.mark.asyncio
     async def test_evaluate_transaction_with_invalid_data(
         self, use_case_with_threshold_strategy
@@ -0,0 +1,244 @@
+"""
+Tests unitarios para el historial por usuario agrupado en buckets.
+
+Valida el formato compacto de las entradas, el upsert acotado por `cap`,
+la lectura ordenada con límite y el uso desde MongoDBAdapter.
+"""
+import pytest
+from unittest.mock import MagicMock, patch
+from datetime import datetime, timedelta
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from pymongo import DeleteMany, ReplaceOne
+
+from src.domain.models import FraudEvaluation, RiskLevel
+from src.infrastructure.user_history_buckets import (
+    UserHistoryBucketStore,
+    document_from_entry,
+    entry_from_document,
+)
+
+
+def make_document(i: int, timestamp: datetime, user_id: str = "user_001") -> dict:
+    return {
+        "transaction_id": f"txn_{i:03d}",
+        "user_id": user_id,
+        "risk_level": "LOW_RISK",
+        "reasons": [],
+        "status": "APPROVED",
+        "timestamp": timestamp,
+        "reviewed_by": None,
+        "amount": 50.0,
+        "location": {"latitude": 4.6, "longitude": -74.1},
+    }
+
+
+class TestEntryFormat:
+
+    def test_entry_is_compact_and_roundtrips(self):
+        document = make_document(1, datetime(2026, 1, 12, 10))
+
+        entry = entry_from_document(document)
+
+        assert entry == {
+            "t": "txn_001", "ts": datetime(2026, 1, 12, 10), "r": "LOW_RISK",
+            "s": "APPROVED", "a": 50.0, "loc": [4.6, -74.1],
+        }
+        restored = document_from_entry("user_001", entry)
+        assert restored["location"] == document["location"]
+        assert restored["reasons"] == []
+        assert restored["transaction_id"] == "txn_001"
+
+
+class TestUserHistoryBucketStore:
+
+    @pytest.fixture
+    def collection(self):
+        return MagicMock()
+
+    def test_append_is_capped_upsert(self, collection):
+        store = UserHistoryBucketStore(collection, granularity="month", cap=500)
+
+        store.append(make_document(1, datetime(2026, 1, 12, 10)))
+
+        operation = collection.bulk_write.call_args.args[0][0]
+        assert operation._filter == {
+            "user_id": "user_001", "period": "2026-01", "count": {"$lt": 500}, "backfill": {"$ne": True},
+        }
+        assert operation._doc["$inc"] == {"count": 1}
+        assert operation._doc["$push"]["entries"]["t"] == "txn_001"
+        assert operation._upsert is True
+        assert collection.bulk_write.call_args.kwargs["ordered"] is True
+
+    def test_day_granularity(self, collection):
+        store = UserHistoryBucketStore(collection, granularity="day")
+        assert store.period_of(datetime(2026, 1, 12, 10)) == "2026-01-12"
+
+    def test_invalid_configuration(self, collection):
+        with pytest.raises(ValueError):
+            UserHistoryBucketStore(collection, granularity="week")
+        with pytest.raises(ValueError):
+            UserHistoryBucketStore(collection, cap=0)
+
+    def test_get_history_sorts_and_limits_across_buckets(self, collection):
+        """Test: Deja de leer buckets cuando ya tiene las `limit` entradas más recientes."""
+        base = datetime(2026, 1, 31, 12)
+        newest = {
+            "last_ts": base,
+            "entries": [entry_from_document(make_document(i, base - timedelta(hours=i))) for i in (3, 0, 1)],
+        }
+        middle = {
+            "last_ts": base - timedelta(hours=2),
+            "entries": [entry_from_document(make_document(2, base - timedelta(hours=2)))],
+        }
+        oldest = MagicMock()
+        oldest.__getitem__.side_effect = lambda key: base - timedelta(days=40)
+        collection.find.return_value.sort.return_value = iter([newest, middle, oldest])
+        store = UserHistoryBucketStore(collection)
+
+        history = store.get_history("user_001", limit=3)
+
+        assert [doc["transaction_id"] for doc in history] == ["txn_000", "txn_001", "txn_002"]
+        oldest.get.assert_not_called()
+        collection.find.return_value.sort.assert_called_once_with("last_ts", -1)
+
+    def test_get_history_since_filters_entries(self, collection):
+        since = datetime(2026, 1, 10)
+        bucket = {
+            "last_ts": datetime(2026, 1, 12),
+            "entries": [
+                entry_from_document(make_document(1, datetime(2026, 1, 12))),
+                entry_from_document(make_document(2, datetime(2026, 1, 5))),
+            ],
+        }
+        collection.find.return_value.sort.return_value = [bucket]
+        store = UserHistoryBucketStore(collection)
+
+        history = store.get_history("user_001", since=since)
+
+        collection.find.assert_called_once_with({"user_id": "user_001", "last_ts": {"$gte": since}})
+        assert [doc["transaction_id"] for doc in history] == ["txn_001"]
+
+    def test_rebuild_splits_by_period_and_cap(self, collection):
+        evaluations = MagicMock()
+        evaluations.find.return_value.sort.return_value = [
+            make_document(1, datetime(2026, 1, 1)),
+            make_document(2, datetime(2026, 1, 2)),
+            make_document(3, datetime(2026, 1, 3)),
+            make_document(4, datetime(2026, 2, 1)),
+        ]
+        collection.find_one.return_value = None
+        store = UserHistoryBucketStore(collection, cap=2)
+
+        written = store.rebuild(evaluations, until=datetime(2026, 3, 1))
+
+        assert written == 3
+        evaluations.find.assert_called_once_with({"timestamp": {"$lt": datetime(2026, 3, 1)}})
+        operations = collection.bulk_write.call_args.args[0]
+        buckets = [operation._doc for operation in operations if isinstance(operation, ReplaceOne)]
+        assert [(b["_id"], b["count"]) for b in buckets] == [
+            ("user_001:2026-01:0", 2), ("user_001:2026-01:1", 1), ("user_001:2026-02:0", 1),
+        ]
+        assert all(b["backfill"] for b in buckets)
+        assert buckets[0]["first_ts"] == datetime(2026, 1, 1)
+        assert buckets[0]["last_ts"] == datetime(2026, 1, 2)
+        collection.delete_many.assert_not_called()
+
+    def test_rebuild_stops_at_first_live_entry_and_keeps_live_buckets(self, collection):
+        evaluations = MagicMock()
+        evaluations.find.return_value.sort.return_value = [
+            make_document(1, datetime(2026, 1, 1)),
+            make_document(2, datetime(2026, 1, 5)),
+            make_document(3, datetime(2026, 1, 9)),
+        ]
+        # La escritura en vivo del usuario empezó el día 5
+        collection.find_one.return_value = {"first_ts": datetime(2026, 1, 5)}
+        store = UserHistoryBucketStore(collection)
+
+        store.rebuild(evaluations, until=datetime(2026, 3, 1))
+        first = collection.bulk_write.call_args.args[0]
+        store.rebuild(evaluations, until=datetime(2026, 3, 1))
+        second = collection.bulk_write.call_args.args[0]
+
+        replaced = [operation._doc for operation in first if isinstance(operation, ReplaceOne)]
+        assert [entry["t"] for entry in replaced[0]["entries"]] == ["txn_001"]
+        # Solo borra buckets de backfill sobrantes, nunca los en vivo
+        deleted = next(operation._filter for operation in first if isinstance(operation, DeleteMany))
+        assert deleted == {"user_id": "user_001", "backfill": True, "_id": {"$nin": ["user_001:2026-01:0"]}}
+        assert [op._doc for op in first if isinstance(op, ReplaceOne)] == [
+            op._doc for op in second if isinstance(op, ReplaceOne)
+        ]
+
+
+class TestMongoDBAdapterBuckets:
+
+    @pytest.fixture
+    def adapter(self):
+        with patch('src.adapters.MongoClient') as mock_client:
+            mock_client.return_value.__getitem__.return_value = MagicMock()
+            from src.adapters import MongoDBAdapter
+            adapter = MongoDBAdapter("mongodb://localhost:27017", "test_db", create_indexes=False)
+            adapter.rollups = MagicMock()
+            adapter.user_buckets = MagicMock()
+            adapter.use_user_buckets = True
+            adapter.write_user_buckets = True
+            yield adapter
+
+    def test_user_history_reads_buckets(self, adapter):
+        adapter.user_buckets.get_history.return_value = [make_document(1, datetime(2026, 1, 12))]
+
+        evaluations = adapter.get_evaluations_by_user("user_001", limit=100)
+
+        adapter.user_buckets.get_history.assert_called_once_with("user_001", since=None, limit=100)
+        adapter.evaluations.find.assert_not_called()
+        assert evaluations[0].transaction_id == "txn_001"
+
+    @pytest.mark.asyncio
+    async def test_save_evaluation_appends_bucket(self, adapter):
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001", user_id="user_001", risk_level=RiskLevel.LOW_RISK,
+            reasons=[], timestamp=datetime(2026, 1, 12),
+        )
+
+        await adapter.save_evaluation(evaluation)
+
+        documents = adapter.user_buckets.append_many.call_args.args[0]
+        assert documents[0]["transaction_id"] == "txn_001"
+
+    def test_review_updates_bucket_entry(self, adapter):
+        adapter.evaluations.find_one_and_update.return_value = {
+            "status": "PENDING_REVIEW", "timestamp": datetime(2026, 1, 12), "user_id": "user_001",
+        }
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001", user_id="user_001", risk_level=RiskLevel.MEDIUM_RISK,
+            reasons=[], timestamp=datetime(2026, 1, 12), status="APPROVED", reviewed_by="analyst",
+        )
+
+        adapter.update_evaluation(evaluation)
+
+        adapter.user_buckets.update_review.assert_called_once_with(
+            "user_001", "txn_001", "APPROVED", "analyst", None
+        )
+
+    def test_disabled_buckets_keep_flat_reads(self, adapter):
+        adapter.use_user_buckets = False
+        adapter.evaluations.find.return_value.sort.return_value = []
+
+        adapter.get_evaluations_by_user("user_001")
+
+        adapter.user_buckets.get_history.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_buckets_are_written_before_reads_switch(self, adapter):
+        adapter.use_user_buckets = False
+        evaluation = FraudEvaluation(
+            transaction_id="txn_001", user_id="user_001", risk_level=RiskLevel.LOW_RISK,
+            reasons=[], timestamp=datetime(2026, 1, 12),
+        )
+
+        await adapter.save_evaluation(evaluation)
+
+        adapter.user_buckets.append_many.assert_called_once()
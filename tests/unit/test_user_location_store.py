@@ -0,0 +1,167 @@
+"""
+Tests unitarios para las ubicaciones de usuario en sets GEO de Redis.
+
+Valida la lectura dual (GEO con hash tag primero, claves anteriores como
+respaldo) en un solo round trip, que la escritura reemplace las claves
+anteriores y que las latitudes fuera del rango GEO se acoten.
+"""
+import json
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.redis_keys import legacy_geo_key, legacy_location_key, user_geo_key
+from src.infrastructure.user_location_store import (
+    GEO_MAX_LATITUDE,
+    LOCATION_MEMBER,
+    UserLocationStore,
+)
+
+
+class FakePipeline:
+    """Pipeline que encola comandos y los aplica en execute()."""
+
+    def __init__(self, redis, transaction):
+        self.redis = redis
+        self.transaction = transaction
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return queue
+
+    async def execute(self):
+        self.redis.round_trips += 1
+        self.redis.executed.append((self.transaction, [name for name, _, _ in self.commands]))
+        return [getattr(self.redis, f"_{name}")(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class FakeRedis:
+    """Subconjunto en memoria de redis.asyncio (strings y sets GEO)."""
+
+    def __init__(self):
+        self.strings = {}
+        self.geo = {}
+        self.ttls = {}
+        self.round_trips = 0
+        self.executed = []
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self, transaction)
+
+    def _geopos(self, key, *members):
+        return [self.geo.get(key, {}).get(member) for member in members]
+
+    def _geoadd(self, key, values):
+        longitude, latitude, member = values
+        self.geo.setdefault(key, {})[member] = (longitude, latitude)
+        return 1
+
+    def _get(self, key):
+        return self.strings.get(key)
+
+    def _setex(self, key, ttl, value):
+        self.strings[key] = value
+        self.ttls[key] = ttl
+        return True
+
+    def _expire(self, key, seconds):
+        self.ttls[key] = seconds
+        return True
+
+    def _delete(self, key):
+        return int(self.strings.pop(key, None) is not None or self.geo.pop(key, None) is not None)
+
+
+@pytest.fixture
+def redis():
+    return FakeRedis()
+
+
+@pytest.fixture
+def store(redis):
+    return UserLocationStore(redis, ttl=3600)
+
+
+class TestUserLocationStore:
+
+    @pytest.mark.asyncio
+    async def test_set_replaces_legacy_json(self, store, redis):
+        redis.strings[legacy_location_key("user_001")] = json.dumps({"latitude": 1.0, "longitude": 2.0})
+
+        await store.set("user_001", 4.7110, -74.0721)
+
+        assert redis.executed[-1] == (True, ["geoadd", "expire", "delete", "delete"])
+        assert redis.geo[user_geo_key("user_001")][LOCATION_MEMBER] == (-74.0721, 4.7110)
+        assert redis.ttls[user_geo_key("user_001")] == 3600
+        assert legacy_location_key("user_001") not in redis.strings
+
+    @pytest.mark.asyncio
+    async def test_get_prefers_geo_in_one_round_trip(self, store, redis):
+        redis.strings[legacy_location_key("user_001")] = json.dumps({"latitude": 1.0, "longitude": 2.0})
+        redis.geo[user_geo_key("user_001")] = {LOCATION_MEMBER: (-74.0721, 4.7110)}
+
+        location = await store.get("user_001")
+
+        assert location == {"latitude": 4.7110, "longitude": -74.0721}
+        assert redis.round_trips == 1
+
+    @pytest.mark.asyncio
+    async def test_get_falls_back_to_legacy_json(self, store, redis):
+        redis.strings[legacy_location_key("user_001")] = json.dumps({"latitude": 1.0, "longitude": 2.0})
+
+        assert await store.get("user_001") == {"latitude": 1.0, "longitude": 2.0}
+
+    @pytest.mark.asyncio
+    async def test_get_missing_or_corrupt(self, store, redis):
+        assert await store.get("user_001") is None
+
+        redis.strings[legacy_location_key("user_001")] = "invalid json"
+        assert await store.get("user_001") is None
+
+    @pytest.mark.asyncio
+    async def test_get_reads_untagged_geo_key(self, store, redis):
+        """Test: El set GEO sin hash tag sigue leyéndose durante la migración."""
+        redis.geo[legacy_geo_key("user_001")] = {LOCATION_MEMBER: (-74.0721, 4.7110)}
+
+        assert await store.get("user_001") == {"latitude": 4.7110, "longitude": -74.0721}
+
+    @pytest.mark.asyncio
+    async def test_legacy_reads_disabled(self, redis):
+        redis.strings[legacy_location_key("user_001")] = json.dumps({"latitude": 1.0, "longitude": 2.0})
+        store = UserLocationStore(redis, ttl=3600, legacy_reads=False)
+
+        assert await store.get("user_001") is None
+        assert redis.executed[-1] == (False, ["geopos"])
+
+    @pytest.mark.asyncio
+    async def test_polar_latitude_is_clamped(self, store, redis):
+        """Test: Latitudes fuera del rango GEO se guardan en el límite."""
+        await store.set("user_001", 89.9, 10.0, ttl=60)
+
+        assert redis.geo[user_geo_key("user_001")][LOCATION_MEMBER] == (10.0, GEO_MAX_LATITUDE)
+        assert redis.ttls[user_geo_key("user_001")] == 60
+
+    @pytest.mark.asyncio
+    async def test_get_many_reads_all_users_in_one_round_trip(self, store, redis):
+        redis.geo[user_geo_key("user_001")] = {LOCATION_MEMBER: (-74.0721, 4.7110)}
+        redis.strings[legacy_location_key("user_002")] = json.dumps({"latitude": 1.0, "longitude": 2.0})
+
+        locations = await store.get_many(["user_001", "user_002", "user_003", "user_001"])
+
+        assert locations == {
+            "user_001": {"latitude": 4.7110, "longitude": -74.0721},
+            "user_002": {"latitude": 1.0, "longitude": 2.0},
+            "user_003": None,
+        }
+        assert redis.round_trips == 1
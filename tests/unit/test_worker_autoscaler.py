@@ -0,0 +1,173 @@
+"""
+Tests unitarios para el autoscaler de procesos del worker.
+
+Valida la regla proporcional al lag (con tolerancia, tope por paso y
+límites), la ventana de estabilización antes de reducir, que una muestra
+fallida no cambie nada y que el supervisor aplique la recomendación.
+"""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.admission_control import QueueSample
+from src.infrastructure.worker_autoscaler import WorkerAutoscaler
+from src.infrastructure.worker_supervisor import WorkerSupervisor
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakeProcess:
+
+    def __init__(self, target, args, name):
+        self.shards, self.index = args[1], args[2]
+        self.alive = False
+        self.pid = None
+        self.exitcode = None
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+
+    def join(self, timeout=None):
+        pass
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.started = []
+
+    def Process(self, target, args, name):
+        process = FakeProcess(target, args, name)
+        self.started.append(process)
+        return process
+
+
+def lag(seconds, ack_rate=100.0):
+    return QueueSample(depth=int(seconds * ack_rate), ack_rate=ack_rate)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def autoscaler(samples, clock, min_workers=1, max_workers=16):
+    samples = iter(samples)
+
+    def sample():
+        value = next(samples)
+        if isinstance(value, Exception):
+            raise value
+        return value
+
+    return WorkerAutoscaler(
+        sample,
+        min_workers=min_workers,
+        max_workers=max_workers,
+        target_lag_seconds=30.0,
+        interval=15.0,
+        scale_down_seconds=60.0,
+        clock=clock,
+    )
+
+
+class TestRecommendation:
+
+    def test_scales_in_proportion_to_lag(self, clock):
+        scaler = autoscaler([], clock)
+
+        assert scaler.recommend(4, lag(45)) == 6
+        assert scaler.recommend(4, lag(15)) == 2
+        assert scaler.recommend(4, QueueSample(0, 0.0)) == 1
+
+    def test_small_deviations_are_ignored(self, clock):
+        assert autoscaler([], clock).recommend(4, lag(32)) == 4
+
+    def test_growth_is_capped_per_step_and_by_bounds(self, clock):
+        scaler = autoscaler([], clock, min_workers=2, max_workers=10)
+
+        assert scaler.recommend(3, lag(600)) == 6
+        assert scaler.recommend(8, lag(600)) == 10
+        assert scaler.recommend(3, lag(1)) == 2
+
+    def test_backlog_without_acks_adds_one_worker(self, clock):
+        assert autoscaler([], clock).recommend(4, QueueSample(5000, 0.0)) == 5
+
+    def test_small_backlog_without_acks_keeps_workers(self, clock):
+        # Cola tranquila: pocos mensajes y la tasa de acks decayó a 0
+        scaler = autoscaler([QueueSample(3, 0.0)] * 10, clock)
+
+        assert scaler.recommend(4, QueueSample(3, 0.0)) == 4
+        for _ in range(10):
+            assert scaler.desired(4) is None
+            clock.now += 15
+
+
+class TestDesired:
+
+    def test_samples_only_every_interval(self, clock):
+        scaler = autoscaler([lag(60), lag(60)], clock)
+
+        assert scaler.desired(2) == 4
+        clock.now += 5
+        assert scaler.desired(4) is None
+        clock.now += 10
+        assert scaler.desired(4) == 8
+
+    def test_scale_down_waits_for_the_stabilization_window(self, clock):
+        scaler = autoscaler([lag(60), lag(0), lag(0), lag(0), lag(0), lag(0)], clock)
+
+        assert scaler.desired(4) == 8
+        for _ in range(4):
+            clock.now += 15
+            assert scaler.desired(8) is None
+        clock.now += 15
+        assert scaler.desired(8) == 1
+
+    def test_failed_sample_keeps_current_workers(self, clock):
+        scaler = autoscaler([ConnectionError("management down")], clock)
+
+        assert scaler.desired(4) is None
+        assert scaler.sample_errors_total == 1
+
+    def test_invalid_bounds(self, clock):
+        with pytest.raises(ValueError):
+            autoscaler([], clock, min_workers=4, max_workers=2)
+
+
+class TestSupervisorAutoscaling:
+
+    def test_supervisor_applies_the_recommendation(self, clock):
+        context = FakeContext()
+        sup = WorkerSupervisor(
+            target=lambda shards: None,
+            workers=2,
+            shard_count=8,
+            context=context,
+            clock=clock,
+            autoscaler=autoscaler([lag(60)], clock),
+        )
+        sup.reconcile()
+
+        sup.autoscale()
+        sup.reconcile()
+
+        assert sup.workers == 4
+        alive = [process for process in context.started if process.is_alive()]
+        assert sorted(process.index for process in alive) == [0, 1, 2, 3]
+        assert sorted(s for process in alive for s in process.shards) == list(range(8))
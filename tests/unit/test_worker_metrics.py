@@ -0,0 +1,189 @@
+"""
+Tests unitarios para las métricas del worker.
+
+Valida el histograma acumulado y la ventana de mensajes por segundo, que
+el consumidor registre entregas, resultados y latencias recorriendo el
+broker en memoria, el formato Prometheus de las series y el puerto
+lateral de métricas sobre un socket real.
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import patch
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.config import settings
+from src.infrastructure.admission_control import QueueSample, RabbitMQManagementSampler
+from src.infrastructure.evaluation_consumer import EvaluationConsumer, MicroBatchConsumer
+from src.infrastructure.evaluation_writer import WriteOutcome
+from src.infrastructure.memory_broker import InMemoryBroker, InMemoryPublisher, LocalWorker, OutgoingMessage
+from src.infrastructure.message_codec import JsonCodec
+from src.infrastructure.metrics import render_histogram, serve_metrics, worker_metrics
+from src.infrastructure.redis_streams import RedisStreamsSampler
+from src.infrastructure.worker_metrics import LatencyHistogram, ThroughputMeter, WorkerStats, backlog_sampler
+from tests.unit.conftest import FakeClock, make_engine, transaction_data
+
+
+class TestLatencyHistogram:
+
+    def test_buckets_are_cumulative_and_end_in_inf(self):
+        histogram = LatencyHistogram(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(seconds)
+
+        assert histogram.cumulative() == [("0.1", 2), ("1", 3), ("+Inf", 4)]
+        assert histogram.sum == pytest.approx(3.65)
+
+    def test_batch_observation_counts_every_message(self):
+        histogram = LatencyHistogram(buckets=(0.1,))
+        histogram.observe(0.02, count=8)
+
+        assert histogram.count == 8
+        assert histogram.sum == pytest.approx(0.16)
+
+
+class TestThroughputMeter:
+
+    def test_rate_covers_only_the_window(self):
+        clock = FakeClock(1000.0)
+        meter = ThroughputMeter(window=10.0, clock=clock)
+        meter.add(50)
+        clock.now += 5
+        meter.add(30)
+
+        assert meter.rate() == 8.0
+        clock.now += 6
+        assert meter.rate() == 3.0
+        clock.now += 10
+        assert meter.rate() == 0.0
+
+
+class TestConsumerStats:
+
+    @pytest.mark.asyncio
+    async def test_written_messages_are_counted_with_latency(self):
+        broker = InMemoryBroker()
+        stats = WorkerStats()
+        engine, _ = make_engine(InMemoryPublisher(broker, codec=JsonCodec()))
+        worker = LocalWorker(broker, EvaluationConsumer(engine, concurrency=4, stats=stats), prefetch_count=16)
+        await worker.start()
+
+        publisher = InMemoryPublisher(broker, codec=JsonCodec())
+        for i in range(12):
+            await publisher.publish_transaction_for_processing(transaction_data(i))
+        await asyncio.wait_for(worker.wait_idle(), timeout=5)
+        await worker.stop()
+
+        assert stats.outcomes == {"written": 12}
+        assert stats.in_flight == 0
+        assert stats.processing_latency.count == 12
+        assert stats.evaluation_latency.count == 12
+        assert stats.messages_per_second() > 0
+
+    @pytest.mark.asyncio
+    async def test_micro_batch_counts_invalid_and_failed_writes(self):
+        broker = InMemoryBroker()
+        stats = WorkerStats()
+        engine, _ = make_engine(InMemoryPublisher(broker, codec=JsonCodec()), WriteOutcome.FAILED)
+        consumer = MicroBatchConsumer(engine, batch_size=4, max_wait_seconds=0.005, stats=stats)
+        channel = await broker.channel()
+        queue = await channel.declare_queue("transactions")
+        await channel.default_exchange.publish(OutgoingMessage(b"invalid json {{"), routing_key="transactions")
+        for i in range(3):
+            body = json.dumps(transaction_data(i)).encode()
+            await channel.default_exchange.publish(OutgoingMessage(body), routing_key="transactions")
+
+        await queue.consume(consumer.dispatch)
+        await asyncio.sleep(0.01)
+        await consumer.drain()
+
+        assert stats.outcomes == {"invalid": 1, "failed": 3}
+        assert stats.in_flight == 0
+        assert stats.evaluation_latency.count == 3
+
+
+class TestWorkerMetricsRendering:
+
+    def test_series_include_backlog_outcomes_and_histograms(self):
+        stats = WorkerStats()
+        stats.last_sample = QueueSample(depth=300, ack_rate=20.0)
+        message = object()
+        stats.received(message)
+        stats.observe(message, "written")
+        stats.received(object())
+
+        text = "\n".join(worker_metrics({"transactions": stats}))
+
+        assert 'fraud_worker_queue_depth{name="transactions"} 300' in text
+        assert 'fraud_worker_consumer_lag_seconds{name="transactions"} 15' in text
+        assert 'fraud_worker_in_flight{name="transactions"} 1' in text
+        assert 'fraud_worker_messages_total{name="transactions",outcome="written"} 1' in text
+        assert 'fraud_worker_processing_seconds_bucket{name="transactions",le="+Inf"} 1' in text
+        assert "# TYPE fraud_worker_evaluation_seconds histogram" in text
+
+    def test_backlog_without_acks_has_no_lag_series(self):
+        stats = WorkerStats()
+        stats.last_sample = QueueSample(depth=10, ack_rate=0.0)
+
+        text = "\n".join(worker_metrics({"transactions": stats}))
+
+        assert "fraud_worker_consumer_lag_seconds{" not in text
+
+    def test_histogram_lines(self):
+        histogram = LatencyHistogram(buckets=(0.5,))
+        histogram.observe(0.25)
+
+        assert render_histogram("latency", "Latency", [({}, histogram)])[2:] == [
+            'latency_bucket{le="0.5"} 1',
+            'latency_bucket{le="+Inf"} 1',
+            "latency_sum 0.25",
+            "latency_count 1",
+        ]
+
+
+class TestBacklogSampler:
+
+    def test_rabbitmq_transport_samples_the_management_api(self):
+        with patch.object(settings, "message_transport", "rabbitmq"):
+            assert isinstance(backlog_sampler(), RabbitMQManagementSampler)
+
+    def test_streams_transport_samples_every_transaction_stream(self):
+        with patch.object(settings, "message_transport", "redis_streams"), \
+                patch.object(settings, "rabbitmq_shard_count", 4):
+            sampler = backlog_sampler()
+
+        assert isinstance(sampler, RedisStreamsSampler)
+        assert len(sampler.streams) == 4
+        assert sampler.group == settings.redis_stream_group
+
+
+class TestMetricsSidePort:
+
+    async def get(self, port, path):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n".encode())
+        await writer.drain()
+        response = await reader.read()
+        writer.close()
+        return response.decode()
+
+    @pytest.mark.asyncio
+    async def test_serves_metrics_health_and_404(self):
+        server = await serve_metrics(0, host="127.0.0.1")
+        port = server.sockets[0].getsockname()[1]
+        try:
+            metrics = await self.get(port, "/metrics")
+            health = await self.get(port, "/healthz")
+            missing = await self.get(port, "/other")
+        finally:
+            server.close()
+            await server.wait_closed()
+
+        assert metrics.startswith("HTTP/1.1 200 OK")
+        assert "text/plain; version=0.0.4" in metrics
+        assert "# TYPE fraud_worker_in_flight gauge" in metrics
+        assert health.endswith("ok\n")
+        assert missing.startswith("HTTP/1.1 404")
@@ -0,0 +1,208 @@
+"""
+Tests unitarios para el supervisor de procesos del worker.
+
+Usa procesos falsos: valida el arranque de N procesos, el reinicio con
+backoff de los que mueren y que escalar solo reinicie los afectados.
+"""
+import pytest
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent.parent / "services" / "fraud-evaluation-service"))
+
+from src.infrastructure.worker_supervisor import WorkerSupervisor
+
+
+class FakeProcess:
+
+    def __init__(self, target, args, name, events):
+        self.shards = args[1]
+        self.name = name
+        self.events = events
+        self.pid = None
+        self.alive = False
+        self.exitcode = None
+        self.terminated = False
+
+    def start(self):
+        self.alive = True
+        self.pid = id(self)
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.events.append(("terminate", self.name))
+        self.terminated = True
+        self.alive = False
+        self.exitcode = 0
+
+    def join(self, timeout=None):
+        self.events.append(("join", self.name))
+
+    def kill(self):
+        self.alive = False
+
+    def crash(self):
+        self.alive = False
+        self.exitcode = 1
+
+
+class FakeContext:
+
+    def __init__(self):
+        self.started = []
+        self.events = []
+
+    def Process(self, target, args, name):
+        process = FakeProcess(target, args, name, self.events)
+        self.started.append(process)
+        return process
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def context():
+    return FakeContext()
+
+
+def supervisor(context, clock, workers=3, shard_count=16):
+    return WorkerSupervisor(
+        target=lambda shards: None,
+        workers=workers,
+        shard_count=shard_count,
+        context=context,
+        restart_backoff=1.0,
+        max_backoff=4.0,
+        stable_seconds=30.0,
+        clock=clock,
+    )
+
+
+class TestWorkerSupervisor:
+
+    def test_starts_one_process_per_worker_with_its_shards(self, context, clock):
+        sup = supervisor(context, clock)
+
+        sup.reconcile()
+
+        assert len(context.started) == 3
+        shards = sorted(s for process in context.started for s in process.shards)
+        assert shards == list(range(16))
+
+    def test_crashed_worker_restarts_with_backoff(self, context, clock):
+        sup = supervisor(context, clock)
+        sup.reconcile()
+        crashed = context.started[0]
+
+        crashed.crash()
+        sup.reconcile()
+        assert len(context.started) == 3  # espera 1s
+
+        clock.now = 1.0
+        sup.reconcile()
+        assert len(context.started) == 4
+        assert context.started[-1].shards == crashed.shards
+
+        context.started[-1].crash()
+        clock.now = 1.5
+        sup.reconcile()
+        clock.now = 3.0
+        sup.reconcile()
+        assert len(context.started) == 4  # segunda caída: espera 2s
+        clock.now = 3.5
+        sup.reconcile()
+        assert len(context.started) == 5
+        assert sup.restarts_total == 2
+
+    def test_scale_out_restarts_only_workers_that_lose_shards(self, context, clock):
+        sup = supervisor(context, clock)
+        sup.reconcile()
+        before = {process.name: process for process in context.started}
+
+        sup.scale(4)
+        sup.reconcile()
+
+        assert sup.workers == 4
+        for process in before.values():
+            assert process.terminated == (process.shards != sup.assignment()[int(process.name[-1])])
+        owned = sorted(s for shards in sup.assignment().values() for s in shards)
+        assert owned == list(range(16))
+        alive = [p for p in context.started if p.is_alive()]
+        assert len(alive) == 4
+
+    def test_scale_stops_affected_workers_in_parallel(self, context, clock):
+        """Test: SIGTERM a todos los afectados antes de esperar a alguno."""
+        sup = supervisor(context, clock, workers=2, shard_count=64)
+        sup.reconcile()
+
+        sup.scale(3)
+
+        actions = [action for action, _ in context.events]
+        assert actions == ["terminate", "terminate", "join", "join"]
+
+    def test_scale_in_stops_extra_worker(self, context, clock):
+        sup = supervisor(context, clock)
+        sup.reconcile()
+
+        sup.scale(2)
+        sup.reconcile()
+
+        assert sup.workers == 2
+        assert context.started[2].terminated
+        assert len([p for p in context.started if p.is_alive()]) == 2
+
+    def test_workers_are_capped_to_the_shard_count(self, context, clock):
+        sup = supervisor(context, clock, workers=20, shard_count=4)
+        assert sup.workers == 4
+
+        sup.scale(8)
+
+        assert sup.workers == 4
+        assert all(sup.assignment().values())
+
+    def test_scale_signals_are_applied_between_iterations(self, context, clock):
+        sup = supervisor(context, clock)
+        sup.reconcile()
+
+        sup.request_scale(1)
+        sup.request_scale(1)
+        sup.request_scale(-1)
+        assert sup.workers == 3  # el handler no toca los procesos
+
+        sup.apply_requested_scale()
+        assert sup.workers == 4
+        sup.apply_requested_scale()
+        assert sup.workers == 4
+
+    def test_unsharded_workers_get_no_shards(self, context, clock):
+        sup = supervisor(context, clock, workers=2, shard_count=0)
+
+        sup.reconcile()
+
+        assert [process.shards for process in context.started] == [None, None]
+
+    def test_stop_all_terminates_workers(self, context, clock):
+        sup = supervisor(context, clock)
+        sup.reconcile()
+
+        sup.stop_all()
+
+        assert all(process.terminated for process in context.started)
+
+    def test_workers_must_be_positive(self, context, clock):
+        with pytest.raises(ValueError):
+            supervisor(context, clock, workers=0)